@@ -0,0 +1,136 @@
+import os
+import sys
+import time
+import shutil
+import pathlib
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.text_to_video import job_store
+from backend.text_to_video.job_store import SQLiteJobStore
+from backend.video_pipeline import asset_orchestrator
+from backend.video_pipeline.asset_orchestrator import poll_and_download_argil_videos
+from backend.text_to_video.argil_client import notify_argil_video_event
+
+
+class TestArgilPoller(unittest.TestCase):
+    """Mocked tests for the concurrent Argil render poller."""
+
+    def setUp(self):
+        self.work_dir = pathlib.Path(tempfile.mkdtemp(prefix="argil_poller_"))
+        self.scene_plans = [
+            {"scene_id": f"scene_{i}", "visual_type": "AVATAR", "argil_video_id": f"vid_{i}",
+             "start_time": float(i), "end_time": float(i + 1)}
+            for i in range(4)
+        ]
+        self.downloaded_at = {}
+        self.start = None
+        self.config_patcher = patch.multiple(
+            asset_orchestrator,
+            ARGIL_POLL_INITIAL_INTERVAL_SECONDS=0.05,
+            ARGIL_POLL_MAX_INTERVAL_SECONDS=0.2,
+            ARGIL_POLLING_DEADLINE_SECONDS=3,
+            INGEST_NORMALIZE_ENABLED=False,
+        )
+        self.config_patcher.start()
+        self.db_path = str(self.work_dir / "jobs.sqlite3")
+        self.store_patcher = patch.object(job_store, "_default_store", SQLiteJobStore(self.db_path))
+        self.store_patcher.start()
+
+    def tearDown(self):
+        self.store_patcher.stop()
+        self.config_patcher.stop()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _fake_download(self, url, output_path):
+        self.downloaded_at[url] = time.monotonic() - self.start
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_bytes(b"avatar")
+        return True
+
+    def _details_after(self, ready_after: dict, failed: set = frozenset()):
+        def _details(api_key, video_id):
+            if video_id in failed:
+                return {"success": True, "data": {"status": "VIDEO_GENERATION_FAILED"}}
+            if time.monotonic() - self.start >= ready_after[video_id]:
+                return {"success": True, "data": {"status": "DONE", "videoUrl": f"https://argil/{video_id}.mp4"}}
+            return {"success": True, "data": {"status": "GENERATING_VIDEO"}}
+        return _details
+
+    def _poll(self):
+        self.start = time.monotonic()
+        result = poll_and_download_argil_videos(self.scene_plans, "FAKE_KEY", "proj", self.work_dir)
+        return result, time.monotonic() - self.start
+
+    def test_renders_are_tracked_together_and_downloaded_as_they_finish(self):
+        ready_after = {"vid_0": 0.6, "vid_1": 0.0, "vid_2": 0.1, "vid_3": 0.3}
+        with patch.object(asset_orchestrator, "get_argil_video_details", side_effect=self._details_after(ready_after)), \
+             patch.object(asset_orchestrator, "_download_file_from_url", side_effect=self._fake_download):
+            scene_plans, elapsed = self._poll()
+
+        # Total wait is bounded by the slowest render, not the sum of all of them.
+        self.assertLess(elapsed, 1.5)
+        for scene in scene_plans:
+            self.assertEqual(scene["argil_render_status"], "DONE")
+            self.assertTrue(pathlib.Path(scene["avatar_video_path"]).exists())
+        # The fast render was downloaded well before the slow one finished.
+        self.assertLess(self.downloaded_at["https://argil/vid_1.mp4"], 0.3)
+
+    def test_failures_and_global_deadline(self):
+        ready_after = {"vid_0": 0.0, "vid_1": 99, "vid_2": 99, "vid_3": 0.0}
+        with patch.object(asset_orchestrator, "ARGIL_POLLING_DEADLINE_SECONDS", 0.5), \
+             patch.object(asset_orchestrator, "get_argil_video_details", side_effect=self._details_after(ready_after, failed={"vid_3"})), \
+             patch.object(asset_orchestrator, "_download_file_from_url", side_effect=self._fake_download):
+            scene_plans, elapsed = self._poll()
+
+        self.assertLess(elapsed, 1.2)
+        statuses = {scene["scene_id"]: scene["argil_render_status"] for scene in scene_plans}
+        self.assertEqual(statuses, {"scene_0": "DONE", "scene_1": "polling_timed_out", "scene_2": "polling_timed_out", "scene_3": "VIDEO_GENERATION_FAILED"})
+
+    def test_webhook_short_circuits_backoff_wait(self):
+        self.scene_plans = self.scene_plans[:1]
+        pending_details = {"success": True, "data": {"status": "GENERATING_VIDEO"}}
+        threading.Timer(0.2, notify_argil_video_event, args=("vid_0", "VIDEO_GENERATION_SUCCESS", "https://argil/vid_0.mp4")).start()
+        with patch.object(asset_orchestrator, "ARGIL_POLL_INITIAL_INTERVAL_SECONDS", 10), \
+             patch.object(asset_orchestrator, "ARGIL_POLL_MAX_INTERVAL_SECONDS", 10), \
+             patch.object(asset_orchestrator, "get_argil_video_details", return_value=pending_details) as mock_details, \
+             patch.object(asset_orchestrator, "_download_file_from_url", side_effect=self._fake_download):
+            scene_plans, elapsed = self._poll()
+
+        self.assertLess(elapsed, 1.0) # Without the webhook the next poll would be ~10s away
+        mock_details.assert_called_once()
+        self.assertEqual(scene_plans[0]["argil_render_status"], "DONE")
+        self.assertIn("https://argil/vid_0.mp4", self.downloaded_at)
+
+    def test_webhook_received_by_another_process_ends_the_wait(self):
+        self.scene_plans = self.scene_plans[:1]
+        pending_details = {"success": True, "data": {"status": "GENERATING_VIDEO"}}
+        api_store = SQLiteJobStore(self.db_path) # The API process's store: its writes wake nothing here
+        threading.Timer(0.2, api_store.record_video_event, args=("argil", "vid_0", "DONE", "https://argil/vid_0.mp4")).start()
+        with patch.object(asset_orchestrator, "ARGIL_POLL_INITIAL_INTERVAL_SECONDS", 10), \
+             patch.object(asset_orchestrator, "ARGIL_POLL_MAX_INTERVAL_SECONDS", 10), \
+             patch.object(asset_orchestrator, "get_argil_video_details", return_value=pending_details), \
+             patch.object(asset_orchestrator, "_download_file_from_url", side_effect=self._fake_download):
+            scene_plans, elapsed = self._poll()
+
+        self.assertLess(elapsed, 2.0) # Picked up on the next store check, not the next poll ~10s away
+        self.assertEqual(scene_plans[0]["argil_render_status"], "DONE")
+        self.assertEqual(api_store.take_video_events("argil", ["vid_0"]), {}) # Taken by the poller, not left behind
+
+    def test_repeated_detail_failures_give_up(self):
+        self.scene_plans = self.scene_plans[:1]
+        with patch.object(asset_orchestrator, "ARGIL_POLL_MAX_INTERVAL_SECONDS", 0.05), \
+             patch.object(asset_orchestrator, "get_argil_video_details", return_value={"success": False, "error": "boom"}) as mock_details:
+            scene_plans, _ = self._poll()
+        self.assertEqual(mock_details.call_count, asset_orchestrator.ARGIL_MAX_DETAILS_FAILURES)
+        self.assertEqual(scene_plans[0]["argil_render_status"], "polling_details_failed")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import json
+import time
+import shutil
+import pathlib
+import tempfile
+import threading
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.video_pipeline import asset_orchestrator
+from backend.video_pipeline.asset_orchestrator import run_asset_orchestration
+from backend.text_to_video.provider_selector import ProviderSelector
+
+
+class TestAssetOrchestrationConcurrency(unittest.TestCase):
+    """Mocked tests for the concurrent stock-media fan-out in run_asset_orchestration."""
+
+    def setUp(self):
+        self.work_dir = pathlib.Path(tempfile.mkdtemp(prefix="orchestration_concurrency_"))
+        self.output_dir = self.work_dir / "output"
+        self.scene_plan_path = self.work_dir / "scene_plan.json"
+        self.script_path = self.work_dir / "script.json"
+        self.vo_path = self.work_dir / "vo.mp3"
+
+        scene_plans = [
+            {"scene_id": f"scene_{i:03d}", "visual_type": "STOCK_VIDEO" if i % 2 == 0 else "STOCK_IMAGE",
+             "text_for_scene": f"Scene {i}", "start_time": float(i), "end_time": float(i + 1),
+             "visual_keywords": [f"keyword {i}"]}
+            for i in range(8)
+        ]
+        with open(self.scene_plan_path, 'w') as f:
+            json.dump(scene_plans, f)
+        with open(self.script_path, 'w') as f:
+            json.dump({"production_notes": {}}, f)
+        self.vo_path.write_bytes(b"fake mp3")
+
+        self.env_patcher = patch.dict(os.environ, {"PEXELS_API_KEY": "FAKE_PEXELS", "PIXABAY_API_KEY": "FAKE_PIXABAY"})
+        self.env_patcher.start()
+        for key in ("ARGIL_API_KEY", "FREESOUND_API_KEY", "S3_BUCKET_NAME"):
+            os.environ.pop(key, None)
+
+        self.lock = threading.Lock()
+        self.in_flight = {"pexels": 0, "pixabay": 0}
+        self.max_in_flight = {"pexels": 0, "pixabay": 0}
+
+        # Deterministic, non-persistent selector: with no history, ties keep the configured order (pexels first).
+        self.selector = ProviderSelector(stats_path=None, explore_ratio=0, hedging_enabled=False)
+        self.selector_patcher = patch.object(asset_orchestrator, "get_provider_selector", return_value=self.selector)
+        self.selector_patcher.start()
+
+    def tearDown(self):
+        self.selector_patcher.stop()
+        self.env_patcher.stop()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _fake_provider(self, provider, result_factory, delay=0.2):
+        def _fetch(api_key, query, count, output_dir, **kwargs):
+            with self.lock:
+                self.in_flight[provider] += 1
+                self.max_in_flight[provider] = max(self.max_in_flight[provider], self.in_flight[provider])
+            time.sleep(delay)
+            with self.lock:
+                self.in_flight[provider] -= 1
+            return result_factory(provider, query, output_dir)
+        return _fetch
+
+    @staticmethod
+    def _success(provider, query, output_dir):
+        return [os.path.join(output_dir, f"{provider}_{query.replace(' ', '_')}.mp4")]
+
+    @staticmethod
+    def _failure(provider, query, output_dir):
+        return []
+
+    def _run(self):
+        summary_path = run_asset_orchestration(
+            scene_plan_path_str=str(self.scene_plan_path),
+            master_vo_path_str=str(self.vo_path),
+            original_script_path_str=str(self.script_path),
+            output_dir=self.output_dir,
+        )
+        with open(summary_path, 'r') as f:
+            return json.load(f)
+
+    def test_stock_scenes_are_fetched_concurrently_with_provider_cap(self):
+        pexels = self._fake_provider("pexels", self._success)
+        with patch.object(asset_orchestrator, "find_pexels_videos", side_effect=pexels), \
+             patch.object(asset_orchestrator, "find_pexels_photos", side_effect=pexels), \
+             patch.dict(asset_orchestrator.PROVIDER_MAX_CONCURRENCY, {"pexels": 3, "pixabay": 3}):
+            start = time.monotonic()
+            summary = self._run()
+            elapsed = time.monotonic() - start
+
+        # Eight 0.2s fetches serially would take 1.6s; with a cap of 3 they finish in three waves.
+        self.assertLess(elapsed, 1.2)
+        self.assertLessEqual(self.max_in_flight["pexels"], 3)
+        self.assertGreater(self.max_in_flight["pexels"], 1)
+        for scene in summary["scene_plans"]:
+            asset_key = "video_asset_path" if scene["visual_type"] == "STOCK_VIDEO" else "image_asset_path"
+            self.assertIn(asset_key, scene)
+            self.assertEqual(scene["stock_media_provider"], "pexels")
+
+    def test_fallback_provider_used_when_primary_fails(self):
+        pexels = self._fake_provider("pexels", self._failure, delay=0.01)
+        pixabay = self._fake_provider("pixabay", self._success, delay=0.01)
+        with patch.object(asset_orchestrator, "find_pexels_videos", side_effect=pexels), \
+             patch.object(asset_orchestrator, "find_pexels_photos", side_effect=pexels), \
+             patch.object(asset_orchestrator, "find_and_download_pixabay_videos", side_effect=pixabay), \
+             patch.object(asset_orchestrator, "find_and_download_pixabay_images", side_effect=pixabay):
+            summary = self._run()
+
+        self.assertEqual(len(summary["scene_plans"]), 8)
+        for scene in summary["scene_plans"]:
+            self.assertEqual(scene["stock_media_provider"], "pixabay")
+        self.assertTrue((self.output_dir / "05_orchestration_summary.json").exists())
+        # Failures are remembered: pixabay now has the better expected time-to-asset.
+        self.assertEqual(self.selector.rank(["pexels", "pixabay"]), ["pixabay", "pexels"])
+
+    def test_slow_primary_is_hedged_by_second_provider(self):
+        self.selector.hedging_enabled = True
+        for _ in range(5): # History: pexels usually answers in ~0.1s, so a 2s call is far past its p90
+            self.selector.record_attempt("pexels", 0.1, True)
+        pexels = self._fake_provider("pexels", self._success, delay=2.0)
+        pixabay = self._fake_provider("pixabay", self._success, delay=0.05)
+        with patch.object(asset_orchestrator, "find_pexels_videos", side_effect=pexels), \
+             patch.object(asset_orchestrator, "find_pexels_photos", side_effect=pexels), \
+             patch.object(asset_orchestrator, "find_and_download_pixabay_videos", side_effect=pixabay), \
+             patch.object(asset_orchestrator, "find_and_download_pixabay_images", side_effect=pixabay), \
+             patch.object(asset_orchestrator.ProviderSelector, "hedge_delay", return_value=0.2):
+            start = time.monotonic()
+            summary = self._run()
+            elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 1.5) # Without hedging every scene would wait for the 2s pexels call
+        self.assertEqual({scene["stock_media_provider"] for scene in summary["scene_plans"]}, {"pixabay"})
+
+
+if __name__ == '__main__':
+    unittest.main()
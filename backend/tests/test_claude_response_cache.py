@@ -0,0 +1,91 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import anthropic
+from pydantic import BaseModel
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.text_to_video.llm_clients import claude_client as claude_client_module
+from backend.text_to_video.llm_clients.claude_client import ClaudeClient
+from backend.text_to_video.llm_clients.response_cache import LLMResponseCache
+
+
+class _Item(BaseModel):
+    name: str
+    value: int
+
+
+def _api_response(payload, input_tokens=1200, output_tokens=300):
+    response = MagicMock()
+    response.content = [anthropic.types.TextBlock(type="text", text=f"```json\n{json.dumps(payload)}\n```")]
+    response.usage.input_tokens = input_tokens
+    response.usage.output_tokens = output_tokens
+    return response
+
+
+class TestClaudeResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp(prefix="llm_cache_test_")
+        self.cache = LLMResponseCache(self.cache_dir)
+        self.patchers = [
+            patch.object(claude_client_module.anthropic, "Anthropic"),
+            patch.object(claude_client_module, "get_llm_response_cache", return_value=self.cache),
+        ]
+        self.mock_anthropic = self.patchers[0].start()
+        self.patchers[1].start()
+        self.create = self.mock_anthropic.return_value.messages.create
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_identical_requests_are_served_from_disk_and_count_saved_tokens(self):
+        self.create.return_value = _api_response([{"name": "a", "value": 1}])
+        client = ClaudeClient(api_key="FAKE", model="model-a")
+        first = client.generate_structured_output("system", "user", max_tokens=100, temperature=0.2)
+        second = ClaudeClient(api_key="FAKE", model="model-a").generate_structured_output("system", "user", max_tokens=100, temperature=0.2)
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.create.call_count, 1)
+        self.assertEqual(self.cache.stats["hits"], 1)
+        self.assertEqual(self.cache.stats["input_tokens_saved"], 1200)
+        self.assertEqual(self.cache.stats["output_tokens_saved"], 300)
+
+        # Any change to model, prompt, temperature or schema is a different entry.
+        client.generate_structured_output("system", "user", max_tokens=100, temperature=0.7)
+        ClaudeClient(api_key="FAKE", model="model-b").generate_structured_output("system", "user", max_tokens=100, temperature=0.2)
+        client.generate_structured_output("system", "user", max_tokens=100, temperature=0.2, response_model=_Item)
+        self.assertEqual(self.create.call_count, 4)
+
+    def test_refresh_flag_bypasses_and_overwrites_the_entry(self):
+        self.create.return_value = _api_response({"name": "old", "value": 1})
+        ClaudeClient(api_key="FAKE").generate_structured_output("system", "user")
+        self.create.return_value = _api_response({"name": "new", "value": 2})
+
+        refreshed = ClaudeClient(api_key="FAKE", refresh_cache=True).generate_structured_output("system", "user")
+        self.assertEqual(refreshed["name"], "new")
+        self.assertEqual(self.cache.stats["refreshes"], 1)
+        self.assertEqual(ClaudeClient(api_key="FAKE").generate_structured_output("system", "user")["name"], "new")
+        self.assertEqual(self.create.call_count, 2)
+
+    def test_only_validated_output_is_cached(self):
+        self.create.return_value = _api_response([{"name": "a", "value": "not a number"}])
+        client = ClaudeClient(api_key="FAKE")
+        self.assertIsNone(client.generate_structured_output("system", "user", response_model=_Item))
+        self.assertIsNone(client.generate_structured_output("system", "user", response_model=_Item))
+        self.assertEqual(self.create.call_count, 2)
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -343,6 +343,7 @@ class TestE2ESceneGenerationFlow(unittest.TestCase):
         system_prompt_for_claude = "You are an expert video production planner..."
 
         replacements = {
+            "{{transcript_format_description}}": "A JSON list of words, each with 'word', 'start' (seconds), 'end' (seconds).",
             "{{word_transcript_json_string}}": json.dumps(TestE2ESceneGenerationFlow.word_level_transcript),
             "{{script_json_string}}": json.dumps(TestE2ESceneGenerationFlow.script_data),
             "{{min_segment_duration}}": str(llm_config["MIN_SEGMENT_DURATION"]),
@@ -0,0 +1,79 @@
+import os
+import sys
+import json
+import shutil
+import zipfile
+import tempfile
+import unittest
+from pathlib import Path
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.text_to_video.envato_assets import (
+    EnvatoCatalog, envato_item_id, extract_media_member, MEDIA_EXTENSIONS_BY_TYPE
+)
+
+
+class TestEnvatoAssets(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = Path(tempfile.mkdtemp(prefix="envato_assets_test_"))
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _make_zip(self, name: str, members: dict) -> Path:
+        zip_path = self.work_dir / name
+        with zipfile.ZipFile(zip_path, 'w') as zf:
+            for member_name, data in members.items():
+                zf.writestr(member_name, data)
+        return zip_path
+
+    def test_item_id_from_item_page_url(self):
+        self.assertEqual(envato_item_id("https://elements.envato.com/city-traffic-timelapse-ABC12DE"), "ABC12DE")
+        self.assertEqual(envato_item_id("https://elements.envato.com/city-traffic-timelapse-ABC12DE/"), "ABC12DE")
+        self.assertEqual(envato_item_id("http://127.0.0.1:8000/item/ocean-waves"), "ocean-waves")
+
+    def test_extracts_only_largest_matching_member(self):
+        zip_path = self._make_zip("city_timelapse.zip", {
+            "preview/preview.mp4": b"p" * 10,
+            "render/City Timelapse 4K.MOV": b"m" * 1000,
+            "__MACOSX/render/._City Timelapse 4K.MOV": b"x" * 5000,
+            "License.txt": b"licence",
+            "project/scene.aep": b"a" * 20000,
+        })
+        extracted = extract_media_member(str(zip_path), str(self.work_dir / "out"), MEDIA_EXTENSIONS_BY_TYPE["video"])
+
+        self.assertEqual(Path(extracted), self.work_dir / "out" / "city_timelapse.mov")
+        self.assertEqual(Path(extracted).read_bytes(), b"m" * 1000)
+        self.assertEqual(os.listdir(self.work_dir / "out"), ["city_timelapse.mov"]) # Nothing else extracted
+
+    def test_extract_returns_none_without_match_or_for_bad_zip(self):
+        zip_path = self._make_zip("docs.zip", {"License.txt": b"licence"})
+        self.assertIsNone(extract_media_member(str(zip_path), str(self.work_dir), MEDIA_EXTENSIONS_BY_TYPE["audio"]))
+        bad_zip = self.work_dir / "bad.zip"
+        bad_zip.write_bytes(b"not a zip")
+        self.assertIsNone(extract_media_member(str(bad_zip), str(self.work_dir), MEDIA_EXTENSIONS_BY_TYPE["audio"]))
+
+    def test_catalog_persists_and_drops_missing_files(self):
+        catalog_path = self.work_dir / "catalog.json"
+        media_path = self.work_dir / "item.mp4"
+        media_path.write_bytes(b"video")
+
+        catalog = EnvatoCatalog(catalog_path)
+        catalog.record("ABC12DE", str(media_path), "City", "https://elements.envato.com/city-ABC12DE")
+        self.assertEqual(json.loads(catalog_path.read_text())["ABC12DE"]["title"], "City")
+
+        reloaded = EnvatoCatalog(catalog_path)
+        self.assertEqual(reloaded.get("ABC12DE"), str(media_path))
+        self.assertIsNone(reloaded.get("UNKNOWN1"))
+
+        media_path.unlink()
+        self.assertIsNone(reloaded.get("ABC12DE"))
+        self.assertEqual(len(EnvatoCatalog(catalog_path)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
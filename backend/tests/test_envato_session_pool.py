@@ -0,0 +1,153 @@
+import io
+import asyncio
+import zipfile
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from backend.text_to_video import envato_client
+from backend.text_to_video.envato_assets import EnvatoCatalog
+from backend.text_to_video.envato_session_pool import EnvatoSessionPool
+
+LICENSE_VALUE = "wanx-test"
+
+LOGGED_IN_PAGE = """<html><body>
+<button data-testid="toggle-navigation-drawer"
+        onclick="var d = document.getElementById('drawer'); d.style.display = d.style.display === 'none' ? 'block' : 'none';">Menu</button>
+<div id="drawer" data-testid="navigation-drawer-content" style="display:none"><span>Sign out</span></div>
+<button data-testid="user-avatar-button">Me</button>
+</body></html>"""
+
+SIGN_IN_PAGE = """<html><body><form onsubmit="return false">
+<input id="username"><input id="password" type="password">
+<button id="sso-forms__submit" type="button"
+        onclick="document.cookie = 'session=ok; path=/'; location.href = '/account';">Sign in</button>
+</form></body></html>"""
+
+ITEM_PAGE = """<html><body>
+<button data-testid="button-download" onclick="document.getElementById('license').style.display = 'block';">Download</button>
+<div id="license" role="dialog" style="display:none">
+  <input type="radio" name="project" value="{license}">
+  <button data-testid="add-download-button" onclick="location.href = '/files/{slug}.zip';">License &amp; download</button>
+</div>
+</body></html>"""
+
+
+def _item_zip(slug: str) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zf:
+        zf.writestr("preview/preview.jpg", b"j" * 10)
+        zf.writestr(f"{slug}/render.mp4", f"render of {slug}".encode() * 100)
+        zf.writestr("License.txt", b"licence")
+    return buffer.getvalue()
+
+
+class _FakeEnvatoHandler(BaseHTTPRequestHandler):
+    sign_in_requests = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "text/html", headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        logged_in = "session=ok" in self.headers.get("Cookie", "")
+        if self.path.startswith("/sign-in"):
+            type(self).sign_in_requests += 1
+            self._send(200, SIGN_IN_PAGE.encode())
+        elif self.path.startswith("/item/"):
+            if not logged_in:
+                self._send(302, b"", headers={"Location": "/sign-in"})
+                return
+            slug = self.path.rstrip("/").rsplit("/", 1)[-1]
+            self._send(200, ITEM_PAGE.format(license=LICENSE_VALUE, slug=slug).encode())
+        elif self.path.startswith("/files/"):
+            slug = Path(self.path).stem
+            self._send(200, _item_zip(slug), "application/zip", {"Content-Disposition": f'attachment; filename="{slug}.zip"'})
+        else:
+            self._send(200, LOGGED_IN_PAGE.encode())
+
+
+@pytest.fixture
+def fake_envato_site(monkeypatch):
+    _FakeEnvatoHandler.sign_in_requests = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeEnvatoHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setattr(envato_client, "ENVATO_BASE_URL", base_url)
+    yield base_url
+    server.shutdown()
+    server.server_close()
+
+
+def _download(pool_kwargs: dict, items: list, download_dir: Path, repeat: bool = False):
+    async def _run():
+        async with EnvatoSessionPool(**pool_kwargs) as pool:
+            paths = await pool.download_items(items, LICENSE_VALUE, str(download_dir), media_extensions=(".mp4",))
+            if repeat:
+                paths = await pool.download_items(items, LICENSE_VALUE, str(download_dir), media_extensions=(".mp4",))
+            return paths, dict(pool.stats)
+    return asyncio.run(_run())
+
+
+def test_pool_logs_in_once_per_ttl_and_downloads_concurrently(fake_envato_site, tmp_path):
+    items = [
+        {"title": "Ocean Waves", "item_page_url": f"{fake_envato_site}/item/ocean-waves-AB12CD3"},
+        {"title": "City Night", "item_page_url": f"{fake_envato_site}/item/city-night-CD34EF5"},
+        {"title": "Ocean Waves (dup)", "item_page_url": f"{fake_envato_site}/item/ocean-waves-AB12CD3"},
+    ]
+    state_path = tmp_path / "storage_state.json"
+    pool_kwargs = {"size": 2, "storage_state_path": state_path, "credentials": ("user", "pass")}
+
+    paths, stats = _download({**pool_kwargs, "catalog": EnvatoCatalog(tmp_path / "catalog_a.json")}, items, tmp_path / "dl_a")
+    assert stats["logins"] == 1 and stats["downloads"] == 2 # The duplicate is fetched once
+    assert state_path.exists()
+    assert paths[0] == paths[2]
+    for path in paths:
+        assert Path(path).suffix == ".mp4" and Path(path).read_bytes().startswith(b"render of")
+    assert sorted(p.suffix for p in (tmp_path / "dl_a").iterdir()) == [".mp4", ".mp4"] # Zips removed, previews never extracted
+
+    # A second pool inside the TTL reuses the saved cookies: no sign-in, item pages still authorized.
+    paths, stats = _download({**pool_kwargs, "catalog": EnvatoCatalog(tmp_path / "catalog_b.json")}, items, tmp_path / "dl_b", repeat=True)
+    assert stats["logins"] == 0 and stats["downloads"] == 2 and stats["catalog_hits"] == 2
+    assert _FakeEnvatoHandler.sign_in_requests == 1
+
+
+def test_stock_footage_search_downloads_through_the_pool(fake_envato_site, tmp_path, monkeypatch):
+    items = [
+        {"title": "Ocean Waves", "item_page_url": f"{fake_envato_site}/item/ocean-waves-AB12CD3"},
+        {"title": "City Night", "item_page_url": f"{fake_envato_site}/item/city-night-CD34EF5"},
+    ]
+    searches = []
+
+    async def _search(page, params, num_results_to_save):
+        searches.append((params.keyword, num_results_to_save))
+        return items
+
+    monkeypatch.setattr(envato_client, "search_envato_stock_video_by_url", _search)
+
+    async def _run():
+        pool_kwargs = {"size": 2, "storage_state_path": tmp_path / "storage_state.json", "credentials": ("user", "pass"),
+                       "catalog": EnvatoCatalog(tmp_path / "catalog.json")}
+        async with EnvatoSessionPool(**pool_kwargs) as pool:
+            paths = await envato_client.search_and_download_envato_stock_footage(
+                None, "ocean", LICENSE_VALUE, str(tmp_path / "dl"), num_results_to_save=2, pool=pool
+            )
+            return paths, dict(pool.stats)
+
+    paths, stats = asyncio.run(_run())
+    assert searches == [("ocean", 2)]
+    assert stats["logins"] == 1 and stats["downloads"] == 2
+    assert [Path(path).suffix for path in paths] == [".mp4", ".mp4"]
@@ -0,0 +1,123 @@
+import os
+import sys
+import shutil
+import pathlib
+import tempfile
+import subprocess
+import unittest
+from unittest.mock import patch, MagicMock
+
+import requests
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from moviepy.editor import VideoFileClip
+from backend.video_pipeline import ingest
+from backend.video_pipeline.video_utils import process_video_clip
+
+TARGET_DIMS = (108, 192)
+TARGET_FPS = 30
+
+
+def _make_source_video(path: pathlib.Path, faststart: bool) -> None:
+    command = [
+        ingest.get_ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", "testsrc=size=320x180:rate=25:duration=1",
+        "-f", "lavfi", "-i", "sine=frequency=440:duration=1",
+        "-c:v", "libx264", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest",
+    ]
+    if faststart:
+        command += ["-movflags", "+faststart"]
+    subprocess.run(command + [str(path)], check=True, capture_output=True)
+
+
+def _streaming_response(data: bytes, chunk_size: int = 4096) -> MagicMock:
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.iter_content.return_value = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+    return response
+
+
+class TestIngest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = pathlib.Path(tempfile.mkdtemp(prefix="ingest_test_"))
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _assert_normalized(self, path: str, duration: float):
+        clip = VideoFileClip(path)
+        try:
+            self.assertEqual(tuple(clip.size), TARGET_DIMS)
+            self.assertAlmostEqual(clip.fps, TARGET_FPS, places=2)
+            self.assertAlmostEqual(clip.duration, duration, delta=0.1)
+            self.assertIsNone(clip.audio)
+        finally:
+            clip.close()
+
+    def test_normalize_media_covers_crops_retimes_and_extends(self):
+        source = self.work_dir / "source.mp4"
+        _make_source_video(source, faststart=True)
+        output = ingest.normalize_media(str(source), str(self.work_dir / "out.mp4"), TARGET_DIMS, TARGET_FPS, duration=2.0)
+        self.assertIsNotNone(output)
+        self._assert_normalized(output, 2.0) # 1s source held on its last frame to 2s
+
+    def test_normalize_media_missing_input(self):
+        self.assertIsNone(ingest.normalize_media(str(self.work_dir / "missing.mp4"), str(self.work_dir / "out.mp4")))
+
+    def test_download_and_normalize_streams_into_ffmpeg(self):
+        source = self.work_dir / "source.mp4"
+        _make_source_video(source, faststart=True)
+        raw_copy = self.work_dir / "raw.mp4"
+        with patch.object(ingest.requests, "get", return_value=_streaming_response(source.read_bytes())), \
+             patch.object(ingest, "normalize_media", wraps=ingest.normalize_media) as file_fallback:
+            output = ingest.download_and_normalize("https://example.com/a.mp4", str(self.work_dir / "out.mp4"),
+                                                   TARGET_DIMS, TARGET_FPS, duration=0.5, raw_output_path=str(raw_copy))
+        self.assertIsNotNone(output)
+        file_fallback.assert_not_called()
+        self._assert_normalized(output, 0.5)
+        self.assertEqual(raw_copy.read_bytes(), source.read_bytes())
+
+    def test_download_and_normalize_falls_back_to_file_for_non_faststart_mp4(self):
+        source = self.work_dir / "moov_at_end.mp4"
+        _make_source_video(source, faststart=False)
+        with patch.object(ingest.requests, "get", return_value=_streaming_response(source.read_bytes())):
+            output = ingest.download_and_normalize("https://example.com/b.mp4", str(self.work_dir / "out.mp4"),
+                                                   TARGET_DIMS, TARGET_FPS, duration=1.0)
+        self.assertIsNotNone(output)
+        self._assert_normalized(output, 1.0)
+        self.assertEqual(sorted(p.name for p in self.work_dir.iterdir()), ["moov_at_end.mp4", "out.mp4"]) # Temp download removed
+
+    def test_download_failure_leaves_no_partial_files(self):
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError("404")
+        raw_copy = self.work_dir / "raw.mp4"
+        with patch.object(ingest.requests, "get", return_value=response):
+            output = ingest.download_and_normalize("https://example.com/c.mp4", str(self.work_dir / "out.mp4"),
+                                                   TARGET_DIMS, TARGET_FPS, raw_output_path=str(raw_copy))
+        self.assertIsNone(output)
+        self.assertFalse(raw_copy.exists())
+        self.assertFalse((self.work_dir / "out.mp4").exists())
+
+    def test_process_video_clip_skips_transform_for_normalized_input(self):
+        source = self.work_dir / "source.mp4"
+        _make_source_video(source, faststart=True)
+        normalized = ingest.normalize_media(str(source), str(self.work_dir / "out.mp4"), TARGET_DIMS, TARGET_FPS, duration=1.5)
+        with patch("backend.video_pipeline.video_utils.resize") as mock_resize, \
+             patch("backend.video_pipeline.video_utils.crop") as mock_crop:
+            clip = process_video_clip(normalized, 1.2, TARGET_DIMS, TARGET_FPS)
+        try:
+            mock_resize.assert_not_called()
+            mock_crop.assert_not_called()
+            self.assertEqual(tuple(clip.size), TARGET_DIMS)
+            self.assertAlmostEqual(clip.duration, 1.2, places=2)
+        finally:
+            clip.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
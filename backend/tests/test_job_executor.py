@@ -0,0 +1,141 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import functools
+import threading
+import unittest
+from unittest.mock import patch
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.text_to_video import job_store
+from backend.text_to_video.job_executor import JobExecutor, JobQueueFullError, RENDER, IO
+from backend.text_to_video.job_store import SQLiteJobStore, JobCancelledError, raise_if_cancelled
+from backend.text_to_video.metrics import observe_stage, render_metrics, STAGE_SECONDS, STAGE_FAILURES, DOWNLOADED_BYTES, record_download
+
+
+def _square(x):
+    """Top-level so the render pool can pickle it."""
+    return x * x
+
+
+async def _async_add(a, b):
+    return a + b
+
+
+def _staged_render(cancel_check, started_path):
+    """A render with stage boundaries, as create_tiktok has."""
+    open(started_path, "w").close()
+    for _ in range(200):
+        cancel_check()
+        time.sleep(0.05)
+    return "finished"
+
+
+@observe_stage("render")
+def _observed_render(x):
+    record_download("render_test", 1000)
+    return x
+
+
+@observe_stage("render")
+def _observed_failing_render():
+    raise RuntimeError("encode failed")
+
+
+class TestJobExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = JobExecutor(render_workers=1, io_workers=1, max_queue_depth=2, render_start_method="spawn")
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.executor.shutdown(wait=True)
+
+    def _blocker(self):
+        self.release.wait(5)
+        return "done"
+
+    def test_full_queue_is_rejected_with_a_retry_hint(self):
+        self.executor.submit("job-a", self._blocker)
+        self.executor.submit("job-b", self._blocker)
+        with self.assertRaises(JobQueueFullError) as ctx:
+            self.executor.submit("job-c", self._blocker)
+        self.assertEqual(ctx.exception.queue_depth, 2)
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+        self.assertEqual(self.executor.snapshot()["rejected"], 1)
+
+        self.release.set()
+        time.sleep(0.2)
+        self.assertEqual(self.executor.submit("job-c", _square, 3).result(timeout=5), 9) # Capacity is back
+
+    def test_cancel_drops_queued_work_and_marks_running_work(self):
+        started = threading.Event()
+
+        def _cooperative():
+            started.set()
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                if self.executor.is_cancelled("job-a"):
+                    return "stopped"
+                time.sleep(0.01)
+            return "finished"
+
+        running = self.executor.submit("job-a", _cooperative)
+        started.wait(5)
+        queued = self.executor.submit("job-a", self._blocker) # Single IO worker: waits behind the first task
+        self.assertTrue(self.executor.cancel("job-a"))
+
+        self.assertTrue(queued.cancelled())
+        self.assertEqual(running.result(timeout=5), "stopped")
+        self.assertTrue(self.executor.is_cancelled("job-a"))
+        self.assertFalse(self.executor.cancel("job-unknown"))
+
+    def test_coroutine_functions_and_render_jobs_run_off_the_caller(self):
+        self.assertEqual(self.executor.submit("job-a", _async_add, 2, 3).result(timeout=5), 5)
+        self.assertEqual(self.executor.submit("job-b", _square, 7, kind=RENDER).result(timeout=60), 49)
+        self.assertEqual(self.executor.run_render(_square, 4), 16)
+
+        time.sleep(0.1)
+        snapshot = self.executor.snapshot()
+        self.assertEqual(snapshot["queue_depth"], 0)
+        self.assertEqual(snapshot["completed"], 2)
+        self.assertEqual(snapshot["running_io"], 0)
+
+    def test_cancelled_render_stops_at_its_next_stage_in_the_render_process(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, True)
+        db_path, started_path = os.path.join(tmp_dir, "jobs.sqlite3"), os.path.join(tmp_dir, "started")
+        store = SQLiteJobStore(db_path)
+        store.set_status("job-r", "processing")
+        with patch.dict(os.environ, {"JOB_STORE_PATH": db_path}), patch.object(job_store, "_default_store", store):
+            executor = JobExecutor(render_workers=1, io_workers=1) # Its render process reads the store from JOB_STORE_PATH
+            self.addCleanup(executor.shutdown, True)
+            render = executor.submit("job-r", _staged_render, functools.partial(raise_if_cancelled, "job-r"), started_path, kind=RENDER)
+            deadline = time.monotonic() + 60
+            while not os.path.exists(started_path) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            store.set_status("job-r", "cancelled")
+            with self.assertRaises(JobCancelledError):
+                render.result(timeout=30)
+
+    def test_metrics_recorded_in_the_render_process_reach_this_process(self):
+        renders, failures = STAGE_SECONDS.count(stage="render"), STAGE_FAILURES.value(stage="render")
+        self.assertEqual(self.executor.submit("job-m", _observed_render, 7, kind=RENDER).result(timeout=60), 7)
+        with self.assertRaises(RuntimeError):
+            self.executor.run_render(_observed_failing_render)
+
+        scrape = render_metrics() # Drains what the render process sent back
+        self.assertEqual(STAGE_SECONDS.count(stage="render"), renders + 2)
+        self.assertEqual(STAGE_FAILURES.value(stage="render"), failures + 1)
+        self.assertIn(f'wanx_stage_duration_seconds_count{{stage="render"}} {renders + 2}', scrape)
+        self.assertGreaterEqual(DOWNLOADED_BYTES.value(source="render_test"), 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.text_to_video.job_executor import JobQueueFullError
+from backend.text_to_video.job_queue import SQLiteJobQueue
+from backend.text_to_video.job_store import SQLiteJobStore
+from backend.text_to_video.worker import QueueWorker
+
+
+class TestSQLiteJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "jobs.sqlite3")
+        self.queue = SQLiteJobQueue(self.db_path, max_queue_depth=3)
+        self.store = SQLiteJobStore(self.db_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_tasks_are_claimed_once_in_order_and_depth_is_bounded(self):
+        first = self.queue.enqueue("job-1", "generate_script_task")
+        self.queue.enqueue("job-2", "provider_workflow_task", ["heygen", "/scripts/a.md"])
+        self.queue.enqueue("job-3", "assembly_task")
+        with self.assertRaises(JobQueueFullError) as ctx:
+            self.queue.enqueue("job-4", "assembly_task")
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+
+        claims, lock = [], threading.Lock()
+
+        def _claim(worker_id):
+            task = self.queue.claim(worker_id)
+            with lock:
+                claims.append(task)
+
+        threads = [threading.Thread(target=_claim, args=(f"worker-{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        claimed = sorted((task for task in claims if task), key=lambda task: task.task_id)
+        self.assertEqual([task.job_id for task in claimed], ["job-1", "job-2", "job-3"]) # Each task leased to exactly one worker
+        self.assertIn(None, claims)
+        self.assertEqual(claimed[0].task_id, first)
+        self.assertEqual(claimed[1].args, ["heygen", "/scripts/a.md"])
+
+    def test_expired_lease_is_redelivered_until_attempts_run_out(self):
+        self.queue.enqueue("job-1", "assembly_task", max_attempts=2)
+        lost = self.queue.claim("worker-a", visibility_timeout=0.05)
+        self.assertIsNone(self.queue.claim("worker-b", visibility_timeout=0.05)) # Leased, not yet expired
+        time.sleep(0.1)
+        redelivered = self.queue.claim("worker-b", visibility_timeout=0.05)
+        self.assertEqual((redelivered.task_id, redelivered.attempts), (lost.task_id, 2))
+        self.assertFalse(self.queue.heartbeat(lost.task_id, "worker-a")) # The crashed worker's lease is gone
+        self.assertFalse(self.queue.complete(lost.task_id, "worker-a"))
+
+        time.sleep(0.1)
+        self.assertIsNone(self.queue.claim("worker-c")) # Out of attempts: failed, not redelivered
+        self.assertEqual(self.queue.snapshot()["failed"], 1)
+
+    def test_reads_do_not_wait_for_writers(self):
+        task_id = self.queue.enqueue("job-1", "assembly_task")
+        writer = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        self.addCleanup(writer.close)
+        writer.execute("BEGIN IMMEDIATE") # e.g. a lease renewal in progress
+        start = time.monotonic()
+        snapshot = self.queue.snapshot()
+        self.assertFalse(self.queue.is_cancelled(task_id))
+        self.assertEqual(self.queue.queue_depth(), 1)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual((snapshot["queue_depth"], snapshot["queued"]), (1, 1))
+        writer.execute("ROLLBACK")
+
+    def test_worker_runs_tasks_retries_failures_and_drops_cancelled_results(self):
+        calls = []
+
+        def generate_script_task(job_id, note):
+            calls.append((job_id, note))
+
+        def flaky_task(job_id):
+            if len([c for c in calls if c[0] == job_id]) == 0:
+                calls.append((job_id, "failed"))
+                raise RuntimeError("provider timeout")
+            calls.append((job_id, "ok"))
+
+        release = threading.Event()
+
+        def slow_task(job_id):
+            release.wait(5)
+
+        worker = QueueWorker({"generate_script_task": generate_script_task, "flaky_task": flaky_task, "slow_task": slow_task},
+                             queue=self.queue, store=self.store, worker_id="worker-a", visibility_timeout=0.3)
+        self.queue.enqueue("job-1", "generate_script_task", ["hello"])
+        self.assertTrue(worker.run_once())
+        self.assertEqual(calls, [("job-1", "hello")])
+
+        self.queue.enqueue("job-2", "flaky_task")
+        worker.run_once()
+        self.assertEqual(self.queue.snapshot()["queued"], 1) # Failed attempt queued again after the retry delay
+        self.assertIn("provider timeout", self.store.get_logs("job-2")[-1][1])
+
+        self.queue.enqueue("job-3", "slow_task")
+        runner = threading.Thread(target=worker.run_once)
+        runner.start()
+        time.sleep(0.05)
+        self.queue.cancel_job("job-3")
+        time.sleep(0.2) # Next heartbeat notices the cancellation
+        release.set()
+        runner.join(5)
+        self.assertEqual(self.queue.snapshot()["cancelled"], 1)
+        self.assertEqual(self.queue.snapshot()["done"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
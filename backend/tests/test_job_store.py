@@ -0,0 +1,217 @@
+import os
+import sys
+import pickle
+import shutil
+import tempfile
+import time
+import threading
+import unittest
+from unittest.mock import patch
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.text_to_video import job_store
+from backend.text_to_video.job_store import SQLiteJobStore, JobHeartbeat, segment_is_settled, ASSEMBLY_STARTED_STATUSES
+
+
+def _heygen_job(job_id):
+    return {
+        "workflow_type": "heygen",
+        "job_id": job_id,
+        "status": "processing",
+        "error": None,
+        "assets": {"music_path": None, "music_status": "pending", "segments": {}},
+    }
+
+
+class TestSQLiteJobStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "jobs.sqlite3")
+        self.store = SQLiteJobStore(self.db_path)
+        self.active_jobs, self.job_results, self.job_data = self.store.logs_view(), self.store.results_view(), self.store.data_view()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_nested_writes_logs_and_results_survive_a_restart(self):
+        self.job_data["job-1"] = _heygen_job("job-1")
+        self.active_jobs["job-1"] = []
+        self.job_data["job-1"]["assets"]["segments"]["hook"] = {"type": "heygen", "audio_status": "completed", "visual_status": "pending"}
+        segment_state = self.job_data["job-1"]["assets"]["segments"]["hook"]
+        segment_state["visual_status"] = "processing"
+        segment_state["heygen_video_id"] = "hg-123"
+        segment_state.pop("audio_status")
+        self.active_jobs["job-1"].append("Workflow initialized.")
+        self.active_jobs["job-1"].append("Starting HeyGen video for hook...")
+        self.job_results["job-1"] = "/videos/job-1.mp4"
+
+        restarted = SQLiteJobStore(self.db_path)
+        data = restarted.get_data("job-1")
+        self.assertEqual(data["assets"]["segments"]["hook"], {"type": "heygen", "visual_status": "processing", "heygen_video_id": "hg-123"})
+        self.assertEqual([message for _, message in restarted.get_logs("job-1")], ["Workflow initialized.", "Starting HeyGen video for hook..."])
+        self.assertEqual(restarted.get_result("job-1"), "/videos/job-1.mp4")
+        self.assertEqual(restarted.find_job_by_external_id("hg-123"), ("job-1", "hook"))
+        self.assertIsNone(restarted.find_job_by_external_id("hg-123", provider="argil"))
+
+        # Records handed to render processes pickle as plain data
+        snapshot = pickle.loads(pickle.dumps(self.job_data["job-1"]))
+        self.assertIs(type(snapshot), dict)
+        self.assertEqual(snapshot["assets"]["segments"]["hook"]["heygen_video_id"], "hg-123")
+
+        self.store.delete_job("job-1")
+        self.assertNotIn("job-1", self.active_jobs)
+        self.assertIsNone(self.store.find_job_by_external_id("hg-123"))
+
+    def test_concurrent_writers_of_different_fields_keep_each_others_updates(self):
+        self.job_data["job-1"] = _heygen_job("job-1")
+        names = [f"segment_{i}" for i in range(8)]
+        for name in names:
+            self.job_data["job-1"]["assets"]["segments"][name] = {"visual_status": "processing"}
+
+        def _complete(name):
+            self.job_data["job-1"]["assets"]["segments"][name]["visual_status"] = "completed"
+
+        threads = [threading.Thread(target=_complete, args=(name,)) for name in names]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        segments = self.store.get_data("job-1")["assets"]["segments"]
+        self.assertEqual({name: s["visual_status"] for name, s in segments.items()}, {name: "completed" for name in names})
+
+    def test_list_writes_from_stale_snapshots_do_not_undo_each_other(self):
+        self.job_data["job-1"] = {**_heygen_job("job-1"), "warnings": []}
+        io_thread_view, webhook_view = self.job_data["job-1"], SQLiteJobStore(self.db_path).data_view()["job-1"]
+
+        threads = [threading.Thread(target=view["warnings"].append, args=(f"{label}-{i}",))
+                   for i in range(5) for label, view in (("io", io_thread_view), ("webhook", webhook_view))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        webhook_view["status"] = "assembly_complete" # The status column follows in-place writes
+        webhook_view["assets"]["segments"]["hook"] = {"argil_video_id": "ar-9"}
+
+        data = self.store.get_data("job-1")
+        self.assertEqual(sorted(data["warnings"]), sorted([f"io-{i}" for i in range(5)] + [f"webhook-{i}" for i in range(5)]))
+        io_thread_view["warnings"][0] = "replaced"
+        del io_thread_view["warnings"][1]
+        self.assertEqual(len(self.store.get_data("job-1")["warnings"]), 9)
+        self.assertEqual(self.store.get_data("job-1")["warnings"][0], "replaced")
+        self.assertEqual(self.store.get_job("job-1")["stage"], "assembly")
+        self.assertEqual(self.store.find_job_by_external_id("ar-9", provider="argil"), ("job-1", "hook"))
+        with self.assertRaises(KeyError):
+            self.store.set_data_path("job-1", ("assets", "missing", "key"), 1)
+
+    def test_unfinished_jobs_report_their_stage_and_are_claimed_once(self):
+        self.job_data["stepwise"] = {"content": "x", "steps": {"script": "completed", "audio": "processing", "captions": "pending"}}
+        self.job_data["assembled"] = {**_heygen_job("assembled"), "status": "assembly_complete"}
+        self.job_data["done"] = {**_heygen_job("done"), "status": "completed"}
+        self.active_jobs["streamed"] = []
+        self.store.set_status("streamed", "processing")
+
+        unfinished = {job["job_id"]: job for job in self.store.list_unfinished_jobs()}
+        self.assertEqual(set(unfinished), {"stepwise", "assembled", "streamed"})
+        self.assertEqual((unfinished["stepwise"]["status"], unfinished["stepwise"]["stage"]), ("processing", "script"))
+        self.assertEqual(unfinished["assembled"]["stage"], "assembly")
+
+        self.assertTrue(self.store.claim_for_resume("stepwise"))
+        self.assertFalse(SQLiteJobStore(self.db_path).claim_for_resume("stepwise")) # A second worker starting at the same time
+
+    def test_jobs_heartbeating_in_a_live_process_are_not_resumed_elsewhere(self):
+        self.job_data["running"] = _heygen_job("running")
+        self.job_data["orphaned"] = _heygen_job("orphaned")
+        other_process = SQLiteJobStore(self.db_path)
+        heartbeat = JobHeartbeat(self.store, lambda: ["running"], owner="api-1", interval=0.05)
+        with patch.object(job_store, "JOB_HEARTBEAT_STALE_SECONDS", 0.3):
+            heartbeat.start()
+            self.store.heartbeat(["orphaned"], owner="api-0") # Its process died right after
+            time.sleep(0.5) # Longer than the stale limit
+            self.assertFalse(other_process.claim_for_resume("running", owner="api-2"))
+            self.assertTrue(other_process.claim_for_resume("orphaned", owner="api-2"))
+
+            heartbeat.stop() # The owner dies
+            time.sleep(0.5)
+            self.assertTrue(other_process.claim_for_resume("running", owner="api-2"))
+        self.assertEqual(self.store.get_job("running")["status"], "processing")
+
+    def test_only_one_of_concurrent_triggers_starts_assembly(self):
+        self.job_data["job-1"] = _heygen_job("job-1")
+        stores = [SQLiteJobStore(self.db_path) for _ in range(8)] # As if in separate server processes
+        results = []
+
+        def _trigger(store):
+            results.append(store.transition_status("job-1", "assembling", unless=ASSEMBLY_STARTED_STATUSES))
+
+        threads = [threading.Thread(target=_trigger, args=(store,)) for store in stores]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((len(results), [previous for previous in results if previous]), (8, ["processing"]))
+        self.assertEqual(self.store.get_state("job-1")[0], "assembling")
+
+        self.assertEqual(self.store.transition_status("job-1", "processing", from_statuses=("assembling",)), "assembling") # A deferred start is undone
+        self.store.transition_status("job-1", "completed")
+        self.assertIsNone(self.store.transition_status("job-1", "assembling", unless=ASSEMBLY_STARTED_STATUSES))
+        self.assertIsNone(self.store.transition_status("missing", "assembling"))
+
+    def test_webhook_redeliveries_get_the_recorded_response(self):
+        self.assertIsNone(self.store.claim_webhook_event("heygen", "hg-1", "avatar_video.success"))
+        self.assertEqual(self.store.claim_webhook_event("heygen", "hg-1", "avatar_video.success"), (None, None)) # Still processing
+        self.assertIsNone(self.store.claim_webhook_event("heygen", "hg-1", "avatar_video.fail")) # Another event of the video
+        self.store.complete_webhook_event("heygen", "hg-1", "avatar_video.success", 200, {"status": "received"})
+        self.assertEqual(SQLiteJobStore(self.db_path).claim_webhook_event("heygen", "hg-1", "avatar_video.success"), (200, {"status": "received"}))
+
+        self.store.release_webhook_event("heygen", "hg-1", "avatar_video.fail") # Deferred: the retry is processed
+        self.assertIsNone(self.store.claim_webhook_event("heygen", "hg-1", "avatar_video.fail"))
+        with patch.object(job_store, "WEBHOOK_EVENT_CLAIM_SECONDS", -1):
+            self.assertIsNone(self.store.claim_webhook_event("heygen", "hg-1", "avatar_video.fail")) # Abandoned claim is taken over
+        with patch.object(job_store, "WEBHOOK_EVENT_RETENTION_SECONDS", -1):
+            self.assertIsNone(self.store.claim_webhook_event("argil", "ar-1", "VIDEO_GENERATION_SUCCESS"))
+            self.assertIsNone(self.store.claim_webhook_event("heygen", "hg-1", "avatar_video.success")) # Expired record is pruned
+
+    def test_identical_requests_share_a_running_or_recent_job(self):
+        video_path = os.path.join(self.tmp_dir, "video.mp4")
+        open(video_path, "wb").close()
+        claims = []
+        stores = [SQLiteJobStore(self.db_path) for _ in range(6)]
+        threads = [threading.Thread(target=lambda store, i: claims.append(store.claim_request("digest-a", f"job-{i}", 3600, 1800)), args=(store, i))
+                   for i, store in enumerate(stores)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        leaders = [job_id for job_id, is_new in claims if is_new]
+        self.assertEqual(len(leaders), 1)
+        self.assertEqual({job_id for job_id, _ in claims}, set(leaders)) # Everyone else coalesced onto it
+        self.assertEqual(self.store.get_state(leaders[0]), ("processing", None))
+
+        self.store.set_result(leaders[0], video_path)
+        self.store.set_status(leaders[0], "completed")
+        self.assertEqual(self.store.claim_request("digest-a", "job-late", 3600, 1800), (leaders[0], False)) # Result cache hit
+        self.assertEqual(self.store.claim_request("digest-b", "job-other", 3600, 1800), ("job-other", True))
+        self.assertEqual(self.store.claim_request("digest-a", "job-expired", 0, 1800), ("job-expired", True))
+
+        self.store.set_status("job-expired", "failed")
+        self.assertEqual(self.store.claim_request("digest-a", "job-retry", 3600, 1800), ("job-retry", True)) # Failures are not cached
+        self.store.delete_job("job-retry")
+        self.assertEqual(self.store.claim_request("digest-a", "job-again", 3600, 1800), ("job-again", True))
+
+    def test_settled_segments_are_the_ones_a_resumed_workflow_keeps(self):
+        audio_path = os.path.join(self.tmp_dir, "hook.mp3")
+        open(audio_path, "wb").close()
+        self.assertTrue(segment_is_settled({"audio_status": "failed", "visual_status": "processing", "heygen_video_id": "hg-1"}))
+        self.assertTrue(segment_is_settled({"audio_status": "completed", "audio_path": audio_path, "visual_status": "completed"}))
+        self.assertTrue(segment_is_settled({"audio_status": "skipped", "visual_status": "skipped"}))
+        self.assertFalse(segment_is_settled({"audio_status": "completed", "audio_path": audio_path, "visual_status": "pending"}))
+        self.assertFalse(segment_is_settled({"audio_status": "completed", "audio_path": audio_path + ".gone", "visual_status": "completed"}))
+        self.assertFalse(segment_is_settled(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import sys
+import json
+import asyncio
+import shutil
+import tempfile
+import threading
+import unittest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.text_to_video.job_store import SQLiteJobStore
+from backend.text_to_video.log_bus import LogBus, LogStreamLimitError
+
+
+def _parse(frame):
+    """(id, payload) of a data event, or (None, None) for a keep-alive comment."""
+    if frame.startswith(":"):
+        return None, None
+    event_id, data = None, None
+    for line in frame.strip().split("\n"):
+        if line.startswith("id: "):
+            event_id = int(line[4:])
+        elif line.startswith("data: "):
+            data = json.loads(line[6:])
+    return event_id, data
+
+
+class TestLogBus(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "jobs.sqlite3")
+        self.store = SQLiteJobStore(self.db_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    async def _collect(self, events, count, timeout=5):
+        frames = []
+        async def _read():
+            async for frame in events:
+                frames.append(frame)
+                if len(frames) == count:
+                    return
+        await asyncio.wait_for(_read(), timeout)
+        return [_parse(frame) for frame in frames]
+
+    async def test_lines_written_from_other_threads_are_pushed_then_completion(self):
+        bus = LogBus(self.store, heartbeat_seconds=5)
+        await bus.start()
+        self.store.append_log("job-1", "Workflow initialized.")
+        events = bus.stream("job-1")
+        first = await self._collect(events, 1)
+        self.assertEqual(first[0][1], {"message": "Workflow initialized."})
+
+        def _worker():
+            self.store.append_log("job-1", "Rendering...")
+            self.store.set_result("job-1", "/videos/job-1.mp4")
+
+        threading.Thread(target=_worker).start()
+        rest = await self._collect(events, 2)
+        self.assertEqual(rest[0][1], {"message": "Rendering..."})
+        self.assertGreater(rest[0][0], first[0][0])
+        self.assertEqual(rest[1][1], {"status": "complete", "video_path": "/videos/job-1.mp4"})
+        self.assertEqual([frame async for frame in events], []) # Stream ends after completion
+        self.assertEqual(bus.snapshot()["subscribers"], 0)
+        await bus.stop()
+
+    async def test_reconnect_resumes_after_last_event_id_from_buffer_or_store(self):
+        seqs = [self.store.append_log("job-1", f"line {i}") for i in range(6)]
+        self.store.set_status("job-1", "failed")
+        bus = LogBus(self.store, buffer_size=3, heartbeat_seconds=5)
+        await bus.start()
+
+        resumed = await self._collect(bus.stream("job-1", seqs[3]), 3) # Still in the ring buffer
+        self.assertEqual([payload for _, payload in resumed], [{"message": "line 4"}, {"message": "line 5"}, {"status": "failed"}])
+
+        behind = await self._collect(bus.stream("job-1", seqs[0]), 6) # Older than the buffer: replayed from the store
+        self.assertEqual([event_id for event_id, _ in behind[:5]], seqs[1:])
+        self.assertEqual(behind[5][1], {"status": "failed"})
+        await bus.stop()
+
+    async def test_subscriber_cap_heartbeats_and_writes_from_another_process(self):
+        bus = LogBus(self.store, heartbeat_seconds=0.1, max_subscribers_per_job=1, tail_seconds=0.05)
+        await bus.start(tail_store=True)
+        self.store.append_log("job-1", "Queued.")
+        events = bus.stream("job-1")
+        await self._collect(events, 1)
+        with self.assertRaises(LogStreamLimitError):
+            bus.stream("job-1")
+
+        self.assertEqual(await self._collect(events, 1), [(None, None)]) # Keep-alive while the job is quiet
+        worker_store = SQLiteJobStore(self.db_path) # A worker process's store: no hints reach this bus
+        worker_store.append_log("job-1", "Rendered by a worker.")
+        worker_store.set_result("job-1", "/videos/job-1.mp4")
+        frames = [payload for _, payload in await self._collect(events, 4) if payload]
+        self.assertEqual(frames, [{"message": "Rendered by a worker."}, {"status": "complete", "video_path": "/videos/job-1.mp4"}])
+        await bus.stop()
+
+    async def test_sqlite_store_is_tailed_by_default_for_inline_jobs_on_other_api_workers(self):
+        bus = LogBus(self.store, heartbeat_seconds=5, tail_seconds=0.05)
+        await bus.start()
+        self.store.append_log("job-1", "Queued.")
+        events = bus.stream("job-1")
+        await self._collect(events, 1)
+
+        other_api_worker = SQLiteJobStore(self.db_path) # Runs the job inline in another process
+        other_api_worker.append_log("job-1", "Rendered inline elsewhere.")
+        frames = await self._collect(events, 1, timeout=2) # Well before the keep-alive refresh
+        self.assertEqual(frames[0][1], {"message": "Rendered inline elsewhere."})
+        await bus.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import sys
+import asyncio
+import shutil
+import tempfile
+import unittest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from starlette.requests import Request
+
+from backend.text_to_video.media_delivery import media_response, package_hls, parse_range, etag_matches, RangeNotSatisfiable
+
+
+def _request(method="GET", **headers):
+    scope = {
+        "type": "http", "method": method, "path": "/get_video/job-1", "query_string": b"",
+        "headers": [(name.replace("_", "-").lower().encode(), value.encode()) for name, value in headers.items()],
+    }
+    return Request(scope)
+
+
+async def _send(response):
+    """Runs an ASGI response and returns (status, headers, body)."""
+    messages = []
+
+    async def receive():
+        await asyncio.Event().wait() # The client stays connected
+
+    async def send(message):
+        messages.append(message)
+
+    await response({"type": "http", "method": "GET"}, receive, send)
+    start = messages[0]
+    headers = {name.decode(): value.decode() for name, value in start["headers"]}
+    return start["status"], headers, b"".join(m.get("body", b"") for m in messages[1:])
+
+
+class TestMediaDelivery(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.video_path = os.path.join(self.tmp_dir, "final.mp4")
+        with open(self.video_path, "wb") as f:
+            f.write(bytes(range(256)) * 4)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_parse_range_forms(self):
+        self.assertEqual(parse_range("bytes=0-99", 1024), (0, 99))
+        self.assertEqual(parse_range("bytes=1000-", 1024), (1000, 1023))
+        self.assertEqual(parse_range("bytes=-24", 1024), (1000, 1023))
+        self.assertEqual(parse_range("bytes=1000-5000", 1024), (1000, 1023))
+        self.assertIsNone(parse_range("bytes=0-1,5-9", 1024)) # Several ranges: whole file
+        self.assertIsNone(parse_range("items=0-1", 1024))
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range("bytes=1024-", 1024)
+        self.assertTrue(etag_matches('W/"abc", "def"', '"def"'))
+        self.assertFalse(etag_matches('"abc"', '"def"'))
+
+    async def test_ranges_and_conditional_requests(self):
+        status, headers, body = await _send(await media_response(_request(), self.video_path, "video/mp4", filename="final.mp4"))
+        self.assertEqual((status, len(body), headers["accept-ranges"]), (200, 1024, "bytes"))
+        etag = headers["etag"]
+        self.assertEqual(headers["content-disposition"], 'attachment; filename="final.mp4"')
+
+        status, headers, body = await _send(await media_response(_request(range="bytes=256-511"), self.video_path, "video/mp4"))
+        self.assertEqual((status, headers["content-range"], headers["content-length"]), (206, "bytes 256-511/1024", "256"))
+        self.assertEqual(body, bytes(range(256)))
+
+        status, _, body = await _send(await media_response(_request(if_none_match=etag), self.video_path, "video/mp4"))
+        self.assertEqual((status, body), (304, b""))
+
+        status, headers, _ = await _send(await media_response(_request(range="bytes=4096-"), self.video_path, "video/mp4"))
+        self.assertEqual((status, headers["content-range"]), (416, "bytes */1024"))
+
+        status, _, body = await _send(await media_response(_request(range="bytes=0-9", if_range='"stale"'), self.video_path, "video/mp4"))
+        self.assertEqual((status, len(body)), (200, 1024)) # Partial copy of another version: full file
+
+        with open(self.video_path, "ab") as f:
+            f.write(b"re-rendered")
+        os.utime(self.video_path, ns=(0, os.stat(self.video_path).st_mtime_ns + 1_000_000))
+        status, headers, _ = await _send(await media_response(_request(if_none_match=etag), self.video_path, "video/mp4"))
+        self.assertEqual(status, 200)
+        self.assertNotEqual(headers["etag"], etag)
+
+    @unittest.skipUnless(shutil.which("ffmpeg"), "ffmpeg not installed")
+    def test_hls_package_is_cached_next_to_the_video(self):
+        import subprocess
+        subprocess.run(["ffmpeg", "-y", "-v", "error", "-f", "lavfi", "-i", "testsrc=duration=3:size=64x64:rate=10",
+                        "-c:v", "libx264", "-pix_fmt", "yuv420p", self.video_path], check=True)
+        package_dir = package_hls(self.video_path)
+        self.assertTrue((package_dir / "index.m3u8").exists())
+        self.assertEqual(package_dir.parent, type(package_dir)(f"{self.video_path}.hls"))
+        self.assertEqual(package_hls(self.video_path), package_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
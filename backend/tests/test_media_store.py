@@ -0,0 +1,95 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.text_to_video.media_store import MediaStore
+from backend.text_to_video import pexels_client
+
+
+def _writer(content: bytes):
+    """Returns a download_fn that writes fixed content and counts its calls."""
+    fn = MagicMock()
+    def _write(path):
+        Path(path).write_bytes(content)
+        return True
+    fn.side_effect = _write
+    return fn
+
+
+class TestMediaStore(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = Path(tempfile.mkdtemp(prefix="media_store_test_"))
+        self.store = MediaStore(self.work_dir / "store", max_bytes=1024 * 1024)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_repeat_asset_across_jobs_downloads_once(self):
+        download = _writer(b"video-bytes")
+        job_a = self.work_dir / "job_a" / "clip.mp4"
+        job_b = self.work_dir / "job_b" / "clip.mp4"
+
+        self.assertEqual(self.store.fetch("pexels", 123, "1080x1920", job_a, download), str(job_a))
+        self.assertEqual(self.store.fetch("pexels", 123, "1080x1920", job_b, download), str(job_b))
+
+        download.assert_called_once()
+        self.assertEqual(job_b.read_bytes(), b"video-bytes")
+        self.assertEqual(os.stat(job_a).st_ino, os.stat(job_b).st_ino) # Hardlinked, one copy on disk
+        self.assertEqual(self.store.stats, {"hits": 1, "misses": 1, "bytes_saved": len(b"video-bytes")})
+
+    def test_identical_content_from_different_assets_is_stored_once(self):
+        self.store.fetch("pexels", 1, "hd", self.work_dir / "a.mp4", _writer(b"same"))
+        self.store.fetch("pixabay", 99, "medium", self.work_dir / "b.mp4", _writer(b"same"))
+        stored_objects = [p for p in (self.work_dir / "store" / "objects").rglob("*") if p.is_file()]
+        self.assertEqual(len(stored_objects), 1)
+        self.assertEqual(self.store.total_bytes(), 4)
+
+    def test_failed_download_is_not_indexed(self):
+        self.assertIsNone(self.store.fetch("pexels", 5, "hd", self.work_dir / "x.mp4", lambda path: False))
+        self.assertIsNone(self.store.lookup("pexels", 5, "hd"))
+        self.assertEqual(list((self.work_dir / "store" / "incoming").iterdir()), [])
+
+    def test_missing_object_is_redownloaded(self):
+        self.store.fetch("pexels", 7, "hd", self.work_dir / "first.mp4", _writer(b"abc"))
+        for stored in (self.work_dir / "store" / "objects").rglob("*.mp4"):
+            stored.unlink()
+        download = _writer(b"abc")
+        self.store.fetch("pexels", 7, "hd", self.work_dir / "second.mp4", download)
+        download.assert_called_once()
+
+    def test_eviction_removes_least_recently_used(self):
+        store = MediaStore(self.work_dir / "small_store", max_bytes=250)
+        store.fetch("pexels", 1, "hd", self.work_dir / "1.mp4", _writer(b"1" * 100))
+        store.fetch("pexels", 2, "hd", self.work_dir / "2.mp4", _writer(b"2" * 100))
+        store.fetch("pexels", 1, "hd", self.work_dir / "1b.mp4", _writer(b"1" * 100)) # Touch asset 1
+        store.fetch("pexels", 3, "hd", self.work_dir / "3.mp4", _writer(b"3" * 100))
+
+        self.assertIsNone(store.lookup("pexels", 2, "hd"))
+        self.assertIsNotNone(store.lookup("pexels", 1, "hd"))
+        self.assertIsNotNone(store.lookup("pexels", 3, "hd"))
+        self.assertLessEqual(store.total_bytes(), 250)
+        self.assertEqual((self.work_dir / "2.mp4").read_bytes(), b"2" * 100) # Job copies survive eviction
+
+    def test_pexels_download_goes_through_store(self):
+        response = MagicMock()
+        response.iter_content.return_value = [b"pexels-video"]
+        with patch.object(pexels_client, "get_media_store", return_value=self.store), \
+             patch.object(pexels_client.requests, "get", return_value=response) as mock_get:
+            for job in ("job_a", "job_b"):
+                self.assertTrue(pexels_client._download_pexels_file(
+                    "https://videos.pexels.com/1.mp4", str(self.work_dir / job / "clip.mp4"), 1, "1080x1920"))
+        mock_get.assert_called_once()
+        self.assertEqual((self.work_dir / "job_b" / "clip.mp4").read_bytes(), b"pexels-video")
+
+
+if __name__ == '__main__':
+    unittest.main()
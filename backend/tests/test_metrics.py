@@ -0,0 +1,79 @@
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.text_to_video import metrics, rate_limiter
+from backend.text_to_video.metrics import MetricsRegistry, observe_stage, STAGE_SECONDS, STAGE_FAILURES, PROVIDER_REQUESTS
+from backend.text_to_video.rate_limiter import RateLimiter, call_with_rate_limit
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_registry_renders_prometheus_text_format(self):
+        registry = MetricsRegistry(namespace="test")
+        requests = registry.counter("requests_total", "Requests.", ("route",))
+        latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1))
+        requests.inc(route='/a"b')
+        requests.inc(2, route='/a"b')
+        for value in (0.05, 0.5, 5):
+            latency.observe(value)
+        registry.add_collector(lambda: [("queue_depth", "gauge", "Queued.", [({}, 3)])])
+        registry.add_collector(lambda: 1 / 0) # A failing collector does not break the scrape
+
+        lines = registry.render().splitlines()
+        self.assertIn("# TYPE test_requests_total counter", lines)
+        self.assertIn('test_requests_total{route="/a\\"b"} 3', lines)
+        self.assertIn('test_latency_seconds_bucket{le="0.1"} 1', lines)
+        self.assertIn('test_latency_seconds_bucket{le="1"} 2', lines) # Buckets are cumulative
+        self.assertIn('test_latency_seconds_bucket{le="+Inf"} 3', lines)
+        self.assertIn("test_latency_seconds_sum 5.55", lines)
+        self.assertIn("test_latency_seconds_count 3", lines)
+        self.assertIn("test_queue_depth 3", lines)
+        with self.assertRaises(ValueError):
+            requests.inc(method="GET")
+
+    def test_observe_stage_counts_exceptions_and_empty_results_as_failures(self):
+        @observe_stage("test_stage")
+        def stage(result):
+            if result == "raise":
+                raise RuntimeError("boom")
+            return result
+
+        runs, failures = STAGE_SECONDS.count(stage="test_stage"), STAGE_FAILURES.value(stage="test_stage")
+        self.assertEqual(stage("out.mp4"), "out.mp4")
+        self.assertIsNone(stage(None))
+        with self.assertRaises(RuntimeError):
+            stage("raise")
+        self.assertEqual(STAGE_SECONDS.count(stage="test_stage") - runs, 3)
+        self.assertEqual(STAGE_FAILURES.value(stage="test_stage") - failures, 2)
+
+    def test_rate_limited_calls_record_provider_outcomes(self):
+        def _response(status_code):
+            return SimpleNamespace(status_code=status_code, headers={"Retry-After": "0"})
+
+        with patch.dict(rate_limiter._limiters, {"metrics_svc": RateLimiter("metrics_svc", requests=100, per_seconds=1)}):
+            call_with_rate_limit("metrics_svc", MagicMock(side_effect=[_response(429), _response(200)]))
+            call_with_rate_limit("metrics_svc", MagicMock(return_value=_response(500)))
+            with self.assertRaises(ConnectionError):
+                call_with_rate_limit("metrics_svc", MagicMock(side_effect=ConnectionError()))
+        outcomes = {outcome: PROVIDER_REQUESTS.value(provider="metrics_svc", outcome=outcome) for outcome in ("ok", "rate_limited", "error", "exception")}
+        self.assertEqual(outcomes, {"ok": 1, "rate_limited": 1, "error": 1, "exception": 1})
+
+    def test_cache_collector_reports_hit_ratios(self):
+        search_cache = SimpleNamespace(stats={"hits": 3, "stale_hits": 1, "misses": 4})
+        with patch("backend.text_to_video.search_cache.get_search_cache", return_value=search_cache), \
+             patch("backend.text_to_video.media_store.get_media_store", return_value=None), \
+             patch("backend.text_to_video.llm_clients.response_cache.get_llm_response_cache", return_value=None):
+            families = {name: samples for name, _, _, samples in metrics._cache_samples()}
+        self.assertEqual(families["cache_hit_ratio"], [({"cache": "search"}, 0.5)])
+        self.assertIn(({"cache": "search", "result": "stale_hit"}, 1), families["cache_requests_total"])
+
+
+if __name__ == '__main__':
+    unittest.main()
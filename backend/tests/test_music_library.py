@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from pydub import AudioSegment
+from pydub.generators import Sine
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.text_to_video import music_library, freesound_client
+from backend.text_to_video.music_library import MusicLibrary, analyze_track, mixer_gain_db
+from backend.video_pipeline import asset_orchestrator
+
+SAMPLE_RATE = 22050
+
+
+def _write_sine(path: Path, seconds: float, volume_db: float = -20.0) -> Path:
+    Sine(440).to_audio_segment(duration=int(seconds * 1000), volume=volume_db).set_channels(1).set_frame_rate(SAMPLE_RATE).export(str(path), format="wav")
+    return path
+
+
+def _write_click_track(path: Path, seconds: float, bpm: float) -> Path:
+    samples = np.zeros(int(seconds * SAMPLE_RATE))
+    decay = np.exp(-np.arange(200) / 40)
+    for beat in np.arange(0, len(samples) - 200, SAMPLE_RATE * 60 / bpm).astype(int):
+        samples[beat:beat + 200] += np.random.RandomState(beat).randn(200) * 0.5 * decay
+    AudioSegment((samples * 20000).astype(np.int16).tobytes(), frame_rate=SAMPLE_RATE, sample_width=2, channels=1).export(str(path), format="wav")
+    return path
+
+
+class TestMusicLibrary(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = Path(tempfile.mkdtemp(prefix="music_library_test_"))
+        self.library = MusicLibrary(self.work_dir / "library")
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_analysis_measures_duration_loudness_tempo_and_energy(self):
+        # A -20 dBFS sine has an RMS of -23 dBFS; K-weighting adds well under 1 dB at 440 Hz.
+        features = analyze_track(_write_sine(self.work_dir / "sine.wav", 4.0))
+        self.assertAlmostEqual(features["duration"], 4.0, places=2)
+        self.assertAlmostEqual(features["loudness_lufs"], -23.0, delta=1.0)
+        self.assertEqual(len(features["energy_curve"]), 4)
+
+        features = analyze_track(_write_click_track(self.work_dir / "clicks.wav", 12.0, bpm=120))
+        self.assertAlmostEqual(features["tempo_bpm"], 120, delta=2)
+
+    def test_bundled_tracks_are_selected_by_mood_and_duration_fit(self):
+        bundled = self.work_dir / "bundled"
+        bundled.mkdir()
+        _write_sine(bundled / "calm_short.wav", 3.0)
+        _write_sine(bundled / "calm_long.wav", 8.0)
+        _write_sine(bundled / "tense.wav", 8.0)
+        for name, tags in (("calm_short", ["ambient", "calm"]), ("calm_long", ["ambient", "calm", "piano"]), ("tense", ["dramatic", "electronic"])):
+            (bundled / f"{name}.json").write_text(json.dumps({"tags": tags, "license": "Creative Commons 0"}))
+
+        self.assertEqual(self.library.index_directory(bundled), 3)
+        with patch.object(music_library, "analyze_track", side_effect=AssertionError("re-analyzed")):
+            self.assertEqual(self.library.index_directory(bundled), 3) # Unchanged files keep their features
+
+        track = self.library.select("Ambient, calm contemplative", target_duration=6.0)
+        self.assertEqual(track.title, "calm_long") # Long enough to avoid looping
+        self.assertEqual(track.license, "Creative Commons 0")
+        self.assertEqual(self.library.select("calm ambient", target_duration=2.5).title, "calm_short")
+        self.assertIsNone(self.library.select("upbeat jazz"))
+
+        self.assertAlmostEqual(mixer_gain_db(track), music_library.MUSIC_BED_TARGET_LUFS - track.loudness_lufs, places=1)
+        self.assertEqual(mixer_gain_db(None), music_library.DEFAULT_MUSIC_GAIN_DB)
+
+    def test_orchestrator_indexes_downloads_and_reuses_them_without_network(self):
+        def _fake_download(api_key, query, output_path, sound_info_out=None, **kwargs):
+            _write_sine(Path(output_path), 5.0)
+            sound_info_out.update({"id": 42, "name": "Night Drive", "license": "Attribution", "username": "artist", "tags": ["synthwave"], "duration": 5.0})
+            return output_path
+
+        # WAV so pydub can decode without ffmpeg; the pipeline itself writes background_music.mp3.
+        first_job, second_job = self.work_dir / "job_1", self.work_dir / "job_2"
+        first_job.mkdir()
+        second_job.mkdir()
+        with patch.object(asset_orchestrator, "get_music_library", return_value=self.library), \
+             patch.object(asset_orchestrator, "find_and_download_music", side_effect=_fake_download) as mock_download:
+            path, track = asset_orchestrator._fetch_background_music("dark electronic, driving", "FAKE_KEY", first_job / "background_music.wav", 4.0)
+            self.assertEqual(track.source_id, "42")
+            self.assertEqual(track.attribution, "artist")
+            path, reused = asset_orchestrator._fetch_background_music("driving electronic", None, second_job / "background_music.wav", 4.0)
+
+        mock_download.assert_called_once()
+        self.assertEqual(reused.track_id, track.track_id)
+        self.assertTrue(Path(path).exists())
+        self.assertTrue(Path(track.path).is_relative_to(self.library.tracks_dir)) # Survives the job directory
+
+    def test_freesound_pick_already_in_the_library_is_copied_not_downloaded(self):
+        first_job, second_job = self.work_dir / "job_1", self.work_dir / "job_2"
+        first_job.mkdir()
+        second_job.mkdir()
+        indexed = self.library.add_track(_write_sine(first_job / "night_drive.wav", 5.0), tags=["synthwave"], source="freesound",
+                                         source_id=42, copy_into_library=True)
+        search = MagicMock(status_code=200)
+        search.json.return_value = {"results": [{"id": 42, "name": "Night Drive", "license": "Attribution", "username": "artist",
+                                                 "tags": ["synthwave"], "duration": 5.0, "previews": {"preview-hq-mp3": "https://freesound/42.mp3"}}]}
+        with patch.object(asset_orchestrator, "get_music_library", return_value=self.library), \
+             patch.object(freesound_client.requests, "get", return_value=search) as mock_get:
+            path, track = asset_orchestrator._fetch_background_music("lofi beats", "FAKE_KEY", second_job / "background_music.wav", 4.0)
+
+        self.assertEqual(mock_get.call_count, 1) # The search only; no preview download
+        self.assertEqual(track.track_id, indexed.track_id)
+        self.assertEqual(Path(path).read_bytes(), Path(indexed.path).read_bytes())
+
+
+if __name__ == '__main__':
+    unittest.main()
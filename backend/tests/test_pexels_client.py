@@ -14,6 +14,7 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 from backend.text_to_video.pexels_client import find_and_download_videos, find_and_download_photos
+from backend.text_to_video.stock_candidates import STOCK_CANDIDATE_TOP_N
 
 # Suppress all logging output during tests, re-enable Critical for Pexels client errors if needed
 # logging.disable(logging.INFO) # Or logging.CRITICAL to see only critical errors from pexels_client
@@ -28,6 +29,9 @@ class TestPexelsClient(unittest.TestCase):
     def setUpClass(cls):
         load_dotenv()
         cls.PEXELS_API_KEY = os.getenv("PEXELS_API_KEY")
+        # Mocked tests assert on the exact request sequence, so bypass the persistent search cache and media store.
+        cls.env_patcher = patch.dict(os.environ, {"STOCK_SEARCH_CACHE_DISABLED": "1", "STOCK_MEDIA_STORE_DISABLED": "1"})
+        cls.env_patcher.start()
 
         # Create test output directory within backend/tests/
         cls.TEST_OUTPUT_DIR = os.path.join(os.path.dirname(__file__), cls.TEST_OUTPUT_DIR_NAME)
@@ -50,6 +54,7 @@ class TestPexelsClient(unittest.TestCase):
             shutil.rmtree(cls.TEST_OUTPUT_DIR)
         # Restore logger level
         cls.pexels_client_logger.setLevel(cls.original_pexels_logger_level)
+        cls.env_patcher.stop()
 
 
     # --- Video Tests ---
@@ -126,7 +131,7 @@ class TestPexelsClient(unittest.TestCase):
             content = f.read()
             self.assertEqual(content, b"fake video data chunk 1fake video data chunk 2")
 
-        expected_video_search_params = {'query': 'mocked video', 'per_page': 2, 'orientation': 'portrait', 'size': 'medium'}
+        expected_video_search_params = {'query': 'mocked video', 'per_page': STOCK_CANDIDATE_TOP_N, 'orientation': 'portrait', 'size': 'medium'}
         mock_get.assert_any_call("https://api.pexels.com/videos/search", headers={"Authorization": "FAKE_KEY"}, params=expected_video_search_params, timeout=15)
         mock_get.assert_any_call("http://fakeurl.com/fakevideo.mp4", stream=True, timeout=60)
 
@@ -154,7 +159,7 @@ class TestPexelsClient(unittest.TestCase):
         with open(downloaded_files[0], 'rb') as f:
             self.assertEqual(f.read(), b"fake photo data")
 
-        expected_photo_search_params = {'query': 'mocked photo', 'per_page': 2, 'orientation': 'square', 'size': 'small'}
+        expected_photo_search_params = {'query': 'mocked photo', 'per_page': STOCK_CANDIDATE_TOP_N, 'orientation': 'square', 'size': 'small'}
         mock_get.assert_any_call("https://api.pexels.com/v1/search", headers={"Authorization": "FAKE_KEY"}, params=expected_photo_search_params, timeout=15)
         mock_get.assert_any_call("http://fakeurl.com/fakephoto.jpeg", stream=True, timeout=60)
 
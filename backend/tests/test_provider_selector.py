@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.text_to_video import provider_selector
+from backend.text_to_video.provider_selector import ProviderSelector
+
+
+class TestProviderSelector(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = Path(tempfile.mkdtemp(prefix="provider_selector_test_"))
+        self.selector = ProviderSelector(stats_path=self.work_dir / "stats.json", explore_ratio=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_cold_start_keeps_configured_order(self):
+        self.assertEqual(self.selector.rank(["pexels", "pixabay"]), ["pexels", "pixabay"])
+
+    def test_routes_to_best_expected_time_to_usable_asset(self):
+        for _ in range(5):
+            self.selector.record_attempt("pexels", 8.0, True)
+            self.selector.record_attempt("pixabay", 2.0, True)
+        self.assertEqual(self.selector.rank(["pexels", "pixabay"]), ["pixabay", "pexels"])
+
+        # Fast but rarely usable loses to slower but reliable.
+        for _ in range(5):
+            self.selector.record_search("pixabay", 0)
+            self.selector.record_attempt("pixabay", 2.0, False)
+        self.assertEqual(self.selector.rank(["pexels", "pixabay"]), ["pexels", "pixabay"])
+
+    def test_exhausted_quota_ranks_last_until_reset(self):
+        self.selector.record_quota("pexels", {"X-RateLimit-Remaining": "2", "X-RateLimit-Reset": str(int(time.time()) + 600)})
+        self.assertEqual(self.selector.expected_time_to_asset("pexels"), float("inf"))
+        self.assertEqual(self.selector.rank(["pexels", "pixabay"]), ["pixabay", "pexels"])
+
+        self.selector.record_quota("pixabay", {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "-1"}) # Relative form, already reset
+        self.assertLess(self.selector.expected_time_to_asset("pixabay"), float("inf"))
+
+    def test_stats_persist_and_decay_toward_priors(self):
+        for _ in range(5):
+            self.selector.record_attempt("pexels", 1.0, True)
+        self.selector.save()
+
+        reloaded = ProviderSelector(stats_path=self.work_dir / "stats.json", explore_ratio=0)
+        self.assertEqual(reloaded.stats("pexels").attempts, 5)
+        fresh_estimate = reloaded.expected_time_to_asset("pexels")
+
+        with patch.object(provider_selector.time, "time", return_value=time.time() + 10 * provider_selector.STATS_HALF_LIFE_SECONDS):
+            idle_estimate = reloaded.expected_time_to_asset("pexels")
+        prior_estimate = ProviderSelector(stats_path=None).expected_time_to_asset("pexels")
+        self.assertLess(fresh_estimate, idle_estimate)
+        self.assertAlmostEqual(idle_estimate, prior_estimate, places=1)
+
+    def test_hedge_delay_uses_tail_latency(self):
+        self.assertIsNone(self.selector.hedge_delay("pexels")) # Too little history
+        for latency in (1.0, 1.2, 1.1, 1.3, 1.2, 1.1, 1.0, 1.2, 1.4, 6.0):
+            self.selector.record_attempt("pexels", latency, True)
+        self.assertAlmostEqual(self.selector.hedge_delay("pexels"), 1.4)
+        self.selector.hedging_enabled = False
+        self.assertIsNone(self.selector.hedge_delay("pexels"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.text_to_video import rate_limiter
+from backend.text_to_video.tracing import submit_in_context
+from backend.text_to_video.rate_limiter import (
+    RateLimiter, SharedBucketStore, INTERACTIVE, BATCH, request_priority, call_with_rate_limit,
+    configure_rate_limits, load_rate_limit_config
+)
+
+
+def _response(status_code=200, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    return response
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_paces_at_configured_rate_after_burst(self):
+        limiter = RateLimiter("svc", requests=20, per_seconds=1, burst=2)
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.acquire()
+        elapsed = time.monotonic() - start
+        # Two tokens up front, then four more at 20/s.
+        self.assertGreater(elapsed, 0.15)
+        self.assertLess(elapsed, 0.5)
+        metrics = limiter.metrics()
+        self.assertEqual(metrics["requests"], 6)
+        self.assertGreaterEqual(metrics["throttled"], 3)
+        self.assertGreater(metrics["queue_seconds_p95"], 0)
+
+    def test_interactive_requests_overtake_queued_batch_work(self):
+        limiter = RateLimiter("svc", requests=10, per_seconds=1, burst=1)
+        limiter.acquire() # Drain the bucket so everything below queues
+        order = []
+
+        def _worker(priority, label):
+            limiter.acquire(priority=priority)
+            order.append(label)
+
+        threads = [threading.Thread(target=_worker, args=(BATCH, f"batch_{i}")) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.02)
+        interactive = threading.Thread(target=_worker, args=(INTERACTIVE, "interactive"))
+        interactive.start()
+        for thread in threads + [interactive]:
+            thread.join()
+        self.assertLessEqual(order.index("interactive"), 1) # At most the batch request already at the head goes first
+
+    def test_priority_context_propagates_to_worker_threads(self):
+        limiter = RateLimiter("svc", requests=100, per_seconds=1)
+        seen = []
+        with patch.object(limiter, "acquire", side_effect=lambda priority=None, timeout=None: seen.append(rate_limiter._request_priority.get())):
+            with request_priority(BATCH), ThreadPoolExecutor(max_workers=1) as executor:
+                submit_in_context(executor, limiter.acquire).result()
+                executor.submit(limiter.acquire).result() # Plain submit loses the context
+        self.assertEqual(seen, [BATCH, INTERACTIVE])
+
+    def test_headers_cap_tokens_and_pace_remaining_quota(self):
+        limiter = RateLimiter("svc", requests=100, per_seconds=1, burst=100)
+        limiter.update_from_response(200, {"X-RateLimit-Remaining": "3", "X-RateLimit-Reset": "30"})
+        metrics = limiter.metrics()
+        self.assertLessEqual(metrics["tokens"], 3)
+        self.assertAlmostEqual(metrics["rate_per_second"], 0.1, places=2) # 3 requests spread over 30s
+
+        limiter.update_from_response(200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(int(time.time()) + 60)})
+        self.assertGreater(limiter.metrics()["blocked_for_seconds"], 50)
+        self.assertIsNone(limiter.acquire(timeout=0.05))
+
+    def test_429_is_retried_after_retry_after(self):
+        with patch.dict(rate_limiter._limiters, {"svc429": RateLimiter("svc429", requests=100, per_seconds=1)}):
+            send = MagicMock(side_effect=[_response(429, {"Retry-After": "0.2"}), _response(200)])
+            start = time.monotonic()
+            response = call_with_rate_limit("svc429", send)
+            self.assertEqual(response.status_code, 200)
+            self.assertGreaterEqual(time.monotonic() - start, 0.2)
+            self.assertEqual(send.call_count, 2)
+            self.assertEqual(rate_limiter._limiters["svc429"].metrics()["rate_limited_responses"], 1)
+
+            send = MagicMock(return_value=_response(429, {"Retry-After": "0"}))
+            self.assertEqual(call_with_rate_limit("svc429", send, max_retries=2).status_code, 429)
+            self.assertEqual(send.call_count, 3)
+
+    def test_config_reconfigures_existing_limiters(self):
+        with patch.dict(rate_limiter._limiters, clear=False), patch.dict(rate_limiter._service_limits, clear=False):
+            limiter = rate_limiter.get_rate_limiter("configured_svc")
+            configure_rate_limits({"configured_svc": {"requests": 30, "per_seconds": 60, "burst": 3}})
+            self.assertAlmostEqual(limiter.rate, 0.5)
+            self.assertEqual(limiter.capacity, 3)
+            with patch.dict(os.environ, {"RATE_LIMIT_ENV_SVC": "10/5/2"}):
+                env_limiter = rate_limiter.get_rate_limiter("env_svc")
+            self.assertAlmostEqual(env_limiter.rate, 2.0)
+            self.assertEqual(env_limiter.capacity, 2)
+
+
+    def test_long_server_windows_only_block_once_used_up(self):
+        limiter = RateLimiter("svc", requests=200, per_seconds=3600, burst=50)
+        month_end = int(time.time()) + 20 * 24 * 3600 # Pexels reports its monthly quota
+        limiter.update_from_response(200, {"X-RateLimit-Remaining": "19000", "X-RateLimit-Reset": str(month_end)})
+        self.assertAlmostEqual(limiter.metrics()["rate_per_second"], 200 / 3600, places=4)
+
+        limiter.update_from_response(200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(month_end)})
+        self.assertGreater(limiter.metrics()["blocked_for_seconds"], 3600)
+
+    def test_limits_are_read_from_the_pipeline_config(self):
+        limits = load_rate_limit_config()
+        self.assertEqual(limits["pexels"], {"requests": 200, "per_seconds": 3600, "burst": 50})
+        self.assertEqual(load_rate_limit_config(os.path.join(tempfile.gettempdir(), "missing_config.yaml")), {})
+
+
+class TestSharedRateLimiter(unittest.TestCase):
+    """Two limiters on one SharedBucketStore database stand in for two processes."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        self.db_path = os.path.join(self.tmp_dir, "rate_limits.sqlite3")
+        patcher = patch.object(rate_limiter, "RATE_LIMIT_POLL_SECONDS", 0.02)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _limiter(self, **limits):
+        return RateLimiter("shared_svc", shared=SharedBucketStore(self.db_path), **limits)
+
+    def test_processes_draw_from_one_bucket(self):
+        api, cli = self._limiter(requests=1, per_seconds=60, burst=3), self._limiter(requests=1, per_seconds=60, burst=3)
+        for _ in range(3):
+            api.acquire()
+        self.assertIsNone(cli.acquire(timeout=0.05))
+
+        api.update_from_response(429, {"Retry-After": "30"})
+        self.assertGreater(cli.metrics()["blocked_for_seconds"], 25)
+
+    def test_batch_work_yields_to_interactive_requests_in_another_process(self):
+        api, cli = self._limiter(requests=10, per_seconds=1, burst=1), self._limiter(requests=10, per_seconds=1, burst=1)
+        cli.acquire() # Drain the bucket so both requests below queue
+        order = []
+
+        def _worker(limiter, priority, label):
+            limiter.acquire(priority=priority)
+            order.append(label)
+
+        batch = threading.Thread(target=_worker, args=(cli, BATCH, "batch"))
+        batch.start()
+        time.sleep(0.03)
+        interactive = threading.Thread(target=_worker, args=(api, INTERACTIVE, "interactive"))
+        interactive.start()
+        for thread in (batch, interactive):
+            thread.join()
+        self.assertEqual(order, ["interactive", "batch"])
+
+if __name__ == '__main__':
+    unittest.main()
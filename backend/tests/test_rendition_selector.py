@@ -0,0 +1,100 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.text_to_video.rendition_selector import Rendition, pexels_renditions, pixabay_renditions, select_rendition
+from backend.text_to_video.models.pixabay_models import PixabayVideoVersions
+from backend.text_to_video import pexels_client
+
+PEXELS_VIDEO_FILES = [
+    {"quality": "hd", "file_type": "video/mp4", "width": 2160, "height": 3840, "fps": 29.97, "link": "http://x/4k.mp4"},
+    {"quality": "hd", "file_type": "video/mp4", "width": 1080, "height": 1920, "fps": 29.97, "link": "http://x/1080.mp4"},
+    {"quality": "hd", "file_type": "video/mp4", "width": 1440, "height": 2560, "fps": 29.97, "link": "http://x/1440.mp4"},
+    {"quality": "sd", "file_type": "video/mp4", "width": 540, "height": 960, "fps": 29.97, "link": "http://x/540.mp4"},
+    {"quality": None, "file_type": "video/hls", "width": 1080, "height": 1920, "link": "http://x/playlist.m3u8"},
+]
+
+
+def _pixabay_detail(name, width, height, size):
+    return {"url": f"https://cdn.pixabay.com/{name}.mp4", "width": width, "height": height, "size": size, "thumbnail": ""}
+
+
+class TestRenditionSelector(unittest.TestCase):
+
+    def test_pexels_picks_smallest_covering_file_not_4k(self):
+        chosen = select_rendition(pexels_renditions(PEXELS_VIDEO_FILES), (1080, 1920), 30)
+        self.assertEqual(chosen.url, "http://x/1080.mp4")
+
+    def test_landscape_source_must_cover_height_after_scale_to_cover(self):
+        renditions = [
+            Rendition(provider="pexels", name="hd", url="a", width=1920, height=1080),
+            Rendition(provider="pexels", name="uhd", url="b", width=3840, height=2160),
+        ]
+        # 1920x1080 would need upscaling to reach 1920 px of height for a portrait crop.
+        self.assertEqual(select_rendition(renditions, (1080, 1920)).url, "b")
+
+    def test_falls_back_to_least_upscaling_when_nothing_covers(self):
+        renditions = [
+            Rendition(provider="pixabay", name="tiny", url="a", width=360, height=640),
+            Rendition(provider="pixabay", name="small", url="b", width=720, height=1280),
+        ]
+        self.assertEqual(select_rendition(renditions, (1080, 1920)).name, "small")
+
+    def test_ties_prefer_fps_at_or_above_target_then_smaller_file(self):
+        renditions = [
+            Rendition(provider="pexels", name="a", url="a", width=1080, height=1920, fps=24),
+            Rendition(provider="pexels", name="b", url="b", width=1080, height=1920, fps=60),
+            Rendition(provider="pexels", name="c", url="c", width=1080, height=1920, fps=30, size=200),
+            Rendition(provider="pexels", name="d", url="d", width=1080, height=1920, fps=30, size=100),
+        ]
+        self.assertEqual(select_rendition(renditions, (1080, 1920), 30).name, "d")
+
+    def test_returns_none_without_dimensions(self):
+        files = [{"quality": "hd", "file_type": "video/mp4", "link": "http://x/a.mp4"}]
+        self.assertIsNone(select_rendition(pexels_renditions(files)))
+
+    def test_pixabay_versions_use_reported_dimensions(self):
+        versions = PixabayVideoVersions(
+            large=_pixabay_detail("large", 2160, 3840, 90_000_000),
+            medium=_pixabay_detail("medium", 1080, 1920, 20_000_000),
+            small=_pixabay_detail("small", 720, 1280, 8_000_000),
+            tiny=_pixabay_detail("tiny", 360, 640, 2_000_000),
+        )
+        self.assertEqual(select_rendition(pixabay_renditions(versions), (1080, 1920)).name, "medium")
+        self.assertEqual(select_rendition(pixabay_renditions(versions), (720, 1280)).name, "small")
+
+
+class TestPexelsRenditionIntegration(unittest.TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp(prefix="rendition_test_")
+        self.env_patcher = patch.dict(os.environ, {"STOCK_SEARCH_CACHE_DISABLED": "1", "STOCK_MEDIA_STORE_DISABLED": "1"})
+        self.env_patcher.start()
+
+    def tearDown(self):
+        self.env_patcher.stop()
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    @patch('backend.text_to_video.pexels_client.requests.get')
+    def test_find_and_download_videos_downloads_covering_rendition(self, mock_get):
+        search_response = MagicMock()
+        search_response.json.return_value = {"videos": [{"id": 1, "video_files": PEXELS_VIDEO_FILES}]}
+        download_response = MagicMock()
+        download_response.iter_content.return_value = [b"data"]
+        mock_get.side_effect = [search_response, download_response]
+
+        downloaded = pexels_client.find_and_download_videos("FAKE_KEY", "city", 1, self.output_dir)
+
+        self.assertEqual(len(downloaded), 1)
+        mock_get.assert_called_with("http://x/1080.mp4", stream=True, timeout=60)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import sys
+import wave
+import shutil
+import tempfile
+import unittest
+
+import pytest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+moto = pytest.importorskip("moto")
+import boto3
+
+from backend.text_to_video.s3_client import S3UploadManager, CONTENT_HASH_METADATA_KEY
+from backend.video_pipeline.audio_utils import slice_audio_to_buffer
+
+TEST_BUCKET = "wanx-upload-manager-test"
+
+
+class TestS3UploadManager(unittest.TestCase):
+
+    def setUp(self):
+        self.env = {"AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing", "AWS_DEFAULT_REGION": "us-east-1"}
+        self.saved_env = {k: os.environ.get(k) for k in self.env}
+        os.environ.update(self.env)
+        self.aws = moto.mock_aws()
+        self.aws.start()
+        self.s3 = boto3.client("s3", region_name="us-east-1")
+        self.s3.create_bucket(Bucket=TEST_BUCKET)
+        self.manager = S3UploadManager(self.s3, TEST_BUCKET, multipart_threshold=5 * 1024 * 1024, multipart_chunksize=5 * 1024 * 1024)
+        self.work_dir = tempfile.mkdtemp(prefix="s3_upload_test_")
+
+    def tearDown(self):
+        self.manager.close()
+        self.aws.stop()
+        for key, value in self.saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_upload_bytes_tags_content_hash_and_skips_identical_content(self):
+        url = self.manager.upload_bytes(b"scene audio", "job/scene_001.mp3")
+        self.assertTrue(url.endswith("/job/scene_001.mp3"))
+        head = self.s3.head_object(Bucket=TEST_BUCKET, Key="job/scene_001.mp3")
+        self.assertIn(CONTENT_HASH_METADATA_KEY, head["Metadata"])
+        self.assertEqual(head["ContentType"], "audio/mpeg")
+
+        self.assertEqual(self.manager.upload_bytes(b"scene audio", "job/scene_001.mp3"), url)
+        self.manager.upload_bytes(b"re-recorded audio", "job/scene_001.mp3")
+        self.assertEqual(self.manager.stats["uploaded"], 2)
+        self.assertEqual(self.manager.stats["skipped"], 1)
+        body = self.s3.get_object(Bucket=TEST_BUCKET, Key="job/scene_001.mp3")["Body"].read()
+        self.assertEqual(body, b"re-recorded audio")
+
+    def test_concurrent_submits_and_multipart_file_upload(self):
+        futures = [self.manager.submit_bytes(f"scene {i}".encode(), f"job/scene_{i:03d}.mp3") for i in range(12)]
+        self.assertTrue(all(future.result() for future in futures))
+        self.assertEqual(self.manager.stats["uploaded"], 12)
+
+        large_path = os.path.join(self.work_dir, "large.bin")
+        with open(large_path, "wb") as f:
+            f.write(os.urandom(6 * 1024 * 1024)) # Above the multipart threshold
+        self.assertIsNotNone(self.manager.submit_file(large_path, "job/large.bin", "application/octet-stream").result())
+        self.assertIsNotNone(self.manager.upload_file(large_path, "job/large.bin", "application/octet-stream"))
+        self.assertEqual(self.manager.stats["skipped"], 1)
+        self.assertIsNone(self.manager.upload_file(os.path.join(self.work_dir, "missing.mp3"), "job/missing.mp3"))
+
+    def test_presigned_urls_are_reused_until_content_changes(self):
+        self.manager.upload_bytes(b"v1", "job/audio.mp3")
+        first = self.manager.presigned_url("job/audio.mp3")
+        self.assertEqual(self.manager.presigned_url("job/audio.mp3"), first)
+        self.manager.upload_bytes(b"v2", "job/audio.mp3")
+        self.assertEqual(self.manager._presigned_urls, {}) # Cache entry dropped when the content changed
+        self.assertIsNotNone(self.manager.presigned_url("job/audio.mp3"))
+
+    def test_slice_audio_to_buffer_uploads_without_temp_file(self):
+        source = os.path.join(self.work_dir, "master.wav")
+        with wave.open(source, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(8000)
+            wav_file.writeframes(b"\x00\x00" * 8000 * 2) # 2 seconds of silence
+        buffer = slice_audio_to_buffer(source, 0.5, 1.5, format="wav")
+        self.assertIsNotNone(buffer)
+        self.assertIsNotNone(self.manager.upload_bytes(buffer, "job/slice.wav", "audio/wav"))
+        self.assertEqual(os.listdir(self.work_dir), ["master.wav"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import shutil
+import pathlib
+import time
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.text_to_video import tracing
+from backend.text_to_video.llm_clients import claude_client as claude_client_module
+from backend.text_to_video.llm_clients.claude_client import ClaudeClient
+from backend.text_to_video.llm_clients.json_stream import IncrementalJSONArrayParser
+from backend.text_to_video.llm_clients.response_cache import LLMResponseCache
+from backend.text_to_video.models.scene_models import ScenePlan
+from backend.text_to_video.provider_selector import ProviderSelector
+from backend.video_pipeline import asset_orchestrator
+
+
+def _scene(i, visual_type="STOCK_VIDEO", **extra):
+    return {"scene_id": f"{i:03d}", "start_time": float(i), "end_time": float(i + 1), "text_for_scene": f"Scene {i} says \"{{hi}}\"",
+            "original_script_part_ref": "body", "visual_type": visual_type, "visual_keywords": [f"keyword {i}"], **extra}
+
+
+def _chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class TestSceneStreamParsing(unittest.TestCase):
+
+    def test_items_are_emitted_as_soon_as_they_close_regardless_of_chunking(self):
+        scenes = [_scene(0, fx_suggestion={"type": "text_overlay_static", "text_content": "[100%]", "params": {"position": "top_right"}}), _scene(1), _scene(2)]
+        text = "```json\n" + json.dumps(scenes, indent=2) + "\n```"
+        for size in (1, 5, 64, len(text)):
+            parser, emitted = IncrementalJSONArrayParser(), []
+            for chunk in _chunks(text, size):
+                emitted.extend(parser.feed(chunk))
+            parser.close()
+            self.assertEqual(emitted, scenes)
+
+        # The first scene is available before the second one has been generated.
+        parser = IncrementalJSONArrayParser()
+        cut = text.index('"scene_id": "001"')
+        self.assertEqual(parser.feed(text[:cut]), [scenes[0]])
+        self.assertEqual(parser.feed(text[cut:]), scenes[1:])
+
+    def test_truncated_array_is_reported(self):
+        parser = IncrementalJSONArrayParser()
+        parser.feed(json.dumps([_scene(0), _scene(1)])[:-20])
+        with self.assertRaises(ValueError):
+            parser.close()
+
+
+class TestClaudeStreaming(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp(prefix="llm_stream_cache_test_")
+        self.cache = LLMResponseCache(self.cache_dir)
+        self.patchers = [
+            patch.object(claude_client_module.anthropic, "Anthropic"),
+            patch.object(claude_client_module, "get_llm_response_cache", return_value=self.cache),
+        ]
+        self.mock_anthropic = self.patchers[0].start()
+        self.patchers[1].start()
+        self.stream = self.mock_anthropic.return_value.messages.stream
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _stream_text(self, text):
+        stream = self.stream.return_value.__enter__.return_value
+        stream.text_stream = iter(_chunks(text, 7))
+        stream.get_final_message.return_value.usage.input_tokens = 900
+        stream.get_final_message.return_value.usage.output_tokens = 400
+
+    def test_scenes_are_validated_yielded_and_cached(self):
+        raw = [_scene(0, visual_type="avatar"), {**_scene(1), "scene_id": 2}]
+        self._stream_text(json.dumps(raw))
+        streamed = list(ClaudeClient(api_key="FAKE").stream_structured_list("system", "user", item_model=ScenePlan))
+        self.assertEqual([s["visual_type"] for s in streamed], ["AVATAR", "STOCK_VIDEO"])
+        self.assertEqual(streamed[1]["scene_id"], "2")
+
+        # The complete plan is cached and shared with the non-streaming call for the same request.
+        self.assertEqual(list(ClaudeClient(api_key="FAKE").stream_structured_list("system", "user", item_model=ScenePlan)), streamed)
+        self.assertEqual(ClaudeClient(api_key="FAKE").generate_structured_output("system", "user", response_model=ScenePlan), streamed)
+        self.assertEqual(self.stream.call_count, 1)
+        self.assertEqual(self.cache.stats["output_tokens_saved"], 800)
+
+    def test_invalid_scene_stops_the_stream_and_nothing_is_cached(self):
+        self._stream_text(json.dumps([_scene(0), {**_scene(1), "visual_type": "HOLOGRAM"}, _scene(2)]))
+        received = []
+        with self.assertRaises(ValueError):
+            for scene in ClaudeClient(api_key="FAKE").stream_structured_list("system", "user", item_model=ScenePlan):
+                received.append(scene)
+        self.assertEqual([s["scene_id"] for s in received], ["000"])
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_consumer_time_is_neither_provider_latency_nor_nested_under_the_provider_span(self):
+        self._stream_text(json.dumps([_scene(0), _scene(1)]))
+        trace_dir = tempfile.mkdtemp(prefix="llm_stream_trace_test_")
+        self.addCleanup(shutil.rmtree, trace_dir, True)
+        with patch.object(tracing, "TRACE_DIR", pathlib.Path(trace_dir)), \
+             patch.object(claude_client_module, "record_provider_request") as record:
+            with tracing.job_trace("job-s", "plan"):
+                for _ in ClaudeClient(api_key="FAKE").stream_structured_list("system", "user", item_model=ScenePlan):
+                    with tracing.span("consume scene", "test"):
+                        time.sleep(0.2)
+        (provider, seconds, outcome), _ = record.call_args
+        self.assertEqual((provider, outcome), ("anthropic", "ok"))
+        self.assertLess(seconds, 0.2)
+
+        with open(os.path.join(trace_dir, "job-s.trace.json")) as f:
+            events = json.loads(f.read().rstrip().rstrip(",") + "]")
+        spans = {e["args"]["span_id"]: e for e in events if "span_id" in e["args"]}
+        anthropic_span = next(e for e in events if e["name"] == "anthropic")
+        consumer_parents = {spans[e["args"]["parent_id"]]["name"] for e in events if e["name"] == "consume scene"}
+        self.assertEqual(consumer_parents, {"plan"})
+        self.assertEqual(spans[anthropic_span["args"]["parent_id"]]["name"], "plan")
+
+    def test_closing_the_stream_early_is_not_a_provider_failure(self):
+        self._stream_text(json.dumps([_scene(0), _scene(1)]))
+        with patch.object(claude_client_module, "record_provider_request") as record:
+            scenes = ClaudeClient(api_key="FAKE").stream_structured_list("system", "user", item_model=ScenePlan)
+            next(scenes)
+            scenes.close()
+        self.assertEqual(record.call_args[0][2], "ok")
+        self.assertEqual(os.listdir(self.cache_dir), []) # A partial plan is not cached
+
+
+class TestStreamedOrchestration(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = pathlib.Path(tempfile.mkdtemp(prefix="streamed_orchestration_"))
+        self.script_path = self.work_dir / "script.json"
+        self.script_path.write_text(json.dumps({"production_notes": {}}))
+        self.vo_path = self.work_dir / "vo.mp3"
+        self.vo_path.write_bytes(b"fake mp3")
+        self.env_patcher = patch.dict(os.environ, {"PEXELS_API_KEY": "FAKE_PEXELS"})
+        self.env_patcher.start()
+        for key in ("PIXABAY_API_KEY", "ARGIL_API_KEY", "FREESOUND_API_KEY", "S3_BUCKET_NAME"):
+            os.environ.pop(key, None)
+        selector = ProviderSelector(stats_path=None, explore_ratio=0, hedging_enabled=False)
+        self.selector_patcher = patch.object(asset_orchestrator, "get_provider_selector", return_value=selector)
+        self.selector_patcher.start()
+
+    def tearDown(self):
+        self.selector_patcher.stop()
+        self.env_patcher.stop()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_fetching_starts_while_the_plan_is_still_streaming(self):
+        first_fetch_started = threading.Event()
+        fetch_calls = []
+
+        def _fetch(api_key, query, count, output_dir, min_duration=None, **kwargs):
+            fetch_calls.append((query, min_duration))
+            first_fetch_started.set()
+            return [os.path.join(output_dir, f"{query.replace(' ', '_')}.mp4")]
+
+        overlapped = []
+
+        def _scene_stream():
+            yield _scene(0)
+            yield {**_scene(1), "start_time": 1.5, "end_time": 2.5} # Gap after scene 0 extends its footage
+            overlapped.append(first_fetch_started.wait(timeout=5)) # Scene 0 is being fetched before scene 2 exists
+            yield _scene(2)
+
+        with patch.object(asset_orchestrator, "find_pexels_videos", side_effect=_fetch), \
+             patch.object(asset_orchestrator, "normalize_media", return_value=None):
+            summary_path = asset_orchestrator.run_asset_orchestration(
+                scene_plan_path_str=str(self.work_dir / "04_scene_plan.json"), master_vo_path_str=str(self.vo_path),
+                original_script_path_str=str(self.script_path), output_dir=self.work_dir / "output", scene_stream=_scene_stream(),
+            )
+
+        self.assertEqual(overlapped, [True])
+        summary = json.loads(pathlib.Path(summary_path).read_text())
+        self.assertEqual([s["scene_id"] for s in summary["scene_plans"]], ["000", "001", "002"])
+        self.assertTrue(all("video_asset_path" in s for s in summary["scene_plans"]))
+        render_durations = dict(fetch_calls)
+        self.assertAlmostEqual(render_durations["keyword 0"] - render_durations["keyword 1"], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
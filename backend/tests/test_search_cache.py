@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.text_to_video.search_cache import SearchCache
+from backend.text_to_video import pixabay_client
+from backend.text_to_video.models.pixabay_models import PixabayVideoSearchParams
+
+
+def _pixabay_video_hit(hit_id: int) -> dict:
+    rendition = {"url": f"https://cdn.pixabay.com/video/{hit_id}.mp4", "width": 1080, "height": 1920, "size": 1000, "thumbnail": ""}
+    return {
+        "id": hit_id, "pageURL": f"https://pixabay.com/videos/id-{hit_id}/", "type": "film", "tags": "city",
+        "duration": 12, "videos": {"medium": rendition, "small": rendition, "tiny": rendition},
+        "views": 1, "downloads": 1, "likes": 1, "comments": 0, "user_id": 1, "user": "tester", "userImageURL": "",
+    }
+
+
+class TestSearchCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp(prefix="search_cache_test_")
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_key_ignores_api_key_and_normalizes_query(self):
+        key_a = SearchCache.make_key("pixabay", "videos", {"key": "A", "q": "AI  Chip", "per_page": 3})
+        key_b = SearchCache.make_key("pixabay", "videos", {"key": "B", "q": "ai chip", "per_page": 3})
+        key_c = SearchCache.make_key("pixabay", "images", {"key": "B", "q": "ai chip", "per_page": 3})
+        self.assertEqual(key_a, key_b)
+        self.assertNotEqual(key_a, key_c)
+
+    def test_fresh_hit_skips_fetch(self):
+        cache = SearchCache(self.cache_dir, ttl_seconds=60, stale_ttl_seconds=60)
+        fetch = MagicMock(return_value={"results": [1, 2]})
+        self.assertEqual(cache.get_or_fetch("pexels", "videos", {"query": "stock market"}, fetch), {"results": [1, 2]})
+        self.assertEqual(cache.get_or_fetch("pexels", "videos", {"query": "Stock Market"}, fetch), {"results": [1, 2]})
+        fetch.assert_called_once()
+        self.assertEqual(cache.stats["hits"], 1)
+
+    def test_failed_fetch_is_not_cached(self):
+        cache = SearchCache(self.cache_dir)
+        fetch = MagicMock(return_value=None)
+        self.assertIsNone(cache.get_or_fetch("pexels", "videos", {"query": "x"}, fetch))
+        self.assertIsNone(cache.get_or_fetch("pexels", "videos", {"query": "x"}, fetch))
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_stale_entry_served_while_revalidating(self):
+        cache = SearchCache(self.cache_dir, ttl_seconds=0.05, stale_ttl_seconds=60)
+        cache.get_or_fetch("pexels", "videos", {"query": "beijing skyline"}, lambda: {"version": 1})
+        time.sleep(0.1)
+
+        stale_value = cache.get_or_fetch("pexels", "videos", {"query": "beijing skyline"}, lambda: {"version": 2})
+        self.assertEqual(stale_value, {"version": 1})
+        self.assertEqual(cache.stats["stale_hits"], 1)
+
+        deadline = time.time() + 2
+        key = SearchCache.make_key("pexels", "videos", {"query": "beijing skyline"})
+        while time.time() < deadline and cache.get(key)[0] != {"version": 2}:
+            time.sleep(0.02)
+        self.assertEqual(cache.get(key)[0], {"version": 2})
+
+    def test_expired_entry_is_refetched(self):
+        cache = SearchCache(self.cache_dir, ttl_seconds=0.01, stale_ttl_seconds=0.01)
+        cache.get_or_fetch("pexels", "photos", {"query": "q"}, lambda: {"version": 1})
+        time.sleep(0.05)
+        self.assertEqual(cache.get_or_fetch("pexels", "photos", {"query": "q"}, lambda: {"version": 2}), {"version": 2})
+
+    def test_eviction_respects_max_entries(self):
+        cache = SearchCache(self.cache_dir, max_entries=3)
+        for i in range(6):
+            cache.get_or_fetch("pexels", "videos", {"query": f"q{i}"}, lambda i=i: {"i": i})
+            time.sleep(0.01) # Distinct mtimes so the oldest entries are evicted first
+        remaining = os.listdir(self.cache_dir)
+        self.assertEqual(len(remaining), 3)
+        newest_key = SearchCache.make_key("pexels", "videos", {"query": "q5"})
+        self.assertIn(f"{newest_key}.json", remaining)
+
+    def test_writes_after_the_first_do_not_rescan_the_directory(self):
+        cache = SearchCache(self.cache_dir, max_entries=3)
+        cache.get_or_fetch("pexels", "videos", {"query": "q0"}, lambda: {"i": 0}) # Builds the size index
+        with patch.object(type(cache.cache_dir), "glob", side_effect=AssertionError("directory rescanned")):
+            for i in range(1, 6):
+                cache.get_or_fetch("pexels", "videos", {"query": f"q{i}"}, lambda i=i: {"i": i})
+        remaining = sorted(os.listdir(self.cache_dir))
+        expected = sorted(f"{SearchCache.make_key('pexels', 'videos', {'query': f'q{i}'})}.json" for i in range(3, 6))
+        self.assertEqual(remaining, expected)
+
+    def test_pixabay_search_stores_validated_response(self):
+        cache = SearchCache(self.cache_dir)
+        api_response = {"total": 1, "totalHits": 1, "hits": [_pixabay_video_hit(42)]}
+        params = PixabayVideoSearchParams(key="FAKE_KEY", q="AI chip", per_page=3)
+
+        with patch.object(pixabay_client, "get_search_cache", return_value=cache), \
+             patch.object(pixabay_client, "_make_api_request", return_value=api_response) as mock_request:
+            first = pixabay_client.search_pixabay_videos("FAKE_KEY", params)
+            second = pixabay_client.search_pixabay_videos("OTHER_KEY", PixabayVideoSearchParams(key="OTHER_KEY", q="ai chip", per_page=3))
+
+        mock_request.assert_called_once()
+        self.assertEqual(first, second)
+        self.assertEqual(second.hits[0].id, 42)
+        self.assertIsNone(second.hits[0].userImageURL)
+
+        stored_files = os.listdir(self.cache_dir)
+        self.assertEqual(len(stored_files), 1)
+        with open(os.path.join(self.cache_dir, stored_files[0]), 'r') as f:
+            stored = json.load(f)
+        self.assertEqual(stored["provider"], "pixabay")
+        self.assertIsNone(stored["value"]["hits"][0]["videos"]["large"]) # Stored in validated (model_dump) form
+
+    def test_pixabay_invalid_response_not_cached(self):
+        cache = SearchCache(self.cache_dir)
+        params = PixabayVideoSearchParams(key="FAKE_KEY", q="broken", per_page=3)
+        with patch.object(pixabay_client, "get_search_cache", return_value=cache), \
+             patch.object(pixabay_client, "_make_api_request", return_value={"unexpected": True}):
+            self.assertIsNone(pixabay_client.search_pixabay_videos("FAKE_KEY", params))
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
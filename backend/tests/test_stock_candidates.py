@@ -0,0 +1,109 @@
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import requests
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.text_to_video.rendition_selector import Rendition
+from backend.text_to_video.stock_candidates import StockCandidate, rank_candidates, fetch_best_candidates
+
+TARGET_DIMS = (1080, 1920)
+
+
+def _response(status_code=200, chunks=(b"video bytes",), headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers if headers is not None else {"Content-Type": "video/mp4"}
+    response.iter_content.return_value = list(chunks)
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError(f"HTTP {status_code}")
+    return response
+
+
+class TestStockCandidates(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = Path(tempfile.mkdtemp(prefix="stock_candidates_test_"))
+        self.env_patcher = patch.dict(os.environ, {"STOCK_MEDIA_STORE_DISABLED": "1"})
+        self.env_patcher.start()
+
+    def tearDown(self):
+        self.env_patcher.stop()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _candidate(self, asset_id, duration=10, width=1080, height=1920, size=None):
+        return StockCandidate(
+            provider="pexels", asset_id=asset_id, rendition_key=f"{width}x{height}",
+            rendition=Rendition(provider="pexels", name="hd", url=f"http://cdn.test/{asset_id}.mp4", width=width, height=height, size=size),
+            output_path=str(self.work_dir / f"{asset_id}.mp4"), duration=duration, width=width, height=height,
+        )
+
+    def test_ranking_prefers_duration_fit_orientation_and_small_renditions(self):
+        candidates = [
+            self._candidate("too_short", duration=3),
+            self._candidate("landscape", width=1920, height=1080),
+            self._candidate("upscaled", width=540, height=960),
+            self._candidate("heavy", width=2160, height=3840),
+            self._candidate("best"),
+        ]
+        ranked = rank_candidates(candidates, min_duration=6.0, target_dims=TARGET_DIMS)
+        self.assertEqual(ranked[0].asset_id, "best")
+        self.assertEqual(ranked[1].asset_id, "heavy")
+        self.assertEqual(ranked[-1].asset_id, "too_short") # Kept only as a last resort
+        self.assertEqual([c.asset_id for c in rank_candidates(candidates, 6.0, TARGET_DIMS, top_n=2)], ["best", "heavy"])
+
+    def test_falls_through_to_probed_runner_up_without_new_search(self):
+        candidates = [self._candidate("leader"), self._candidate("broken"), self._candidate("runner_up")]
+        probed = []
+
+        def _head(url, **kwargs):
+            probed.append(url)
+            return _response(404) if "broken" in url else _response(200)
+
+        def _get(url, **kwargs):
+            return _response(500) if "leader" in url else _response(200, chunks=[f"data of {url}".encode()])
+
+        with patch("backend.text_to_video.stock_candidates.requests.head", side_effect=_head), \
+             patch("backend.text_to_video.stock_candidates.requests.get", side_effect=_get) as mock_get:
+            winners = fetch_best_candidates(candidates, count=1)
+
+        self.assertEqual([c.asset_id for c in winners], ["runner_up"])
+        self.assertIn("http://cdn.test/broken.mp4", probed)
+        downloaded = [call.args[0] for call in mock_get.call_args_list]
+        self.assertNotIn("http://cdn.test/broken.mp4", downloaded) # Failed probe: skipped without a download
+        self.assertEqual(Path(winners[0].output_path).read_bytes(), b"data of http://cdn.test/runner_up.mp4")
+        self.assertFalse((self.work_dir / "leader.mp4").exists())
+
+    def test_truncated_and_cancelled_downloads_leave_no_file(self):
+        candidate = self._candidate("truncated")
+        truncated = _response(200, chunks=[b"12345"], headers={"Content-Type": "video/mp4", "Content-Length": "10"})
+        with patch("backend.text_to_video.stock_candidates.requests.get", return_value=truncated):
+            self.assertEqual(fetch_best_candidates([candidate]), [])
+        self.assertFalse(Path(candidate.output_path).exists())
+
+        cancel_event = threading.Event()
+
+        def _chunks():
+            yield b"first"
+            cancel_event.set() # Another provider won while this one was streaming
+            yield b"second"
+
+        streaming = _response(200)
+        streaming.iter_content.return_value = _chunks()
+        candidate = self._candidate("cancelled")
+        with patch("backend.text_to_video.stock_candidates.requests.get", return_value=streaming):
+            self.assertEqual(fetch_best_candidates([candidate], cancel_event=cancel_event), [])
+        self.assertFalse(Path(candidate.output_path).exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.text_to_video import tracing
+from backend.text_to_video.tracing import job_trace, span, event, trace_context, submit_in_context
+from backend.text_to_video.metrics import observe_stage, observe_provider, encode_pass, record_download
+from backend.text_to_video.job_executor import JobExecutor
+
+
+def _stage_work(output_path):
+    with observe_stage("render"):
+        with observe_provider("elevenlabs"):
+            event("media_store hit", "cache", cache_hit=True)
+        with encode_pass("base", output_path, duration=2, fps=25):
+            with open(output_path, "wb") as f:
+                f.write(b"x" * 100)
+        record_download("pexels", 2048)
+    return output_path
+
+
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        patcher = patch.object(tracing, "TRACE_DIR", Path(self.tmp_dir))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _events(self, job_id):
+        with open(os.path.join(self.tmp_dir, f"{job_id}.trace.json")) as f:
+            return json.loads(f.read().rstrip().rstrip(",") + "]") # Unterminated JSON array, as viewers accept it
+
+    def test_nested_spans_carry_job_id_and_attributes(self):
+        with span("outside a job") as untraced:
+            untraced.set_attribute("ignored", True) # No-op span
+        with job_trace("job-1", "generate_video"):
+            _stage_work(os.path.join(self.tmp_dir, "out.mp4"))
+
+        events = {e["name"]: e for e in self._events("job-1")}
+        self.assertNotIn("outside a job", events)
+        root, stage, provider, encode = events["generate_video"], events["render"], events["elevenlabs"], events["encode base"]
+        self.assertIsNone(root["args"]["parent_id"])
+        self.assertEqual(stage["args"]["parent_id"], root["args"]["span_id"])
+        self.assertEqual(provider["args"]["parent_id"], stage["args"]["span_id"])
+        self.assertEqual((encode["args"]["frames"], encode["args"]["bytes"]), (50, 100))
+        self.assertEqual(stage["args"]["downloaded_bytes"], 2048)
+        self.assertEqual((events["media_store hit"]["ph"], events["media_store hit"]["args"]["cache_hit"]), ("i", True))
+        self.assertTrue(all(e["args"]["job_id"] == "job-1" for e in events.values()))
+        self.assertGreaterEqual(root["dur"], stage["dur"])
+
+    def test_pipeline_run_writes_its_stage_spans_next_to_the_outputs(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        output_dir = Path(self.tmp_dir) / "run_outputs"
+        with job_trace("video_pipeline_story", "video_pipeline", trace_dir=output_dir, input="story"):
+            with ThreadPoolExecutor(max_workers=1) as executor: # As the orchestrator fetches scenes
+                submit_in_context(executor, _stage_work, os.path.join(self.tmp_dir, "scene.mp4")).result()
+
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, "video_pipeline_story.trace.json")))
+        with open(output_dir / "video_pipeline_story.trace.json") as f:
+            events = {e["name"]: e for e in json.loads(f.read().rstrip().rstrip(",") + "]")}
+        root, stage = events["video_pipeline"], events["render"]
+        self.assertEqual(root["args"]["input"], "story")
+        self.assertEqual(stage["args"]["parent_id"], root["args"]["span_id"])
+        self.assertEqual(events["elevenlabs"]["args"]["parent_id"], stage["args"]["span_id"])
+        self.assertIn("encode base", events)
+
+    def test_trace_continues_in_other_workers_and_records_errors(self):
+        with job_trace("job-2", "assemble"):
+            job_id, parent_id = trace_context()
+            def _render_process(): # A fresh context, as in a render process
+                with job_trace(job_id, "render_video", parent_id=parent_id):
+                    with self.assertRaises(ValueError), span("moviepy", "encode"):
+                        raise ValueError("bad clip")
+            worker = threading.Thread(target=_render_process)
+            worker.start()
+            worker.join()
+
+        events = {e["name"]: e for e in self._events("job-2")}
+        self.assertEqual(events["render_video"]["args"]["parent_id"], events["assemble"]["args"]["span_id"])
+        self.assertEqual(events["moviepy"]["args"]["error"], "ValueError: bad clip")
+
+    def test_executor_jobs_are_traced_and_exported_to_otlp(self):
+        executor = JobExecutor(render_workers=0, io_workers=1)
+        post = MagicMock(return_value=MagicMock(status_code=200))
+        with patch.object(tracing, "OTLP_TRACES_ENDPOINT", "http://collector:4318/v1/traces"), patch("requests.post", post):
+            output = executor.submit("job-3", _stage_work, os.path.join(self.tmp_dir, "job3.mp4")).result(timeout=5)
+            executor.shutdown(wait=True)
+            for thread in [t for t in threading.enumerate() if t.name == "otlp_export"]:
+                thread.join(5)
+        self.assertTrue(output.endswith("job3.mp4"))
+        self.assertIn("_stage_work", [e["name"] for e in self._events("job-3")])
+
+        payload = post.call_args.kwargs["json"]
+        spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        self.assertEqual({s["traceId"] for s in spans}, {tracing._trace_id("job-3")})
+        encode = next(s for s in spans if s["name"] == "encode base")
+        self.assertIn({"key": "frames", "value": {"intValue": "50"}}, encode["attributes"])
+
+
+if __name__ == '__main__':
+    unittest.main()
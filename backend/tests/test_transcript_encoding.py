@@ -0,0 +1,70 @@
+import os
+import sys
+import json
+import random
+import unittest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.text_to_video.transcript_encoding import CompactTranscript, benchmark_encodings
+
+
+def _whisper_words(count=450, seed=7):
+    """A ~3 minute word-level transcript with Whisper-style float timestamps and sentence pauses."""
+    rng = random.Random(seed)
+    vocabulary = ["startups", "in", "Southeast", "Asia", "raised", "funding", "the", "market", "is", "changing", "fast", "investors", "say"]
+    words, t = [], 0.0
+    for i in range(count):
+        duration = rng.uniform(0.15, 0.45)
+        text = f" {rng.choice(vocabulary)}" + ("." if i % 12 == 11 else "")
+        words.append({"word": text, "start": round(t, 6) + 0.000123, "end": round(t + duration, 6) + 0.000456})
+        t += duration + (0.4 if i % 12 == 11 else rng.uniform(0.0, 0.08))
+    return words
+
+
+class TestCompactTranscript(unittest.TestCase):
+
+    def setUp(self):
+        self.words = _whisper_words()
+        self.transcript = CompactTranscript(self.words, max_phrase_seconds=1.0)
+
+    def test_phrases_cover_every_word_within_the_minimum_scene_length(self):
+        covered = [i for p in self.transcript.phrases for i in range(p["first_word"], p["last_word"] + 1)]
+        self.assertEqual(covered, list(range(len(self.words))))
+        for index, phrase in enumerate(self.transcript.phrases):
+            word_times = self.transcript.word_times(index)
+            self.assertEqual(phrase["start_cs"], round(word_times[0][1] * 100))
+            self.assertEqual(phrase["end_cs"], round(word_times[-1][2] * 100))
+            if len(word_times) > 1: # A single long word may exceed the cap on its own
+                self.assertLessEqual(word_times[-1][2] - word_times[0][1], 1.0)
+
+        line = self.transcript.to_prompt_text().splitlines()[1]
+        start_cs, end_cs, text = line.split(" ", 2)
+        self.assertTrue(start_cs.isdigit() and end_cs.isdigit())
+        self.assertEqual(text, self.transcript.phrases[0]["text"])
+
+    def test_prompt_is_much_smaller_than_the_word_json(self):
+        report = benchmark_encodings(self.words)
+        self.assertLess(report["size_ratio"], 0.3)
+        self.assertLess(report["compact"]["estimated_tokens"], report["word_json"]["estimated_tokens"] / 3)
+
+    def test_scene_times_snap_back_to_exact_word_boundaries(self):
+        phrase_a, phrase_b = self.transcript.phrases[3], self.transcript.phrases[5]
+        # The planner answers in seconds derived from the rounded centisecond offsets.
+        scene = {"scene_id": "001", "start_time": phrase_a["start_cs"] / 100, "end_time": phrase_b["end_cs"] / 100, "text_for_scene": "paraphrased"}
+        self.transcript.snap_scene(scene)
+
+        first, last = self.words[phrase_a["first_word"]], self.words[phrase_b["last_word"]]
+        self.assertEqual(scene["start_time"], first["start"])
+        self.assertEqual(scene["end_time"], last["end"])
+        expected_text = " ".join(w["word"].strip() for w in self.words[phrase_a["first_word"]:phrase_b["last_word"] + 1])
+        self.assertEqual(scene["text_for_scene"], expected_text)
+
+        untimed = {"scene_id": "002", "start_time": None, "end_time": None}
+        self.assertEqual(self.transcript.snap_scene(dict(untimed)), untimed)
+
+
+if __name__ == '__main__':
+    unittest.main()
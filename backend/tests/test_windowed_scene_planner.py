@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.video_pipeline.scene_planner import split_transcript_windows, plan_scenes_windowed, coverage_errors
+
+
+def _words(sentences=40, words_per_sentence=8):
+    """~3 minutes of narration: 0.5s words, 0.1s gaps, 0.6s pause after each sentence."""
+    words, t = [], 0.0
+    for s in range(sentences):
+        for w in range(words_per_sentence):
+            end_of_sentence = w == words_per_sentence - 1
+            words.append({"word": f"w{s}_{w}" + ("." if end_of_sentence else ""), "start": round(t, 3), "end": round(t + 0.5, 3)})
+            t += 0.5 + (0.6 if end_of_sentence else 0.1)
+    return words
+
+
+def _plan_excerpt(window_words, scene_words=4, drop_scene=None):
+    """What a well-behaved planner returns: consecutive groups of words, one scene each."""
+    scenes = []
+    for i in range(0, len(window_words), scene_words):
+        group = window_words[i:i + scene_words]
+        scenes.append({"scene_id": f"{len(scenes) + 1:03d}", "start_time": group[0]["start"], "end_time": group[-1]["end"],
+                       "text_for_scene": " ".join(w["word"] for w in group), "visual_type": "STOCK_VIDEO", "visual_keywords": ["city"]})
+    if drop_scene is not None:
+        del scenes[drop_scene]
+    return scenes
+
+
+class TestWindowedScenePlanner(unittest.TestCase):
+
+    def setUp(self):
+        self.words = _words()
+
+    def test_windows_cut_at_sentence_boundaries_and_partition_the_transcript(self):
+        windows = split_transcript_windows(self.words, window_seconds=45, overlap_seconds=5)
+        self.assertGreater(len(windows), 2)
+        self.assertEqual(windows[0].own_first_word, 0)
+        self.assertEqual(windows[-1].own_last_word, len(self.words) - 1)
+        for previous, window in zip(windows, windows[1:]):
+            self.assertEqual(window.own_first_word, previous.own_last_word + 1)
+            self.assertTrue(self.words[window.own_first_word - 1]["word"].endswith("."))
+            self.assertLess(window.first_word, window.own_first_word) # Context from the previous window
+            self.assertGreater(previous.last_word, previous.own_last_word)
+        self.assertEqual(len(split_transcript_windows(self.words[:40], window_seconds=45)), 1)
+
+    def test_windows_are_planned_concurrently_and_only_failures_are_re_requested(self):
+        lock = threading.Lock()
+        state = {"in_flight": 0, "max_in_flight": 0, "calls": []}
+
+        def _generate(system_prompt, user_prompt, window_words, response_model=None, refresh_cache=None):
+            with lock:
+                state["in_flight"] += 1
+                state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+                state["calls"].append((window_words[0]["start"], refresh_cache))
+                first_call_for_window = sum(1 for start, _ in state["calls"] if start == window_words[0]["start"]) == 1
+            time.sleep(0.1)
+            with lock:
+                state["in_flight"] -= 1
+            # The second window leaves a hole in its first answer.
+            if window_words is second_window_words[0] and first_call_for_window:
+                return _plan_excerpt(window_words, drop_scene=5)
+            return _plan_excerpt(window_words)
+
+        windows = split_transcript_windows(self.words, window_seconds=45, overlap_seconds=5)
+        second_window_words = [None]
+
+        def _build_request(window_words, note):
+            if window_words[0] is self.words[windows[1].first_word]:
+                second_window_words[0] = window_words
+            return {"system_prompt": "system", "user_prompt": note, "window_words": window_words}, None
+
+        claude_client = MagicMock()
+        claude_client.generate_structured_output.side_effect = _generate
+        scenes = list(plan_scenes_windowed(claude_client, self.words, _build_request, min_segment_duration=1.0, window_seconds=45, overlap_seconds=5))
+
+        self.assertGreater(state["max_in_flight"], 1)
+        retries = [call for call in state["calls"] if call[1]]
+        self.assertEqual(retries, [(self.words[windows[1].first_word]["start"], True)]) # Only the broken window, bypassing the cache
+        self.assertEqual(len(state["calls"]), len(windows) + 1)
+
+        self.assertEqual(coverage_errors(scenes, self.words, 0, len(self.words) - 1), [])
+        self.assertEqual([s["scene_id"] for s in scenes], [f"{i:03d}" for i in range(1, len(scenes) + 1)])
+        for previous, scene in zip(scenes, scenes[1:]):
+            self.assertLessEqual(previous["end_time"], scene["start_time"]) # Boundary scenes reconciled: no overlap
+        # Text always matches the (possibly clipped) scene span exactly.
+        spanned = " ".join(w["word"] for w in self.words if scenes[3]["start_time"] <= w["start"] and w["end"] <= scenes[3]["end_time"])
+        self.assertEqual(scenes[3]["text_for_scene"], spanned)
+
+
+if __name__ == '__main__':
+    unittest.main()
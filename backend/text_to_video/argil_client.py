@@ -5,7 +5,11 @@ import time
 import re
 import uuid
 import random
+import threading
 from dotenv import load_dotenv
+from backend.text_to_video.rate_limiter import call_with_rate_limit
+from backend.text_to_video.metrics import record_download
+from backend.text_to_video.job_store import get_job_store
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -194,7 +198,7 @@ def create_argil_video_job(
     url = f"{BASE_URL}/videos"
     logger.debug(f"Argil create_video_job final payload: {payload}")
     try:
-        response = requests.post(url, headers=_get_headers(api_key), json=payload, timeout=30)
+        response = call_with_rate_limit("argil", lambda: requests.post(url, headers=_get_headers(api_key), json=payload, timeout=30))
         response.raise_for_status()
         response_data = response.json()
         video_id = response_data.get("id")
@@ -233,7 +237,7 @@ def render_argil_video(api_key: str, video_id: str) -> dict | None:
 
     url = f"{BASE_URL}/videos/{video_id}/render"
     try:
-        response = requests.post(url, headers=_get_headers(api_key), timeout=30)
+        response = call_with_rate_limit("argil", lambda: requests.post(url, headers=_get_headers(api_key), timeout=30))
         response.raise_for_status()
         response_data = response.json()
         logger.info(f"Argil video render request successful for Video ID: {video_id}. Initial status: {response_data.get('status')}")
@@ -267,7 +271,7 @@ def get_argil_video_details(api_key: str, video_id: str) -> dict | None:
 
     url = f"{BASE_URL}/videos/{video_id}"
     try:
-        response = requests.get(url, headers=_get_headers(api_key), timeout=30)
+        response = call_with_rate_limit("argil", lambda: requests.get(url, headers=_get_headers(api_key), timeout=30))
         response.raise_for_status()
         response_data = response.json()
         logger.debug(f"Successfully fetched details for Argil Video ID: {video_id}. Response: {response_data}")
@@ -292,6 +296,56 @@ def get_argil_video_details(api_key: str, video_id: str) -> dict | None:
         return {"success": False, "error": f"Unexpected error: {str(e)}"}
 
 
+# --- Webhook notifications for pollers ---
+# The server's /webhooks/argil handler records render results in the job store, which every process on
+# the host shares, so a poller (see asset_orchestrator.poll_and_download_argil_videos) can stop waiting
+# as soon as one arrives. Pollers in the handler's own process are also woken directly.
+WEBHOOK_EVENT_STATUSES = {
+    "VIDEO_GENERATION_SUCCESS": "DONE",
+    "VIDEO_GENERATION_FAILED": "VIDEO_GENERATION_FAILED",
+}
+ARGIL_WEBHOOK_EVENT_CHECK_SECONDS = float(os.getenv("ARGIL_WEBHOOK_EVENT_CHECK_SECONDS", "1")) # How often a waiting poller checks the store
+_webhook_events_condition = threading.Condition()
+
+
+def notify_argil_video_event(video_id: str, event_type: str, video_url: str = None) -> None:
+    """Records a webhook result for video_id in the job store and wakes any poller waiting on it in this process."""
+    status = WEBHOOK_EVENT_STATUSES.get(event_type)
+    if not video_id or not status:
+        return
+    get_job_store().record_video_event("argil", video_id, status, video_url)
+    with _webhook_events_condition:
+        _webhook_events_condition.notify_all()
+    logger.debug(f"Recorded Argil webhook event {event_type} for video {video_id}.")
+
+
+def wait_for_argil_video_events(video_ids, timeout: float) -> dict[str, dict]:
+    """
+    Waits up to timeout seconds for a webhook result for any of video_ids, checking the job store every
+    ARGIL_WEBHOOK_EVENT_CHECK_SECONDS (or sooner when this process received the webhook).
+
+    Returns:
+        The events received for those ids (removed from the store), keyed by video id.
+        Empty if none arrived in time.
+    """
+    video_ids = list(video_ids)
+    deadline = time.monotonic() + max(0.0, timeout)
+    while True:
+        try:
+            events = get_job_store().take_video_events("argil", video_ids)
+        except Exception as e:
+            logger.warning(f"Could not check the job store for Argil webhook events: {e}")
+            events = {}
+        remaining = deadline - time.monotonic()
+        if events or remaining <= 0:
+            return {
+                video_id: {"status": event["status"], "videoUrl": event["video_url"], "source": "webhook"}
+                for video_id, event in events.items()
+            }
+        with _webhook_events_condition:
+            _webhook_events_condition.wait(min(remaining, ARGIL_WEBHOOK_EVENT_CHECK_SECONDS))
+
+
 def list_argil_webhooks(api_key: str) -> dict | None:
     """Lists all registered webhooks for the Argil account."""
     logger.info("Listing Argil webhooks.")
@@ -301,7 +355,7 @@ def list_argil_webhooks(api_key: str) -> dict | None:
 
     url = f"{BASE_URL}/webhooks"
     try:
-        response = requests.get(url, headers=_get_headers(api_key), timeout=30)
+        response = call_with_rate_limit("argil", lambda: requests.get(url, headers=_get_headers(api_key), timeout=30))
         response.raise_for_status()
         response_data = response.json()
         logger.info(f"Successfully listed {len(response_data)} Argil webhooks.")
@@ -340,7 +394,7 @@ def create_argil_webhook(api_key: str, callback_url: str, events: list[str]) ->
     url = f"{BASE_URL}/webhooks"
     logger.debug(f"Argil create_webhook payload: {payload}")
     try:
-        response = requests.post(url, headers=_get_headers(api_key), json=payload, timeout=30)
+        response = call_with_rate_limit("argil", lambda: requests.post(url, headers=_get_headers(api_key), json=payload, timeout=30))
         response.raise_for_status()
         response_data = response.json()
         webhook_id = response_data.get("id")
@@ -386,6 +440,7 @@ def _download_file_from_url_argil(url: str, output_path: str) -> bool:
             with open(output_path_obj, 'wb') as f:
                 for chunk in r.iter_content(chunk_size=8192):
                     f.write(chunk)
+        record_download("argil", output_path_obj)
         logger.info(f"Successfully downloaded file from {url} to {output_path}")
         return True
     except requests.exceptions.RequestException as e:
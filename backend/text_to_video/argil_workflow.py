@@ -14,7 +14,8 @@ from .pexels_client import find_and_download_videos
 from .freesound_client import find_and_download_music
 from .argil_client import create_argil_video_job, render_argil_video, DEFAULT_AVATAR_ID as DEFAULT_ARGIL_AVATAR_ID, DEFAULT_VOICE_ID as DEFAULT_ARGIL_VOICE_ID
 # Import S3 client functions (if needed for audio uploads, though Argil might handle TTS)
-from .s3_client import get_s3_client, ensure_s3_bucket, upload_to_s3
+from .s3_client import get_s3_client, ensure_s3_bucket
+from .job_store import segment_is_settled, job_is_cancelled
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -82,6 +83,9 @@ async def run_argil_workflow(job_id: str, script_path: str, job_data_ref: Dict,
         webhook_url = f"{NGROK_PUBLIC_URL.rstrip('/')}/webhooks/argil" # Ensure this matches main.py
 
     # Use passed-in references for state
+    # A resumed job (see resume_interrupted_jobs in main.py) keeps the segments an earlier run already paid for
+    previous_segments = job_data_ref[job_id].get("assets", {}).get("segments", {}) if job_id in job_data_ref else {}
+
     job_data_ref[job_id] = {
         "workflow_type": "argil", # Distinguish from heygen workflow
         "job_id": job_id,
@@ -143,11 +147,21 @@ async def run_argil_workflow(job_id: str, script_path: str, job_data_ref: Dict,
     os.makedirs(music_output_dir, exist_ok=True)
 
     for segment_name in segment_names:
+        if job_is_cancelled(job_id):
+            # Stop before paying for the next segment's TTS and avatar render
+            logger.info(f"[{job_id}] Job was cancelled; not starting segment '{segment_name}' or any after it.")
+            active_jobs_ref[job_id].append(f"[{datetime.now().isoformat()}] Cancelled; remaining segments were not started.")
+            return
         segment_data = script_segments[segment_name]
         voiceover_text = segment_data.get("voiceover")
         b_roll_keywords = segment_data.get("b_roll_keywords", [])
 
         segment_type = "argil" if segment_name in actual_argil_segments else "pexels"
+        if segment_is_settled(previous_segments.get(segment_name)):
+            job_data_ref[job_id]["assets"]["segments"][segment_name] = previous_segments[segment_name]
+            logger.info(f"[{job_id}] Keeping segment '{segment_name}' from the previous run.")
+            active_jobs_ref[job_id].append(f"[{datetime.now().isoformat()}] Kept {segment_name} from the previous run.")
+            continue
         job_data_ref[job_id]["assets"]["segments"][segment_name] = {
             "type": segment_type,
             "audio_path": None, # For Pexels segments; Argil handles its own TTS
@@ -3,8 +3,11 @@ import os
 import logging
 from moviepy.editor import VideoFileClip, AudioFileClip
 
+from backend.text_to_video.metrics import observe_stage, encode_pass
+
 logger = logging.getLogger("TikTokCreator")
 
+@observe_stage("captions")
 def add_bottom_captions(video_file, output_file=None):
     """
     Add captions at the bottom of a video file.
@@ -73,7 +76,8 @@ def add_bottom_captions(video_file, output_file=None):
 
             # Save the final video with audio
             temp_output = f"{name_parts[0]}_with_audio.{name_parts[1]}"
-            final_video.write_videofile(temp_output, codec="libx264", audio_codec="aac")
+            with encode_pass("captions_audio", temp_output, final_video.duration, final_video.fps):
+                final_video.write_videofile(temp_output, codec="libx264", audio_codec="aac")
 
             # Close clips to free resources
             captioned_video.close()
@@ -39,7 +39,7 @@ def sanitize_project_name(name):
     sanitized = re.sub(r'[^\w\-_.]', '_', name.replace(' ', '_'))
     return sanitized
 
-def create_tiktok(content, log_callback=None, job_id=None):
+def create_tiktok(content, log_callback=None, job_id=None, cancel_check=None):
     """
     Create a TikTok video from content with progress updates via callback.
 
@@ -47,6 +47,7 @@ def create_tiktok(content, log_callback=None, job_id=None):
         content (str): The content to create a video from
         log_callback (callable, optional): Function to call with status updates
         job_id (str, optional): Unique identifier for this job
+        cancel_check (callable, optional): Called before each stage; raises to stop a cancelled job
 
     Returns:
         str: Path to the final video
@@ -74,6 +75,9 @@ def create_tiktok(content, log_callback=None, job_id=None):
     os.makedirs(audio_dir, exist_ok=True)
     os.makedirs(videos_dir, exist_ok=True)
 
+    if cancel_check:
+        cancel_check()
+
     if log_callback:
         log_callback("Transforming content to script...")
 
@@ -89,6 +93,9 @@ def create_tiktok(content, log_callback=None, job_id=None):
     logger.info(f"Project name: {project_name}")
     logger.info(f"Audio will be saved to: {audio_path}")
 
+    if cancel_check:
+        cancel_check()
+
     if log_callback:
         log_callback("Generating audio from script...")
 
@@ -128,6 +135,9 @@ def create_tiktok(content, log_callback=None, job_id=None):
     num_videos = max(1, int(audio_length / 6))
     logger.info(f"Generating {num_videos} videos (6 seconds each)")
 
+    if cancel_check:
+        cancel_check()
+
     if log_callback:
         log_callback(f"Creating {num_videos} video segments...")
 
@@ -147,6 +157,9 @@ def create_tiktok(content, log_callback=None, job_id=None):
             log_callback("Error: Failed to create video content")
         return None
 
+    if cancel_check:
+        cancel_check()
+
     # Combine audio and videos
     if log_callback:
         log_callback("Combining audio and videos...")
@@ -163,6 +176,9 @@ def create_tiktok(content, log_callback=None, job_id=None):
             log_callback("Error: Failed to create final video")
         return None
 
+    if cancel_check:
+        cancel_check()
+
     try:
         # Add captions to the final video
         if log_callback:
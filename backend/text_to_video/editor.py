@@ -7,11 +7,14 @@ from moviepy.audio.fx.volumex import volumex
 from moviepy.audio.AudioClip import CompositeAudioClip, concatenate_audioclips
 from moviepy.video.fx.all import resize, crop
 
+from backend.text_to_video.metrics import observe_stage, encode_pass, record_download
+
 logger = logging.getLogger(__name__)
 if not logger.hasHandlers():
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     logger = logging.getLogger(__name__)
 
+@observe_stage("render")
 def combine_audio_video(audio_file, video_files, output_file="final_tiktok.mp4"):
     """
     Combine audio with multiple video clips to create a TikTok video.
@@ -55,7 +58,8 @@ def combine_audio_video(audio_file, video_files, output_file="final_tiktok.mp4")
         final_clip = final_clip.set_audio(audio)
 
         # Write the result to a file
-        final_clip.write_videofile(output_file, codec="libx264", audio_codec="aac")
+        with encode_pass("combine", output_file, final_clip.duration, final_clip.fps):
+            final_clip.write_videofile(output_file, codec="libx264", audio_codec="aac")
 
         # Close the clips to free resources
         audio.close()
@@ -145,6 +149,7 @@ def download_video(url: str, output_path: str) -> bool:
         with open(output_path, 'wb') as f:
             for chunk in response.iter_content(chunk_size=8192):
                 f.write(chunk)
+        record_download("video", output_path)
         logger.info(f"Successfully downloaded {output_path}")
         return True
     except requests.exceptions.RequestException as e:
@@ -154,6 +159,7 @@ def download_video(url: str, output_path: str) -> bool:
         logger.error(f"An unexpected error occurred during video download: {e}")
         return False
 
+@observe_stage("render")
 def assemble_heygen_video(job_id: str, job_data: dict, final_output_dir: str, bg_music_volume: float = 0.15) -> str | None:
     """
     Assembles the final video for the HeyGen workflow from generated assets.
@@ -441,7 +447,8 @@ def assemble_heygen_video(job_id: str, job_data: dict, final_output_dir: str, bg
         output_path = os.path.join(final_output_dir, output_filename)
 
         logger.info(f"[{job_id}] Writing final raw video to: {output_path}")
-        final_video_with_audio.write_videofile(output_path, codec="libx264", audio_codec="aac")
+        with encode_pass("heygen", output_path, final_video_with_audio.duration, final_video_with_audio.fps):
+            final_video_with_audio.write_videofile(output_path, codec="libx264", audio_codec="aac")
         logger.info(f"[{job_id}] Final raw video saved successfully.")
         return output_path
 
@@ -476,6 +483,7 @@ def assemble_heygen_video(job_id: str, job_data: dict, final_output_dir: str, bg
 #     else:
 #         print("Assembly test failed.")
 
+@observe_stage("render")
 def assemble_argil_video(job_id: str, job_data: dict, final_output_dir: str, bg_music_volume: float = 0.1) -> str | None:
     """
     Assembles the final video for the Argil workflow from generated assets.
@@ -676,7 +684,8 @@ def assemble_argil_video(job_id: str, job_data: dict, final_output_dir: str, bg_
         output_path = os.path.join(final_output_dir, output_filename)
 
         logger.info(f"[{job_id}] Writing final Argil assembled video to: {output_path}")
-        final_video_with_music.write_videofile(output_path, codec="libx264", audio_codec="aac", threads=4, logger='bar')
+        with encode_pass("argil", output_path, final_video_with_music.duration, final_video_with_music.fps):
+            final_video_with_music.write_videofile(output_path, codec="libx264", audio_codec="aac", threads=4, logger='bar')
         logger.info(f"[{job_id}] Argil Video Assembly successful. Output: {output_path}")
 
     except Exception as e:
@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import shutil
+import logging
+import zipfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- Envato Asset Configuration ---
+DEFAULT_CATALOG_PATH = Path(__file__).resolve().parent.parent / "assets" / "envato" / "catalog.json"
+ENVATO_CATALOG_PATH = Path(os.getenv("ENVATO_CATALOG_PATH", str(DEFAULT_CATALOG_PATH)))
+EXTRACT_CHUNK_SIZE = 1024 * 1024
+
+MEDIA_EXTENSIONS_BY_TYPE = {
+    "video": (".mp4", ".mov", ".m4v", ".webm"),
+    "audio": (".wav", ".mp3", ".aif", ".aiff", ".m4a"),
+    "photo": (".jpg", ".jpeg", ".png", ".webp"),
+}
+
+
+def envato_item_id(item_page_url: str) -> str:
+    """
+    Derives the stable Envato item id from an item page URL.
+
+    Envato item slugs end in the item code, e.g. ".../city-traffic-timelapse-ABC12DE" -> "ABC12DE".
+    Falls back to the full slug when the URL does not follow that pattern.
+    """
+    slug = urlparse(item_page_url).path.rstrip("/").rsplit("/", 1)[-1]
+    candidate = slug.rsplit("-", 1)[-1]
+    if candidate.isalnum() and candidate.upper() == candidate and any(c.isdigit() for c in candidate):
+        return candidate
+    return slug
+
+
+def _is_media_member(member: zipfile.ZipInfo, extensions: Iterable[str]) -> bool:
+    name = member.filename
+    if member.is_dir() or name.startswith("__MACOSX/") or Path(name).name.startswith("._"):
+        return False
+    return Path(name).suffix.lower() in extensions
+
+
+def extract_media_member(zip_path_str: str, dest_dir_str: str, extensions: Iterable[str]) -> Optional[str]:
+    """
+    Streams only the main media file out of a downloaded Envato zip.
+
+    Envato bundles usually hold one full-quality render plus previews, licences and project files.
+    The largest member with a matching extension is taken to be the render and copied out in chunks;
+    nothing else in the archive is extracted.
+
+    Args:
+        zip_path_str: Path to the .zip file.
+        dest_dir_str: Directory to write the extracted file into.
+        extensions: Lowercase file extensions (with dot) that count as media.
+
+    Returns:
+        Path to the extracted file, or None if the zip is invalid or holds no matching member.
+    """
+    zip_path = Path(zip_path_str)
+    extensions = tuple(ext.lower() for ext in extensions)
+    try:
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            members = [m for m in zip_ref.infolist() if _is_media_member(m, extensions)]
+            if not members:
+                logger.warning(f"No member of '{zip_path.name}' matches {extensions}.")
+                return None
+            member = max(members, key=lambda m: m.file_size)
+
+            dest_dir = Path(dest_dir_str)
+            dest_dir.mkdir(parents=True, exist_ok=True)
+            dest_path = dest_dir / f"{zip_path.stem}{Path(member.filename).suffix.lower()}"
+            tmp_path = dest_path.with_name(f"{dest_path.name}.part")
+            with zip_ref.open(member) as src, open(tmp_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst, EXTRACT_CHUNK_SIZE)
+            os.replace(tmp_path, dest_path)
+    except zipfile.BadZipFile:
+        logger.error(f"Error: '{zip_path.name}' is not a valid zip file or is corrupted.")
+        return None
+    except (OSError, KeyError) as e:
+        logger.error(f"Error extracting media from '{zip_path.name}': {e}")
+        return None
+
+    logger.info(f"Extracted '{member.filename}' ({member.file_size} bytes) from '{zip_path.name}' ({len(members)} media members) to '{dest_path}'")
+    return str(dest_path)
+
+
+class EnvatoCatalog:
+    """
+    Local record of Envato items that were already downloaded, keyed by item id.
+
+    Lets callers skip the browser entirely for items fetched by an earlier job. Entries whose file
+    has since been deleted are dropped on lookup. Stored as a single JSON file, rewritten atomically.
+    """
+
+    def __init__(self, catalog_path: str | Path = ENVATO_CATALOG_PATH):
+        self.catalog_path = Path(catalog_path)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = self._load()
+
+    def _load(self) -> Dict[str, dict]:
+        if not self.catalog_path.exists():
+            return {}
+        try:
+            with open(self.catalog_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Could not read Envato catalog {self.catalog_path}: {e}. Starting empty.")
+            return {}
+
+    def _save(self) -> None:
+        self.catalog_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.catalog_path.with_name(f"{self.catalog_path.name}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f, indent=2)
+        os.replace(tmp_path, self.catalog_path)
+
+    def get(self, item_id: str) -> Optional[str]:
+        """Returns the local path of a previously fetched item, or None if unknown or missing on disk."""
+        with self._lock:
+            entry = self._entries.get(item_id)
+            if not entry:
+                return None
+            if not Path(entry["path"]).exists():
+                logger.info(f"Catalog entry for Envato item {item_id} points to a missing file. Dropping it.")
+                del self._entries[item_id]
+                self._save()
+                return None
+            return entry["path"]
+
+    def record(self, item_id: str, path: str, title: str = "", item_page_url: str = "") -> None:
+        """Adds or replaces the catalog entry for an item."""
+        with self._lock:
+            self._entries[item_id] = {"path": str(path), "title": title, "item_page_url": item_page_url, "fetched_at": time.time()}
+            self._save()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -7,10 +7,14 @@ from pathlib import Path # For path operations
 from urllib.parse import urljoin # Added import
 from dotenv import load_dotenv
 from playwright.async_api import Page, Download, Locator # Added Locator
-from typing import List, Dict, Tuple, Optional, Any # Added Any for locator in dict
+from typing import List, Dict, Tuple, Optional, Any, Sequence, TYPE_CHECKING # Added Any for locator in dict
 
+from backend.text_to_video.envato_assets import MEDIA_EXTENSIONS_BY_TYPE, extract_media_member
 from backend.text_to_video.models.envato_models import EnvatoMusicSearchParams, EnvatoStockVideoSearchParams, EnvatoPhotoSearchParams, EnvatoVideoCategory, EnvatoVideoResolution, EnvatoPhotoNumberOfPeople # Added EnvatoPhotoSearchParams
 
+if TYPE_CHECKING:
+    from backend.text_to_video.envato_session_pool import EnvatoSessionPool # The pool builds on this module
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -27,6 +31,9 @@ logger.info(f"Global LOGS_DIR defined as: {LOGS_DIR.absolute()}")
 # Load environment variables from .env file
 load_dotenv()
 
+# Overridable so the client can be pointed at a locally served fake site in tests
+ENVATO_BASE_URL = os.getenv("ENVATO_BASE_URL", "https://elements.envato.com").rstrip("/")
+
 DEFAULT_USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36"
 
 def get_envato_credentials() -> Tuple[str | None, str | None]:
@@ -108,7 +115,7 @@ async def login_to_envato(page: Page, username: str, password: str) -> bool:
     Returns:
         True if login is likely successful, False otherwise.
     """
-    login_url = "https://elements.envato.com/sign-in"
+    login_url = f"{ENVATO_BASE_URL}/sign-in"
     logger.info(f"Navigating to Envato login page: {login_url}")
     try:
         await page.goto(login_url, wait_until="networkidle")
@@ -206,7 +213,7 @@ async def login_to_envato(page: Page, username: str, password: str) -> bool:
         if login_confirmed:
             logger.info("Login confirmed. Navigating to Envato Elements homepage for stable state.")
             try:
-                await page.goto("https://elements.envato.com/", wait_until="domcontentloaded", timeout=20000)
+                await page.goto(f"{ENVATO_BASE_URL}/", wait_until="domcontentloaded", timeout=20000)
                 logger.info(f"Successfully navigated to homepage. Final URL: {page.url}")
             except Exception as e_goto_home:
                 logger.warning(f"Failed to navigate to homepage after confirmed login: {e_goto_home}. Current URL: {page.url}")
@@ -391,7 +398,7 @@ async def _parse_envato_item_search_results_page(page: Page, keyword_identifier:
 
 async def search_envato_music_by_url(page: Page, params: EnvatoMusicSearchParams, num_results_to_save: int = 10) -> List[Dict[str, Any]]:
     search_path = params.build_url_path()
-    full_search_url = f"https://elements.envato.com{search_path}"
+    full_search_url = f"{ENVATO_BASE_URL}{search_path}"
     logger.info(f"Navigating to Envato music search URL: {full_search_url}")
     try:
         await page.goto(full_search_url, wait_until="domcontentloaded", timeout=30000)
@@ -410,7 +417,7 @@ async def search_envato_stock_video_by_url(page: Page, params: EnvatoStockVideoS
     Searches for stock video on Envato Elements using a direct URL from parameters.
     """
     search_path = params.build_url_path()
-    full_search_url = f"https://elements.envato.com{search_path}"
+    full_search_url = f"{ENVATO_BASE_URL}{search_path}"
     logger.info(f"Navigating to Envato stock video search URL: {full_search_url}")
     try:
         await page.goto(full_search_url, wait_until="domcontentloaded", timeout=30000)
@@ -443,7 +450,7 @@ async def search_envato_photos_by_url(page: Page, params: EnvatoPhotoSearchParam
     Searches for photos on Envato Elements using a direct URL from parameters.
     """
     search_path = params.build_url_path()
-    full_search_url = f"https://elements.envato.com{search_path}"
+    full_search_url = f"{ENVATO_BASE_URL}{search_path}"
     logger.info(f"Navigating to Envato photo search URL: {full_search_url}")
     try:
         await page.goto(full_search_url, wait_until="domcontentloaded", timeout=30000)
@@ -466,12 +473,12 @@ async def search_envato_stock_video_by_ui(page: Page, params: EnvatoStockVideoSe
     try:
         # Ensure we are on a page where the main search bar is available, e.g., homepage
         current_url = page.url
-        if "elements.envato.com" not in current_url:
+        if ENVATO_BASE_URL not in current_url:
             logger.info("Not on Envato Elements domain, navigating to homepage first.")
-            await page.goto("https://elements.envato.com/", wait_until="networkidle")
-        elif not (current_url == "https://elements.envato.com/" or current_url == "https://elements.envato.com" or "/s/" in current_url):
+            await page.goto(f"{ENVATO_BASE_URL}/", wait_until="networkidle")
+        elif not (current_url == f"{ENVATO_BASE_URL}/" or current_url == ENVATO_BASE_URL or "/s/" in current_url):
              logger.info(f"Current URL is {current_url}. Navigating to homepage for clean search start.")
-             await page.goto("https://elements.envato.com/", wait_until="networkidle")
+             await page.goto(f"{ENVATO_BASE_URL}/", wait_until="networkidle")
 
         logger.info(f"Ensuring search input is visible before interacting with category dropdown. Current URL: {page.url}")
         search_input_selector = 'input[data-testid="search-form-input"]'
@@ -605,12 +612,12 @@ async def search_envato_photos_by_ui(page: Page, params: EnvatoPhotoSearchParams
     logger.info(f"Starting UI-based photo search for keyword: '{params.keyword}' with params: {params.model_dump_json(indent=2)}")
     try:
         current_url = page.url
-        if "elements.envato.com" not in current_url:
+        if ENVATO_BASE_URL not in current_url:
             logger.info("Not on Envato Elements domain, navigating to homepage first.")
-            await page.goto("https://elements.envato.com/", wait_until="networkidle")
-        elif not (current_url == "https://elements.envato.com/" or current_url == "https://elements.envato.com" or "/s/" in current_url):
+            await page.goto(f"{ENVATO_BASE_URL}/", wait_until="networkidle")
+        elif not (current_url == f"{ENVATO_BASE_URL}/" or current_url == ENVATO_BASE_URL or "/s/" in current_url):
              logger.info(f"Current URL is {current_url}. Navigating to homepage for clean search start.")
-             await page.goto("https://elements.envato.com/", wait_until="networkidle")
+             await page.goto(f"{ENVATO_BASE_URL}/", wait_until="networkidle")
 
         logger.info(f"Ensuring search input is visible before interacting with category dropdown. Current URL: {page.url}")
         search_input_selector = 'input[data-testid="search-form-input"]'
@@ -697,7 +704,7 @@ async def search_envato_photos_by_ui(page: Page, params: EnvatoPhotoSearchParams
 
 async def logout_from_envato(page: Page) -> None:
     """Logs out from Envato Elements by navigating to the sign-out URL."""
-    logout_url = "https://elements.envato.com/sign-out"
+    logout_url = f"{ENVATO_BASE_URL}/sign-out"
     logger.info(f"Attempting to logout by navigating to: {logout_url}")
     try:
         await page.goto(logout_url, wait_until="domcontentloaded") # Wait for basic page load
@@ -706,7 +713,7 @@ async def logout_from_envato(page: Page) -> None:
         logger.info(f"Logout successful. Current URL: {page.url}")
         # Typically, after sign-out, it redirects to the homepage or a sign-in page.
         # Check if we are on a page that indicates logout (e.g., sign-in page)
-        if "sign-in" in page.url or page.url == "https://elements.envato.com/" or "signed_out=true" in page.url:
+        if "sign-in" in page.url or page.url == f"{ENVATO_BASE_URL}/" or "signed_out=true" in page.url:
             logger.info("Logout confirmed by URL or page content.")
         else:
             logger.warning(f"Logout navigation completed, but URL is {page.url}, which might not confirm logout. Check manually if issues persist.")
@@ -766,11 +773,14 @@ async def download_envato_asset(
     download_button_locator: Optional[Locator],
     project_license_value: str,
     download_directory: str,
-    item_page_url: Optional[str] = None
+    item_page_url: Optional[str] = None,
+    media_extensions: Optional[Sequence[str]] = None
 ) -> Optional[str]:
     """
     Downloads an asset from Envato Elements.
     Handles potential intermediate upsell/login modals before reaching the license modal.
+    If media_extensions is given, only the main matching media file is streamed out of a zip download
+    (and the zip removed); otherwise the whole archive is extracted as before.
     """
     if not download_button_locator:
         logger.error(f"Download attempt for '{item_title}' failed: No download button locator provided.")
@@ -1031,6 +1041,14 @@ async def download_envato_asset(
             # Add any other extensions that are archives and need unzipping
             # Example: elif final_file_extension == ".rar": should_unzip = True
 
+            if should_unzip and media_extensions:
+                extracted_file_path = extract_media_member(download_save_path, Path(download_save_path).parent, media_extensions)
+                if extracted_file_path:
+                    Path(download_save_path).unlink(missing_ok=True)
+                    logger.info(f"Asset '{item_title}' media extracted to: {extracted_file_path}")
+                    return extracted_file_path
+                logger.warning(f"No media member extracted from '{download_save_path}'. Falling back to full extraction.")
+
             if should_unzip:
                 logger.info(f"Attempting to unzip: {download_save_path}")
                 extracted_dir_path = unzip_asset(download_save_path, Path(download_save_path).parent)
@@ -1057,22 +1075,37 @@ async def search_and_download_envato_stock_footage(
     keyword: str,
     project_license_value: str,
     download_directory: str,
-    num_results_to_save: int = 10
-) -> List[str]: # Returns list of paths to downloaded & extracted footage folders/files
+    num_results_to_save: int = 10,
+    pool: Optional["EnvatoSessionPool"] = None,
+) -> List[str]: # Returns list of paths to downloaded footage files
     """
-    Placeholder for searching and downloading Envato stock footage.
-    Currently logs a message and returns an empty list.
+    Searches Envato stock footage for keyword on page and downloads the results through a session pool.
+
+    Downloads run concurrently on the pool's authenticated pages, keep only the main video file of each
+    zip, and skip items already in the local catalog.
+
+    Args:
+        page: Logged-in page used for the search.
+        pool: A started EnvatoSessionPool to download with; one is opened (and closed) for this call if omitted.
+
+    Returns:
+        Paths of the successfully downloaded files, in search result order.
     """
-    logger.info(f"Placeholder: Stock footage search for '{keyword}' requested. Num results: {num_results_to_save}.")
-    logger.info(f"Output directory: {download_directory}, Project License: {project_license_value}")
-    # In a real implementation:
-    # 1. Adapt search_envato_music_by_url or search_envato_music for video (different category, selectors)
-    #    - Video category in URL/filter might be "stock-footage" or similar.
-    #    - Result parsing for video items (title, download button) will differ.
-    # 2. Loop through results, call a modified download_envato_asset for video.
-    #    - Video downloads might also be zips or direct .mp4 files.
-    #    - Unzipping logic would apply if they are zips.
-    return []
+    from backend.text_to_video.envato_session_pool import EnvatoSessionPool # Imported here: the pool imports this module
+
+    items = await search_envato_stock_video_by_url(page, EnvatoStockVideoSearchParams(keyword=keyword), num_results_to_save)
+    if not items:
+        logger.warning(f"No Envato stock footage found for '{keyword}'.")
+        return []
+    logger.info(f"Found {len(items)} Envato stock footage items for '{keyword}'. Downloading to {download_directory}.")
+
+    video_extensions = MEDIA_EXTENSIONS_BY_TYPE["video"]
+    if pool is not None:
+        paths = await pool.download_items(items, project_license_value, download_directory, media_extensions=video_extensions)
+    else:
+        async with EnvatoSessionPool() as pool:
+            paths = await pool.download_items(items, project_license_value, download_directory, media_extensions=video_extensions)
+    return [path for path in paths if path]
 
 if __name__ == '__main__':
     # This is a placeholder for direct testing of the client if needed.
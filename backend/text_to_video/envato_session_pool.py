@@ -0,0 +1,216 @@
+import os
+import time
+import asyncio
+import logging
+from pathlib import Path
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from playwright.async_api import async_playwright, Page
+
+from backend.text_to_video.envato_client import (
+    login_to_envato,
+    get_envato_credentials,
+    download_envato_asset,
+    DEFAULT_USER_AGENT,
+)
+from backend.text_to_video.envato_assets import EnvatoCatalog, envato_item_id
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- Session Pool Configuration ---
+DEFAULT_STORAGE_STATE_PATH = Path(__file__).resolve().parent.parent / "assets" / "envato" / "storage_state.json"
+ENVATO_STORAGE_STATE_PATH = Path(os.getenv("ENVATO_STORAGE_STATE_PATH", str(DEFAULT_STORAGE_STATE_PATH)))
+ENVATO_SESSION_TTL_SECONDS = int(os.getenv("ENVATO_SESSION_TTL_SECONDS", str(6 * 60 * 60)))
+ENVATO_POOL_SIZE = int(os.getenv("ENVATO_POOL_SIZE", "3"))
+ENVATO_ITEM_PAGE_TIMEOUT_MS = 30000
+ENVATO_ITEM_DOWNLOAD_BUTTON_SELECTOR = "button[data-testid='button-download']"
+
+
+def storage_state_is_fresh(storage_state_path: Path, ttl_seconds: float) -> bool:
+    """True if a saved login session exists and is younger than ttl_seconds."""
+    try:
+        return time.time() - storage_state_path.stat().st_mtime < ttl_seconds
+    except OSError:
+        return False
+
+
+class EnvatoSessionPool:
+    """
+    A pool of authenticated Playwright browser contexts for Envato Elements downloads.
+
+    One browser is shared by `size` contexts, each with a single page. All contexts are created from
+    a saved storage_state (cookies + local storage), so the interactive login only runs when that file
+    is missing or older than the TTL. Downloads are spread across the pages concurrently, and items
+    already present in the local catalog are returned without touching the browser.
+
+    Usage:
+        async with EnvatoSessionPool(size=3) as pool:
+            paths = await pool.download_items(items, "my-project", "downloads/", media_extensions=(".mp4",))
+    """
+
+    def __init__(
+        self,
+        size: int = ENVATO_POOL_SIZE,
+        storage_state_path: str | Path = ENVATO_STORAGE_STATE_PATH,
+        ttl_seconds: float = ENVATO_SESSION_TTL_SECONDS,
+        headless: bool = True,
+        credentials: Optional[Tuple[str, str]] = None,
+        catalog: Optional[EnvatoCatalog] = None,
+    ):
+        self.size = max(1, size)
+        self.storage_state_path = Path(storage_state_path)
+        self.ttl_seconds = ttl_seconds
+        self.headless = headless
+        self.credentials = credentials
+        self.catalog = catalog if catalog is not None else EnvatoCatalog()
+        self._playwright = None
+        self._browser = None
+        self._contexts = []
+        self._pages: Optional[asyncio.Queue] = None
+        self.stats = {"logins": 0, "downloads": 0, "catalog_hits": 0, "failures": 0}
+
+    async def __aenter__(self):
+        try:
+            await self.start()
+        except Exception:
+            await self.close()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def start(self) -> None:
+        """Launches the browser, logs in if the saved session is stale, and opens the pooled contexts."""
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=self.headless)
+
+        if storage_state_is_fresh(self.storage_state_path, self.ttl_seconds):
+            logger.info(f"Reusing saved Envato session from {self.storage_state_path}.")
+        else:
+            await self._login_and_save_state()
+
+        self._pages = asyncio.Queue()
+        for _ in range(self.size):
+            context = await self._browser.new_context(
+                storage_state=str(self.storage_state_path), user_agent=DEFAULT_USER_AGENT, accept_downloads=True
+            )
+            self._contexts.append(context)
+            self._pages.put_nowait(await context.new_page())
+        logger.info(f"Envato session pool ready with {self.size} contexts.")
+
+    async def _login_and_save_state(self) -> None:
+        username, password = self.credentials or get_envato_credentials()
+        if not username or not password:
+            raise RuntimeError("Envato credentials are not configured; cannot create a session.")
+
+        context = await self._browser.new_context(user_agent=DEFAULT_USER_AGENT)
+        try:
+            page = await context.new_page()
+            if not await login_to_envato(page, username, password):
+                raise RuntimeError("Envato login failed; cannot create a session.")
+            self.storage_state_path.parent.mkdir(parents=True, exist_ok=True)
+            await context.storage_state(path=str(self.storage_state_path))
+            self.stats["logins"] += 1
+            logger.info(f"Logged into Envato and saved session to {self.storage_state_path}.")
+        finally:
+            await context.close()
+
+    async def close(self) -> None:
+        """Closes all contexts, the browser and Playwright."""
+        for context in self._contexts:
+            try:
+                await context.close()
+            except Exception as e:
+                logger.warning(f"Error closing Envato browser context: {e}")
+        self._contexts = []
+        if self._browser:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+        logger.info(f"Envato session pool closed. Stats: {self.stats}")
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrows a page from the pool for the duration of the block."""
+        page: Page = await self._pages.get()
+        try:
+            yield page
+        finally:
+            self._pages.put_nowait(page)
+
+    async def download_item(
+        self,
+        item: Dict,
+        project_license_value: str,
+        download_directory: str,
+        media_extensions: Optional[Sequence[str]] = None,
+    ) -> Optional[str]:
+        """
+        Downloads one Envato item on a pooled page, or returns it from the catalog if already fetched.
+
+        Args:
+            item: A search result dict with at least "title" and "item_page_url".
+            project_license_value: Value of the project radio button in the license modal.
+            download_directory: Where downloads are saved.
+            media_extensions: If given, only the main media file with one of these extensions is kept.
+
+        Returns:
+            Path to the downloaded file (or extraction directory), or None on failure.
+        """
+        item_page_url = item["item_page_url"]
+        item_id = envato_item_id(item_page_url)
+        cached_path = self.catalog.get(item_id)
+        if cached_path:
+            self.stats["catalog_hits"] += 1
+            logger.info(f"Envato item {item_id} already fetched: {cached_path}")
+            return cached_path
+
+        async with self.page() as page:
+            try:
+                await page.goto(item_page_url, wait_until="domcontentloaded", timeout=ENVATO_ITEM_PAGE_TIMEOUT_MS)
+            except Exception as e:
+                self.stats["failures"] += 1
+                logger.error(f"Could not open Envato item page {item_page_url}: {e}")
+                return None
+            download_button = page.locator(ENVATO_ITEM_DOWNLOAD_BUTTON_SELECTOR).first
+            downloaded_path = await download_envato_asset(
+                page, item["title"], download_button, project_license_value, download_directory,
+                item_page_url=item_page_url, media_extensions=media_extensions,
+            )
+
+        if not downloaded_path:
+            self.stats["failures"] += 1
+            return None
+        self.stats["downloads"] += 1
+        self.catalog.record(item_id, downloaded_path, item["title"], item_page_url)
+        return downloaded_path
+
+    async def download_items(
+        self,
+        items: List[Dict],
+        project_license_value: str,
+        download_directory: str,
+        media_extensions: Optional[Sequence[str]] = None,
+    ) -> List[Optional[str]]:
+        """
+        Downloads several items concurrently across the pooled pages.
+
+        Duplicate items (same Envato item id) are fetched once. Results are returned in input order.
+        """
+        unique_items: Dict[str, Dict] = {}
+        for item in items:
+            unique_items.setdefault(envato_item_id(item["item_page_url"]), item)
+        logger.info(f"Downloading {len(unique_items)} Envato items across {self.size} pooled pages.")
+
+        paths = await asyncio.gather(*(
+            self.download_item(item, project_license_value, download_directory, media_extensions)
+            for item in unique_items.values()
+        ))
+        path_by_id = dict(zip(unique_items.keys(), paths))
+        return [path_by_id[envato_item_id(item["item_page_url"])] for item in items]
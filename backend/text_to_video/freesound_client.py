@@ -1,9 +1,14 @@
 import os
+import shutil
 import requests
 import logging
+from typing import Callable, Optional
 from dotenv import load_dotenv
 import random
 
+from backend.text_to_video.rate_limiter import call_with_rate_limit
+from backend.text_to_video.metrics import record_download
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -11,7 +16,8 @@ logger = logging.getLogger(__name__)
 # Define usable licenses
 USABLE_LICENSES = ["Creative Commons 0", "Attribution"]
 
-def find_and_download_music(api_key: str, query: str, output_path: str, min_duration: float = 60, max_duration: float = 180) -> str | None:
+def find_and_download_music(api_key: str, query: str, output_path: str, min_duration: float = 60, max_duration: float = 180, sound_info_out: dict | None = None,
+                            local_copy: Callable[[int], Optional[str]] | None = None) -> str | None:
     """
     Search Freesound for music and download the HQ MP3 preview of the first suitable result.
 
@@ -21,6 +27,10 @@ def find_and_download_music(api_key: str, query: str, output_path: str, min_dura
         output_path (str): Full path including filename to save the downloaded music.
         min_duration (float): Minimum duration in seconds. Default: 60.
         max_duration (float): Maximum duration in seconds. Default: 180.
+        sound_info_out (dict | None): If given, filled with the downloaded sound's id, name, license,
+                                      username, tags and duration (e.g. for the music library index).
+        local_copy (Callable | None): Called with the chosen sound's id; a path it returns (the same sound,
+                                      downloaded before) is copied to output_path instead of downloading again.
 
     Returns:
         str | None: The path to the downloaded file if successful, otherwise None.
@@ -42,14 +52,14 @@ def find_and_download_music(api_key: str, query: str, output_path: str, min_dura
     params = {
         "query": query,
         "filter": combined_filter,
-        "fields": "id,name,license,previews,duration", # Request needed fields
+        "fields": "id,name,license,previews,duration,username,tags", # Request needed fields
         "sort": "rating_desc", # Sort by rating
         "page_size": 10 # Get a few results to check
     }
 
     try:
         logger.info(f"Searching Freesound for '{query}' with filters: {combined_filter}")
-        response = requests.get(search_url, headers=headers, params=params, timeout=15)
+        response = call_with_rate_limit("freesound", lambda: requests.get(search_url, headers=headers, params=params, timeout=15))
         response.raise_for_status() # Raise an exception for bad status codes
 
         data = response.json()
@@ -66,6 +76,15 @@ def find_and_download_music(api_key: str, query: str, output_path: str, min_dura
         sound_id = sound_info.get("id")
         previews = sound_info.get("previews")
 
+        existing_path = local_copy(sound_id) if local_copy and sound_id is not None else None
+        if existing_path:
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            shutil.copy2(existing_path, output_path)
+            logger.info(f"Sound ID {sound_id} ({sound_info.get('name')}) was downloaded before; copied {existing_path} instead of downloading it again.")
+            if sound_info_out is not None:
+                sound_info_out.update({key: sound_info.get(key) for key in ("id", "name", "license", "username", "tags", "duration")})
+            return output_path
+
         if not previews or "preview-hq-mp3" not in previews:
             logger.warning(f"Sound ID {sound_id} does not have an HQ MP3 preview available. Trying next if available...")
             # In a real scenario, you might loop through more results here
@@ -88,7 +107,10 @@ def find_and_download_music(api_key: str, query: str, output_path: str, min_dura
                     f.write(chunk)
 
             if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+                record_download("freesound", output_path)
                 logger.info(f"Successfully downloaded music to {output_path}")
+                if sound_info_out is not None:
+                    sound_info_out.update({key: sound_info.get(key) for key in ("id", "name", "license", "username", "tags", "duration")})
                 return output_path
             else:
                 logger.error(f"Failed to download music for sound ID {sound_id} correctly (file empty or not created).")
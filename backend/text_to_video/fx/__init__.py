@@ -6,6 +6,8 @@ import os
 
 from . import segment_parser
 from . import transcriber
+from backend.text_to_video.metrics import encode_pass
+from backend.text_to_video.tracing import span
 from .text_drawer import (
     get_text_size_ex,
     create_text_ex,
@@ -87,7 +89,8 @@ def calculate_lines(text, font, font_size, stroke_width, frame_width):
     return data
 
 def ffmpeg(command):
-    return subprocess.run(command, capture_output=True)
+    with span("ffmpeg", "ffmpeg"):
+        return subprocess.run(command, capture_output=True)
 
 def create_shadow(text: str, font_size: int, font: str, blur_radius: float, opacity: float=1.0):
     global shadow_cache
@@ -297,13 +300,14 @@ def add_captions(
     # Ensure the composite video has the same duration as the input video
     video_with_text = CompositeVideoClip(clips, size=video.size).set_duration(video.duration)
 
-    video_with_text.write_videofile(
-        filename=output_file,
-        codec="libx264",
-        audio_codec="aac",
-        fps=video.fps,
-        logger="bar" if print_info else None,
-    )
+    with encode_pass("captions", output_file, video.duration, video.fps):
+        video_with_text.write_videofile(
+            filename=output_file,
+            codec="libx264",
+            audio_codec="aac",
+            fps=video.fps,
+            logger="bar" if print_info else None,
+        )
 
     end_time = time.time()
     total_time = end_time - _start_time
@@ -4,6 +4,7 @@ import os
 from moviepy.editor import VideoFileClip, AudioFileClip, CompositeVideoClip
 from moviepy.video.fx.all import crop, resize
 from backend.text_to_video.fx import add_captions
+from backend.text_to_video.tracing import span
 
 TIKTOK_DIMS = (1080, 1920)
 
@@ -11,7 +12,8 @@ def ffmpeg_cmd(command):
     # Simplified ffmpeg command execution
     try:
         print(f"Running FFmpeg command: {' '.join(command)}")
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
+        with span("ffmpeg", "ffmpeg"):
+            result = subprocess.run(command, capture_output=True, text=True, check=True)
         print("FFmpeg stdout:", result.stdout)
         print("FFmpeg stderr:", result.stderr)
         return result
@@ -1,6 +1,9 @@
 import openai
 from openai._types import FileTypes
 
+from backend.text_to_video.metrics import observe_stage, observe_provider
+
+@observe_stage("transcription")
 def transcribe_with_api(
     audio_file: FileTypes,
     prompt: str | None = None
@@ -8,13 +11,14 @@ def transcribe_with_api(
     """
     Transcribe an audio file using the OpenAI Whisper API
     """
-    transcript = openai.audio.transcriptions.create(
-        model="whisper-1",
-        file=open(audio_file, "rb"),
-        response_format="verbose_json",
-        timestamp_granularities=["segment", "word"],
-        prompt=prompt,
-    )
+    with observe_provider("openai"):
+        transcript = openai.audio.transcriptions.create(
+            model="whisper-1",
+            file=open(audio_file, "rb"),
+            response_format="verbose_json",
+            timestamp_granularities=["segment", "word"],
+            prompt=prompt,
+        )
 
     # Add space to beginning of words
     # to match local Whisper format
@@ -29,6 +33,7 @@ def transcribe_with_api(
         "words": transcript.words,
     }]
 
+@observe_stage("transcription")
 def transcribe_locally(
     audio_file: str,
     prompt: str | None = None
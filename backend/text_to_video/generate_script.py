@@ -6,6 +6,7 @@ from typing import Optional # Import Optional
 
 # Import Claude client and related items
 from .claude_client import ClaudeClient, ClaudeAPIError, DEFAULT_MODEL as DEFAULT_CLAUDE_MODEL
+from .metrics import observe_stage, observe_provider
 
 def remove_think_tags(text):
     """
@@ -28,6 +29,7 @@ def remove_think_tags(text):
     # Return the cleaned text
     return cleaned_text.strip()
 
+@observe_stage("script")
 def transform_to_script(input_text, temperature=0.6, max_tokens=9000, top_p=0.95):
     """
     Transform any text into a script format using Groq's AI model.
@@ -46,33 +48,34 @@ def transform_to_script(input_text, temperature=0.6, max_tokens=9000, top_p=0.95
     system_prompt = f"""You are an amazing youtube shorts and tiktok creator you have been given a news piece you want to make that into a youtube short"""
 
     try:
-        completion = client.chat.completions.create(
-            model="deepseek-r1-distill-llama-70b",
-            messages=[
-                {
-                    "role": "system",
-                    "content": system_prompt
-                },
-                {
-                    "role": "user",
-                    "content": f"Transform this text #Content {input_text} and transform that into a short form content for tiktok and youtube shorts of about 15 seconds in duration, around 200 characters, in complete sentences, we just want the content that the human should read. only give the text that i should be reading. no hashtags at the end"
-                }
-            ],
-            temperature=temperature,
-            top_p=top_p,
-            stream=True,
-            stop=None,
-        )
-
-        # For returning the complete text
-        full_response = ""
-
-        # Print the response as it streams
-        print(f"Transforming text into youtube shorts script...\n")
-        for chunk in completion:
-            content = chunk.choices[0].delta.content or ""
-            print(content, end="")
-            full_response += content
+        with observe_provider("groq"):
+            completion = client.chat.completions.create(
+                model="deepseek-r1-distill-llama-70b",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": system_prompt
+                    },
+                    {
+                        "role": "user",
+                        "content": f"Transform this text #Content {input_text} and transform that into a short form content for tiktok and youtube shorts of about 15 seconds in duration, around 200 characters, in complete sentences, we just want the content that the human should read. only give the text that i should be reading. no hashtags at the end"
+                    }
+                ],
+                temperature=temperature,
+                top_p=top_p,
+                stream=True,
+                stop=None,
+            )
+
+            # For returning the complete text
+            full_response = ""
+
+            # Print the response as it streams
+            print(f"Transforming text into youtube shorts script...\n")
+            for chunk in completion:
+                content = chunk.choices[0].delta.content or ""
+                print(content, end="")
+                full_response += content
 
         cleaned_response = remove_think_tags(full_response)
 
@@ -82,6 +85,7 @@ def transform_to_script(input_text, temperature=0.6, max_tokens=9000, top_p=0.95
         print(f"Error transforming text: {e}")
         return None
 
+@observe_stage("script")
 async def transform_to_tech_in_asia_script(
     input_text: str,
     llm_provider: str = "groq", # "groq" or "claude"
@@ -131,23 +135,24 @@ async def transform_to_tech_in_asia_script(
         actual_model_name = model_name or "deepseek-r1-distill-llama-70b" # Groq default
         print(f"\n--- Using Groq LLM ({actual_model_name}) ---")
         try:
-            completion = client.chat.completions.create(
-                model=actual_model_name,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": system_prompt_content_template
-                    },
-                    {
-                        "role": "user",
-                        "content": user_content_for_llm
-                    }
-                ],
-                temperature=temperature,
-                top_p=top_p,
-                stream=False,
-                stop=None,
-            )
+            with observe_provider("groq"):
+                completion = client.chat.completions.create(
+                    model=actual_model_name,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": system_prompt_content_template
+                        },
+                        {
+                            "role": "user",
+                            "content": user_content_for_llm
+                        }
+                    ],
+                    temperature=temperature,
+                    top_p=top_p,
+                    stream=False,
+                    stop=None,
+                )
             raw_response_text = completion.choices[0].message.content
         except Exception as e:
             print(f"Error transforming text with Groq: {e}")
@@ -4,6 +4,8 @@ import logging
 from dotenv import load_dotenv
 import uuid
 
+from backend.text_to_video.rate_limiter import call_with_rate_limit
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -126,7 +128,7 @@ def start_avatar_video_generation(
         }
 
     try:
-        response = requests.post(HEYGEN_API_ENDPOINT, headers=headers, json=payload, timeout=30)
+        response = call_with_rate_limit("heygen", lambda: requests.post(HEYGEN_API_ENDPOINT, headers=headers, json=payload, timeout=30))
         response.raise_for_status()
         response_data = response.json()
         logger.info(f"HeyGen API response received: {response_data}")
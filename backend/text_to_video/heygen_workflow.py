@@ -14,7 +14,8 @@ from .pexels_client import find_and_download_videos
 from .freesound_client import find_and_download_music
 from .heygen_client import start_avatar_video_generation
 # Import S3 client functions
-from .s3_client import get_s3_client, ensure_s3_bucket, upload_to_s3
+from .s3_client import get_s3_client, ensure_s3_bucket, S3UploadManager
+from .job_store import segment_is_settled, job_is_cancelled
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -83,6 +84,9 @@ async def run_heygen_workflow(job_id: str, script_path: str, job_data_ref: Dict,
         webhook_url = f"{NGROK_PUBLIC_URL.rstrip('/')}/webhooks/heygen"
 
     # Create initial job state entry using the passed reference
+    # A resumed job (see resume_interrupted_jobs in main.py) keeps the segments an earlier run already paid for
+    previous_segments = job_data_ref[job_id].get("assets", {}).get("segments", {}) if job_id in job_data_ref else {}
+
     job_data_ref[job_id] = {
         "workflow_type": "heygen",
         "job_id": job_id,
@@ -153,145 +157,182 @@ async def run_heygen_workflow(job_id: str, script_path: str, job_data_ref: Dict,
 
     tasks_to_await = []
 
-    # Initiate generation for each segment
-    for segment_name in segment_names:
-        segment_data = script_segments[segment_name]
-        voiceover_text = segment_data.get("voiceover")
-        b_roll_keywords = segment_data.get("b_roll_keywords", [])
-
-        # Initialize segment state in the passed job_data_ref
-        segment_type = "heygen" if segment_name in heygen_target_segments else "pexels"
-        job_data_ref[job_id]["assets"]["segments"][segment_name] = {
-            "type": segment_type,
-            "audio_path": None,
-            "audio_status": "pending",
-            "visual_status": "pending",
-        }
-        segment_state = job_data_ref[job_id]["assets"]["segments"][segment_name]
-
-        if not voiceover_text:
-            logger.warning(f"[{job_id}] Segment '{segment_name}' has no voiceover text. Skipping audio.")
-            segment_state["audio_status"] = "skipped"
-            continue # Should we handle segments without voiceover differently?
-
-        # --- 3a. Generate Audio (ElevenLabs) ---
-        logger.info(f"[{job_id}] Initiating audio generation for segment: {segment_name}")
-        active_jobs_ref[job_id].append(f"[{datetime.now().isoformat()}] Generating audio for {segment_name}...")
-        audio_filename = f"segment_{segment_name}.mp3"
-        audio_full_path = os.path.join(audio_output_dir, audio_filename)
-        # Note: text_to_speech is synchronous. We could run it in an executor for parallelization.
-        try:
-            generated_audio_path = text_to_speech(voiceover_text, audio_filename) # Uses default voice
-            if generated_audio_path and os.path.exists(generated_audio_path):
-                # Ensure path is absolute or relative to project root if needed
-                segment_state["audio_path"] = generated_audio_path # Store the returned path
-                segment_state["audio_status"] = "completed"
-                logger.info(f"[{job_id}] Audio completed for {segment_name}: {generated_audio_path}")
-                active_jobs_ref[job_id].append(f"[{datetime.now().isoformat()}] Audio completed for {segment_name}.")
-            else:
-                raise ValueError("text_to_speech failed or returned invalid path")
-        except Exception as e:
-            error_msg = f"Audio generation failed for {segment_name}: {e}"
-            logger.error(f"[{job_id}] {error_msg}")
-            segment_state["audio_status"] = "failed"
-            segment_state["error"] = error_msg
-            active_jobs_ref[job_id].append(f"[{datetime.now().isoformat()}] Error: {error_msg}")
-            # Optionally: Mark overall job as failed or try to continue without this segment's audio?
-
-        # --- 3b. Initiate Visuals (HeyGen or Pexels) ---
-        audio_public_url = None # Initialize for HeyGen
-        if segment_name in heygen_target_segments:
-            # --- HeyGen ---
-            segment_state["type"] = "heygen"
-            segment_state["visual_status"] = "processing" # Heygen is async
-            avatar_id = VEST_AVATARS.get(segment_name, VEST_AVATARS["default"])
-            segment_state["heygen_avatar_id"] = avatar_id
-
-            # Upload audio to S3 if available
-            if segment_state["audio_status"] == "completed" and s3_client and S3_BUCKET_NAME:
-                local_audio = segment_state["audio_path"]
-                s3_key = f"{job_id}/{segment_name}/audio.mp3" # Define S3 key structure
-                audio_public_url = upload_to_s3(s3_client, local_audio, S3_BUCKET_NAME, s3_key)
-                if not audio_public_url:
-                    logger.error(f"[{job_id}] Failed to upload audio {local_audio} to S3 for segment {segment_name}. Proceeding without custom audio.")
-                    # Reset audio status or mark error? Keep HeyGen going with its TTS for now.
-                else:
-                    logger.info(f"[{job_id}] Audio for {segment_name} uploaded to S3: {audio_public_url}")
-            elif segment_state["audio_status"] != "completed":
-                logger.warning(f"[{job_id}] Audio not completed for HeyGen segment {segment_name}. HeyGen will use its own TTS or fail if audio_url was intended.")
-            else: # S3 client or bucket name missing
-                logger.warning(f"[{job_id}] S3 not configured. HeyGen will use its own TTS for segment {segment_name}.")
-
-            logger.info(f"[{job_id}] Initiating HeyGen video for segment: {segment_name} (Avatar: {avatar_id})")
-            active_jobs_ref[job_id].append(f"[{datetime.now().isoformat()}] Starting HeyGen video for {segment_name}...")
-            # Note: We need audio_url for HeyGen. For now, using text input.
-            # To use ElevenLabs audio: upload generated_audio_path to a public URL (e.g., S3)
-            # and pass that URL as voice_audio_url instead of voice_text.
-            # TODO: Implement audio upload and use voice_audio_url
-            # Example (pseudo-code):
-            # if segment_state["audio_status"] == "completed":
-            #    audio_public_url = upload_to_s3(segment_state["audio_path"])
-            # else:
-            #    audio_public_url = None # Or handle error
-            heygen_response = start_avatar_video_generation(
-                api_key=HEYGEN_API_KEY,
-                avatar_id=avatar_id,
-                # Use a default background for now, could be dynamic later
-                background_url="https://images.pexels.com/photos/265125/pexels-photo-265125.jpeg",
-                webhook_url=webhook_url,
-                callback_id=f"{job_id}__{segment_name}", # Include segment name in callback
-                voice_text=voiceover_text, # Using HeyGen TTS for now
-                voice_id=HEYGEN_JIN_VOICE_ID, # Specific HeyGen voice
-                voice_audio_url=audio_public_url, # Pass S3 URL if available, otherwise None
-                title=f"{job_id} - {segment_name}"
-            )
-            if heygen_response and heygen_response.get("data", {}).get("video_id"):
-                segment_state["heygen_video_id"] = heygen_response["data"]["video_id"]
-                logger.info(f"[{job_id}] HeyGen video started for {segment_name}. Video ID: {segment_state['heygen_video_id']}")
-            else:
-                error_msg = f"Failed to start HeyGen video for {segment_name}. Response: {heygen_response}"
-                logger.error(f"[{job_id}] {error_msg}")
-                segment_state["visual_status"] = "failed"
-                segment_state["error"] = error_msg
-                active_jobs_ref[job_id].append(f"[{datetime.now().isoformat()}] Error: {error_msg}")
-        else:
-            # --- Pexels ---
-            segment_state["type"] = "pexels"
-            if not b_roll_keywords:
-                logger.warning(f"[{job_id}] Segment '{segment_name}' is Pexels type but has no keywords. Skipping visuals.")
-                segment_state["visual_status"] = "skipped"
+    # Initiate generation for each segment: audio first (HeyGen audio uploads run in the background on one
+    # manager for the job), then visuals, which wait only for their own segment's upload
+    visual_segments = []
+    audio_uploads = {}
+    upload_manager = S3UploadManager(s3_client, S3_BUCKET_NAME) if s3_client and S3_BUCKET_NAME else None
+    try:
+        for segment_name in segment_names:
+            if job_is_cancelled(job_id):
+                # Stop before paying for the next segment's TTS and avatar render
+                logger.info(f"[{job_id}] Job was cancelled; not starting segment '{segment_name}' or any after it.")
+                active_jobs_ref[job_id].append(f"[{datetime.now().isoformat()}] Cancelled; remaining segments were not started.")
+                return
+            segment_data = script_segments[segment_name]
+            voiceover_text = segment_data.get("voiceover")
+            b_roll_keywords = segment_data.get("b_roll_keywords", [])
+
+            # Initialize segment state in the passed job_data_ref
+            segment_type = "heygen" if segment_name in heygen_target_segments else "pexels"
+            if segment_is_settled(previous_segments.get(segment_name)):
+                job_data_ref[job_id]["assets"]["segments"][segment_name] = previous_segments[segment_name]
+                logger.info(f"[{job_id}] Keeping segment '{segment_name}' from the previous run.")
+                active_jobs_ref[job_id].append(f"[{datetime.now().isoformat()}] Kept {segment_name} from the previous run.")
                 continue
-
-            query = " ".join(b_roll_keywords)
-            segment_state["pexels_query"] = query
-            logger.info(f"[{job_id}] Initiating Pexels search for segment: {segment_name} (Query: {query})")
-            active_jobs_ref[job_id].append(f"[{datetime.now().isoformat()}] Finding Pexels video for {segment_name}...")
-            # Note: find_and_download_videos is synchronous.
+            job_data_ref[job_id]["assets"]["segments"][segment_name] = {
+                "type": segment_type,
+                "audio_path": None,
+                "audio_status": "pending",
+                "visual_status": "pending",
+            }
+            segment_state = job_data_ref[job_id]["assets"]["segments"][segment_name]
+
+            if not voiceover_text:
+                logger.warning(f"[{job_id}] Segment '{segment_name}' has no voiceover text. Skipping audio.")
+                segment_state["audio_status"] = "skipped"
+                continue # Should we handle segments without voiceover differently?
+
+            # --- 3a. Generate Audio (ElevenLabs) ---
+            logger.info(f"[{job_id}] Initiating audio generation for segment: {segment_name}")
+            active_jobs_ref[job_id].append(f"[{datetime.now().isoformat()}] Generating audio for {segment_name}...")
+            audio_filename = f"segment_{segment_name}.mp3"
+            audio_full_path = os.path.join(audio_output_dir, audio_filename)
+            # Note: text_to_speech is synchronous. We could run it in an executor for parallelization.
             try:
-                # Determine how many clips are needed based on audio duration (approx 5s/clip?)
-                # Requires audio to be generated first - potential dependency issue if async
-                # For now, just download 1 clip.
-                num_clips = 1 # TODO: Calculate based on segment_data['timing'] or audio duration
-                downloaded_paths = find_and_download_videos(
-                    api_key=PEXELS_API_KEY,
-                    query=query,
-                    count=num_clips,
-                    output_dir=pexels_output_dir,
-                    orientation="portrait" # Assuming vertical format
-                )
-                if downloaded_paths:
-                    segment_state["pexels_video_paths"] = downloaded_paths
-                    segment_state["visual_status"] = "completed"
-                    logger.info(f"[{job_id}] Pexels videos downloaded for {segment_name}: {downloaded_paths}")
-                    active_jobs_ref[job_id].append(f"[{datetime.now().isoformat()}] Pexels video downloaded for {segment_name}.")
+                generated_audio_path = text_to_speech(voiceover_text, audio_filename) # Uses default voice
+                if generated_audio_path and os.path.exists(generated_audio_path):
+                    # Ensure path is absolute or relative to project root if needed
+                    segment_state["audio_path"] = generated_audio_path # Store the returned path
+                    segment_state["audio_status"] = "completed"
+                    logger.info(f"[{job_id}] Audio completed for {segment_name}: {generated_audio_path}")
+                    active_jobs_ref[job_id].append(f"[{datetime.now().isoformat()}] Audio completed for {segment_name}.")
                 else:
-                     raise ValueError("find_and_download_videos returned no paths.")
+                    raise ValueError("text_to_speech failed or returned invalid path")
             except Exception as e:
-                error_msg = f"Pexels video download failed for {segment_name}: {e}"
+                error_msg = f"Audio generation failed for {segment_name}: {e}"
                 logger.error(f"[{job_id}] {error_msg}")
-                segment_state["visual_status"] = "failed"
+                segment_state["audio_status"] = "failed"
                 segment_state["error"] = error_msg
                 active_jobs_ref[job_id].append(f"[{datetime.now().isoformat()}] Error: {error_msg}")
+                # Optionally: Mark overall job as failed or try to continue without this segment's audio?
+
+            # Upload HeyGen audio in the background while the next segments' audio is generated
+            if segment_name in heygen_target_segments and segment_state["audio_status"] == "completed" and upload_manager:
+                s3_key = f"{job_id}/{segment_name}/audio.mp3" # Define S3 key structure
+                # Re-runs of the same segment skip the upload when the object's content hash already matches.
+                audio_uploads[segment_name] = (s3_key, upload_manager.submit_file(segment_state["audio_path"], s3_key))
+            visual_segments.append(segment_name)
+
+        # Start visuals once every segment's audio is generated and its upload queued
+        for segment_name in visual_segments:
+            if job_is_cancelled(job_id):
+                # Stop before paying for the next segment's avatar render
+                logger.info(f"[{job_id}] Job was cancelled; not starting segment '{segment_name}' or any after it.")
+                active_jobs_ref[job_id].append(f"[{datetime.now().isoformat()}] Cancelled; remaining segments were not started.")
+                return
+            segment_state = job_data_ref[job_id]["assets"]["segments"][segment_name]
+            voiceover_text = script_segments[segment_name].get("voiceover")
+            b_roll_keywords = script_segments[segment_name].get("b_roll_keywords", [])
+
+            # --- 3b. Initiate Visuals (HeyGen or Pexels) ---
+            audio_public_url = None # Initialize for HeyGen
+            if segment_name in heygen_target_segments:
+                # --- HeyGen ---
+                segment_state["type"] = "heygen"
+                segment_state["visual_status"] = "processing" # Heygen is async
+                avatar_id = VEST_AVATARS.get(segment_name, VEST_AVATARS["default"])
+                segment_state["heygen_avatar_id"] = avatar_id
+
+                # Use the audio uploaded to S3 if available
+                if segment_name in audio_uploads:
+                    s3_key, upload = audio_uploads[segment_name]
+                    if upload.result():
+                        # Objects are uploaded without a public ACL; a signed URL lets HeyGen fetch the audio either way
+                        audio_public_url = upload_manager.presigned_url(s3_key)
+                    if not audio_public_url:
+                        logger.error(f"[{job_id}] Failed to upload audio {segment_state['audio_path']} to S3 for segment {segment_name}. Proceeding without custom audio.")
+                        # Reset audio status or mark error? Keep HeyGen going with its TTS for now.
+                    else:
+                        logger.info(f"[{job_id}] Audio for {segment_name} uploaded to S3: {audio_public_url}")
+                elif segment_state["audio_status"] != "completed":
+                    logger.warning(f"[{job_id}] Audio not completed for HeyGen segment {segment_name}. HeyGen will use its own TTS or fail if audio_url was intended.")
+                else: # S3 client or bucket name missing
+                    logger.warning(f"[{job_id}] S3 not configured. HeyGen will use its own TTS for segment {segment_name}.")
+
+                logger.info(f"[{job_id}] Initiating HeyGen video for segment: {segment_name} (Avatar: {avatar_id})")
+                active_jobs_ref[job_id].append(f"[{datetime.now().isoformat()}] Starting HeyGen video for {segment_name}...")
+                # Note: We need audio_url for HeyGen. For now, using text input.
+                # To use ElevenLabs audio: upload generated_audio_path to a public URL (e.g., S3)
+                # and pass that URL as voice_audio_url instead of voice_text.
+                # TODO: Implement audio upload and use voice_audio_url
+                # Example (pseudo-code):
+                # if segment_state["audio_status"] == "completed":
+                #    audio_public_url = upload_to_s3(segment_state["audio_path"])
+                # else:
+                #    audio_public_url = None # Or handle error
+                heygen_response = start_avatar_video_generation(
+                    api_key=HEYGEN_API_KEY,
+                    avatar_id=avatar_id,
+                    # Use a default background for now, could be dynamic later
+                    background_url="https://images.pexels.com/photos/265125/pexels-photo-265125.jpeg",
+                    webhook_url=webhook_url,
+                    callback_id=f"{job_id}__{segment_name}", # Include segment name in callback
+                    voice_text=voiceover_text, # Using HeyGen TTS for now
+                    voice_id=HEYGEN_JIN_VOICE_ID, # Specific HeyGen voice
+                    voice_audio_url=audio_public_url, # Pass S3 URL if available, otherwise None
+                    title=f"{job_id} - {segment_name}"
+                )
+                if heygen_response and heygen_response.get("data", {}).get("video_id"):
+                    segment_state["heygen_video_id"] = heygen_response["data"]["video_id"]
+                    logger.info(f"[{job_id}] HeyGen video started for {segment_name}. Video ID: {segment_state['heygen_video_id']}")
+                else:
+                    error_msg = f"Failed to start HeyGen video for {segment_name}. Response: {heygen_response}"
+                    logger.error(f"[{job_id}] {error_msg}")
+                    segment_state["visual_status"] = "failed"
+                    segment_state["error"] = error_msg
+                    active_jobs_ref[job_id].append(f"[{datetime.now().isoformat()}] Error: {error_msg}")
+            else:
+                # --- Pexels ---
+                segment_state["type"] = "pexels"
+                if not b_roll_keywords:
+                    logger.warning(f"[{job_id}] Segment '{segment_name}' is Pexels type but has no keywords. Skipping visuals.")
+                    segment_state["visual_status"] = "skipped"
+                    continue
+
+                query = " ".join(b_roll_keywords)
+                segment_state["pexels_query"] = query
+                logger.info(f"[{job_id}] Initiating Pexels search for segment: {segment_name} (Query: {query})")
+                active_jobs_ref[job_id].append(f"[{datetime.now().isoformat()}] Finding Pexels video for {segment_name}...")
+                # Note: find_and_download_videos is synchronous.
+                try:
+                    # Determine how many clips are needed based on audio duration (approx 5s/clip?)
+                    # Requires audio to be generated first - potential dependency issue if async
+                    # For now, just download 1 clip.
+                    num_clips = 1 # TODO: Calculate based on segment_data['timing'] or audio duration
+                    downloaded_paths = find_and_download_videos(
+                        api_key=PEXELS_API_KEY,
+                        query=query,
+                        count=num_clips,
+                        output_dir=pexels_output_dir,
+                        orientation="portrait" # Assuming vertical format
+                    )
+                    if downloaded_paths:
+                        segment_state["pexels_video_paths"] = downloaded_paths
+                        segment_state["visual_status"] = "completed"
+                        logger.info(f"[{job_id}] Pexels videos downloaded for {segment_name}: {downloaded_paths}")
+                        active_jobs_ref[job_id].append(f"[{datetime.now().isoformat()}] Pexels video downloaded for {segment_name}.")
+                    else:
+                         raise ValueError("find_and_download_videos returned no paths.")
+                except Exception as e:
+                    error_msg = f"Pexels video download failed for {segment_name}: {e}"
+                    logger.error(f"[{job_id}] {error_msg}")
+                    segment_state["visual_status"] = "failed"
+                    segment_state["error"] = error_msg
+                    active_jobs_ref[job_id].append(f"[{datetime.now().isoformat()}] Error: {error_msg}")
+    finally:
+        if upload_manager:
+            upload_manager.close()
 
     # --- 4. Initiate Music Download ---
     music_query = parsed_script.get("production_notes", {}).get("music_vibe")
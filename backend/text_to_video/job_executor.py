@@ -0,0 +1,252 @@
+import os
+import time
+import asyncio
+import inspect
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from backend.text_to_video.tracing import job_trace, trace_context
+from backend.text_to_video.metrics import REGISTRY
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- Executor Configuration ---
+JOB_RENDER_WORKERS = int(os.getenv("JOB_RENDER_WORKERS", str(max(1, (os.cpu_count() or 2) // 2)))) # MoviePy renders, one per core pair; 0 renders in the calling thread
+JOB_IO_WORKERS = int(os.getenv("JOB_IO_WORKERS", "8")) # Provider calls, TTS, polling
+JOB_MAX_QUEUE_DEPTH = int(os.getenv("JOB_MAX_QUEUE_DEPTH", "32")) # Queued + running jobs before new ones get 429
+JOB_RENDER_START_METHOD = os.getenv("JOB_RENDER_START_METHOD", "spawn") # Forking a threaded server is unsafe
+DEFAULT_JOB_SECONDS_ESTIMATE = 60.0 # Retry-After basis until some jobs have finished
+
+RENDER = "render" # CPU-bound work in the process pool; fn and args must be picklable
+IO = "io"         # Blocking I/O in the thread pool; may use closures and shared in-process state
+
+
+class JobQueueFullError(Exception):
+    """Raised by JobExecutor.submit when the queue depth limit is reached."""
+
+    def __init__(self, queue_depth: int, retry_after: int):
+        super().__init__(f"Job queue is full ({queue_depth} jobs queued or running). Retry in {retry_after}s.")
+        self.queue_depth = queue_depth
+        self.retry_after = retry_after
+
+
+def _run_job(fn: Callable, args: tuple, kwargs: dict, trace: Optional[tuple] = None) -> Any:
+    """
+    Runs fn in a worker; coroutine functions (blocking code behind async def) get their own event loop.
+    trace is (job_id, parent span id): the work is traced as part of that job (see tracing.job_trace).
+    """
+    job_id, parent_id = trace or (None, None)
+    with job_trace(job_id, getattr(fn, "__name__", "job"), parent_id=parent_id):
+        if inspect.iscoroutinefunction(fn):
+            return asyncio.run(fn(*args, **kwargs))
+        return fn(*args, **kwargs)
+
+
+_render_metrics_queue = None # Set in render processes: where their metric changes go back to the API process
+
+
+def _init_render_process(metrics_queue) -> None:
+    global _render_metrics_queue
+    _render_metrics_queue = metrics_queue
+
+
+def _run_render_job(fn: Callable, args: tuple, kwargs: dict, trace: Optional[tuple] = None) -> Any:
+    """
+    _run_job in a render process. What the job recorded in this process's metrics (stage timings, encode
+    figures, downloads) is sent back before the result, so the parent's /metrics includes it.
+    """
+    before = REGISTRY.state()
+    try:
+        return _run_job(fn, args, kwargs, trace)
+    finally:
+        changes = REGISTRY.changes_since(before)
+        if changes and _render_metrics_queue is not None:
+            _render_metrics_queue.put(changes) # A pool process runs one job at a time, so these are this job's alone
+
+
+class JobExecutor:
+    """
+    Bounded execution layer that keeps blocking job work off the API's event loop.
+
+    Rendering runs in a process pool (so MoviePy encodes neither hold the GIL nor stall request handling),
+    blocking I/O in a thread pool. Admission is bounded by max_queue_depth across both pools: beyond it
+    submit raises JobQueueFullError with a retry hint derived from recent job durations.
+
+    Cancellation is per job: queued work is dropped before it starts. Running work is not interrupted;
+    jobs stop themselves at their next stage boundary by checking the job store (job_store.raise_if_cancelled),
+    which works the same in render processes and queue workers.
+    """
+
+    def __init__(self, render_workers: int = JOB_RENDER_WORKERS, io_workers: int = JOB_IO_WORKERS,
+                 max_queue_depth: int = JOB_MAX_QUEUE_DEPTH, render_start_method: str = JOB_RENDER_START_METHOD):
+        self.render_workers = render_workers
+        self.io_workers = io_workers
+        self.max_queue_depth = max_queue_depth
+        # Without render workers (queue worker processes, which are already isolated) renders run in the IO pool
+        self._render_pool = None
+        self._render_metrics = None
+        self._render_metrics_lock = threading.Lock()
+        if render_workers > 0:
+            mp_context = multiprocessing.get_context(render_start_method)
+            self._render_metrics = mp_context.SimpleQueue()
+            self._render_pool = ProcessPoolExecutor(max_workers=render_workers, mp_context=mp_context,
+                                                    initializer=_init_render_process, initargs=(self._render_metrics,))
+            REGISTRY.add_source(self.collect_render_metrics)
+        self._io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="job_io")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, list] = {}            # job_id -> futures not yet done
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self._running = {RENDER: 0, IO: 0}
+        self._recent_durations: list = []
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "cancelled": 0, "rejected": 0}
+
+    def job_ids(self) -> list[str]:
+        """Jobs with work queued or running here (for job heartbeats)."""
+        with self._lock:
+            return list(self._jobs)
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return sum(len(futures) for futures in self._jobs.values())
+
+    def _retry_after(self, depth: int) -> int:
+        durations = self._recent_durations or [DEFAULT_JOB_SECONDS_ESTIMATE]
+        average = sum(durations) / len(durations)
+        return max(1, int(average * (depth - self.max_queue_depth + 1) / max(self.render_workers + self.io_workers, 1)))
+
+    def submit(self, job_id: str, fn: Callable, *args, kind: str = IO, **kwargs) -> Future:
+        """
+        Schedules fn(*args, **kwargs) for job_id on the pool for kind (RENDER or IO).
+
+        Raises:
+            JobQueueFullError: If max_queue_depth jobs are already queued or running.
+        """
+        with self._lock:
+            depth = sum(len(futures) for futures in self._jobs.values())
+            if depth >= self.max_queue_depth:
+                self.stats["rejected"] += 1
+                raise JobQueueFullError(depth, self._retry_after(depth))
+            cancel_event = self._cancel_events.setdefault(job_id, threading.Event())
+            cancel_event.clear()
+            submitted_at = time.monotonic()
+            trace = (job_id, None)
+            if kind == RENDER and self._render_pool is not None:
+                future = self._render_pool.submit(_run_render_job, fn, args, kwargs, trace)
+                future.add_done_callback(lambda f: self.collect_render_metrics())
+            else:
+                future = self._io_pool.submit(self._run_io_job, kind, fn, args, kwargs, trace)
+            self._jobs.setdefault(job_id, []).append(future)
+            self.stats["submitted"] += 1
+        future.add_done_callback(lambda f: self._job_done(job_id, f, submitted_at))
+        logger.info(f"[{job_id}] Submitted {getattr(fn, '__name__', fn)} ({kind}); queue depth {depth + 1}/{self.max_queue_depth}.")
+        return future
+
+    def _run_io_job(self, kind: str, fn: Callable, args: tuple, kwargs: dict, trace: Optional[tuple] = None) -> Any:
+        with self._lock:
+            self._running[kind] += 1
+        try:
+            return _run_job(fn, args, kwargs, trace)
+        finally:
+            with self._lock:
+                self._running[kind] -= 1
+
+    def collect_render_metrics(self) -> None:
+        """Merges the metric changes finished renders sent back into this process's registry."""
+        if self._render_metrics is None:
+            return
+        with self._render_metrics_lock:
+            while not self._render_metrics.empty():
+                REGISTRY.merge(self._render_metrics.get())
+
+    def _job_done(self, job_id: str, future: Future, submitted_at: float) -> None:
+        with self._lock:
+            futures = self._jobs.get(job_id, [])
+            if future in futures:
+                futures.remove(future)
+            if not futures:
+                self._jobs.pop(job_id, None)
+                if not self._cancel_events.get(job_id, threading.Event()).is_set():
+                    self._cancel_events.pop(job_id, None)
+            if future.cancelled() or self._cancel_events.get(job_id, threading.Event()).is_set():
+                self.stats["cancelled"] += 1
+            elif future.exception() is not None:
+                self.stats["failed"] += 1
+            else:
+                self.stats["completed"] += 1
+                self._recent_durations = (self._recent_durations + [time.monotonic() - submitted_at])[-50:]
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancels a job's queued work and marks the job cancelled here (see is_cancelled). Returns False if the
+        job has nothing pending.
+        """
+        with self._lock:
+            futures = list(self._jobs.get(job_id, []))
+            if not futures:
+                return False
+            self._cancel_events.setdefault(job_id, threading.Event()).set()
+        dropped = sum(1 for future in futures if future.cancel())
+        logger.info(f"[{job_id}] Cancellation requested: {dropped} queued task(s) dropped, {len(futures) - dropped} running task(s) stop at their next stage.")
+        return True
+
+    def is_cancelled(self, job_id: str) -> bool:
+        """True once cancel(job_id) was called (until new work is submitted for the job)."""
+        event = self._cancel_events.get(job_id)
+        return bool(event and event.is_set())
+
+    def run_render(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Runs the CPU-bound part of an already admitted job in the process pool and waits for the result.
+
+        Meant to be called from IO jobs, which keep their shared in-process state while MoviePy encodes
+        happen in another process. Not subject to the queue depth limit (the calling job was admitted).
+        Runs in the calling thread when the executor has no render workers.
+        """
+        if self._render_pool is None:
+            return _run_job(fn, args, kwargs, trace_context())
+        try:
+            return self._render_pool.submit(_run_render_job, fn, args, kwargs, trace_context()).result() # The render is traced in the calling job
+        finally:
+            self.collect_render_metrics()
+
+    async def run(self, job_id: str, fn: Callable, *args, kind: str = IO, **kwargs) -> Any:
+        """Submits a job and awaits its result without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(job_id, fn, *args, kind=kind, **kwargs))
+
+    def snapshot(self) -> dict:
+        """Executor state for /health."""
+        with self._lock:
+            return {
+                "render_workers": self.render_workers,
+                "io_workers": self.io_workers,
+                "queue_depth": sum(len(futures) for futures in self._jobs.values()),
+                "max_queue_depth": self.max_queue_depth,
+                "running_io": self._running[IO],
+                "jobs": len(self._jobs),
+                **self.stats,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._io_pool.shutdown(wait=wait, cancel_futures=not wait)
+        if self._render_pool is not None:
+            self._render_pool.shutdown(wait=wait, cancel_futures=not wait)
+            self.collect_render_metrics()
+            REGISTRY.remove_source(self.collect_render_metrics)
+
+
+_job_executor: Optional[JobExecutor] = None
+_job_executor_lock = threading.Lock()
+
+
+def get_job_executor() -> JobExecutor:
+    """Returns the process-wide job executor configured from the environment (JOB_* variables)."""
+    global _job_executor
+    with _job_executor_lock:
+        if _job_executor is None:
+            _job_executor = JobExecutor()
+        return _job_executor
@@ -0,0 +1,273 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+from backend.text_to_video.job_executor import JobQueueFullError, JOB_MAX_QUEUE_DEPTH, DEFAULT_JOB_SECONDS_ESTIMATE
+from backend.text_to_video.job_store import DEFAULT_JOB_STORE_PATH
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- Queue Configuration ---
+JOB_QUEUE_VISIBILITY_TIMEOUT = float(os.getenv("JOB_QUEUE_VISIBILITY_TIMEOUT", "60")) # A lease not renewed for this long is reclaimed
+JOB_QUEUE_MAX_ATTEMPTS = int(os.getenv("JOB_QUEUE_MAX_ATTEMPTS", "3")) # Deliveries before a task is failed for good
+JOB_QUEUE_RETRY_DELAY = float(os.getenv("JOB_QUEUE_RETRY_DELAY", "10")) # Seconds before a failed task is offered again
+
+QUEUED, LEASED, DONE, FAILED, CANCELLED = "queued", "leased", "done", "failed", "cancelled"
+
+
+@dataclass
+class QueuedTask:
+    """A task leased to a worker."""
+    task_id: int
+    job_id: str
+    task_name: str
+    args: list
+    attempts: int
+    max_attempts: int
+
+
+class SQLiteJobQueue:
+    """
+    Durable local task queue in SQLite (WAL), shared by API processes (which enqueue) and worker processes
+    (which claim).
+
+    claim() leases the oldest available task to a worker for visibility_timeout seconds; the worker
+    renews the lease with heartbeat() while it runs and ends it with complete() or fail(). A lease that
+    expires (worker crashed or hung) makes the task available again, up to max_attempts deliveries, so a
+    task runs at least once; tasks must tolerate a re-run (the job store keeps their progress). Task
+    arguments are JSON, so tasks are referenced by name and resolved by the worker.
+    """
+
+    def __init__(self, db_path: str | Path = DEFAULT_JOB_STORE_PATH, max_queue_depth: int = JOB_MAX_QUEUE_DEPTH):
+        self.db_path = Path(db_path)
+        self.max_queue_depth = max_queue_depth
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_db(self) -> None:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._open()
+        try:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS job_queue (
+                    task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT NOT NULL,
+                    task_name TEXT NOT NULL,
+                    args TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    lease_owner TEXT,
+                    lease_expires_at REAL,
+                    available_at REAL NOT NULL,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_job_queue_available ON job_queue(status, available_at);
+                CREATE INDEX IF NOT EXISTS idx_job_queue_lease ON job_queue(status, lease_expires_at);
+                CREATE INDEX IF NOT EXISTS idx_job_queue_job ON job_queue(job_id);
+            """)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self._init_db()
+                    self._initialized = True
+        return self._open()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _reader(self) -> Iterator[sqlite3.Connection]:
+        """Read-only (deferred) transaction: one consistent WAL snapshot that never waits for writers."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN")
+            try:
+                yield conn
+            finally:
+                conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _depth(conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT COUNT(*) FROM job_queue WHERE status IN (?, ?)", (QUEUED, LEASED)).fetchone()[0]
+
+    def _retry_after(self, conn: sqlite3.Connection, depth: int) -> int:
+        row = conn.execute(
+            "SELECT AVG(finished_at - started_at), COUNT(DISTINCT lease_owner) FROM "
+            "(SELECT finished_at, started_at, lease_owner FROM job_queue WHERE status = ? ORDER BY finished_at DESC LIMIT 50)",
+            (DONE,),
+        ).fetchone()
+        average, workers = (row[0] or DEFAULT_JOB_SECONDS_ESTIMATE), max(row[1] or 1, 1)
+        return max(1, int(average * (depth - self.max_queue_depth + 1) / workers))
+
+    def enqueue(self, job_id: str, task_name: str, args: list | tuple = (), max_attempts: int = JOB_QUEUE_MAX_ATTEMPTS) -> int:
+        """
+        Adds a task for job_id and returns its task id.
+
+        Raises:
+            JobQueueFullError: If max_queue_depth tasks are already queued or leased.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            depth = self._depth(conn)
+            if depth >= self.max_queue_depth:
+                raise JobQueueFullError(depth, self._retry_after(conn, depth))
+            cursor = conn.execute(
+                "INSERT INTO job_queue (job_id, task_name, args, status, max_attempts, available_at, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, task_name, json.dumps(list(args)), QUEUED, max_attempts, now, now),
+            )
+            task_id = cursor.lastrowid
+        logger.info(f"[{job_id}] Enqueued {task_name} as task {task_id}; queue depth {depth + 1}/{self.max_queue_depth}.")
+        return task_id
+
+    def claim(self, worker_id: str, visibility_timeout: float = JOB_QUEUE_VISIBILITY_TIMEOUT) -> Optional[QueuedTask]:
+        """Leases the oldest available task (queued, or with an expired lease) to worker_id, or returns None."""
+        now = time.time()
+        with self._transaction() as conn:
+            # Expired leases out of attempts are failed instead of redelivered
+            conn.execute(
+                "UPDATE job_queue SET status = ?, error = COALESCE(error, 'lease expired'), finished_at = ? "
+                "WHERE status = ? AND lease_expires_at < ? AND attempts >= max_attempts",
+                (FAILED, now, LEASED, now),
+            )
+            row = conn.execute(
+                "SELECT task_id, job_id, task_name, args, attempts, max_attempts FROM job_queue "
+                "WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires_at < ?) "
+                "ORDER BY available_at, task_id LIMIT 1",
+                (QUEUED, now, LEASED, now),
+            ).fetchone()
+            if not row:
+                return None
+            task_id, job_id, task_name, args, attempts, max_attempts = row
+            conn.execute(
+                "UPDATE job_queue SET status = ?, lease_owner = ?, lease_expires_at = ?, attempts = attempts + 1, started_at = ? WHERE task_id = ?",
+                (LEASED, worker_id, now + visibility_timeout, now, task_id),
+            )
+        if attempts:
+            logger.warning(f"[{job_id}] Redelivering task {task_id} ({task_name}) to {worker_id}, attempt {attempts + 1}/{max_attempts}.")
+        return QueuedTask(task_id, job_id, task_name, json.loads(args), attempts + 1, max_attempts)
+
+    def heartbeat(self, task_id: int, worker_id: str, visibility_timeout: float = JOB_QUEUE_VISIBILITY_TIMEOUT) -> bool:
+        """Extends a lease. Returns False if worker_id no longer holds it (expired and reclaimed, or the job was cancelled)."""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE job_queue SET lease_expires_at = ? WHERE task_id = ? AND status = ? AND lease_owner = ?",
+                (time.time() + visibility_timeout, task_id, LEASED, worker_id),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, task_id: int, worker_id: str) -> bool:
+        """Marks a leased task done. Returns False if the lease was lost in the meantime."""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE job_queue SET status = ?, finished_at = ?, lease_expires_at = NULL WHERE task_id = ? AND status = ? AND lease_owner = ?",
+                (DONE, time.time(), task_id, LEASED, worker_id),
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, task_id: int, worker_id: str, error: str, retry_delay: float = JOB_QUEUE_RETRY_DELAY) -> bool:
+        """
+        Records a failed attempt: the task is queued again after retry_delay, or failed for good once it is
+        out of attempts. Returns True if it will be retried.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT attempts, max_attempts FROM job_queue WHERE task_id = ? AND status = ? AND lease_owner = ?", (task_id, LEASED, worker_id)).fetchone()
+            if not row:
+                return False
+            retry = row[0] < row[1]
+            conn.execute(
+                "UPDATE job_queue SET status = ?, error = ?, available_at = ?, lease_owner = NULL, lease_expires_at = NULL, finished_at = ? WHERE task_id = ?",
+                (QUEUED if retry else FAILED, error[:2000], now + retry_delay, None if retry else now, task_id),
+            )
+            return retry
+
+    def cancel_job(self, job_id: str) -> int:
+        """
+        Cancels a job's queued and running tasks. Returns how many.
+
+        A running task's worker notices at its next heartbeat and drops the result; the task itself stops
+        at its next stage boundary once the job is also marked cancelled in the job store (job_store.raise_if_cancelled).
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE job_queue SET status = ?, finished_at = ? WHERE job_id = ? AND status IN (?, ?)",
+                (CANCELLED, time.time(), job_id, QUEUED, LEASED),
+            )
+            return cursor.rowcount
+
+    def is_cancelled(self, task_id: int) -> bool:
+        with self._reader() as conn:
+            row = conn.execute("SELECT status FROM job_queue WHERE task_id = ?", (task_id,)).fetchone()
+        return bool(row and row[0] == CANCELLED)
+
+    def queue_depth(self) -> int:
+        with self._reader() as conn:
+            return self._depth(conn)
+
+    def snapshot(self) -> dict:
+        """Queue state for /health: tasks per status and live workers (holding an unexpired lease)."""
+        now = time.time()
+        with self._reader() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM job_queue GROUP BY status").fetchall())
+            workers = conn.execute("SELECT COUNT(DISTINCT lease_owner) FROM job_queue WHERE status = ? AND lease_expires_at >= ?", (LEASED, now)).fetchone()[0]
+        return {
+            "queue_depth": counts.get(QUEUED, 0) + counts.get(LEASED, 0),
+            "max_queue_depth": self.max_queue_depth,
+            "busy_workers": workers,
+            **{status: counts.get(status, 0) for status in (QUEUED, LEASED, DONE, FAILED, CANCELLED)},
+        }
+
+
+_default_queue: Optional[SQLiteJobQueue] = None
+_default_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> SQLiteJobQueue:
+    """
+    Returns the process-wide durable job queue configured from the environment.
+
+    Environment:
+        JOB_STORE_PATH: SQLite database file; the queue shares it with the job store.
+        JOB_MAX_QUEUE_DEPTH: Queued + running tasks before enqueue raises JobQueueFullError.
+    """
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = SQLiteJobQueue(os.getenv("JOB_STORE_PATH", str(DEFAULT_JOB_STORE_PATH)))
+        return _default_queue
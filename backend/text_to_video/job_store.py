@@ -0,0 +1,949 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from collections.abc import MutableMapping, MutableSequence, Sequence
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- Store Configuration ---
+DEFAULT_JOB_STORE_PATH = Path(__file__).resolve().parent.parent / "data" / "jobs.sqlite3"
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15")) # How often a process refreshes the heartbeat of the jobs it runs
+JOB_HEARTBEAT_STALE_SECONDS = float(os.getenv("JOB_HEARTBEAT_STALE_SECONDS", "60")) # A job whose heartbeat is older may be resumed elsewhere
+WEBHOOK_EVENT_RETENTION_SECONDS = float(os.getenv("WEBHOOK_EVENT_RETENTION_SECONDS", str(7 * 24 * 3600))) # How long replayed deliveries get the cached response
+WEBHOOK_EVENT_CLAIM_SECONDS = float(os.getenv("WEBHOOK_EVENT_CLAIM_SECONDS", "300")) # A delivery still unanswered after this is taken over by a redelivery
+
+# Statuses after which a job needs no more work from the server
+TERMINAL_STATUSES = ("completed", "completed_no_captions", "failed", "assembly_failed", "captioning_failed", "cancelled", "interrupted")
+# Statuses in which a provider job's assembly was already started (or can no longer start)
+ASSEMBLY_STARTED_STATUSES = ("assembling", "assembly_complete", "captioning") + TERMINAL_STATUSES
+# Provider workflow statuses and the stage they imply is done
+STATUS_STAGES = {
+    "assembly_complete": "assembly",
+    "captioning": "assembly",
+    "captioning_failed": "assembly",
+    "completed_no_captions": "assembly",
+    "completed": "captioning",
+}
+# Segment keys holding an avatar provider's video id, indexed for webhook lookups
+EXTERNAL_VIDEO_ID_KEYS = {"heygen_video_id": "heygen", "argil_video_id": "argil"}
+# Identifies this process as the owner of the jobs it runs (pids are reused across container restarts)
+PROCESS_OWNER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _plain(value: Any) -> Any:
+    """JSON round trip: what a value looks like after it was stored (tuples become lists, views become dicts)."""
+    if isinstance(value, (TrackedDict, TrackedList)):
+        value = value.to_plain()
+    return json.loads(json.dumps(value, default=str))
+
+
+def _json_path(path: tuple) -> str:
+    """SQLite JSON path of a data path, e.g. ("assets", "segments", "hook") -> '$."assets"."segments"."hook"'."""
+    parts = ["$"]
+    for key in path:
+        if isinstance(key, int):
+            parts.append(f"[{key}]")
+        else:
+            parts.append('."' + str(key).replace('"', '\\"') + '"')
+    return "".join(parts)
+
+
+def derive_progress(data: dict) -> tuple[str, Optional[str]]:
+    """
+    Returns (status, last completed stage) of a job's data.
+
+    Stepwise API jobs carry per-step statuses in data["steps"]; provider workflows (HeyGen/Argil) carry
+    data["status"]. An explicit data["status"] always wins (e.g. a cancelled stepwise job).
+    """
+    steps = data.get("steps")
+    if isinstance(steps, dict) and "status" not in data:
+        statuses = list(steps.values())
+        if "failed" in statuses:
+            status = "failed"
+        elif statuses and all(s == "completed" for s in statuses):
+            status = "completed"
+        elif "processing" in statuses:
+            status = "processing"
+        else:
+            status = "pending"
+        completed = [step for step, s in steps.items() if s == "completed"]
+        return status, (completed[-1] if completed else None)
+    status = data.get("status") or "pending"
+    return status, STATUS_STAGES.get(status)
+
+
+class SQLiteJobStore:
+    """
+    Persistence for API jobs (state, stage, outputs, webhook correlation ids and logs) in a SQLite
+    database in WAL mode, shared by every worker process on the host.
+
+    A job is created by its first log line or data write. Its data is a JSON document (the job_data entry
+    the workflows build up), written field by field in place (SQLite JSON functions) so concurrent
+    writers of different fields, or appenders to the same list, do not lose each other's updates.
+
+    jobs is keyed by job_id, with status and last completed stage kept as columns (derived from the data
+    on every write) so unfinished jobs can be found with an index scan after a restart. job_logs is an
+    append-only log per job, ordered by seq. job_external_ids maps provider video ids back to
+    (job_id, segment), for webhooks that arrive without a usable callback id. webhook_events records each
+    provider webhook delivery and the response it got, so redeliveries are answered without reprocessing.
+    video_events holds the render results webhooks reported, until a poller in any process takes them.
+    request_digests maps the digest of a video request to the job that renders it, so identical requests
+    share one job.
+
+    Listeners added with add_listener are called with the job_id after each committed change to a job in
+    this process (from the writing thread); they are hints, the store stays the source of truth.
+    """
+
+    def __init__(self, db_path: str | Path = DEFAULT_JOB_STORE_PATH):
+        self.db_path = Path(db_path)
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        self._listeners: list[Callable[[str], None]] = []
+
+    def add_listener(self, listener: Callable[[str], None]) -> None:
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[str], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, job_id: str) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(job_id)
+            except Exception as e:
+                logger.warning(f"[{job_id}] Job store listener failed: {e}")
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self._init_db()
+                    self._initialized = True
+        return self._open()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL") # Durable across process crashes; WAL keeps commits cheap
+        return conn
+
+    def _init_db(self) -> None:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._open()
+        try:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    workflow_type TEXT,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    stage TEXT,
+                    data TEXT,
+                    result_path TEXT,
+                    owner TEXT,
+                    heartbeat_at REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+                CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs(updated_at);
+                CREATE TABLE IF NOT EXISTS job_logs (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_job_logs_job ON job_logs(job_id, seq);
+                CREATE TABLE IF NOT EXISTS job_external_ids (
+                    provider TEXT NOT NULL,
+                    external_id TEXT NOT NULL,
+                    job_id TEXT NOT NULL,
+                    segment TEXT,
+                    PRIMARY KEY (provider, external_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_job_external_ids_external ON job_external_ids(external_id);
+                CREATE INDEX IF NOT EXISTS idx_job_external_ids_job ON job_external_ids(job_id);
+                CREATE TABLE IF NOT EXISTS webhook_events (
+                    provider TEXT NOT NULL,
+                    video_id TEXT NOT NULL,
+                    event TEXT NOT NULL,
+                    status_code INTEGER,
+                    response TEXT,
+                    received_at REAL NOT NULL,
+                    PRIMARY KEY (provider, video_id, event)
+                );
+                CREATE INDEX IF NOT EXISTS idx_webhook_events_received ON webhook_events(received_at);
+                CREATE TABLE IF NOT EXISTS video_events (
+                    provider TEXT NOT NULL,
+                    video_id TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    video_url TEXT,
+                    received_at REAL NOT NULL,
+                    PRIMARY KEY (provider, video_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_video_events_received ON video_events(received_at);
+                CREATE TABLE IF NOT EXISTS request_digests (
+                    digest TEXT PRIMARY KEY,
+                    job_id TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_request_digests_created ON request_digests(created_at);
+            """)
+            # Databases created before job ownership was tracked
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in (("owner", "TEXT"), ("heartbeat_at", "REAL")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction that takes the database lock up front, so read-modify-write cycles are atomic."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _reader(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _ensure_job(conn: sqlite3.Connection, job_id: str) -> None:
+        now = time.time()
+        conn.execute("INSERT OR IGNORE INTO jobs (job_id, created_at, updated_at) VALUES (?, ?, ?)", (job_id, now, now))
+
+    @staticmethod
+    def _load_data(conn: sqlite3.Connection, job_id: str) -> Optional[dict]:
+        row = conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    @staticmethod
+    def _write_data(conn: sqlite3.Connection, job_id: str, data: Optional[dict]) -> None:
+        if data is None:
+            conn.execute("UPDATE jobs SET data = NULL, updated_at = ? WHERE job_id = ?", (time.time(), job_id))
+            return
+        status, stage = derive_progress(data)
+        conn.execute(
+            "UPDATE jobs SET data = ?, workflow_type = ?, status = ?, stage = COALESCE(?, stage), updated_at = ? WHERE job_id = ?",
+            (json.dumps(data), data.get("workflow_type"), status, stage, time.time(), job_id),
+        )
+        SQLiteJobStore._index_external_ids(conn, job_id, (data.get("assets") or {}).get("segments"))
+
+    @staticmethod
+    def _index_external_ids(conn: sqlite3.Connection, job_id: str, segments: Optional[dict]) -> None:
+        for segment, segment_state in (segments if isinstance(segments, dict) else {}).items():
+            for key, provider in EXTERNAL_VIDEO_ID_KEYS.items():
+                external_id = segment_state.get(key) if isinstance(segment_state, dict) else None
+                if external_id:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO job_external_ids (provider, external_id, job_id, segment) VALUES (?, ?, ?, ?)",
+                        (provider, str(external_id), job_id, segment),
+                    )
+
+    @staticmethod
+    def _update_path(conn: sqlite3.Connection, job_id: str, path: tuple, expression: str, *params) -> None:
+        """
+        Rewrites data with a JSON function applied in SQL (json_set(data, ...) and the like), so the
+        document is changed in place rather than read, modified and written back by this process. Keeps
+        the columns derived from the data (status, stage, external ids) in sync with what changed.
+        """
+        conn.execute(f"UPDATE jobs SET data = {expression}, updated_at = ? WHERE job_id = ?", (*params, time.time(), job_id))
+        if path[0] in ("status", "steps", "workflow_type"):
+            status, steps, workflow_type = conn.execute(
+                "SELECT json_extract(data, '$.status'), json_extract(data, '$.steps'), json_extract(data, '$.workflow_type') FROM jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+            progress = {"workflow_type": workflow_type}
+            if status is not None:
+                progress["status"] = status
+            if steps is not None:
+                progress["steps"] = json.loads(steps)
+            status, stage = derive_progress(progress)
+            conn.execute(
+                "UPDATE jobs SET workflow_type = ?, status = ?, stage = COALESCE(?, stage) WHERE job_id = ?",
+                (workflow_type, status, stage, job_id),
+            )
+        elif path[0] == "assets" and (len(path) < 4 or path[3] in EXTERNAL_VIDEO_ID_KEYS):
+            segments = conn.execute("SELECT json_extract(data, '$.assets.segments') FROM jobs WHERE job_id = ?", (job_id,)).fetchone()[0]
+            SQLiteJobStore._index_external_ids(conn, job_id, json.loads(segments) if segments else None)
+
+    @staticmethod
+    def _check_path(conn: sqlite3.Connection, job_id: str, path: tuple) -> None:
+        """Raises KeyError unless the job has data and path (an existing container) exists in it."""
+        row = conn.execute("SELECT json_type(data, ?) FROM jobs WHERE job_id = ? AND data IS NOT NULL", (_json_path(path), job_id)).fetchone()
+        if not row or row[0] is None:
+            raise KeyError(path[-1] if path else job_id)
+
+    def create_job(self, job_id: str) -> None:
+        with self._transaction() as conn:
+            self._ensure_job(conn, job_id)
+
+    def job_exists(self, job_id: str) -> bool:
+        with self._reader() as conn:
+            return conn.execute("SELECT 1 FROM jobs WHERE job_id = ?", (job_id,)).fetchone() is not None
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        """The job's row: job_id, workflow_type, status, stage, data, result_path, created_at, updated_at."""
+        with self._reader() as conn:
+            row = conn.execute(
+                "SELECT job_id, workflow_type, status, stage, data, result_path, created_at, updated_at FROM jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        if not row:
+            return None
+        job = dict(zip(("job_id", "workflow_type", "status", "stage", "data", "result_path", "created_at", "updated_at"), row))
+        job["data"] = json.loads(job["data"]) if job["data"] is not None else None
+        return job
+
+    def get_data(self, job_id: str) -> Optional[dict]:
+        with self._reader() as conn:
+            return self._load_data(conn, job_id)
+
+    def put_data(self, job_id: str, data: Optional[dict]) -> None:
+        with self._transaction() as conn:
+            self._ensure_job(conn, job_id)
+            self._write_data(conn, job_id, _plain(data) if data is not None else None)
+        self._notify(job_id)
+
+    def set_data_path(self, job_id: str, path: tuple, value: Any) -> None:
+        """
+        Sets data[path[0]][path[1]]...[path[-1]] = value atomically, with json_set in SQL.
+
+        Raises:
+            KeyError: If the job has no data or an intermediate key is missing.
+        """
+        with self._transaction() as conn:
+            self._check_path(conn, job_id, path[:-1])
+            self._update_path(conn, job_id, path, "json_set(data, ?, json(?))", _json_path(path), json.dumps(_plain(value)))
+        self._notify(job_id)
+
+    def delete_data_path(self, job_id: str, path: tuple) -> None:
+        with self._transaction() as conn:
+            self._check_path(conn, job_id, path)
+            self._update_path(conn, job_id, path, "json_remove(data, ?)", _json_path(path))
+        self._notify(job_id)
+
+    def insert_data_path(self, job_id: str, path: tuple, index: Optional[int], value: Any) -> None:
+        """
+        Inserts value into the list at path before index, or appends it when index is None. An append
+        is a single json_insert, so concurrent appends to the same list from several writers all land.
+
+        Raises:
+            KeyError: If the job has no data or the list is missing.
+        """
+        value = _plain(value)
+        with self._transaction() as conn:
+            self._check_path(conn, job_id, path)
+            if index is None:
+                self._update_path(conn, job_id, path, "json_insert(data, ?, json(?))", _json_path(path) + "[#]", json.dumps(value))
+            else:
+                current = conn.execute("SELECT json_extract(data, ?) FROM jobs WHERE job_id = ?", (_json_path(path), job_id)).fetchone()[0]
+                items = json.loads(current)
+                items.insert(index, value)
+                self._update_path(conn, job_id, path, "json_set(data, ?, json(?))", _json_path(path), json.dumps(items))
+        self._notify(job_id)
+
+    def set_status(self, job_id: str, status: str) -> None:
+        """Sets the status of a job without data (e.g. a streamed create_tiktok job)."""
+        with self._transaction() as conn:
+            self._ensure_job(conn, job_id)
+            conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ?", (status, time.time(), job_id))
+        self._notify(job_id)
+
+    def append_log(self, job_id: str, message: str) -> int:
+        """Appends a log line (creating the job if needed) and returns its sequence number."""
+        with self._transaction() as conn:
+            self._ensure_job(conn, job_id)
+            cursor = conn.execute("INSERT INTO job_logs (job_id, message, created_at) VALUES (?, ?, ?)", (job_id, str(message), time.time()))
+            seq = cursor.lastrowid
+        self._notify(job_id)
+        return seq
+
+    def get_logs(self, job_id: str, after_seq: int = 0) -> list[tuple[int, str]]:
+        """Log lines of a job as (seq, message), oldest first, optionally only those after after_seq."""
+        with self._reader() as conn:
+            return conn.execute("SELECT seq, message FROM job_logs WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, after_seq)).fetchall()
+
+    def get_state(self, job_id: str) -> Optional[tuple[str, Optional[str]]]:
+        """(status, result_path) of a job, or None if it does not exist; cheaper than get_job."""
+        with self._reader() as conn:
+            row = conn.execute("SELECT status, result_path FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def last_change(self) -> tuple[int, float]:
+        """
+        (last log seq, last job update time) across all jobs. Changes whenever any process writes a log line
+        or updates a job, so one cheap query tells a reader whether anything happened since its last look.
+        """
+        with self._reader() as conn:
+            row = conn.execute("SELECT (SELECT MAX(seq) FROM job_logs), (SELECT MAX(updated_at) FROM jobs)").fetchone()
+        return (row[0] or 0, row[1] or 0.0)
+
+    def count_by_status(self) -> dict[str, int]:
+        """Number of jobs per status (for metrics)."""
+        with self._reader() as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def clear_logs(self, job_id: str) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM job_logs WHERE job_id = ?", (job_id,))
+
+    def set_result(self, job_id: str, result_path: Optional[str]) -> None:
+        with self._transaction() as conn:
+            self._ensure_job(conn, job_id)
+            conn.execute("UPDATE jobs SET result_path = ?, updated_at = ? WHERE job_id = ?", (result_path, time.time(), job_id))
+        self._notify(job_id)
+
+    def get_result(self, job_id: str) -> Optional[str]:
+        with self._reader() as conn:
+            row = conn.execute("SELECT result_path FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def find_job_by_external_id(self, external_id: str, provider: Optional[str] = None) -> Optional[tuple[str, Optional[str]]]:
+        """Returns (job_id, segment) for a provider video id, or None if it was never recorded."""
+        query, params = "SELECT job_id, segment FROM job_external_ids WHERE external_id = ?", [str(external_id)]
+        if provider:
+            query, params = query + " AND provider = ?", params + [provider]
+        with self._reader() as conn:
+            row = conn.execute(query, params).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def list_job_ids(self) -> list[str]:
+        with self._reader() as conn:
+            return [row[0] for row in conn.execute("SELECT job_id FROM jobs ORDER BY created_at")]
+
+    def list_unfinished_jobs(self) -> list[dict]:
+        """Jobs not in a terminal status, oldest first (see get_job for the fields)."""
+        placeholders = ", ".join("?" for _ in TERMINAL_STATUSES)
+        with self._reader() as conn:
+            job_ids = [row[0] for row in conn.execute(f"SELECT job_id FROM jobs WHERE status NOT IN ({placeholders}) ORDER BY created_at", TERMINAL_STATUSES)]
+        return [job for job in (self.get_job(job_id) for job_id in job_ids) if job]
+
+    def heartbeat(self, job_ids: Iterable[str], owner: str = PROCESS_OWNER_ID) -> None:
+        """Records that owner (a live process) is running these jobs now; see JobHeartbeat."""
+        job_ids = list(job_ids)
+        if not job_ids:
+            return
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany("UPDATE jobs SET owner = ?, heartbeat_at = ? WHERE job_id = ?", [(owner, now, job_id) for job_id in job_ids])
+
+    def claim_for_resume(self, job_id: str, owner: str = PROCESS_OWNER_ID) -> bool:
+        """
+        Claims an unfinished job for resumption by owner. Returns False while the job's heartbeat is fresher
+        than JOB_HEARTBEAT_STALE_SECONDS: another live process runs it (or just claimed it), so workers
+        starting or restarting alongside it leave it alone.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET owner = ?, heartbeat_at = ? WHERE job_id = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+                (owner, now, job_id, now - JOB_HEARTBEAT_STALE_SECONDS),
+            )
+            return cursor.rowcount == 1
+
+    def transition_status(self, job_id: str, to_status: str, from_statuses: Optional[Sequence[str]] = None,
+                          unless: Sequence[str] = ()) -> Optional[str]:
+        """
+        Atomically sets the status in a job's data, if its current status is one of from_statuses (any, if
+        None) and not one of unless. Of several processes racing to make the same transition, exactly one
+        succeeds.
+
+        Returns:
+            The previous status if the job was transitioned, otherwise None (also for jobs without data).
+        """
+        with self._transaction() as conn:
+            data = self._load_data(conn, job_id)
+            if data is None:
+                return None
+            current, _ = derive_progress(data)
+            if current in unless or (from_statuses is not None and current not in from_statuses):
+                return None
+            data["status"] = to_status
+            self._write_data(conn, job_id, data)
+        self._notify(job_id)
+        return current
+
+    def claim_webhook_event(self, provider: str, video_id: str, event: str) -> Optional[tuple[Optional[int], Optional[dict]]]:
+        """
+        Claims the processing of a provider webhook delivery, keyed by (provider, video_id, event).
+
+        Returns:
+            None if this delivery is the first (or takes over one abandoned for WEBHOOK_EVENT_CLAIM_SECONDS)
+            and should be processed; otherwise (status_code, response) of the earlier delivery, both None
+            while it is still being processed.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM webhook_events WHERE received_at < ?", (now - WEBHOOK_EVENT_RETENTION_SECONDS,))
+            row = conn.execute(
+                "SELECT status_code, response, received_at FROM webhook_events WHERE provider = ? AND video_id = ? AND event = ?",
+                (provider, str(video_id), event),
+            ).fetchone()
+            if row and (row[0] is not None or row[2] >= now - WEBHOOK_EVENT_CLAIM_SECONDS):
+                return row[0], (json.loads(row[1]) if row[1] is not None else None)
+            conn.execute(
+                "INSERT OR REPLACE INTO webhook_events (provider, video_id, event, received_at) VALUES (?, ?, ?, ?)",
+                (provider, str(video_id), event, now),
+            )
+        return None
+
+    def complete_webhook_event(self, provider: str, video_id: str, event: str, status_code: int, response: dict) -> None:
+        """Records the response to a claimed delivery, which is replayed to later deliveries of the same event."""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE webhook_events SET status_code = ?, response = ? WHERE provider = ? AND video_id = ? AND event = ?",
+                (status_code, json.dumps(response, default=str), provider, str(video_id), event),
+            )
+
+    def release_webhook_event(self, provider: str, video_id: str, event: str) -> None:
+        """Drops the claim on a delivery that failed or was deferred, so the provider's retry is processed again."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM webhook_events WHERE provider = ? AND video_id = ? AND event = ?", (provider, str(video_id), event))
+
+    def record_video_event(self, provider: str, video_id: str, status: str, video_url: Optional[str] = None) -> None:
+        """Records a render result reported by a provider webhook, for take_video_events in any process."""
+        now = time.time()
+        with self._transaction() as conn:
+            # Results no poller asked for (renders tracked through job data instead) expire with the deliveries
+            conn.execute("DELETE FROM video_events WHERE received_at < ?", (now - WEBHOOK_EVENT_RETENTION_SECONDS,))
+            conn.execute(
+                "INSERT OR REPLACE INTO video_events (provider, video_id, status, video_url, received_at) VALUES (?, ?, ?, ?, ?)",
+                (provider, str(video_id), status, video_url, now),
+            )
+
+    def take_video_events(self, provider: str, video_ids: Iterable[str]) -> dict[str, dict]:
+        """
+        Removes and returns the recorded render results for any of video_ids.
+
+        Returns:
+            {video_id: {"status": ..., "video_url": ...}}, empty if none was recorded.
+        """
+        video_ids = [str(video_id) for video_id in video_ids]
+        if not video_ids:
+            return {}
+        placeholders = ", ".join("?" for _ in video_ids)
+        with self._reader() as conn: # Pollers check often and rarely find anything; only take the write lock when they do
+            rows = conn.execute(
+                f"SELECT video_id, status, video_url FROM video_events WHERE provider = ? AND video_id IN ({placeholders})",
+                (provider, *video_ids),
+            ).fetchall()
+        if not rows:
+            return {}
+        with self._transaction() as conn:
+            conn.execute(
+                f"DELETE FROM video_events WHERE provider = ? AND video_id IN ({', '.join('?' for _ in rows)})",
+                (provider, *(row[0] for row in rows)),
+            )
+        return {video_id: {"status": status, "video_url": video_url} for video_id, status, video_url in rows}
+
+    def claim_request(self, digest: str, job_id: str, result_ttl: float, inflight_timeout: float) -> tuple[str, bool]:
+        """
+        Singleflight for identical requests, keyed by a digest of everything that determines the result.
+
+        If the digest's job is still running (started less than inflight_timeout ago), or completed less
+        than result_ttl ago and its result file still exists, that job is returned to share. Otherwise
+        job_id is recorded for the digest and created with status "processing" in the same transaction,
+        so of concurrent identical requests (in any process) exactly one starts a job.
+
+        Returns:
+            (job_id to use, True if it is the new job the caller must start).
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM request_digests WHERE created_at < ?", (now - max(result_ttl, 0) - inflight_timeout,))
+            row = conn.execute(
+                "SELECT r.job_id, r.created_at, j.status, j.result_path, j.updated_at FROM request_digests r "
+                "LEFT JOIN jobs j ON j.job_id = r.job_id WHERE r.digest = ?",
+                (digest,),
+            ).fetchone()
+            if row and row[2] is not None:
+                existing_job_id, started_at, status, result_path, finished_at = row
+                if status not in TERMINAL_STATUSES and started_at >= now - inflight_timeout:
+                    return existing_job_id, False
+                if status == "completed" and result_path and finished_at >= now - result_ttl and os.path.exists(result_path):
+                    return existing_job_id, False
+            conn.execute("INSERT OR REPLACE INTO request_digests (digest, job_id, created_at) VALUES (?, ?, ?)", (digest, job_id, now))
+            self._ensure_job(conn, job_id)
+            conn.execute("UPDATE jobs SET status = 'processing', owner = ?, heartbeat_at = ?, updated_at = ? WHERE job_id = ?", (PROCESS_OWNER_ID, now, now, job_id))
+        self._notify(job_id)
+        return job_id, True
+
+    def delete_job(self, job_id: str) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM job_logs WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM job_external_ids WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM request_digests WHERE job_id = ?", (job_id,))
+        self._notify(job_id)
+
+    # Dict-shaped views used by the API and the provider workflows
+    def logs_view(self) -> "JobLogsView":
+        return JobLogsView(self)
+
+    def results_view(self) -> "JobResultsView":
+        return JobResultsView(self)
+
+    def data_view(self) -> "JobDataView":
+        return JobDataView(self)
+
+
+class TrackedDict(MutableMapping):
+    """
+    A dict inside a job's stored data. Reads come from the snapshot loaded with the job; every write is
+    applied to the snapshot and persisted at its path, so nested mutation like
+    job_data[job_id]["assets"]["segments"][name]["visual_status"] = "completed" is durable.
+
+    Pickles (and copy()s) as a plain dict, so records can be passed to render processes.
+    """
+
+    def __init__(self, store: SQLiteJobStore, job_id: str, path: tuple, data: dict):
+        self._store = store
+        self._job_id = job_id
+        self._path = path
+        self._data = data
+
+    def _wrap(self, key, value):
+        if isinstance(value, dict):
+            return TrackedDict(self._store, self._job_id, self._path + (key,), value)
+        if isinstance(value, list):
+            return TrackedList(self._store, self._job_id, self._path + (key,), value)
+        return value
+
+    def __getitem__(self, key):
+        return self._wrap(key, self._data[key])
+
+    def __setitem__(self, key, value):
+        value = _plain(value)
+        self._store.set_data_path(self._job_id, self._path + (key,), value)
+        self._data[key] = value
+
+    def __delitem__(self, key):
+        if key not in self._data:
+            raise KeyError(key)
+        self._store.delete_data_path(self._job_id, self._path + (key,))
+        del self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __repr__(self):
+        return repr(self._data)
+
+    def to_plain(self) -> dict:
+        return json.loads(json.dumps(self._data))
+
+    def copy(self) -> dict:
+        return self.to_plain()
+
+    def __reduce__(self):
+        return (dict, (self.to_plain(),))
+
+
+class TrackedList(MutableSequence):
+    """
+    A list inside a job's stored data. Appends and item writes are applied to the stored list in place
+    (not by writing back this snapshot), so they do not undo other writers' changes; slice assignments
+    persist the whole list.
+    """
+
+    def __init__(self, store: SQLiteJobStore, job_id: str, path: tuple, data: list):
+        self._store = store
+        self._job_id = job_id
+        self._path = path
+        self._data = data
+
+    def __getitem__(self, index):
+        value = self._data[index]
+        if isinstance(index, int) and isinstance(value, dict):
+            return TrackedDict(self._store, self._job_id, self._path + (index % len(self._data),), value)
+        return value
+
+    def _persist(self):
+        self._store.set_data_path(self._job_id, self._path, self._data)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            self._data[index] = _plain(value)
+            self._persist()
+            return
+        position = range(len(self._data))[index] # IndexError as for a list
+        value = _plain(value)
+        self._store.set_data_path(self._job_id, self._path + (position,), value)
+        self._data[position] = value
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            del self._data[index]
+            self._persist()
+            return
+        position = range(len(self._data))[index]
+        self._store.delete_data_path(self._job_id, self._path + (position,))
+        del self._data[position]
+
+    def insert(self, index, value):
+        position = min(max(index + len(self._data) if index < 0 else index, 0), len(self._data))
+        value = _plain(value)
+        # Appends go to the end of the stored list, which other writers may have extended meanwhile
+        self._store.insert_data_path(self._job_id, self._path, None if position == len(self._data) else position, value)
+        self._data.insert(position, value)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return repr(self._data)
+
+    def to_plain(self) -> list:
+        return json.loads(json.dumps(self._data))
+
+    def __reduce__(self):
+        return (list, (self.to_plain(),))
+
+
+class JobLog(Sequence):
+    """A job's log lines as a list-like view; append() persists a line."""
+
+    def __init__(self, store: SQLiteJobStore, job_id: str):
+        self._store = store
+        self._job_id = job_id
+
+    def _messages(self) -> list[str]:
+        return [message for _, message in self._store.get_logs(self._job_id)]
+
+    def __getitem__(self, index):
+        return self._messages()[index]
+
+    def __len__(self):
+        return len(self._messages())
+
+    def __iter__(self):
+        return iter(self._messages())
+
+    def append(self, message: str) -> None:
+        self._store.append_log(self._job_id, message)
+
+    def extend(self, messages) -> None:
+        for message in messages:
+            self.append(message)
+
+    def __repr__(self):
+        return repr(self._messages())
+
+
+class JobLogsView(MutableMapping):
+    """job_id -> JobLog; the shape of the former in-memory active_jobs dict."""
+
+    def __init__(self, store: SQLiteJobStore):
+        self._store = store
+
+    def __getitem__(self, job_id):
+        if not self._store.job_exists(job_id):
+            raise KeyError(job_id)
+        return JobLog(self._store, job_id)
+
+    def __setitem__(self, job_id, messages):
+        self._store.create_job(job_id)
+        self._store.clear_logs(job_id)
+        for message in messages:
+            self._store.append_log(job_id, message)
+
+    def __delitem__(self, job_id):
+        if not self._store.job_exists(job_id):
+            raise KeyError(job_id)
+        self._store.clear_logs(job_id)
+
+    def __contains__(self, job_id):
+        return self._store.job_exists(job_id)
+
+    def __iter__(self):
+        return iter(self._store.list_job_ids())
+
+    def __len__(self):
+        return len(self._store.list_job_ids())
+
+
+class JobResultsView(MutableMapping):
+    """job_id -> final video path, for jobs that have one; the shape of the former job_results dict."""
+
+    def __init__(self, store: SQLiteJobStore):
+        self._store = store
+
+    def __getitem__(self, job_id):
+        result = self._store.get_result(job_id)
+        if result is None:
+            raise KeyError(job_id)
+        return result
+
+    def __setitem__(self, job_id, result_path):
+        self._store.set_result(job_id, result_path)
+
+    def __delitem__(self, job_id):
+        self[job_id]
+        self._store.set_result(job_id, None)
+
+    def __contains__(self, job_id):
+        return self._store.get_result(job_id) is not None
+
+    def __iter__(self):
+        return (job_id for job_id in self._store.list_job_ids() if job_id in self)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class JobDataView(MutableMapping):
+    """job_id -> TrackedDict of the job's data, loaded fresh on each lookup; the shape of the former job_data dict."""
+
+    def __init__(self, store: SQLiteJobStore):
+        self._store = store
+
+    def __getitem__(self, job_id):
+        data = self._store.get_data(job_id)
+        if data is None:
+            raise KeyError(job_id)
+        return TrackedDict(self._store, job_id, (), data)
+
+    def __setitem__(self, job_id, data):
+        self._store.put_data(job_id, data)
+
+    def __delitem__(self, job_id):
+        self[job_id]
+        self._store.put_data(job_id, None)
+
+    def __contains__(self, job_id):
+        return self._store.get_data(job_id) is not None
+
+    def __iter__(self):
+        return (job_id for job_id in self._store.list_job_ids() if job_id in self)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def segment_is_settled(segment_state: Optional[dict]) -> bool:
+    """
+    True if a workflow segment from an earlier run needs no more paid work: its audio is done (or not
+    needed) with the file still on disk, and its visual is done or an avatar render is already in flight
+    (its completion arrives by webhook).
+    """
+    if not segment_state:
+        return False
+    visual_status = segment_state.get("visual_status")
+    if visual_status in ("processing", "completed") and any(segment_state.get(key) for key in EXTERNAL_VIDEO_ID_KEYS):
+        return True # Never pay for the same avatar render twice
+    audio_status = segment_state.get("audio_status")
+    if audio_status in ("pending", "processing", "failed", None):
+        return False
+    if audio_status == "completed" and not (segment_state.get("audio_path") and os.path.exists(segment_state["audio_path"])):
+        return False
+    return visual_status in ("completed", "skipped")
+
+
+class JobHeartbeat:
+    """
+    Refreshes the heartbeat of the jobs this process is running every JOB_HEARTBEAT_SECONDS, so other
+    processes resuming interrupted jobs (claim_for_resume) leave them alone for as long as it is alive.
+    """
+
+    def __init__(self, store: SQLiteJobStore, running_job_ids: Callable[[], Iterable[str]], owner: str = PROCESS_OWNER_ID,
+                 interval: float = JOB_HEARTBEAT_SECONDS):
+        self.store = store
+        self.running_job_ids = running_job_ids
+        self.owner = owner
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def beat(self) -> None:
+        try:
+            self.store.heartbeat(self.running_job_ids(), self.owner)
+        except Exception as e:
+            logger.warning(f"Job heartbeat failed: {e}")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.beat()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="job_heartbeat", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+class JobCancelledError(Exception):
+    """Raised between the stages of a job once it was cancelled (see raise_if_cancelled)."""
+
+
+def job_is_cancelled(job_id: str) -> bool:
+    """True once the job was cancelled (POST /jobs/{job_id}/cancel), as seen from any process."""
+    state = get_job_store().get_state(job_id)
+    return bool(state and state[0] == "cancelled")
+
+
+def raise_if_cancelled(job_id: str) -> None:
+    """
+    Stage boundary check for long-running jobs, so a cancelled job stops before its next paid step.
+    Module-level (with append_job_log) so functools.partial(raise_if_cancelled, job_id) can be passed
+    to render processes and queue workers.
+
+    Raises:
+        JobCancelledError: If the job was cancelled.
+    """
+    if job_is_cancelled(job_id):
+        raise JobCancelledError(f"Job {job_id} was cancelled")
+
+
+def append_job_log(job_id: str, message: str) -> None:
+    """Log callback for work running outside the API process (a render process or a worker)."""
+    get_job_store().append_log(job_id, message)
+
+
+_default_store: Optional[SQLiteJobStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_job_store() -> SQLiteJobStore:
+    """
+    Returns the process-wide job store configured from the environment.
+
+    Environment:
+        JOB_STORE_PATH: SQLite database file (shared by all API workers on the host).
+    """
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = SQLiteJobStore(os.getenv("JOB_STORE_PATH", str(DEFAULT_JOB_STORE_PATH)))
+        return _default_store
@@ -1,36 +1,119 @@
 import anthropic
 import os
 import json
+import time
 import logging
 from dotenv import load_dotenv
+from typing import Iterator
+from pydantic import BaseModel, ValidationError
+
+from backend.text_to_video.llm_clients.response_cache import get_llm_response_cache
+from backend.text_to_video.llm_clients.json_stream import IncrementalJSONArrayParser
+from backend.text_to_video.metrics import observe_provider, record_provider_request
+from backend.text_to_video.tracing import record_span
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_MODEL = "claude-sonnet-4-20250514"
+DEFAULT_STREAM_MAX_TOKENS = 8192 # The streaming endpoint has no server-side default
+
+def _validate_structured_output(parsed: dict | list, response_model: type[BaseModel] | None) -> dict | list | None:
+    """Validates parsed JSON (an object or a list of objects) against response_model; None if it does not conform."""
+    if response_model is None:
+        return parsed
+    try:
+        if isinstance(parsed, list):
+            return [response_model.model_validate(item).model_dump(mode="json", exclude_none=True) for item in parsed]
+        return response_model.model_validate(parsed).model_dump(mode="json", exclude_none=True)
+    except ValidationError as e:
+        logger.error(f"Claude response does not match {response_model.__name__}: {e}")
+        return None
+
+def _usage_dict(message) -> dict:
+    """Token usage of an API response as plain ints (0 where unavailable)."""
+    usage = getattr(message, "usage", None)
+    return {
+        name: value if isinstance(value := getattr(usage, name, None), int) else 0
+        for name in ("input_tokens", "output_tokens")
+    }
 
 class ClaudeClient:
-    def __init__(self, api_key: str = None, model: str = DEFAULT_MODEL):
+    def __init__(self, api_key: str = None, model: str = DEFAULT_MODEL, use_cache: bool = True, refresh_cache: bool = False):
+        """
+        Args:
+            api_key: Anthropic API key; defaults to ANTHROPIC_API_KEY.
+            model: Model used for all requests.
+            use_cache: Serve repeated structured-output requests from the disk response cache.
+            refresh_cache: Ignore cached responses (and overwrite them with fresh ones) for every request.
+        """
         self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY not found in environment variables or passed to constructor.")
         self.client = anthropic.Anthropic(api_key=self.api_key)
         self.model = model
+        self.response_cache = get_llm_response_cache() if use_cache else None
+        self.refresh_cache = refresh_cache
+
+    def _api_call_args(self, system_prompt: str, user_prompt: str, max_tokens: int | None, temperature: float | None) -> dict:
+        """Builds the messages API parameters, only including max_tokens and temperature if they are not None."""
+        api_call_args = {
+            "model": self.model,
+            "system": system_prompt,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": user_prompt
+                        }
+                    ]
+                }
+            ]
+        }
+        if max_tokens is not None:
+            api_call_args["max_tokens"] = max_tokens
+        if temperature is not None:
+            api_call_args["temperature"] = temperature
+        return api_call_args
 
-    def generate_structured_output(self, system_prompt: str, user_prompt: str, max_tokens: int = None, temperature: float = None) -> dict | list | None:
+    def _cache_lookup(self, system_prompt: str, user_prompt: str, max_tokens: int | None, temperature: float | None,
+                      response_model: type[BaseModel] | None, refresh_cache: bool | None) -> tuple[str | None, dict | list | None]:
+        """Returns (cache key or None if caching is off, cached value or None)."""
+        if self.response_cache is None:
+            return None, None
+        schema = response_model.model_json_schema() if response_model else None
+        cache_key = self.response_cache.make_key(self.model, system_prompt, user_prompt, schema, temperature, max_tokens)
+        if self.refresh_cache if refresh_cache is None else refresh_cache:
+            self.response_cache.record_refresh()
+            return cache_key, None
+        return cache_key, self.response_cache.get(cache_key)
+
+    def generate_structured_output(self, system_prompt: str, user_prompt: str, max_tokens: int = None, temperature: float = None,
+                                   response_model: type[BaseModel] = None, refresh_cache: bool = None) -> dict | list | None:
         """
         Sends a prompt to Claude and expects a JSON object or list as a response.
 
+        Identical requests (same model, prompts, schema, temperature and max_tokens) are answered from the
+        disk response cache; only validated output is cached.
+
         Args:
             system_prompt: The system prompt to guide the AI's behavior and output format.
             user_prompt: The main user query or content to be processed.
             max_tokens: Maximum number of tokens to generate. If None, API default is used.
             temperature: Controls randomness (0.0 to 1.0). If None, API default is used.
+            response_model: Optional pydantic model the object (or each list item) must validate against.
+            refresh_cache: Skip the cached response for this request; defaults to the client's refresh_cache.
 
         Returns:
             A dictionary or list parsed from Claude's JSON response, or None if an error occurs or parsing fails.
         """
+        cache_key, cached = self._cache_lookup(system_prompt, user_prompt, max_tokens, temperature, response_model, refresh_cache)
+        if cached is not None:
+            return cached
+
         log_params = {}
         if max_tokens is not None:
             log_params["max_tokens"] = max_tokens
@@ -42,28 +125,9 @@ class ClaudeClient:
         # logger.debug(f"User Prompt:\n{user_prompt}")
 
         try:
-            # Construct the API call parameters, only including max_tokens and temperature if they are not None
-            api_call_args = {
-                "model": self.model,
-                "system": system_prompt,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": user_prompt
-                            }
-                        ]
-                    }
-                ]
-            }
-            if max_tokens is not None:
-                api_call_args["max_tokens"] = max_tokens
-            if temperature is not None:
-                api_call_args["temperature"] = temperature
-
-            response = self.client.messages.create(**api_call_args)
+            api_call_args = self._api_call_args(system_prompt, user_prompt, max_tokens, temperature)
+            with observe_provider("anthropic"):
+                response = self.client.messages.create(**api_call_args)
 
             # Ensure there is content and it's a TextBlock
             if response.content and isinstance(response.content[0], anthropic.types.TextBlock):
@@ -77,7 +141,9 @@ class ClaudeClient:
                      raw_json_response = raw_json_response.strip()[3:-3].strip()
 
                 try:
-                    parsed_response = json.loads(raw_json_response)
+                    parsed_response = _validate_structured_output(json.loads(raw_json_response), response_model)
+                    if parsed_response and cache_key is not None:
+                        self.response_cache.set(cache_key, parsed_response, self.model, _usage_dict(response))
                     return parsed_response
                 except json.JSONDecodeError as e:
                     logger.error(f"Failed to parse JSON response from Claude: {e}")
@@ -99,6 +165,78 @@ class ClaudeClient:
 
         return None
 
+    def stream_structured_list(self, system_prompt: str, user_prompt: str, max_tokens: int = None, temperature: float = None,
+                               item_model: type[BaseModel] = None, refresh_cache: bool = None) -> Iterator[dict]:
+        """
+        Streams a JSON list response from Claude, yielding each item as soon as its object closes.
+
+        Items are validated against item_model one by one, so consumers can start working on the first
+        items while the rest are still being generated. The complete list shares its cache entry with
+        generate_structured_output for the same request; on a cache hit the cached items are yielded at once.
+
+        Args:
+            system_prompt: The system prompt to guide the AI's behavior and output format.
+            user_prompt: The main user query or content to be processed.
+            max_tokens: Maximum number of tokens to generate. Defaults to DEFAULT_STREAM_MAX_TOKENS.
+            temperature: Controls randomness (0.0 to 1.0). If None, API default is used.
+            item_model: Optional pydantic model each list item must validate against.
+            refresh_cache: Skip the cached response for this request; defaults to the client's refresh_cache.
+
+        Yields:
+            Each list item as a dict (validated and dumped through item_model if given).
+
+        Raises:
+            ValueError: If an item fails validation or the response is not a complete JSON list.
+            anthropic.APIError: If the request fails; items already yielded stay valid.
+        """
+        cache_key, cached = self._cache_lookup(system_prompt, user_prompt, max_tokens, temperature, item_model, refresh_cache)
+        if isinstance(cached, list):
+            yield from cached
+            return
+
+        api_call_args = self._api_call_args(system_prompt, user_prompt, max_tokens or DEFAULT_STREAM_MAX_TOKENS, temperature)
+        logger.info(f"Streaming request to Claude model: {self.model} (max_tokens={api_call_args['max_tokens']}, temperature={temperature})")
+        parser = IncrementalJSONArrayParser()
+        items = []
+        # Only the time spent in the stream is provider latency, not the consumer's work between items, and
+        # the span is recorded at the end so the consumer's spans do not nest under it (see tracing.record_span)
+        start_ns, api_seconds, resumed_at = time.time_ns(), 0.0, time.monotonic()
+        outcome, error = "exception", None
+        try:
+            with self.client.messages.stream(**api_call_args) as stream:
+                for text in stream.text_stream:
+                    for raw_item in parser.feed(text):
+                        item = _validate_structured_output(raw_item, item_model)
+                        if item is None:
+                            raise ValueError(f"Streamed item {len(items)} does not match {item_model.__name__}.")
+                        items.append(item)
+                        api_seconds, resumed_at = api_seconds + time.monotonic() - resumed_at, None
+                        yield item
+                        resumed_at = time.monotonic()
+                parser.close()
+                final_message = stream.get_final_message()
+            outcome = "ok"
+        except GeneratorExit:
+            outcome = "ok" # The consumer stopped reading; the provider did not fail
+            raise
+        except anthropic.APIError as e:
+            error = f"{type(e).__name__}: {e}"
+            logger.error(f"Claude API error while streaming (after {len(items)} items): {e}")
+            raise
+        except ValueError as e:
+            error = f"{type(e).__name__}: {e}"
+            logger.error(f"Invalid streamed response from Claude (after {len(items)} items): {e}")
+            raise
+        finally:
+            if resumed_at is not None:
+                api_seconds += time.monotonic() - resumed_at
+            record_provider_request("anthropic", api_seconds, outcome)
+            record_span("anthropic", "provider", start_ns, int(api_seconds * 1e9), error)
+
+        logger.info(f"Claude stream complete: {len(items)} items.")
+        if items and cache_key is not None:
+            self.response_cache.set(cache_key, items, self.model, _usage_dict(final_message))
+
 # Example Usage (can be run directly if you have ANTHROPIC_API_KEY set)
 if __name__ == "__main__":
     logging.basicConfig(level=logging.DEBUG)
@@ -0,0 +1,96 @@
+import json
+
+
+class IncrementalJSONArrayParser:
+    """
+    Parses a JSON array of objects from text that arrives in chunks, emitting each object as soon as it closes.
+
+    Anything before the opening bracket (a ```json fence, a short preamble) and after the closing bracket is
+    ignored. Only objects are supported as array items, which is what the structured-output prompts ask for.
+    Consumed text is dropped from the buffer, so memory stays bounded by the largest single item.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0           # Next character of _buffer to scan
+        self._item_start = None # Buffer index of the '{' opening the current item
+        self._depth = 0         # Nesting depth inside the current item
+        self._in_string = False
+        self._escaped = False
+        self.started = False    # Opening '[' seen
+        self.finished = False   # Closing ']' seen
+        self.items_parsed = 0
+
+    def feed(self, chunk: str) -> list[dict]:
+        """
+        Adds a chunk of text and returns the array items it completed (possibly none).
+
+        Raises:
+            ValueError: If the array contains something other than objects or an item is not valid JSON.
+        """
+        completed = []
+        if self.finished or not chunk:
+            return completed
+        self._buffer += chunk
+        buffer = self._buffer
+        pos = self._pos
+        while pos < len(buffer) and not self.finished:
+            char = buffer[pos]
+            if not self.started:
+                if char == "[":
+                    self.started = True
+            elif self._depth == 0:
+                if char == "{":
+                    self._item_start = pos
+                    self._depth = 1
+                elif char == "]":
+                    self.finished = True
+                elif not (char.isspace() or char == ","):
+                    raise ValueError(f"Unexpected character {char!r} between array items; only objects are supported.")
+            elif self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        item = json.loads(buffer[self._item_start:pos + 1])
+                    except json.JSONDecodeError as e:
+                        raise ValueError(f"Array item {self.items_parsed} is not valid JSON: {e}") from e
+                    self.items_parsed += 1
+                    buffer = buffer[pos + 1:]
+                    pos = -1
+                    self._item_start = None
+                    completed.append(item)
+            pos += 1
+
+        if self._item_start is None:
+            # Nothing worth keeping before the scan position.
+            self._buffer = buffer[pos:]
+            self._pos = 0
+        else:
+            # Keep only the unfinished item.
+            self._buffer = buffer[self._item_start:]
+            self._pos = pos - self._item_start
+            self._item_start = 0
+        return completed
+
+    def close(self) -> None:
+        """
+        Checks that the stream contained a complete array.
+
+        Raises:
+            ValueError: If no array was found or it was cut off (e.g. by max_tokens).
+        """
+        if not self.started:
+            raise ValueError("No JSON array found in the response.")
+        if not self.finished:
+            raise ValueError(f"JSON array was truncated after {self.items_parsed} complete items.")
@@ -0,0 +1,112 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+from backend.text_to_video.tracing import event
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- Cache Configuration ---
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent.parent / "assets" / "cache" / "llm_responses"
+
+
+class LLMResponseCache:
+    """
+    Disk cache for validated structured LLM output.
+
+    Entries are keyed by a hash of everything that determines the response (model, system prompt,
+    user prompt, output schema, temperature and max tokens) and stored one JSON file per key. Pipeline
+    inputs are deterministic, so entries never expire; callers bypass and overwrite them explicitly
+    (refresh) when a fresh generation is wanted. Token usage of the original call is stored with the
+    value so hits can report the tokens they saved.
+    """
+
+    def __init__(self, cache_dir: str | Path = DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "refreshes": 0, "input_tokens_saved": 0, "output_tokens_saved": 0}
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, user_prompt: str, schema: Optional[dict] = None,
+                 temperature: Optional[float] = None, max_tokens: Optional[int] = None) -> str:
+        """Builds a stable cache key from the request parameters that influence the response."""
+        key_material = json.dumps([model, system_prompt, user_prompt, schema, temperature, max_tokens], sort_keys=True, default=str)
+        return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _count(self, **increments: int) -> None:
+        with self._lock:
+            for name, value in increments.items():
+                self.stats[name] += value
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the cached value for key (counting a hit and the tokens it saved), or None on a miss."""
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            self._count(misses=1)
+            event("llm_cache miss", "cache", cache_hit=False)
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Discarding unreadable LLM cache entry {entry_path}: {e}")
+            try: entry_path.unlink()
+            except OSError: pass
+            self._count(misses=1)
+            return None
+
+        usage = entry.get("usage") or {}
+        self._count(hits=1, input_tokens_saved=usage.get("input_tokens", 0), output_tokens_saved=usage.get("output_tokens", 0))
+        event("llm_cache hit", "cache", cache_hit=True, model=entry.get("model"), input_tokens_saved=usage.get("input_tokens", 0))
+        logger.info(f"LLM response cache hit for {entry.get('model')} (saved {usage.get('input_tokens', 0)} input / {usage.get('output_tokens', 0)} output tokens).")
+        return entry.get("value")
+
+    def set(self, key: str, value: Any, model: str = None, usage: Optional[dict] = None) -> None:
+        """Writes a cache entry atomically."""
+        entry = {"model": model, "stored_at": time.time(), "usage": usage or {}, "value": value}
+        entry_path = self._entry_path(key)
+        temp_path = entry_path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(temp_path, entry_path)
+        except OSError as e:
+            logger.warning(f"Failed to write LLM cache entry {entry_path}: {e}")
+            try: temp_path.unlink()
+            except OSError: pass
+
+    def record_refresh(self) -> None:
+        """Counts a lookup that was skipped because the caller asked for a fresh response."""
+        self._count(refreshes=1)
+
+
+_default_cache: Optional[LLMResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_llm_response_cache() -> Optional[LLMResponseCache]:
+    """
+    Returns the process-wide LLM response cache configured from the environment, or None if disabled.
+
+    Environment:
+        LLM_RESPONSE_CACHE_DISABLED: Set to "1"/"true" to always call the API.
+        LLM_RESPONSE_CACHE_DIR: Directory for cache entries.
+    """
+    global _default_cache
+    if os.getenv("LLM_RESPONSE_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMResponseCache(os.getenv("LLM_RESPONSE_CACHE_DIR", str(DEFAULT_CACHE_DIR)))
+        return _default_cache
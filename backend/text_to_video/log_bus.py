@@ -0,0 +1,262 @@
+import os
+import json
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Optional
+
+from backend.text_to_video.job_store import SQLiteJobStore, TERMINAL_STATUSES, get_job_store
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- Log Stream Configuration ---
+LOG_STREAM_BUFFER_SIZE = int(os.getenv("LOG_STREAM_BUFFER_SIZE", "500")) # Recent log lines kept in memory per watched job
+LOG_STREAM_HEARTBEAT_SECONDS = float(os.getenv("LOG_STREAM_HEARTBEAT_SECONDS", "15")) # Idle time before a keep-alive comment
+LOG_STREAM_MAX_SUBSCRIBERS = int(os.getenv("LOG_STREAM_MAX_SUBSCRIBERS", "200")) # Open streams per process
+LOG_STREAM_MAX_SUBSCRIBERS_PER_JOB = int(os.getenv("LOG_STREAM_MAX_SUBSCRIBERS_PER_JOB", "20"))
+LOG_STREAM_TAIL_SECONDS = float(os.getenv("LOG_STREAM_TAIL_SECONDS", "1")) # Store check interval for writes from other processes
+LOG_STREAM_MAX_CHANNELS = 256 # Watched jobs whose buffers are kept for reconnects after the last subscriber leaves
+
+FAILED_STATUSES = tuple(status for status in TERMINAL_STATUSES if not status.startswith("completed"))
+
+
+class LogStreamLimitError(Exception):
+    """Raised by LogBus.stream when the subscriber cap (per job or per process) is reached."""
+
+    def __init__(self, subscribers: int, limit: int, retry_after: int):
+        super().__init__(f"Too many log streams ({subscribers}/{limit}). Retry in {retry_after}s.")
+        self.subscribers = subscribers
+        self.limit = limit
+        self.retry_after = retry_after
+
+
+class _JobChannel:
+    """Ring buffer of a watched job's recent log lines and its last known state."""
+
+    def __init__(self, buffer_size: int):
+        self.events: deque[tuple[int, str]] = deque(maxlen=buffer_size)
+        self.floor_seq = 0 # Every log line of the job after this seq is in events
+        self.last_seq = 0
+        self.status: Optional[str] = None
+        self.result_path: Optional[str] = None
+        self.exists = True
+        self.loaded = False
+        self.subscribers = 0
+        self.changed = asyncio.Event() # Replaced on every change; subscribers wait on the one they last saw
+        self.refreshing: Optional[asyncio.Task] = None
+        self.refresh_again = False
+
+    def add(self, rows: list[tuple[int, str]]) -> None:
+        for seq, message in rows:
+            if len(self.events) == self.events.maxlen:
+                self.floor_seq = self.events[0][0]
+            self.events.append((seq, message))
+            self.last_seq = seq
+
+    def events_after(self, seq: int) -> Optional[list[tuple[int, str]]]:
+        """Buffered lines after seq, or None if some of them already left the buffer."""
+        if seq < self.floor_seq:
+            return None
+        return [event for event in self.events if event[0] > seq]
+
+    def wake(self) -> None:
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class LogBus:
+    """
+    Pushes job log lines to server-sent event streams.
+
+    The job store stays the source of truth: its change hints (from any thread of this process) schedule
+    one read of the new lines per watched job into a bounded ring buffer, and every subscriber of the job
+    is woken from there, so a line is read once however many dashboards watch it. Events carry the log
+    line's store seq as their SSE id, so a client reconnecting with Last-Event-ID resumes where it left
+    off, from the buffer or, if it fell further behind, from the store.
+
+    Other processes (queue workers, or the API worker running an inline job) write to the store without
+    reaching this process's hints; with tail_store the bus checks the store's last change once per
+    LOG_STREAM_TAIL_SECONDS while anyone is subscribed, and refreshes the watched jobs when it moved.
+    """
+
+    def __init__(self, store: Optional[SQLiteJobStore] = None, buffer_size: int = LOG_STREAM_BUFFER_SIZE,
+                 heartbeat_seconds: float = LOG_STREAM_HEARTBEAT_SECONDS, max_subscribers: int = LOG_STREAM_MAX_SUBSCRIBERS,
+                 max_subscribers_per_job: int = LOG_STREAM_MAX_SUBSCRIBERS_PER_JOB, tail_seconds: float = LOG_STREAM_TAIL_SECONDS):
+        self.store = store or get_job_store()
+        self.buffer_size = buffer_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_subscribers = max_subscribers
+        self.max_subscribers_per_job = max_subscribers_per_job
+        self.tail_seconds = tail_seconds
+        self._channels: "OrderedDict[str, _JobChannel]" = OrderedDict()
+        self._subscribers = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tail_task: Optional[asyncio.Task] = None
+
+    async def start(self, tail_store: bool = True) -> None:
+        """
+        Starts receiving the store's change hints on the running loop, and tailing the store if tail_store.
+
+        Args:
+            tail_store: Tail by default, since any process on the host can write to the store.
+        """
+        self._loop = asyncio.get_running_loop()
+        self.store.add_listener(self._on_store_change)
+        if tail_store and self._tail_task is None:
+            self._tail_task = asyncio.create_task(self._tail())
+
+    async def stop(self) -> None:
+        self.store.remove_listener(self._on_store_change)
+        if self._tail_task:
+            self._tail_task.cancel()
+            self._tail_task = None
+
+    def snapshot(self) -> dict:
+        return {"subscribers": self._subscribers, "watched_jobs": sum(1 for c in self._channels.values() if c.subscribers)}
+
+    def _on_store_change(self, job_id: str) -> None:
+        # Called from whichever thread wrote; only jobs someone watches cost anything
+        if job_id not in self._channels or self._loop is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._request_refresh, job_id)
+        except RuntimeError:
+            pass # Loop closed during shutdown
+
+    def _request_refresh(self, job_id: str) -> Optional[asyncio.Task]:
+        channel = self._channels.get(job_id)
+        if channel is None:
+            return None
+        if channel.refreshing is None:
+            channel.refreshing = asyncio.create_task(self._refresh(job_id, channel))
+        else:
+            channel.refresh_again = True # Coalesce hints arriving while a read is in flight
+        return channel.refreshing
+
+    async def _refresh(self, job_id: str, channel: _JobChannel) -> None:
+        try:
+            while True:
+                channel.refresh_again = False
+                try:
+                    rows, state = await asyncio.to_thread(self._read, job_id, channel.last_seq)
+                except Exception as e:
+                    logger.warning(f"[{job_id}] Could not read job logs for streaming: {e}")
+                    rows, state = [], (channel.status, channel.result_path) if channel.exists else None
+                if not channel.loaded and len(rows) > self.buffer_size:
+                    channel.floor_seq = rows[-self.buffer_size - 1][0]
+                    rows = rows[-self.buffer_size:]
+                channel.add(rows)
+                channel.exists = state is not None
+                channel.status, channel.result_path = state or (None, None)
+                channel.loaded = True
+                channel.wake()
+                if not channel.refresh_again:
+                    return
+        finally:
+            channel.refreshing = None
+
+    def _read(self, job_id: str, after_seq: int) -> tuple[list[tuple[int, str]], Optional[tuple[str, Optional[str]]]]:
+        # Log lines are committed in seq order, so reading everything after the last seen seq never skips one
+        return self.store.get_logs(job_id, after_seq), self.store.get_state(job_id)
+
+    async def _tail(self) -> None:
+        last_change = await asyncio.to_thread(self.store.last_change)
+        while True:
+            await asyncio.sleep(self.tail_seconds)
+            if not self._subscribers:
+                continue
+            try:
+                change = await asyncio.to_thread(self.store.last_change)
+            except Exception as e:
+                logger.warning(f"Could not check the job store for log changes: {e}")
+                continue
+            if change != last_change:
+                last_change = change
+                for job_id, channel in list(self._channels.items()):
+                    if channel.subscribers:
+                        self._request_refresh(job_id)
+
+    def _check_capacity(self, job_id: str) -> None:
+        channel = self._channels.get(job_id)
+        if self._subscribers >= self.max_subscribers:
+            raise LogStreamLimitError(self._subscribers, self.max_subscribers, int(self.heartbeat_seconds))
+        if channel and channel.subscribers >= self.max_subscribers_per_job:
+            raise LogStreamLimitError(channel.subscribers, self.max_subscribers_per_job, int(self.heartbeat_seconds))
+
+    def _subscribe(self, job_id: str) -> _JobChannel:
+        channel = self._channels.get(job_id)
+        if channel is None:
+            channel = self._channels[job_id] = _JobChannel(self.buffer_size)
+            self._evict()
+        self._channels.move_to_end(job_id)
+        channel.subscribers += 1
+        self._subscribers += 1
+        return channel
+
+    def _unsubscribe(self, channel: _JobChannel) -> None:
+        channel.subscribers -= 1
+        self._subscribers -= 1
+
+    def _evict(self) -> None:
+        for job_id in list(self._channels):
+            if len(self._channels) <= LOG_STREAM_MAX_CHANNELS:
+                return
+            if not self._channels[job_id].subscribers:
+                del self._channels[job_id]
+
+    def stream(self, job_id: str, last_event_id: int = 0) -> AsyncIterator[str]:
+        """
+        Server-sent events for a job's log, starting after last_event_id: one "data: {"message": ...}"
+        event per line (id = its seq), then "data: {"status": "complete", "video_path": ...}" once the job
+        has a result, or "data: {"status": <failure status>}" if it failed. Keep-alive comments are sent
+        while the job is quiet.
+
+        Raises:
+            LogStreamLimitError: When the subscriber cap is reached (raised before the first event).
+        """
+        self._check_capacity(job_id)
+        return self._events(job_id, last_event_id)
+
+    async def _events(self, job_id: str, cursor: int) -> AsyncIterator[str]:
+        channel = self._subscribe(job_id)
+        try:
+            refresh = self._request_refresh(job_id)
+            if not channel.loaded and refresh:
+                await asyncio.shield(refresh)
+            while True:
+                waiter = channel.changed
+                events = channel.events_after(cursor)
+                if events is None:
+                    events = await asyncio.to_thread(self.store.get_logs, job_id, cursor)
+                for seq, message in events:
+                    yield f"id: {seq}\ndata: {json.dumps({'message': message})}\n\n"
+                    cursor = seq
+                if channel.result_path:
+                    yield f"data: {json.dumps({'status': 'complete', 'video_path': channel.result_path})}\n\n"
+                    return
+                if channel.status in FAILED_STATUSES or not channel.exists:
+                    yield f"data: {json.dumps({'status': channel.status or 'not_found'})}\n\n"
+                    return
+                try:
+                    await asyncio.wait_for(waiter.wait(), self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    self._request_refresh(job_id) # Also picks up status changes no hint announced
+        finally:
+            self._unsubscribe(channel)
+
+
+_default_bus: Optional[LogBus] = None
+_default_bus_lock = threading.Lock()
+
+
+def get_log_bus() -> LogBus:
+    """Returns the process-wide log bus over the default job store."""
+    global _default_bus
+    with _default_bus_lock:
+        if _default_bus is None:
+            _default_bus = LogBus()
+        return _default_bus
@@ -1,7 +1,8 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Header, Depends, Response
+from fastapi import FastAPI, HTTPException, Request, Header, Depends, Response
 from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import APIKeyHeader
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from typing import Dict, List, Optional, Any
 import os
@@ -9,6 +10,12 @@ import traceback
 import asyncio
 import json
 import uuid
+import hashlib
+import functools
+import time
+import random
+import threading
+import weakref
 import logging
 from datetime import datetime
 from dotenv import load_dotenv
@@ -40,7 +47,14 @@ from .argil_workflow import run_argil_workflow
 from .editor import assemble_heygen_video, assemble_argil_video
 
 # Import Argil client for potential use (e.g., webhook verification, though not strictly needed for receiver)
-from backend.text_to_video.argil_client import list_argil_webhooks, create_argil_webhook
+from backend.text_to_video.argil_client import list_argil_webhooks, create_argil_webhook, notify_argil_video_event
+from backend.text_to_video.rate_limiter import rate_limit_metrics, configure_rate_limits, load_rate_limit_config
+from backend.text_to_video.job_executor import get_job_executor, JobQueueFullError, RENDER, IO
+from backend.text_to_video.job_store import get_job_store, JobHeartbeat, TERMINAL_STATUSES, ASSEMBLY_STARTED_STATUSES, JobCancelledError, append_job_log, raise_if_cancelled
+from backend.text_to_video.job_queue import get_job_queue
+from backend.text_to_video.log_bus import get_log_bus, LogStreamLimitError
+from backend.text_to_video.media_delivery import media_response, hls_response, HLSPackagingError, HLS_ENABLED
+from backend.text_to_video.metrics import REGISTRY, HTTP_SECONDS, HTTP_REQUESTS, register_process_collectors, render_metrics
 
 # Configure logging
 logging.basicConfig(
@@ -49,6 +63,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger("api")
 
+# --- Job Execution Configuration ---
+# "inline": jobs run on this process's job executor. "queue": this process only enqueues; worker processes
+# (python -m backend.text_to_video.worker) claim and run the jobs.
+JOB_EXECUTION_MODE = os.getenv("JOB_EXECUTION_MODE", "inline")
+JOB_SYNC_TIMEOUT_SECONDS = float(os.getenv("JOB_SYNC_TIMEOUT_SECONDS", "1800")) # /generate_video wait in queue mode
+VIDEO_RESULT_CACHE_TTL_SECONDS = float(os.getenv("VIDEO_RESULT_CACHE_TTL_SECONDS", "86400")) # Identical /generate_video requests get the finished video this long; 0 disables
+
+# --- Request Logging Configuration ---
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv("REQUEST_LOG_SAMPLE_RATE", "0.1")) # Share of successful, fast requests logged
+REQUEST_LOG_SLOW_SECONDS = float(os.getenv("REQUEST_LOG_SLOW_SECONDS", "2")) # Slower requests are always logged
+
 # Define security scheme for API key authentication
 MODAL_KEY_HEADER = APIKeyHeader(name="Modal-Key", auto_error=False)
 MODAL_SECRET_HEADER = APIKeyHeader(name="Modal-Secret", auto_error=False)
@@ -96,6 +121,7 @@ async def lifespan(app: FastAPI):
     ensure_directories()
     load_dotenv()  # Load environment variables on startup
     logger.info("Loaded environment variables.")
+    configure_rate_limits(load_rate_limit_config()) # Same quotas as pipeline runs; buckets are shared across processes
 
     # --- Add Argil Webhook Check/Registration --- #
     argil_api_key = os.getenv("ARGIL_API_KEY")
@@ -140,9 +166,20 @@ async def lifespan(app: FastAPI):
             logger.error(f"An error occurred during Argil webhook check/registration: {e}", exc_info=True)
     # --- End Argil Webhook Check/Registration --- #
 
+    if JOB_EXECUTION_MODE == "queue":
+        logger.info(f"Queue mode: jobs are run by worker processes. Queue: {get_job_queue().snapshot()}")
+    else:
+        get_job_executor() # Start the worker pools before the first request
+        job_heartbeat.start() # Before resuming, so jobs resumed here are heartbeated as soon as they run
+        resume_interrupted_jobs() # In queue mode expired leases hand interrupted tasks to other workers instead
+    await get_log_bus().start() # Tails the shared store: queue workers and the other API workers log straight to it
     logger.info("Application startup complete.")
     yield
     # Code to run on shutdown (if any)
+    await get_log_bus().stop()
+    if JOB_EXECUTION_MODE != "queue":
+        job_heartbeat.stop()
+        get_job_executor().shutdown(wait=False)
     logger.info("Application shutdown.")
 
 # Create FastAPI app instance using the lifespan manager
@@ -162,36 +199,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Middleware to log request headers
 @app.middleware("http")
-async def log_request_headers(request: Request, call_next):
-    """Middleware to log all request headers"""
-    # Log the request method and URL
-    logger.info(f"Request: {request.method} {request.url}")
-
-    # Log all headers
-    headers = dict(request.headers)
-    # Redact sensitive information if needed
-    if "authorization" in headers:
-        headers["authorization"] = "REDACTED"
-    if "Modal-Secret" in headers:
-        headers["Modal-Secret"] = "REDACTED"
-
-    logger.info(f"Headers: {json.dumps(headers, indent=2)}")
-
-    # Process the request and get the response
-    response = await call_next(request)
-
-    # Log the response status code
-    logger.info(f"Response status: {response.status_code}")
-
-    return response
-
+async def observe_requests(request: Request, call_next):
+    """
+    Records request latency and status per route template in the metrics, and writes one structured
+    (JSON) log line for failed or slow requests and for a REQUEST_LOG_SAMPLE_RATE share of the rest.
+    """
+    start = time.monotonic()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        duration = time.monotonic() - start
+        route = request.scope.get("route")
+        route_path = route.path if route is not None else "unmatched" # Templates, not raw paths, keep label sets small
+        HTTP_SECONDS.observe(duration, method=request.method, route=route_path)
+        HTTP_REQUESTS.inc(method=request.method, route=route_path, status=status_code)
+        if status_code >= 500 or duration >= REQUEST_LOG_SLOW_SECONDS or random.random() < REQUEST_LOG_SAMPLE_RATE:
+            logger.info(json.dumps({
+                "event": "http_request",
+                "method": request.method,
+                "route": route_path,
+                "path": request.url.path,
+                "status": status_code,
+                "duration_ms": round(duration * 1000, 1),
+                "client": request.client.host if request.client else None,
+            }))
+
+# Job state lives in the job store (SQLite), so it survives restarts and is shared by all API workers.
+# The views keep the dict shape the endpoints and workflows were written against; nested writes persist.
+job_store = get_job_store()
+# Keeps other API workers from resuming the jobs this process is running (inline mode)
+job_heartbeat = JobHeartbeat(job_store, lambda: get_job_executor().job_ids())
 # Store for active jobs and their status messages
-active_jobs: Dict[str, List[str]] = {}
-job_results: Dict[str, str] = {}
+active_jobs = job_store.logs_view()
+job_results = job_store.results_view()
 # Store for intermediate results in the workflow
-job_data: Dict[str, Dict] = {}
+job_data = job_store.data_view()
 # Example structure for job_data['some_job_id'] in the HeyGen workflow:
 # {
 #     "workflow_type": "heygen",
@@ -258,6 +304,54 @@ async def verify_authentication(
     logger.info(f"Authentication successful: source={auth_source}, mode={auth_mode}")
     return True
 
+def queue_task(job_id: str, task, *args, kind: str = IO):
+    """
+    Runs a job task (one of JOB_TASKS, called as task(job_id, *args)) off the event loop: on this process's
+    job executor, or in queue mode as a durable queue entry for the worker processes (args must be JSON).
+
+    Raises:
+        JobQueueFullError: When the executor or the queue is at its depth limit.
+    """
+    if JOB_EXECUTION_MODE == "queue":
+        return get_job_queue().enqueue(job_id, task.__name__, args)
+    future = get_job_executor().submit(job_id, task, job_id, *args, kind=kind)
+    job_store.heartbeat([job_id]) # Owned from now on, not only from the next heartbeat
+    return future
+
+def queue_full_error(job_id: str, e: JobQueueFullError) -> HTTPException:
+    logger.warning(f"[{job_id}] Rejected: {e}")
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def submit_job(job_id: str, task, *args, kind: str = IO):
+    """
+    queue_task for request handlers.
+
+    Raises:
+        HTTPException: 429 with a Retry-After header when the job queue is full.
+    """
+    try:
+        return queue_task(job_id, task, *args, kind=kind)
+    except JobQueueFullError as e:
+        raise queue_full_error(job_id, e)
+
+def cancel_queued_work(job_id: str) -> bool:
+    """Drops a job's queued work and signals its running work. Returns False if it had none."""
+    if JOB_EXECUTION_MODE == "queue":
+        return get_job_queue().cancel_job(job_id) > 0
+    return get_job_executor().cancel(job_id)
+
+async def wait_for_job_result(job_id: str, timeout: float) -> Optional[str]:
+    """Waits for a queued job's result path in the job store (written by whichever worker ran it)."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < deadline:
+        job = await run_in_threadpool(job_store.get_job, job_id)
+        if job and job["result_path"]:
+            return job["result_path"]
+        if job and job["status"] in TERMINAL_STATUSES:
+            return None
+        await asyncio.sleep(1)
+    raise HTTPException(status_code=504, detail=f"Video generation did not finish within {int(timeout)}s (job {job_id})")
+
 # Load environment variables from .env file
 load_dotenv()  # Call load_dotenv early
 
@@ -277,6 +371,18 @@ class VideoRequest(BaseModel):
     options: Optional[Options] = None
     metadata: Optional[Metadata] = None
 
+def video_request_digest(workflow: str, request: VideoRequest) -> str:
+    """
+    Digest of what determines a requested video: the workflow, the content (line endings and trailing
+    whitespace normalized) and the options that are set. Metadata (source, timestamp) is left out, so
+    resubmissions of the same request match.
+    """
+    content = "\n".join(line.rstrip() for line in request.content.replace("\r\n", "\n").split("\n")).strip()
+    options = request.options.model_dump(exclude_none=True) if request.options else {}
+    options = {name: value.strip().lower() if isinstance(value, str) else value for name, value in options.items()}
+    key_material = json.dumps([workflow, content, options], sort_keys=True)
+    return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
 class WorkflowResponse(BaseModel):
     status: str = "started"
 
@@ -306,16 +412,96 @@ class StepStatusResponse(BaseModel):
 def read_root():
     return {"message": "Welcome to the Video Generation API"}
 
+@app.get("/health")
+async def health():
+    """Liveness check; also reports job load. The durable queue is read (a deferred SQLite read) in the threadpool."""
+    if JOB_EXECUTION_MODE == "queue":
+        jobs = await run_in_threadpool(get_job_queue().snapshot)
+        return {"status": "ok", "mode": JOB_EXECUTION_MODE, "jobs": jobs, "log_streams": get_log_bus().snapshot()}
+    return {"status": "ok", "mode": JOB_EXECUTION_MODE, "jobs": get_job_executor().snapshot(), "log_streams": get_log_bus().snapshot()}
+
+def _job_samples():
+    """Metrics collector: job queue depth and load (executor or durable queue), and jobs per status."""
+    if JOB_EXECUTION_MODE == "queue":
+        queue = get_job_queue().snapshot()
+        load = [("job_queue_depth", queue["queue_depth"]), ("jobs_active", queue["leased"]), ("job_workers_busy", queue["busy_workers"])]
+    else:
+        executor = get_job_executor().snapshot()
+        load = [("job_queue_depth", executor["queue_depth"]), ("jobs_active", executor["jobs"])]
+    families = [(name, "gauge", "Job execution load now.", [({}, value)]) for name, value in load]
+    counts = job_store.count_by_status()
+    families.append(("jobs", "gauge", "Jobs in the job store by status.", [({"status": status}, count) for status, count in sorted(counts.items())]))
+    return families
+
+register_process_collectors()
+REGISTRY.add_collector(_job_samples)
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics (text exposition format). Unauthenticated like /health; expose it to the scraper only."""
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Inline renders of /generate_video by job_id, shared with identical requests arriving while they run
+_sync_renders: Dict[str, Any] = {}
+
+def _record_sync_render(job_id: str, future) -> None:
+    """Stores an inline render's outcome, for identical requests waiting in other processes and the result cache."""
+    _sync_renders.pop(job_id, None)
+    if not future.cancelled() and isinstance(future.exception(), JobCancelledError):
+        return # Keeps the cancelled status
+    video_path = None if future.cancelled() or future.exception() else future.result()
+    if video_path and os.path.exists(video_path):
+        job_results[job_id] = video_path
+        job_store.set_status(job_id, "completed")
+    else:
+        job_store.set_status(job_id, "failed")
+
 @app.post("/generate_video", dependencies=[Depends(verify_authentication)])
 async def generate_video(request: VideoRequest):
     """
     Generate a video synchronously (blocks until complete)
 
+    Identical requests share one render: a request matching one in progress waits for its video, and
+    one matching a video finished within VIDEO_RESULT_CACHE_TTL_SECONDS gets it immediately. The
+    X-Video-Cache header says which happened (miss, coalesced or hit).
+
     Requires authentication with Modal-Key and Modal-Secret headers.
     """
     try:
-        # Generate the video using your create_tiktok function
-        video_path = create_tiktok(request.content)
+        digest = video_request_digest("create_tiktok", request)
+        # Store calls take the database lock; under write contention they must not stall the event loop
+        job_id, is_new = await run_in_threadpool(job_store.claim_request, digest, f"sync_{uuid.uuid4()}", VIDEO_RESULT_CACHE_TTL_SECONDS, JOB_SYNC_TIMEOUT_SECONDS)
+        cache_status = "miss"
+        if not is_new:
+            video_path = await run_in_threadpool(job_store.get_result, job_id)
+            cache_status = "hit" if video_path else "coalesced"
+            logger.info(f"[{job_id}] Identical video request ({cache_status}); sharing the existing job.")
+            if not video_path:
+                render = _sync_renders.get(job_id)
+                if render is not None:
+                    video_path = await asyncio.shield(asyncio.wrap_future(render))
+                else:
+                    video_path = await wait_for_job_result(job_id, JOB_SYNC_TIMEOUT_SECONDS)
+        elif JOB_EXECUTION_MODE == "queue":
+            # A worker process renders it; this request only waits for the result
+            await run_in_threadpool(job_store.create_job, job_id)
+            try:
+                await run_in_threadpool(submit_job, job_id, video_generation_task, request.content)
+            except HTTPException:
+                await run_in_threadpool(job_store.delete_job, job_id)
+                raise
+            video_path = await wait_for_job_result(job_id, JOB_SYNC_TIMEOUT_SECONDS)
+        else:
+            # Generate the video using your create_tiktok function, rendered in the job executor's process pool
+            try:
+                render = get_job_executor().submit(job_id, create_tiktok, request.content, functools.partial(append_job_log, job_id), job_id,
+                                                   functools.partial(raise_if_cancelled, job_id), kind=RENDER)
+            except JobQueueFullError as e:
+                await run_in_threadpool(job_store.delete_job, job_id)
+                raise queue_full_error(job_id, e)
+            _sync_renders[job_id] = render
+            render.add_done_callback(lambda future: _record_sync_render(job_id, future))
+            video_path = await asyncio.shield(asyncio.wrap_future(render))
 
         # Check if video was created successfully
         if not video_path or not os.path.exists(video_path):
@@ -325,106 +511,140 @@ async def generate_video(request: VideoRequest):
         return FileResponse(
             path=video_path,
             media_type="video/mp4",
-            filename=os.path.basename(video_path)
+            filename=os.path.basename(video_path),
+            headers={"X-Video-Cache": cache_status, "X-Job-Id": job_id},
         )
 
+    except HTTPException:
+        raise
+    except JobCancelledError:
+        raise HTTPException(status_code=409, detail="Video generation was cancelled")
     except Exception as e:
         error_details = traceback.format_exc()
         print(f"Detailed error: {error_details}")
         raise HTTPException(status_code=500, detail=f"Error generating video: {str(e)}")
 
 @app.post("/generate_video_stream", dependencies=[Depends(verify_authentication)])
-async def generate_video_stream(request: VideoRequest, background_tasks: BackgroundTasks):
+def generate_video_stream(request: VideoRequest):
     """
     Start a video generation job and return a job ID for status tracking
 
     Requires authentication with Modal-Key and Modal-Secret headers.
     """
     job_id = str(uuid.uuid4())
-    active_jobs[job_id] = []
-
-    # Define callback function to collect status updates
-    def log_callback(message):
-        active_jobs[job_id].append(message)
 
-    # Run video generation in a background task
-    background_tasks.add_task(run_video_generation, job_id, request.content, log_callback)
+    # Run video generation on the job executor or a worker; status updates go to the job's log
+    active_jobs[job_id] = []
+    job_store.set_status(job_id, "processing")
+    try:
+        submit_job(job_id, video_generation_task, request.content)
+    except HTTPException:
+        job_store.delete_job(job_id)
+        raise
 
     return {"job_id": job_id, "status": "started"}
 
-async def run_video_generation(job_id, content, log_callback):
-    """Run the video generation process in the background"""
+def run_video_generation(job_id, content):
+    """
+    Run the video generation process in the background
+
+    create_tiktok renders with MoviePy, so it runs in the job executor's process pool; its progress goes
+    to the job's log through the job store, and it stops between stages once the job is cancelled.
+    """
     try:
         # Pass the job_id to create_tiktok to use as a consistent identifier
-        video_path = create_tiktok(content, log_callback, job_id)
+        video_path = get_job_executor().run_render(create_tiktok, content, functools.partial(append_job_log, job_id), job_id,
+                                                   functools.partial(raise_if_cancelled, job_id))
 
         # Store the result
         if video_path and os.path.exists(video_path):
             job_results[job_id] = video_path
+            job_store.set_status(job_id, "completed")
             active_jobs[job_id].append(f"Video generation complete: {os.path.basename(video_path)}")
         else:
+            job_store.set_status(job_id, "failed")
             active_jobs[job_id].append("Failed to generate video")
+    except JobCancelledError:
+        logger.info(f"[{job_id}] Video generation stopped: the job was cancelled.")
+        active_jobs[job_id].append("Video generation stopped: job cancelled")
     except Exception as e:
         error_details = traceback.format_exc()
         print(f"Error in background task: {error_details}")
+        job_store.set_status(job_id, "failed")
         active_jobs[job_id].append(f"Error: {str(e)}")
 
 @app.get("/stream_logs/{job_id}", dependencies=[Depends(verify_authentication)])
-async def stream_logs(job_id: str):
+def stream_logs(job_id: str, last_event_id: Optional[str] = Header(None, alias="Last-Event-ID")):
     """
     Stream log messages for a specific job
 
+    Messages are pushed as they are logged. Each carries its sequence number as the event id, so a
+    reconnecting client (EventSource sends Last-Event-ID) continues after the last message it received.
+
     Requires authentication with Modal-Key and Modal-Secret headers.
     """
     if job_id not in active_jobs:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    async def event_generator():
-        # Send any existing messages
-        current_index = 0
+    try:
+        after_seq = int(last_event_id) if last_event_id else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Last-Event-ID must be an event id sent by this stream")
 
-        while True:
-            # Check if there are new messages
-            if current_index < len(active_jobs[job_id]):
-                # Send all new messages
-                while current_index < len(active_jobs[job_id]):
-                    message = active_jobs[job_id][current_index]
-                    yield f"data: {json.dumps({'message': message})}\n\n"
-                    current_index += 1
+    try:
+        events = get_log_bus().stream(job_id, after_seq)
+    except LogStreamLimitError as e:
+        logger.warning(f"[{job_id}] Rejected log stream: {e}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    return StreamingResponse(events, media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
-            # Check if job is complete
-            if job_id in job_results:
-                yield f"data: {json.dumps({'status': 'complete', 'video_path': job_results[job_id]})}\n\n"
-                return
+def completed_video_path(job_id: str) -> str:
+    """Final video of a job, or a 404 if it has none (yet) or the file is gone."""
+    if job_id not in job_results:
+        raise HTTPException(status_code=404, detail="Video not found or generation not complete")
 
-            # Wait before checking for new messages
-            await asyncio.sleep(0.5)
+    video_path = job_results[job_id]
 
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    if not os.path.exists(video_path):
+        raise HTTPException(status_code=404, detail="Video file not found")
+    return video_path
 
 @app.get("/get_video/{job_id}", dependencies=[Depends(verify_authentication)])
-async def get_video(job_id: str):
+@app.head("/get_video/{job_id}", dependencies=[Depends(verify_authentication)])
+async def get_video(job_id: str, request: Request):
     """
     Get the completed video for a job
 
+    Supports Range requests (206) for seeking and conditional requests (ETag / If-None-Match).
+
     Requires authentication with Modal-Key and Modal-Secret headers.
     """
-    if job_id not in job_results:
-        raise HTTPException(status_code=404, detail="Video not found or generation not complete")
+    video_path = await run_in_threadpool(completed_video_path, job_id)
+    return await media_response(request, video_path, "video/mp4", filename=os.path.basename(video_path))
 
-    video_path = job_results[job_id]
+@app.get("/get_video/{job_id}/hls/{name}", dependencies=[Depends(verify_authentication)])
+async def get_video_hls(job_id: str, name: str, request: Request):
+    """
+    Get the completed video for a job as HLS: index.m3u8 and the segments it lists
 
-    if not os.path.exists(video_path):
-        raise HTTPException(status_code=404, detail="Video file not found")
+    The package is made on the first request by stream copy (no re-encode) and cached next to the MP4.
 
-    return FileResponse(
-        path=video_path,
-        media_type="video/mp4",
-        filename=os.path.basename(video_path)
-    )
+    Requires authentication with Modal-Key and Modal-Secret headers.
+    """
+    if not HLS_ENABLED:
+        raise HTTPException(status_code=404, detail="HLS delivery is disabled")
+    video_path = await run_in_threadpool(completed_video_path, job_id)
+    try:
+        return await hls_response(request, video_path, name)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="HLS file not found")
+    except HLSPackagingError as e:
+        logger.error(f"[{job_id}] HLS packaging failed: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
 
 @app.get("/job_status/{job_id}", dependencies=[Depends(verify_authentication)])
-async def job_status(job_id: str):
+def job_status(job_id: str):
     """
     Get the current status of a job
 
@@ -438,34 +658,60 @@ async def job_status(job_id: str):
     return {
         "job_id": job_id,
         "status": "complete" if is_complete else "processing",
-        "logs": active_jobs[job_id],
+        "logs": list(active_jobs[job_id]),
         "video_path": job_results.get(job_id) if is_complete else None
     }
 
+@app.get("/rate_limits", dependencies=[Depends(verify_authentication)])
+def rate_limits():
+    """
+    Get per-service rate limiter state and queueing delays for external APIs
+
+    Requires authentication with Modal-Key and Modal-Secret headers.
+    """
+    return rate_limit_metrics()
+
 @app.get("/videos/{filename}", dependencies=[Depends(verify_authentication)])
 @app.head("/videos/{filename}", dependencies=[Depends(verify_authentication)])  # Also allow HEAD requests
-async def get_video_by_filename(filename: str):
+async def get_video_by_filename(filename: str, request: Request):
     """
     Serve a video file directly by filename
 
+    Supports Range requests (206) for seeking and conditional requests (ETag / If-None-Match).
+
     Requires authentication with Modal-Key and Modal-Secret headers.
     """
     # Construct the path to the video file
     video_path = os.path.join(assets_dir, "videos", filename)
 
     # Check if the file exists
-    if not os.path.exists(video_path):
+    if os.path.basename(filename) != filename or not os.path.isfile(video_path):
         raise HTTPException(status_code=404, detail="Video file not found")
 
     # Return the video file
-    return FileResponse(
-        path=video_path,
-        media_type="video/mp4",
-        filename=filename
-    )
+    return await media_response(request, video_path, "video/mp4", filename=filename)
+
+@app.post("/jobs/{job_id}/cancel", dependencies=[Depends(verify_authentication)])
+def cancel_job(job_id: str):
+    """
+    Cancel a job's queued work and signal its running work to stop
+
+    Requires authentication with Modal-Key and Modal-Secret headers.
+    """
+    if job_id not in active_jobs and job_id not in job_data:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    cancelled = cancel_queued_work(job_id)
+    if job_id in job_data:
+        job_data[job_id]["status"] = "cancelled"
+    else:
+        job_store.set_status(job_id, "cancelled")
+    active_jobs.setdefault(job_id, []).append(f"[{datetime.now().isoformat()}] Job cancelled by request.")
+
+    return {"job_id": job_id, "status": "cancelled", "had_pending_work": cancelled}
 
 @app.delete("/cleanup/{job_id}", dependencies=[Depends(verify_authentication)])
-async def cleanup_job(job_id: str):
+def cleanup_job(job_id: str):
     """
     Clean up resources for a completed job
 
@@ -474,13 +720,14 @@ async def cleanup_job(job_id: str):
     if job_id not in active_jobs:
         raise HTTPException(status_code=404, detail="Job not found")
 
+    # Drop any of the job's work that has not started yet
+    cancel_queued_work(job_id)
+
     # Get the video path if it exists
     video_path = job_results.get(job_id)
 
-    # Remove job data from memory
-    active_jobs.pop(job_id, None)
-    job_results.pop(job_id, None)
-    job_data.pop(job_id, None)  # Clean up workflow data too
+    # Remove the job's state, logs and webhook correlation ids from the job store
+    job_store.delete_job(job_id)
 
     # Optionally, delete the video file (uncomment if desired)
     # if video_path and os.path.exists(video_path):
@@ -491,6 +738,17 @@ async def cleanup_job(job_id: str):
 
     return {"status": "success", "message": f"Cleaned up resources for job {job_id}"}
 
+def start_workflow_step(job_id: str, step: str, message: str, task) -> None:
+    """Marks a stepwise-workflow step as processing and queues its task; a rejected step goes back to pending."""
+    job_data[job_id]["steps"][step] = "processing"
+    active_jobs[job_id].append(message)
+    try:
+        submit_job(job_id, task)
+    except HTTPException:
+        job_data[job_id]["steps"][step] = "pending"
+        active_jobs[job_id].append(f"Step '{step}' not started: job queue is full")
+        raise
+
 # Helper functions for workflow status management
 def calculate_overall_status(job_data):
     """Calculate the overall status based on step statuses"""
@@ -531,7 +789,7 @@ def calculate_progress(job_data):
 # New stepwise workflow endpoints for Cloudflare integration
 
 @app.post("/workflow/init", dependencies=[Depends(verify_authentication)], response_model=WorkflowInitResponse)
-async def init_workflow(request: VideoRequest):
+def init_workflow(request: VideoRequest):
     """
     Initialize a video generation workflow and return a job ID.
     This is the first step in the workflow.
@@ -559,23 +817,18 @@ async def init_workflow(request: VideoRequest):
     return {"job_id": job_id, "status": "initialized"}
 
 @app.post("/workflow/generate_script/{job_id}", dependencies=[Depends(verify_authentication)], response_model=WorkflowResponse)
-async def workflow_generate_script(job_id: str, background_tasks: BackgroundTasks):
+def workflow_generate_script(job_id: str):
     """
     Step 1: Generate a script from the content.
     """
     if job_id not in job_data:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    # Update step status to processing
-    job_data[job_id]["steps"]["script"] = "processing"
-    active_jobs[job_id].append("Generating script...")
-
-    # Start script generation in background
-    background_tasks.add_task(generate_script_task, job_id)
+    start_workflow_step(job_id, "script", "Generating script...", generate_script_task)
 
     return {"status": "started"}
 
-async def generate_script_task(job_id: str):
+def generate_script_task(job_id: str):
     """Background task to generate script"""
     try:
         content = job_data[job_id].get("content")
@@ -605,7 +858,7 @@ async def generate_script_task(job_id: str):
         active_jobs[job_id].append(f"Error generating script: {str(e)}")
 
 @app.post("/workflow/generate_audio/{job_id}", dependencies=[Depends(verify_authentication)], response_model=WorkflowResponse)
-async def workflow_generate_audio(job_id: str, background_tasks: BackgroundTasks):
+def workflow_generate_audio(job_id: str):
     """
     Step 2: Generate audio from the script.
     """
@@ -616,16 +869,11 @@ async def workflow_generate_audio(job_id: str, background_tasks: BackgroundTasks
     if job_data[job_id]["steps"]["script"] != "completed":
         raise HTTPException(status_code=400, detail="Script generation must complete before generating audio")
 
-    # Update step status to processing
-    job_data[job_id]["steps"]["audio"] = "processing"
-    active_jobs[job_id].append("Generating audio...")
-
-    # Start audio generation in background
-    background_tasks.add_task(generate_audio_task, job_id)
+    start_workflow_step(job_id, "audio", "Generating audio...", generate_audio_task)
 
     return {"status": "started"}
 
-async def generate_audio_task(job_id: str):
+def generate_audio_task(job_id: str):
     """Background task to generate audio"""
     try:
         script = job_data[job_id].get("script")
@@ -656,7 +904,7 @@ async def generate_audio_task(job_id: str):
         active_jobs[job_id].append(f"Error generating audio: {str(e)}")
 
 @app.post("/workflow/generate_captions/{job_id}", dependencies=[Depends(verify_authentication)], response_model=WorkflowResponse)
-async def workflow_generate_captions(job_id: str, background_tasks: BackgroundTasks):
+def workflow_generate_captions(job_id: str):
     """
     Step 3: Generate captions from the audio.
     """
@@ -667,16 +915,11 @@ async def workflow_generate_captions(job_id: str, background_tasks: BackgroundTa
     if job_data[job_id]["steps"]["audio"] != "completed":
         raise HTTPException(status_code=400, detail="Audio generation must complete before generating captions")
 
-    # Update step status to processing
-    job_data[job_id]["steps"]["captions"] = "processing"
-    active_jobs[job_id].append("Generating captions...")
-
-    # Start captions generation in background
-    background_tasks.add_task(generate_captions_task, job_id)
+    start_workflow_step(job_id, "captions", "Generating captions...", generate_captions_task)
 
     return {"status": "started"}
 
-async def generate_captions_task(job_id: str):
+def generate_captions_task(job_id: str):
     """Background task to generate captions"""
     try:
         audio_path = job_data[job_id].get("audio_path")
@@ -686,7 +929,7 @@ async def generate_captions_task(job_id: str):
             raise ValueError("Audio path or script not found for this job")
 
         # Generate captions
-        captions_path = create_captions_func(audio_path, script, job_id)
+        captions_path = get_job_executor().run_render(create_captions_func, audio_path, script, job_id)
 
         if not captions_path:
             raise ValueError("Failed to generate captions")
@@ -709,7 +952,7 @@ async def generate_captions_task(job_id: str):
         active_jobs[job_id].append(f"Error generating captions: {str(e)}")
 
 @app.post("/workflow/generate_base_video/{job_id}", dependencies=[Depends(verify_authentication)], response_model=WorkflowResponse)
-async def workflow_generate_base_video(job_id: str, background_tasks: BackgroundTasks):
+def workflow_generate_base_video(job_id: str):
     """
     Step 4: Generate the base video.
     """
@@ -720,16 +963,11 @@ async def workflow_generate_base_video(job_id: str, background_tasks: Background
     if job_data[job_id]["steps"]["script"] != "completed":
         raise HTTPException(status_code=400, detail="Script generation must complete before generating base video")
 
-    # Update step status to processing
-    job_data[job_id]["steps"]["base_video"] = "processing"
-    active_jobs[job_id].append("Generating base video...")
-
-    # Start base video generation in background
-    background_tasks.add_task(generate_base_video_task, job_id)
+    start_workflow_step(job_id, "base_video", "Generating base video...", generate_base_video_task)
 
     return {"status": "started"}
 
-async def generate_base_video_task(job_id: str):
+def generate_base_video_task(job_id: str):
     """Background task to generate base video"""
     try:
         script = job_data[job_id].get("script")
@@ -738,7 +976,7 @@ async def generate_base_video_task(job_id: str):
             raise ValueError("Script not found for this job")
 
         # Generate base video
-        video_path = generate_video_func(script, job_id)
+        video_path = get_job_executor().run_render(generate_video_func, script, job_id)
 
         if not video_path or not os.path.exists(video_path):
             raise ValueError("Failed to generate base video")
@@ -761,7 +999,7 @@ async def generate_base_video_task(job_id: str):
         active_jobs[job_id].append(f"Error generating base video: {str(e)}")
 
 @app.post("/workflow/combine_final_video/{job_id}", dependencies=[Depends(verify_authentication)], response_model=WorkflowResponse)
-async def workflow_combine_final_video(job_id: str, background_tasks: BackgroundTasks):
+def workflow_combine_final_video(job_id: str):
     """
     Step 5: Combine audio, video, and captions into the final video.
     """
@@ -778,16 +1016,11 @@ async def workflow_combine_final_video(job_id: str, background_tasks: Background
     if job_data[job_id]["steps"]["captions"] != "completed":
         raise HTTPException(status_code=400, detail="Captions generation must complete before combining final video")
 
-    # Update step status to processing
-    job_data[job_id]["steps"]["final_video"] = "processing"
-    active_jobs[job_id].append("Combining final video...")
-
-    # Start final video combination in background
-    background_tasks.add_task(combine_final_video_task, job_id)
+    start_workflow_step(job_id, "final_video", "Combining final video...", combine_final_video_task)
 
     return {"status": "started"}
 
-async def combine_final_video_task(job_id: str):
+def combine_final_video_task(job_id: str):
     """Background task to combine final video"""
     try:
         base_video_path = job_data[job_id].get("base_video_path")
@@ -798,7 +1031,7 @@ async def combine_final_video_task(job_id: str):
             raise ValueError("Missing required files for final video combination")
 
         # Combine final video
-        final_video_path = combine_audio_video_captions_func(base_video_path, audio_path, captions_path, job_id)
+        final_video_path = get_job_executor().run_render(combine_audio_video_captions_func, base_video_path, audio_path, captions_path, job_id)
 
         if not final_video_path or not os.path.exists(final_video_path):
             raise ValueError("Failed to combine final video")
@@ -822,7 +1055,7 @@ async def combine_final_video_task(job_id: str):
         active_jobs[job_id].append(f"Error combining final video: {str(e)}")
 
 @app.get("/workflow/status/{job_id}", dependencies=[Depends(verify_authentication)])
-async def workflow_status(job_id: str, step: Optional[str] = None):
+def workflow_status(job_id: str, step: Optional[str] = None):
     """
     Get the current status of a workflow job.
     Optionally specify a step to get detailed status for that step.
@@ -838,7 +1071,7 @@ async def workflow_status(job_id: str, step: Optional[str] = None):
         # Return tailored status for HeyGen workflow
         # Basic example: return the whole job_data entry
         # TODO: Could format this nicer later
-        return job_info
+        return job_info.to_plain()
 
     # --- Original Workflow Status Logic (keep as is) ---
     elif step:
@@ -866,12 +1099,71 @@ async def workflow_status(job_id: str, step: Optional[str] = None):
             error=job_info.get("error")
         )
 
+# --- Webhook Deliveries ---
+# Providers redeliver a webhook when our response is slow or lost. Each delivery is recorded in the job
+# store by (provider, video_id, event): a redelivery gets the first delivery's response replayed and
+# changes nothing, and a delivery that failed or was deferred is released so its retry is processed.
+_job_locks: "weakref.WeakValueDictionary[str, threading.Lock]" = weakref.WeakValueDictionary() # A job's lock lives while someone holds or waits on it
+_job_locks_lock = threading.Lock()
+
+def job_lock(job_id: str) -> threading.Lock:
+    """Serializes the segment updates and assembly decision of a job in this process."""
+    with _job_locks_lock:
+        lock = _job_locks.get(job_id)
+        if lock is None:
+            lock = _job_locks[job_id] = threading.Lock()
+        return lock
+
+def deliver_webhook_once(provider: str, video_id: Optional[str], event_type: Optional[str], process) -> JSONResponse:
+    """
+    Runs process() for the first delivery of a provider event and records its response; later deliveries
+    of the same event get that response replayed (with an X-Webhook-Replay header) without running it.
+    Deliveries without a video id or event type cannot be matched and are always processed.
+    """
+    if not video_id or not event_type:
+        return process()
+    earlier = job_store.claim_webhook_event(provider, video_id, event_type)
+    if earlier is not None:
+        status_code, content = earlier
+        if status_code is None:
+            # The first delivery is still being processed: have the provider retry for its outcome
+            logger.info(f"{provider} webhook {event_type} for video {video_id} is already being processed.")
+            return JSONResponse(content={"status": "processing"}, status_code=409, headers={"Retry-After": "5"})
+        logger.info(f"Replaying the response to a repeated {provider} webhook {event_type} for video {video_id}.")
+        return JSONResponse(content=content, status_code=status_code, headers={"X-Webhook-Replay": "true"})
+    try:
+        response = process()
+    except Exception:
+        job_store.release_webhook_event(provider, video_id, event_type)
+        raise
+    if 200 <= response.status_code < 300:
+        job_store.complete_webhook_event(provider, video_id, event_type, response.status_code, json.loads(response.body))
+    else:
+        job_store.release_webhook_event(provider, video_id, event_type)
+    return response
+
+def assembly_deferred_response(job_id: str, e: JobQueueFullError) -> JSONResponse:
+    # Let the provider redeliver once there is capacity; the segment state is already recorded.
+    logger.warning(f"[{job_id}] Assembly deferred: {e}")
+    return JSONResponse(content={"status": "retry"}, status_code=429, headers={"Retry-After": str(e.retry_after)})
+# --- End Webhook Deliveries ---
+
 # --- HeyGen Webhook Receiver ---
 @app.post("/webhooks/heygen")
-async def handle_heygen_webhook(request: Request, background_tasks: BackgroundTasks):
+async def handle_heygen_webhook(request: Request):
     """Handle callbacks from HeyGen API v2"""
     try:
         payload = await request.json()
+    except json.JSONDecodeError:
+        raw_body = await request.body()
+        logger.error(f"Failed to decode HeyGen webhook JSON. Raw body: {raw_body.decode()}")
+        return JSONResponse(content={"status": "received"})
+    event_data = payload.get("event_data") or {}
+    # Claiming the event and processing it run SQLite transactions under a job lock; keep them off the event loop
+    return await run_in_threadpool(deliver_webhook_once, "heygen", event_data.get("video_id"), payload.get("event_type"), lambda: process_heygen_webhook(payload))
+
+def process_heygen_webhook(payload: dict) -> JSONResponse:
+    try:
         logger.info(f"Received HeyGen webhook: {payload}")
 
         # Extract key information
@@ -885,6 +1177,12 @@ async def handle_heygen_webhook(request: Request, background_tasks: BackgroundTa
             logger.warning(f"Received and ignoring HeyGen event type: {event_type} | Callback ID: {callback_id_str}")
             return JSONResponse(content={"status": "received"})
 
+        if not callback_id_str and video_id:
+            # Fall back to the video id recorded when the render was started
+            known_job = job_store.find_job_by_external_id(video_id, provider="heygen")
+            if known_job and known_job[1]:
+                callback_id_str = f"{known_job[0]}__{known_job[1]}"
+
         if not callback_id_str:
             logger.error(f"Received HeyGen webhook event {event_type} without a callback_id. Cannot update job state.")
             return JSONResponse(content={"status": "received"})
@@ -898,72 +1196,46 @@ async def handle_heygen_webhook(request: Request, background_tasks: BackgroundTa
                 return JSONResponse(content={"status": "received"})
             job_id, segment_name = parts
 
-            # Find the job and segment in our shared state
-            if job_id in job_data and segment_name in job_data[job_id].get("assets", {}).get("segments", {}):
-                segment_state = job_data[job_id]["assets"]["segments"][segment_name]
-
-                # Update job status based on the event
-                if event_type == "avatar_video.success":
-                    status = "success"
-                    video_url = event_data.get("url")
-                    segment_state["visual_status"] = "completed"
-                    segment_state["heygen_video_url"] = video_url
-                    segment_state.pop("error", None) # Clear previous error if any
-                    logger.info(f"HeyGen Success | Job: {job_id} | Segment: {segment_name} | Video ID: {video_id} | URL: {video_url}")
-                    active_jobs[job_id].append(f"[{datetime.now().isoformat()}] HeyGen video completed for {segment_name}.")
-
-                    # Check if all assets are now ready for this job
-                    if check_job_completion(job_id, job_data): # Pass job_data to checker
-                        logger.info(f"[{job_id}] All assets ready. Triggering assembly and captioning.")
-                        # Trigger assembly in the background, passing the specific job's data
-                        current_job_data_snapshot = job_data.get(job_id, {}).copy() # Get a copy of the data for the task
-                        if current_job_data_snapshot:
-                            background_tasks.add_task(run_assembly_and_captioning, job_id, current_job_data_snapshot)
+            with job_lock(job_id):
+                # Find the job and segment in our shared state
+                if job_id in job_data and segment_name in job_data[job_id].get("assets", {}).get("segments", {}):
+                    segment_state = job_data[job_id]["assets"]["segments"][segment_name]
+
+                    # Update job status based on the event
+                    if event_type == "avatar_video.success":
+                        video_url = event_data.get("url")
+                        segment_state["visual_status"] = "completed"
+                        segment_state["heygen_video_url"] = video_url
+                        segment_state.pop("error", None) # Clear previous error if any
+                        logger.info(f"HeyGen Success | Job: {job_id} | Segment: {segment_name} | Video ID: {video_id} | URL: {video_url}")
+                        active_jobs[job_id].append(f"[{datetime.now().isoformat()}] HeyGen video completed for {segment_name}.")
+
+                    elif event_type == "avatar_video.fail":
+                        # Try to get the specific message, fall back to default
+                        error_message = event_data.get("msg", event_data.get("error", "Unknown failure reason"))
+                        segment_state["visual_status"] = "failed"
+                        segment_state["error"] = error_message
+                        logger.error(f"HeyGen Failure | Job: {job_id} | Segment: {segment_name} | Video ID: {video_id} | Error: {error_message}")
+                        active_jobs[job_id].append(f"[{datetime.now().isoformat()}] Error: HeyGen video failed for {segment_name}: {error_message}")
+
+                    # Check completion and trigger assembly in the background, once per job
+                    try:
+                        if start_assembly_once(job_id):
+                            logger.info(f"[{job_id}] All assets ready. Triggered assembly and captioning.")
                         else:
-                            logger.error(f"[{job_id}] Could not retrieve job data snapshot for background task.")
-                        # TODO: Remove this warning once background task confirmed working
-                        # logger.warning(f"[{job_id}] Assembly triggering logic needs implementation (e.g., via BackgroundTasks).")
-
-                elif event_type == "avatar_video.fail":
-                    status = "failed"
-                    # Try to get the specific message, fall back to default
-                    error_message = event_data.get("msg", event_data.get("error", "Unknown failure reason"))
-                    segment_state["visual_status"] = "failed"
-                    segment_state["error"] = error_message
-                    logger.error(f"HeyGen Failure | Job: {job_id} | Segment: {segment_name} | Video ID: {video_id} | Error: {error_message}")
-                    active_jobs[job_id].append(f"[{datetime.now().isoformat()}] Error: HeyGen video failed for {segment_name}: {error_message}")
-                    # Optionally update overall job status here too
-                    # job_data[job_id]["status"] = "failed"
-                    # job_data[job_id]["error"] = f"HeyGen segment {segment_name} failed: {error_message}"
-
-                # Check completion and potentially trigger next step
-                if check_job_completion(job_id):
-                    logger.info(f"[{job_id}] All assets ready. Triggering assembly and captioning.")
-                    # Run assembly in background to avoid blocking webhook response
-                    # Need BackgroundTasks dependency here
-                    # Get BackgroundTasks instance - requires modification to endpoint signature
-                    # For now, log that it SHOULD trigger. Actual triggering needs endpoint change.
-                    logger.warning(f"[{job_id}] TODO: Need BackgroundTasks in webhook handler to trigger assembly.")
-                    # Example (requires adding background_tasks: BackgroundTasks = Depends() to endpoint):
-                    # background_tasks.add_task(run_assembly_and_captioning, job_id)
-                else:
-                    logger.info(f"[{job_id}] Job not yet ready for assembly after segment '{segment_name}' update.")
+                            logger.info(f"[{job_id}] No assembly to start after segment '{segment_name}' update.")
+                    except JobQueueFullError as e:
+                        return assembly_deferred_response(job_id, e)
 
-            else:
-                logger.error(f"Webhook received for unknown job_id '{job_id}' or segment_name '{segment_name}'. Callback ID: {callback_id_str}")
-                # Still return 200 to HeyGen, but log the error
+                else:
+                    logger.error(f"Webhook received for unknown job_id '{job_id}' or segment_name '{segment_name}'. Callback ID: {callback_id_str}")
+                    # Still return 200 to HeyGen, but log the error
 
         except Exception as e:
             logger.error(f"Error updating job state for callback_id {callback_id_str}: {e}", exc_info=True)
             # Don't return 500 to HeyGen if possible, just log our internal error
 
         # --- End Update Job State ---
-
-        # Future step: Find the job in active_jobs/job_data using callback_id and update its status
-    except json.JSONDecodeError:
-        raw_body = await request.body()
-        logger.error(f"Failed to decode HeyGen webhook JSON. Raw body: {raw_body.decode()}")
-        return JSONResponse(content={"status": "received"})
     except Exception as e:
         logger.error(f"Error processing HeyGen webhook: {e}", exc_info=True)
         # Still return 200 to HeyGen to avoid retries if possible,
@@ -984,10 +1256,19 @@ async def options_heygen_webhook():
 
 # --- Argil Webhook Receiver ---
 @app.post("/webhooks/argil")
-async def handle_argil_webhook(request: Request, background_tasks: BackgroundTasks):
+async def handle_argil_webhook(request: Request):
     """Handle callbacks from Argil API"""
     try:
         payload = await request.json()
+    except json.JSONDecodeError:
+        raw_body = await request.body()
+        logger.error(f"Failed to decode Argil webhook JSON. Raw body: {raw_body.decode()}")
+        return JSONResponse(content={"status": "error", "message": "Invalid JSON"}, status_code=400)
+    event_data = payload.get("data") or {}
+    return await run_in_threadpool(deliver_webhook_once, "argil", event_data.get("videoId"), payload.get("event"), lambda: process_argil_webhook(payload))
+
+def process_argil_webhook(payload: dict) -> JSONResponse:
+    try:
         logger.info(f"Received Argil webhook: {json.dumps(payload, indent=2)}")
 
         event_type = payload.get("event")
@@ -1001,6 +1282,15 @@ async def handle_argil_webhook(request: Request, background_tasks: BackgroundTas
             logger.warning(f"Received and ignoring Argil event type: {event_type} | Callback ID: {callback_id_str}")
             return JSONResponse(content={"status": "received", "message": "Event type ignored"})
 
+        # Hand the result to any orchestration poller waiting on this render, in whichever process it runs
+        notify_argil_video_event(video_id, event_type, event_data.get("videoUrl"))
+
+        if not callback_id_str and video_id:
+            # Fall back to the video id recorded when the render was started
+            known_job = job_store.find_job_by_external_id(video_id, provider="argil")
+            if known_job and known_job[1]:
+                callback_id_str = f"{known_job[0]}__{known_job[1]}"
+
         if not callback_id_str:
             logger.error(f"Received Argil webhook event {event_type} for video {video_id} without a callback_id in extras. Cannot update job state.")
             return JSONResponse(content={"status": "received", "message": "Missing callback_id in extras"})
@@ -1012,90 +1302,85 @@ async def handle_argil_webhook(request: Request, background_tasks: BackgroundTas
                 return JSONResponse(content={"status": "received", "message": "Invalid callback_id format"})
             job_id, segment_name = parts
 
-            # --- MODIFICATION START: Handle unknown job_id by creating a minimal entry ---
-            if job_id not in job_data:
-                logger.info(f"Argil webhook for new or externally managed job_id '{job_id}'. Creating minimal entry in job_data.")
-                job_data[job_id] = {
-                    "workflow_type": "argil_external", # Mark as externally triggered
-                    "job_id": job_id,
-                    "status": "processing_webhook", # Initial status upon first webhook
-                    "creation_time": datetime.now().isoformat(),
-                    "assets": {
-                        "segments": {}
-                    },
-                    "logs": [f"[{datetime.now().isoformat()}] First webhook received for external job. Parsed segment: {segment_name}"]
-                }
-                if job_id not in active_jobs: active_jobs[job_id] = [] # Ensure log list for active_jobs too
-                active_jobs[job_id].append(f"[{datetime.now().isoformat()}] First webhook for external job {job_id}, segment {segment_name}")
-
-            # Ensure segment entry exists
-            if "segments" not in job_data[job_id].get("assets", {}): # Should be created above if job_id was new
-                 job_data[job_id]["assets"]["segments"] = {}
-
-            if segment_name not in job_data[job_id]["assets"]["segments"]:
-                logger.info(f"Argil webhook for new segment '{segment_name}' within job_id '{job_id}'. Creating minimal segment entry.")
-                job_data[job_id]["assets"]["segments"][segment_name] = {
-                    "type": "argil", # Assume type based on webhook source
-                    "visual_status": "processing_webhook", # Initial status
-                    "argil_video_id": video_id, # Store video_id from current webhook
-                    "logs": [f"[{datetime.now().isoformat()}] First webhook received for this segment."]
-                }
-            # --- MODIFICATION END ---
-
-            if job_id in job_data and job_data[job_id].get("assets", {}).get("segments", {}).get(segment_name):
-                # Ensure the segment type is Argil, though callback_id uniqueness should handle this
-                # if job_data[job_id]["assets"]["segments"][segment_name].get("type") != "argil":
-                #     logger.warning(f"Argil webhook for non-Argil segment? Job: {job_id}, Segment: {segment_name}. Ignoring.")
-                #     return JSONResponse(content={"status": "received", "message": "Segment type mismatch"})
-
-                segment_state = job_data[job_id]["assets"]["segments"][segment_name]
-
-                if event_type == "VIDEO_GENERATION_SUCCESS":
-                    video_url = event_data.get("videoUrl") # Argil uses videoUrl
-                    segment_state["visual_status"] = "completed"
-                    segment_state["argil_video_url"] = video_url # Store the Argil video URL
-                    segment_state.pop("error", None)
-                    logger.info(f"Argil Success | Job: {job_id} | Segment: {segment_name} | Video ID: {video_id} | URL: {video_url}")
-                    if job_id not in active_jobs: active_jobs[job_id] = [] # Ensure log list exists
-                    active_jobs[job_id].append(f"[{datetime.now().isoformat()}] Argil video completed for {segment_name}.")
-
-                elif event_type == "VIDEO_GENERATION_FAILED":
-                    # Argil payload for failure might not have a specific error message in event_data directly.
-                    # The main video object (if fetched via GET /videos/{id}) might have failureReason.
-                    # For now, we'll log a generic message and the video_id.
-                    error_message = f"Argil video generation failed for videoId {video_id}. Event: {event_data.get('videoName', 'N/A')}"
-                    segment_state["visual_status"] = "failed"
-                    segment_state["error"] = error_message
-                    # Update video_id if it wasn't set at creation (e.g. first webhook for segment)
-                    segment_state["argil_video_id"] = video_id
-                    logger.error(f"Argil Failure | Job: {job_id} | Segment: {segment_name} | Video ID: {video_id} | Message: {error_message}")
-                    if job_id not in active_jobs: active_jobs[job_id] = []
-                    active_jobs[job_id].append(f"[{datetime.now().isoformat()}] Error: Argil video failed for {segment_name}: {error_message}")
-                    # Optionally update overall job status
-                    # job_data[job_id]["status"] = "failed"
-                    # job_data[job_id]["error"] = f"Argil segment {segment_name} failed: {error_message}"
-
-                # Check for overall job completion and trigger assembly if ready
-                if check_job_completion(job_id, job_data): # Pass job_data
-                    logger.info(f"[{job_id}] All assets ready after Argil segment update. Triggering assembly and captioning.")
-                    current_job_data_snapshot = job_data.get(job_id, {}).copy()
-                    if current_job_data_snapshot:
-                        background_tasks.add_task(run_assembly_and_captioning, job_id, job_data[job_id])
-                    else:
-                        logger.error(f"[{job_id}] Webhook: Could not retrieve job data snapshot for background assembly task after Argil update for job {job_id}.")
-                else:
-                    logger.info(f"[{job_id}] Job not yet ready for assembly after Argil segment '{segment_name}' update.")
+            with job_lock(job_id):
+                # --- MODIFICATION START: Handle unknown job_id by creating a minimal entry ---
+                if job_id not in job_data:
+                    logger.info(f"Argil webhook for new or externally managed job_id '{job_id}'. Creating minimal entry in job_data.")
+                    job_data[job_id] = {
+                        "workflow_type": "argil_external", # Mark as externally triggered
+                        "job_id": job_id,
+                        "status": "processing_webhook", # Initial status upon first webhook
+                        "creation_time": datetime.now().isoformat(),
+                        "assets": {
+                            "segments": {}
+                        },
+                        "logs": [f"[{datetime.now().isoformat()}] First webhook received for external job. Parsed segment: {segment_name}"]
+                    }
+                    if job_id not in active_jobs: active_jobs[job_id] = [] # Ensure log list for active_jobs too
+                    active_jobs[job_id].append(f"[{datetime.now().isoformat()}] First webhook for external job {job_id}, segment {segment_name}")
+
+                # Ensure segment entry exists
+                if "segments" not in job_data[job_id].get("assets", {}): # Should be created above if job_id was new
+                     job_data[job_id]["assets"]["segments"] = {}
+
+                if segment_name not in job_data[job_id]["assets"]["segments"]:
+                    logger.info(f"Argil webhook for new segment '{segment_name}' within job_id '{job_id}'. Creating minimal segment entry.")
+                    job_data[job_id]["assets"]["segments"][segment_name] = {
+                        "type": "argil", # Assume type based on webhook source
+                        "visual_status": "processing_webhook", # Initial status
+                        "argil_video_id": video_id, # Store video_id from current webhook
+                        "logs": [f"[{datetime.now().isoformat()}] First webhook received for this segment."]
+                    }
+                # --- MODIFICATION END ---
+
+                if job_id in job_data and job_data[job_id].get("assets", {}).get("segments", {}).get(segment_name):
+                    # Ensure the segment type is Argil, though callback_id uniqueness should handle this
+                    # if job_data[job_id]["assets"]["segments"][segment_name].get("type") != "argil":
+                    #     logger.warning(f"Argil webhook for non-Argil segment? Job: {job_id}, Segment: {segment_name}. Ignoring.")
+                    #     return JSONResponse(content={"status": "received", "message": "Segment type mismatch"})
+
+                    segment_state = job_data[job_id]["assets"]["segments"][segment_name]
+
+                    if event_type == "VIDEO_GENERATION_SUCCESS":
+                        video_url = event_data.get("videoUrl") # Argil uses videoUrl
+                        segment_state["visual_status"] = "completed"
+                        segment_state["argil_video_url"] = video_url # Store the Argil video URL
+                        segment_state.pop("error", None)
+                        logger.info(f"Argil Success | Job: {job_id} | Segment: {segment_name} | Video ID: {video_id} | URL: {video_url}")
+                        if job_id not in active_jobs: active_jobs[job_id] = [] # Ensure log list exists
+                        active_jobs[job_id].append(f"[{datetime.now().isoformat()}] Argil video completed for {segment_name}.")
+
+                    elif event_type == "VIDEO_GENERATION_FAILED":
+                        # Argil payload for failure might not have a specific error message in event_data directly.
+                        # The main video object (if fetched via GET /videos/{id}) might have failureReason.
+                        # For now, we'll log a generic message and the video_id.
+                        error_message = f"Argil video generation failed for videoId {video_id}. Event: {event_data.get('videoName', 'N/A')}"
+                        segment_state["visual_status"] = "failed"
+                        segment_state["error"] = error_message
+                        # Update video_id if it wasn't set at creation (e.g. first webhook for segment)
+                        segment_state["argil_video_id"] = video_id
+                        logger.error(f"Argil Failure | Job: {job_id} | Segment: {segment_name} | Video ID: {video_id} | Message: {error_message}")
+                        if job_id not in active_jobs: active_jobs[job_id] = []
+                        active_jobs[job_id].append(f"[{datetime.now().isoformat()}] Error: Argil video failed for {segment_name}: {error_message}")
+                        # Optionally update overall job status
+                        # job_data[job_id]["status"] = "failed"
+                        # job_data[job_id]["error"] = f"Argil segment {segment_name} failed: {error_message}"
+
+                    # Check for overall job completion and trigger assembly in the background, once per job
+                    try:
+                        if start_assembly_once(job_id):
+                            logger.info(f"[{job_id}] All assets ready after Argil segment update. Triggered assembly and captioning.")
+                        else:
+                            logger.info(f"[{job_id}] No assembly to start after Argil segment '{segment_name}' update.")
+                    except JobQueueFullError as e:
+                        return assembly_deferred_response(job_id, e)
 
-            else:
-                logger.error(f"Argil webhook received for job_id '{job_id}' segment_name '{segment_name}', but could not find/initialize state in job_data. Callback ID: {callback_id_str}")
+                else:
+                    logger.error(f"Argil webhook received for job_id '{job_id}' segment_name '{segment_name}', but could not find/initialize state in job_data. Callback ID: {callback_id_str}")
 
         except Exception as e:
             logger.error(f"Error processing Argil callback_id {callback_id_str} or updating job state: {e}", exc_info=True)
 
-    except json.JSONDecodeError:
-        raw_body = await request.body()
-        logger.error(f"Failed to decode Argil webhook JSON. Raw body: {raw_body.decode()}")
-        return JSONResponse(content={"status": "error", "message": "Invalid JSON"}, status_code=400)
     except Exception as e:
         logger.error(f"Error processing Argil webhook: {e}", exc_info=True)
         return JSONResponse(content={"status": "error", "message": "Internal server error"}, status_code=500)
@@ -1113,7 +1398,7 @@ async def options_argil_webhook():
 
 # --- Workflow Test Endpoints ---
 @app.post("/v2/workflow/heygen/start/{script_filename}", dependencies=[Depends(verify_authentication)])
-async def start_heygen_workflow_v2(script_filename: str, background_tasks: BackgroundTasks):
+def start_heygen_workflow_v2(script_filename: str):
     """
     Endpoint to trigger the HeyGen workflow.
     Uses a script filename (e.g., 'script2.md') from the 'public/' directory.
@@ -1129,13 +1414,13 @@ async def start_heygen_workflow_v2(script_filename: str, background_tasks: Backg
         logger.error(f"Script file not found at calculated path: {script_path}")
         raise HTTPException(status_code=404, detail=f"Script file '{script_filename}' not found in public directory.")
 
-    # Pass the global job_data and active_jobs dictionaries to the background task
-    background_tasks.add_task(run_heygen_workflow, job_id, script_path, job_data, active_jobs)
-    logger.info(f"Added HeyGen workflow task to background for job_id: {job_id}")
+    # The workflow task writes its state to the shared job store
+    submit_job(job_id, provider_workflow_task, "heygen", script_path)
+    logger.info(f"Queued HeyGen workflow for job_id: {job_id}")
     return {"job_id": job_id, "status": "initiated", "message": "HeyGen workflow started."}
 
 @app.post("/v2/workflow/argil/start/{script_filename}", dependencies=[Depends(verify_authentication)])
-async def start_argil_workflow_v2(script_filename: str, background_tasks: BackgroundTasks):
+def start_argil_workflow_v2(script_filename: str):
     """
     Endpoint to trigger the Argil workflow.
     Uses a script filename (e.g., 'script2.md') from the 'public/' directory.
@@ -1151,9 +1436,9 @@ async def start_argil_workflow_v2(script_filename: str, background_tasks: Backgr
         logger.error(f"Script file not found at calculated path: {script_path}")
         raise HTTPException(status_code=404, detail=f"Script file '{script_filename}' not found in public directory.")
 
-    # Pass the global job_data and active_jobs dictionaries to the background task
-    background_tasks.add_task(run_argil_workflow, job_id, script_path, job_data, active_jobs)
-    logger.info(f"Added Argil workflow task to background for job_id: {job_id}")
+    # The workflow task writes its state to the shared job store
+    submit_job(job_id, provider_workflow_task, "argil", script_path)
+    logger.info(f"Queued Argil workflow for job_id: {job_id}")
     return {"job_id": job_id, "status": "initiated", "message": "Argil workflow started."}
 
 # --- Assembly and Captioning Runner (called by webhooks after check_job_completion) ---
@@ -1189,13 +1474,15 @@ def run_assembly_and_captioning(job_id: str, current_job_data_for_assembly: Dict
         logger.info(f"[{job_id}] Running video assembly for {workflow_type} workflow.")
 
         if workflow_type == "argil":
-            raw_video_path = assemble_argil_video(
+            raw_video_path = get_job_executor().run_render(
+                assemble_argil_video,
                 job_id=job_id,
                 job_data=current_job_data_for_assembly,
                 final_output_dir=output_dir
             )
         elif workflow_type == "heygen":
-            raw_video_path = assemble_heygen_video(
+            raw_video_path = get_job_executor().run_render(
+                assemble_heygen_video,
                 job_id=job_id,
                 job_data=current_job_data_for_assembly,
                 final_output_dir=output_dir
@@ -1266,7 +1553,7 @@ def run_assembly_and_captioning(job_id: str, current_job_data_for_assembly: Dict
 
             if caption_file_path and os.path.exists(caption_file_path):
                  logger.info(f"[{job_id}] Using pre-existing SRT file for captions: {caption_file_path}")
-                 captioned_video_path = create_captions_func(raw_video_path, srt_file_path=caption_file_path)
+                 captioned_video_path = get_job_executor().run_render(create_captions_func, raw_video_path, srt_file_path=caption_file_path)
             elif current_job_data_for_assembly.get("final_video_path_raw") and script_text_for_captions: # Check if raw video audio can be used
                 logger.info(f"[{job_id}] Generating captions by transcribing raw video and aligning with script text...")
                 # This implies add_bottom_captions can take the raw video and script text
@@ -1277,7 +1564,7 @@ def run_assembly_and_captioning(job_id: str, current_job_data_for_assembly: Dict
                 # or we need a separate create_srt_from_audio function first.
                 # The current create_captions.py takes audio and script, not video.
                 # For simplicity, we'll assume add_bottom_captions can get audio from raw_video_path for Whisper.
-                captioned_video_path = create_captions_func(raw_video_path) # This will run Whisper on the raw_video_path audio
+                captioned_video_path = get_job_executor().run_render(create_captions_func, raw_video_path) # This will run Whisper on the raw_video_path audio
                 # The add_bottom_captions should also save the SRT it generates, and we should store its path.
                 # Let's assume it returns the video path AND saves SRT like: video_path.replace('.mp4', '.srt')
                 generated_srt_path = raw_video_path.replace(".mp4", ".srt")
@@ -1322,6 +1609,141 @@ def run_assembly_and_captioning(job_id: str, current_job_data_for_assembly: Dict
     logger.info(f"[{job_id}] Assembly and captioning run finished. Final job status: {current_job_data_for_assembly.get('status', 'unknown')}")
 # --- End Assembly and Captioning Runner ---
 
+# --- Job Tasks ---
+# Everything queue_task runs: called as task(job_id, *args) with JSON args, in this process or a worker.
+# State goes through the job store, so a task runs the same wherever it is picked up.
+PROVIDER_WORKFLOWS = {"heygen": run_heygen_workflow, "argil": run_argil_workflow}
+
+def video_generation_task(job_id: str, content: str) -> None:
+    run_video_generation(job_id, content)
+
+def provider_workflow_task(job_id: str, workflow_type: str, script_path: str, assemble_when_ready: bool = False) -> None:
+    """Runs the HeyGen/Argil workflow; a resumed one also starts assembly if nothing is left for webhooks to deliver."""
+    asyncio.run(PROVIDER_WORKFLOWS[workflow_type](job_id, script_path, job_data, active_jobs))
+    if assemble_when_ready:
+        submit_assembly_if_ready(job_id)
+
+_running_assemblies: set = set()
+_running_assemblies_lock = threading.Lock()
+
+def assembly_task(job_id: str) -> None:
+    """Renders a job's final video; a duplicate run (while one is running here, or after it finished) does nothing."""
+    if job_id not in job_data:
+        logger.error(f"[{job_id}] No job data to assemble.")
+        return
+    with _running_assemblies_lock:
+        if job_id in _running_assemblies:
+            logger.warning(f"[{job_id}] Assembly is already running; skipping the duplicate run.")
+            return
+        _running_assemblies.add(job_id)
+    try:
+        job_record = job_data[job_id]
+        if job_record.get("status") in TERMINAL_STATUSES:
+            logger.info(f"[{job_id}] Assembly already finished with status '{job_record.get('status')}'; not rendering again.")
+            return
+        run_assembly_and_captioning(job_id, job_record)
+    finally:
+        with _running_assemblies_lock:
+            _running_assemblies.discard(job_id)
+
+JOB_TASKS = {task.__name__: task for task in (
+    video_generation_task,
+    generate_script_task,
+    generate_audio_task,
+    generate_captions_task,
+    generate_base_video_task,
+    combine_final_video_task,
+    provider_workflow_task,
+    assembly_task,
+)}
+
+# --- Resuming Interrupted Jobs ---
+WORKFLOW_STEP_TASKS = {
+    "script": generate_script_task,
+    "audio": generate_audio_task,
+    "captions": generate_captions_task,
+    "base_video": generate_base_video_task,
+    "final_video": combine_final_video_task,
+}
+
+def start_assembly_once(job_id: str) -> bool:
+    """
+    Queues assembly for a provider workflow job whose assets are all settled, at most once per job.
+
+    The job moves to "assembling" in the store before it is queued, atomically, so of the webhooks,
+    resumed workflows and server processes that find it ready at the same time exactly one queues it.
+
+    Returns:
+        True if this call queued the assembly.
+
+    Raises:
+        JobQueueFullError: When the queue is full; the job is moved back, so a later trigger can start it.
+    """
+    if not check_job_completion(job_id, job_data):
+        return False
+    previous_status = job_store.transition_status(job_id, "assembling", unless=ASSEMBLY_STARTED_STATUSES)
+    if previous_status is None:
+        logger.info(f"[{job_id}] Assembly was already started; ignoring the repeated trigger.")
+        return False
+    try:
+        queue_task(job_id, assembly_task)
+    except JobQueueFullError:
+        job_store.transition_status(job_id, previous_status, from_statuses=("assembling",))
+        raise
+    return True
+
+def submit_assembly_if_ready(job_id: str) -> None:
+    """Queues assembly for a provider workflow job once all its assets are settled."""
+    try:
+        with job_lock(job_id):
+            if not start_assembly_once(job_id):
+                logger.info(f"[{job_id}] Resumed workflow finished; waiting for provider webhooks before assembly.")
+    except JobQueueFullError as e:
+        logger.error(f"[{job_id}] Could not queue assembly: {e}")
+
+def resume_interrupted_jobs() -> None:
+    """
+    Resumes jobs a previous server process left unfinished, from their last completed stage.
+
+    - Stepwise jobs re-run the step that was processing; completed steps are kept.
+    - HeyGen/Argil jobs whose assets are all settled (or that were assembling) re-run assembly.
+      Otherwise the workflow re-runs, keeping segments whose audio and avatar render already exist.
+    - create_tiktok jobs run as one unit and are marked interrupted.
+    """
+    for job in job_store.list_unfinished_jobs():
+        job_id, data = job["job_id"], job["data"]
+        if not job_store.claim_for_resume(job_id):
+            continue # Another worker is resuming it
+        try:
+            if data is None:
+                job_store.set_status(job_id, "interrupted")
+                active_jobs[job_id].append(f"[{datetime.now().isoformat()}] Interrupted by a server restart. Start a new job to retry.")
+                continue
+
+            if "steps" in data:
+                for step, status in data["steps"].items():
+                    if status == "processing" and step in WORKFLOW_STEP_TASKS:
+                        active_jobs[job_id].append(f"[{datetime.now().isoformat()}] Resuming step '{step}' after a server restart.")
+                        queue_task(job_id, WORKFLOW_STEP_TASKS[step])
+                continue
+
+            workflow_type, status = data.get("workflow_type"), data.get("status")
+            if workflow_type not in PROVIDER_WORKFLOWS:
+                continue # External jobs are driven by webhooks alone
+            if status in ("assembling", "captioning", "assembly_complete"):
+                active_jobs[job_id].append(f"[{datetime.now().isoformat()}] Resuming assembly after a server restart.")
+                queue_task(job_id, assembly_task)
+            elif start_assembly_once(job_id):
+                active_jobs[job_id].append(f"[{datetime.now().isoformat()}] Starting assembly after a server restart.")
+            elif data.get("input_script_path"):
+                active_jobs[job_id].append(f"[{datetime.now().isoformat()}] Resuming workflow after a server restart; finished segments are kept.")
+                queue_task(job_id, provider_workflow_task, workflow_type, data["input_script_path"], True)
+            logger.info(f"[{job_id}] Resumed {workflow_type} job from status '{status}' (last completed stage: {job['stage']}).")
+        except JobQueueFullError as e:
+            logger.error(f"[{job_id}] Could not resume job, the job queue is full: {e}")
+        except Exception as e:
+            logger.error(f"[{job_id}] Could not resume job: {e}", exc_info=True)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("backend.text_to_video.main:app", host="0.0.0.0", port=8000, reload=True)
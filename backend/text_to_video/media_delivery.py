@@ -0,0 +1,225 @@
+import os
+import re
+import shutil
+import asyncio
+import logging
+import threading
+import subprocess
+from email.utils import formatdate
+from pathlib import Path
+from typing import Iterator, Optional
+from urllib.parse import quote
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+from backend.text_to_video.media_store import _file_sha256
+from backend.text_to_video.tracing import span
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- Delivery Configuration ---
+VIDEO_CACHE_CONTROL = os.getenv("VIDEO_CACHE_CONTROL", "private, no-cache") # Clients revalidate with the ETag; unchanged videos answer 304
+HLS_ENABLED = os.getenv("VIDEO_HLS_ENABLED", "true").lower() in ("1", "true", "yes")
+HLS_SEGMENT_SECONDS = int(os.getenv("HLS_SEGMENT_SECONDS", "6"))
+STREAM_CHUNK_SIZE = 256 * 1024
+
+HLS_PLAYLIST = "index.m3u8"
+HLS_MEDIA_TYPES = {".m3u8": "application/vnd.apple.mpegurl", ".ts": "video/mp2t"}
+_HLS_FILE_PATTERN = re.compile(r"^(index\.m3u8|segment_\d{5}\.ts)$")
+
+_etag_cache: dict[str, tuple[int, int, str]] = {} # path -> (size, mtime_ns, etag)
+_etag_lock = threading.Lock()
+_package_locks: dict[str, threading.Lock] = {}
+_package_locks_lock = threading.Lock()
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised by parse_range when no byte of the requested range exists."""
+
+
+class HLSPackagingError(Exception):
+    """Raised by package_hls when ffmpeg is missing or cannot segment the video."""
+
+
+def file_etag(path: str | Path) -> str:
+    """
+    Strong ETag of a file's content (quoted sha256 prefix). Hashed once per file version; the version is
+    recognised by size and modification time, so a re-rendered file gets a new ETag.
+    """
+    path = str(path)
+    stat = os.stat(path)
+    with _etag_lock:
+        cached = _etag_cache.get(path)
+    if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return cached[2]
+    etag = f'"{_file_sha256(Path(path))[:32]}"'
+    with _etag_lock:
+        _etag_cache[path] = (stat.st_size, stat.st_mtime_ns, etag)
+    return etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match evaluation (weak comparison, as RFC 9110 requires for it)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """
+    Parses a single-range "bytes=" Range header into inclusive (start, end) offsets.
+
+    Returns None when the whole file should be sent: no header, a header this parser ignores (other
+    units, malformed, or several ranges), as RFC 9110 allows.
+
+    Raises:
+        RangeNotSatisfiable: If the range starts beyond the end of the file.
+    """
+    if not range_header:
+        return None
+    match = re.fullmatch(r"\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*", range_header)
+    if not match or (not match.group(1) and not match.group(2)):
+        return None
+    first, last = match.groups()
+    if not first: # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable(range_header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(range_header)
+    return start, end
+
+
+def _iter_file(path: str | Path, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+async def media_response(request: Request, path: str | Path, media_type: str, filename: Optional[str] = None,
+                         cache_control: str = VIDEO_CACHE_CONTROL) -> Response:
+    """
+    Serves a file with validators and byte ranges: 304 when If-None-Match matches its ETag, 206 with
+    Content-Range for a satisfiable Range (honouring If-Range), 416 for an unsatisfiable one, otherwise
+    200 with the whole file. The body is streamed in chunks; HEAD gets the headers only.
+    """
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = await asyncio.to_thread(file_etag, path) # Hashing a new file version is blocking work
+    headers = {
+        "etag": etag,
+        "cache-control": cache_control,
+        "accept-ranges": "bytes",
+        "last-modified": formatdate(stat.st_mtime, usegmt=True),
+    }
+    if filename:
+        quoted = quote(filename)
+        headers["content-disposition"] = f'attachment; filename="{filename}"' if quoted == filename else f"attachment; filename*=utf-8''{quoted}"
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and if_range and if_range.strip() != etag:
+        range_header = None # The client's partial copy is of another version: send it all
+    try:
+        byte_range = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+
+    status_code, (start, end) = (206, byte_range) if byte_range else (200, (0, size - 1))
+    headers["content-length"] = str(end - start + 1)
+    if byte_range:
+        headers["content-range"] = f"bytes {start}-{end}/{size}"
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+    return StreamingResponse(_iter_file(path, start, end), status_code=status_code, headers=headers, media_type=media_type)
+
+
+def _package_lock(video_path: Path) -> threading.Lock:
+    with _package_locks_lock:
+        return _package_locks.setdefault(str(video_path), threading.Lock())
+
+
+def package_hls(video_path: str | Path) -> Path:
+    """
+    Returns the directory holding the video's HLS package (index.m3u8 plus segment_NNNNN.ts), packaging
+    it on first use with ffmpeg stream copy (no re-encode).
+
+    Packages are cached next to the MP4 in <video>.hls/<content hash>/, so a re-rendered video gets a new
+    package and older ones are removed. Concurrent first requests package once.
+
+    Raises:
+        HLSPackagingError: If ffmpeg is not installed or fails.
+    """
+    video_path = Path(video_path)
+    package_dir = Path(f"{video_path}.hls") / file_etag(video_path).strip('"')[:16]
+    if (package_dir / HLS_PLAYLIST).exists():
+        return package_dir
+
+    with _package_lock(video_path):
+        if (package_dir / HLS_PLAYLIST).exists():
+            return package_dir
+        staging_dir = package_dir.with_name(f"{package_dir.name}.tmp{os.getpid()}")
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        staging_dir.mkdir(parents=True)
+        command = [
+            "ffmpeg", "-y", "-v", "error", "-i", str(video_path),
+            "-c", "copy", "-f", "hls", "-hls_time", str(HLS_SEGMENT_SECONDS), "-hls_playlist_type", "vod",
+            "-hls_segment_filename", str(staging_dir / "segment_%05d.ts"), str(staging_dir / HLS_PLAYLIST),
+        ]
+        logger.info(f"Packaging {video_path.name} as HLS (stream copy)...")
+        try:
+            with span("ffmpeg hls", "ffmpeg", video=video_path.name):
+                subprocess.run(command, capture_output=True, text=True, check=True)
+        except FileNotFoundError:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise HLSPackagingError("ffmpeg is not installed")
+        except subprocess.CalledProcessError as e:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise HLSPackagingError(f"ffmpeg failed to package {video_path.name}: {e.stderr.strip()[-500:]}")
+
+        try:
+            staging_dir.rename(package_dir)
+        except OSError:
+            shutil.rmtree(staging_dir, ignore_errors=True) # Another process packaged the same version first
+        for stale_dir in package_dir.parent.iterdir():
+            if stale_dir != package_dir and ".tmp" not in stale_dir.name: # Leave other processes' staging dirs alone
+                shutil.rmtree(stale_dir, ignore_errors=True)
+        logger.info(f"HLS package ready at {package_dir}.")
+    return package_dir
+
+
+async def hls_response(request: Request, video_path: str | Path, name: str) -> Response:
+    """
+    Serves a file of the video's HLS package (see package_hls) through media_response.
+
+    Raises:
+        FileNotFoundError: If name is not a file of the package.
+        HLSPackagingError: If the package cannot be built.
+    """
+    if not _HLS_FILE_PATTERN.match(name):
+        raise FileNotFoundError(name)
+    package_dir = await asyncio.to_thread(package_hls, video_path)
+    file_path = package_dir / name
+    if not file_path.exists():
+        raise FileNotFoundError(name)
+    return await media_response(request, file_path, HLS_MEDIA_TYPES[file_path.suffix])
@@ -0,0 +1,248 @@
+import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+from backend.text_to_video.tracing import event
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- Store Configuration ---
+DEFAULT_STORE_DIR = Path(__file__).resolve().parent.parent / "assets" / "media_store"
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024 * 1024 # 20 GB disk budget for stored media
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MediaStore:
+    """
+    Shared, content-addressed store for downloaded stock media.
+
+    Files are stored once under objects/<hash prefix>/<sha256><ext> and indexed twice in SQLite:
+    by content hash (size, last access) and by (provider, asset id, rendition). Job directories
+    receive hardlinks (or copies where hardlinks are unsupported), so a repeat asset costs no
+    bandwidth and only one copy lives on disk. Least recently used blobs are evicted when the
+    store grows past its disk budget.
+    """
+
+    def __init__(self, store_dir: str | Path = DEFAULT_STORE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.store_dir = Path(store_dir)
+        self.objects_dir = self.store_dir / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.store_dir / "index.sqlite3"
+        self.max_bytes = max_bytes
+        self._key_locks: dict[tuple, threading.Lock] = {}
+        self._key_locks_guard = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "bytes_saved": 0}
+        self._init_index()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_index(self) -> None:
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    content_hash TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )""")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS assets (
+                    provider TEXT NOT NULL,
+                    asset_id TEXT NOT NULL,
+                    rendition TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    PRIMARY KEY (provider, asset_id, rendition)
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_blobs_last_access ON blobs(last_access)")
+
+    def _key_lock(self, key: tuple) -> threading.Lock:
+        with self._key_locks_guard:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def lookup(self, provider: str, asset_id: str | int, rendition: str) -> Optional[Path]:
+        """Returns the stored file for a provider asset rendition, or None if it is not in the store."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT b.content_hash, b.path FROM assets a JOIN blobs b ON a.content_hash = b.content_hash "
+                "WHERE a.provider = ? AND a.asset_id = ? AND a.rendition = ?",
+                (provider, str(asset_id), rendition),
+            ).fetchone()
+            if not row:
+                return None
+            content_hash, stored_path = row
+            if not Path(stored_path).exists():
+                logger.warning(f"Media store entry for {provider}:{asset_id}:{rendition} points to a missing file. Dropping it.")
+                conn.execute("DELETE FROM blobs WHERE content_hash = ?", (content_hash,))
+                conn.execute("DELETE FROM assets WHERE content_hash = ?", (content_hash,))
+                return None
+            conn.execute("UPDATE blobs SET last_access = ? WHERE content_hash = ?", (time.time(), content_hash))
+            return Path(stored_path)
+
+    def add_file(self, source_path: str | Path, provider: str = None, asset_id: str | int = None, rendition: str = None) -> Path:
+        """
+        Moves a downloaded file into the store (deduplicating by content hash) and indexes it.
+
+        Returns:
+            The path of the stored object.
+        """
+        source_path = Path(source_path)
+        content_hash = _file_sha256(source_path)
+        size = source_path.stat().st_size
+        now = time.time()
+
+        with self._connect() as conn:
+            row = conn.execute("SELECT path FROM blobs WHERE content_hash = ?", (content_hash,)).fetchone()
+            if row and Path(row[0]).exists():
+                stored_path = Path(row[0])
+                source_path.unlink()
+                logger.info(f"Media store already holds content {content_hash[:12]} ({size} bytes). Deduplicated.")
+                conn.execute("UPDATE blobs SET last_access = ? WHERE content_hash = ?", (now, content_hash))
+            else:
+                stored_path = self.objects_dir / content_hash[:2] / f"{content_hash}{source_path.suffix.lower()}"
+                stored_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(str(source_path), stored_path)
+                conn.execute(
+                    "INSERT OR REPLACE INTO blobs (content_hash, path, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (content_hash, str(stored_path), size, now, now),
+                )
+            if provider and asset_id is not None and rendition:
+                conn.execute(
+                    "INSERT OR REPLACE INTO assets (provider, asset_id, rendition, content_hash) VALUES (?, ?, ?, ?)",
+                    (provider, str(asset_id), rendition, content_hash),
+                )
+
+        self.evict_to_budget()
+        return stored_path
+
+    @staticmethod
+    def materialize(stored_path: Path, dest_path: str | Path) -> str:
+        """Places a stored object at dest_path via hardlink, falling back to a copy across filesystems."""
+        dest_path = Path(dest_path)
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        if dest_path.exists():
+            dest_path.unlink()
+        try:
+            os.link(stored_path, dest_path)
+        except OSError:
+            shutil.copy2(stored_path, dest_path)
+        return str(dest_path)
+
+    def fetch(
+        self,
+        provider: str,
+        asset_id: str | int,
+        rendition: str,
+        dest_path: str | Path,
+        download_fn: Callable[[str], bool],
+    ) -> Optional[str]:
+        """
+        Places the requested asset rendition at dest_path, downloading it only if the store does not have it.
+
+        Args:
+            provider: Provider name, e.g. "pexels" or "pixabay".
+            asset_id: The provider's id for the asset.
+            rendition: Identifies the file variant (e.g. "1080x1920" or "large").
+            dest_path: Where the job expects the file.
+            download_fn: Called with a temporary path to download into on a miss; returns True on success.
+
+        Returns:
+            dest_path as a string on success, otherwise None.
+        """
+        with self._key_lock((provider, str(asset_id), rendition)):
+            stored_path = self.lookup(provider, asset_id, rendition)
+            if stored_path:
+                self.stats["hits"] += 1
+                self.stats["bytes_saved"] += stored_path.stat().st_size
+                event("media_store hit", "cache", provider=provider, asset_id=str(asset_id), cache_hit=True, bytes=stored_path.stat().st_size)
+                logger.info(f"Media store hit for {provider} asset {asset_id} ({rendition}). Linking into {dest_path}.")
+                return self.materialize(stored_path, dest_path)
+
+            self.stats["misses"] += 1
+            event("media_store miss", "cache", provider=provider, asset_id=str(asset_id), cache_hit=False)
+            temp_path = self.store_dir / "incoming" / f"{provider}_{asset_id}_{threading.get_ident()}{Path(dest_path).suffix}"
+            temp_path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                if not download_fn(str(temp_path)) or not temp_path.exists() or temp_path.stat().st_size == 0:
+                    return None
+                stored_path = self.add_file(temp_path, provider, asset_id, rendition)
+                return self.materialize(stored_path, dest_path)
+            finally:
+                if temp_path.exists():
+                    try: temp_path.unlink()
+                    except OSError: pass
+
+    def total_bytes(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def evict_to_budget(self) -> int:
+        """Deletes least recently accessed blobs until the store fits its disk budget. Returns bytes freed."""
+        freed = 0
+        with self._connect() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            for content_hash, stored_path, size in conn.execute(
+                "SELECT content_hash, path, size FROM blobs ORDER BY last_access ASC"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                try:
+                    Path(stored_path).unlink()
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"Could not evict media store object {stored_path}: {e}")
+                    continue
+                conn.execute("DELETE FROM blobs WHERE content_hash = ?", (content_hash,))
+                conn.execute("DELETE FROM assets WHERE content_hash = ?", (content_hash,))
+                total -= size
+                freed += size
+        if freed:
+            logger.info(f"Evicted {freed} bytes from the media store to stay within its {self.max_bytes} byte budget.")
+        return freed
+
+
+_default_store: Optional[MediaStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_media_store() -> Optional[MediaStore]:
+    """
+    Returns the process-wide media store configured from the environment, or None if disabled.
+
+    Environment:
+        STOCK_MEDIA_STORE_DISABLED: Set to "1"/"true" to download straight into job directories.
+        STOCK_MEDIA_STORE_DIR: Root directory of the store.
+        STOCK_MEDIA_STORE_MAX_BYTES: Disk budget before LRU eviction.
+    """
+    global _default_store
+    if os.getenv("STOCK_MEDIA_STORE_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = MediaStore(
+                store_dir=os.getenv("STOCK_MEDIA_STORE_DIR", str(DEFAULT_STORE_DIR)),
+                max_bytes=int(os.getenv("STOCK_MEDIA_STORE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+            )
+        return _default_store
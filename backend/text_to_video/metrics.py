@@ -0,0 +1,511 @@
+import os
+import copy
+import time
+import inspect
+import logging
+import functools
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Optional
+
+from backend.text_to_video.tracing import span, current_span, record_span
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- Metrics Configuration ---
+METRICS_NAMESPACE = "wanx"
+STAGE_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600) # Seconds; stages run from seconds to tens of minutes
+REQUEST_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120) # Seconds; HTTP and provider requests
+
+# A collector returns samples computed at scrape time: [(name, type, help, [(labels, value), ...]), ...]
+Collector = Callable[[], Iterable[tuple[str, str, str, list[tuple[dict, float]]]]]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """A named metric family; one series per combination of label values."""
+
+    type = ""
+
+    def __init__(self, name: str, help: str, label_names: tuple = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._series: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _labels(self, key: tuple) -> dict:
+        return dict(zip(self.label_names, key))
+
+    def samples(self) -> list[tuple[str, dict, float]]:
+        raise NotImplementedError
+
+    def state(self) -> dict:
+        with self._lock:
+            return copy.deepcopy(self._series)
+
+    def changes_since(self, before: dict) -> dict:
+        """The series that changed since state() returned before, as deltas merge() can apply elsewhere."""
+        with self._lock:
+            return {key: change for key, series in self._series.items()
+                    if (change := self._change(before.get(key), series)) is not None}
+
+    def merge(self, changes: dict) -> None:
+        with self._lock:
+            for key, change in changes.items():
+                self._series[key] = self._apply(self._series.get(key), change)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for name, labels, value in self.samples())
+        return lines
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._series.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in sorted(self._series.items())]
+
+    @staticmethod
+    def _change(before, value):
+        return value - (before or 0) if value != (before or 0) else None
+
+    @staticmethod
+    def _apply(current, change):
+        return (current or 0) + change
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+    @staticmethod
+    def _change(before, value):
+        return value if value != before else None
+
+    @staticmethod
+    def _apply(current, change):
+        return change
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, label_names: tuple = (), buckets: tuple = REQUEST_BUCKETS):
+        super().__init__(name, help, label_names)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][index] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series["count"] if series else 0
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                labels, cumulative = self._labels(key), 0
+                for bound, bucket_count in zip(self.buckets, series["buckets"]):
+                    cumulative += bucket_count
+                    samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+                samples.append((f"{self.name}_sum", labels, series["sum"]))
+                samples.append((f"{self.name}_count", labels, series["count"]))
+        return samples
+
+    @staticmethod
+    def _change(before, series):
+        before = before or {"buckets": [0] * len(series["buckets"]), "sum": 0.0, "count": 0}
+        if series["count"] == before["count"]:
+            return None
+        return {
+            "buckets": [now - then for now, then in zip(series["buckets"], before["buckets"])],
+            "sum": series["sum"] - before["sum"],
+            "count": series["count"] - before["count"],
+        }
+
+    @staticmethod
+    def _apply(current, change):
+        if current is None:
+            return copy.deepcopy(change)
+        return {
+            "buckets": [now + added for now, added in zip(current["buckets"], change["buckets"])],
+            "sum": current["sum"] + change["sum"],
+            "count": current["count"] + change["count"],
+        }
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics in the Prometheus text exposition format.
+
+    Metrics updated as work happens (counters, gauges, histograms) live here; figures that other
+    components already keep (job counts, cache stats, rate limiter state) are read by collectors at
+    scrape time instead of being mirrored. Work done in child processes (renders) is recorded in the
+    child's registry and merged into this one: the child sends changes_since() deltas, and sources
+    added with add_source are drained before every render so a scrape never misses finished work.
+    """
+
+    def __init__(self, namespace: str = METRICS_NAMESPACE):
+        self.namespace = namespace
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Collector] = []
+        self._sources: list[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                return self._metrics[metric.name]
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        return self._register(Counter(f"{self.namespace}_{name}", help, labels))
+
+    def gauge(self, name: str, help: str, labels: tuple = ()) -> Gauge:
+        return self._register(Gauge(f"{self.namespace}_{name}", help, labels))
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = REQUEST_BUCKETS) -> Histogram:
+        return self._register(Histogram(f"{self.namespace}_{name}", help, labels, buckets))
+
+    def add_collector(self, collector: Collector) -> None:
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def add_source(self, source: Callable[[], None]) -> None:
+        """Adds a callable that merges metrics recorded in other processes into this registry, run before each render."""
+        with self._lock:
+            if source not in self._sources:
+                self._sources.append(source)
+
+    def remove_source(self, source: Callable[[], None]) -> None:
+        with self._lock:
+            if source in self._sources:
+                self._sources.remove(source)
+
+    def state(self) -> dict:
+        """Copy of every metric's series, to diff against later with changes_since."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.state() for metric in metrics}
+
+    def changes_since(self, before: dict) -> dict:
+        """Picklable deltas of what was recorded since state() returned before: {metric name: {series: delta}}."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        changes = {}
+        for metric in metrics:
+            metric_changes = metric.changes_since(before.get(metric.name, {}))
+            if metric_changes:
+                changes[metric.name] = metric_changes
+        return changes
+
+    def merge(self, changes: dict) -> None:
+        """Applies deltas from another process's changes_since (counters and histograms add up, gauges take the new value)."""
+        with self._lock:
+            metrics = dict(self._metrics)
+        for name, metric_changes in changes.items():
+            metric = metrics.get(name)
+            if metric is None:
+                logger.debug(f"Dropping changes to metric {name}, which is not registered in this process.")
+                continue
+            metric.merge(metric_changes)
+
+    def render(self) -> str:
+        with self._lock:
+            sources = list(self._sources)
+        for source in sources:
+            try:
+                source()
+            except Exception as e:
+                logger.warning(f"Metrics source {getattr(source, '__name__', source)} failed: {e}")
+        with self._lock:
+            metrics, collectors = list(self._metrics.values()), list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+                continue
+            for name, metric_type, help, samples in families:
+                full_name = f"{self.namespace}_{name}"
+                lines.append(f"# HELP {full_name} {help}")
+                lines.append(f"# TYPE {full_name} {metric_type}")
+                lines.extend(f"{full_name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram("stage_duration_seconds", "Wall time of pipeline stages.", ("stage",), STAGE_BUCKETS)
+STAGE_FAILURES = REGISTRY.counter("stage_failures_total", "Pipeline stages that raised or returned no result.", ("stage",))
+PROVIDER_SECONDS = REGISTRY.histogram("provider_request_duration_seconds", "Latency of external provider requests.", ("provider",))
+PROVIDER_REQUESTS = REGISTRY.counter("provider_requests_total", "External provider requests by outcome (ok, error, rate_limited, exception).", ("provider", "outcome"))
+HTTP_SECONDS = REGISTRY.histogram("http_request_duration_seconds", "API request latency until response headers.", ("method", "route"))
+HTTP_REQUESTS = REGISTRY.counter("http_requests_total", "API requests by route and status code.", ("method", "route", "status"))
+RENDER_FRAMES = REGISTRY.counter("render_frames_total", "Frames encoded, by encode pass.", ("encode",))
+RENDER_SECONDS = REGISTRY.counter("render_seconds_total", "Wall time spent encoding, by encode pass (frames / seconds = fps).", ("encode",))
+RENDER_FPS = REGISTRY.gauge("render_fps", "Encode speed of the last pass, in frames per wall second.", ("encode",))
+ENCODED_BYTES = REGISTRY.counter("encoded_bytes_total", "Bytes of encoded output, by encode pass.", ("encode",))
+DOWNLOADED_BYTES = REGISTRY.counter("downloaded_bytes_total", "Bytes downloaded, by source.", ("source",))
+
+
+class observe_stage:
+    """
+    Times a pipeline stage into STAGE_SECONDS, as a context manager or as a decorator (sync or async),
+    and traces it as a span of the current job.
+
+    Stage names: script, tts, transcription, planning, orchestration, render, captions. Failures are
+    counted in STAGE_FAILURES: an exception, or, for decorated functions, a None or False result (how
+    the stage functions in this codebase report failure).
+
+    Args:
+        detached: Record the span when the stage ends instead of making it the current span, for stages
+                  that yield to their consumer (a generator), whose own spans must not nest under them.
+    """
+
+    def __init__(self, stage: str, detached: bool = False):
+        self.stage = stage
+        self.detached = detached
+        self._start = 0.0
+        self._start_ns = 0
+        self._span = None
+
+    def __enter__(self):
+        if not self.detached:
+            self._span = span(self.stage, "stage")
+            self._span.__enter__()
+        self._start_ns = time.time_ns()
+        self._start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.monotonic() - self._start
+        STAGE_SECONDS.observe(elapsed, stage=self.stage)
+        if exc_type is not None:
+            STAGE_FAILURES.inc(stage=self.stage)
+        if self._span is not None:
+            self._span.__exit__(exc_type, exc, tb)
+        else:
+            record_span(self.stage, "stage", self._start_ns, int(elapsed * 1e9), f"{exc_type.__name__}: {exc}" if exc_type else None)
+        return False
+
+    def _record_result(self, result):
+        if result is None or result is False:
+            STAGE_FAILURES.inc(stage=self.stage)
+            current_span().set_attribute("failed", True)
+        return result
+
+    def __call__(self, fn: Callable) -> Callable:
+        stage = self.stage
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with observe_stage(stage) as observed:
+                    return observed._record_result(await fn(*args, **kwargs))
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with observe_stage(stage) as observed:
+                return observed._record_result(fn(*args, **kwargs))
+        return wrapper
+
+
+def record_provider_request(provider: str, seconds: float, outcome: str) -> None:
+    PROVIDER_SECONDS.observe(seconds, provider=provider)
+    PROVIDER_REQUESTS.inc(provider=provider, outcome=outcome)
+
+
+def outcome_for_status(status_code) -> str:
+    """Provider request outcome for an HTTP status code."""
+    if status_code == 429:
+        return "rate_limited"
+    if isinstance(status_code, int) and status_code >= 400:
+        return "error"
+    return "ok"
+
+
+@contextmanager
+def observe_provider(provider: str) -> Iterator[None]:
+    """Times (and traces) a provider call made through an SDK (no status code): ok unless it raises."""
+    start = time.monotonic()
+    outcome = "exception"
+    try:
+        with span(provider, "provider"):
+            yield
+        outcome = "ok"
+    finally:
+        record_provider_request(provider, time.monotonic() - start, outcome)
+
+
+@contextmanager
+def encode_pass(encode: str, output_path: str, duration: Optional[float], fps: Optional[float]) -> Iterator[None]:
+    """
+    Records frames, wall time, speed and output bytes of one video encode (e.g. a write_videofile call),
+    and traces it as a span with the same figures.
+    """
+    with span(f"encode {encode}", "encode", output=os.path.basename(str(output_path))) as encode_span:
+        start = time.monotonic()
+        yield
+        elapsed = max(time.monotonic() - start, 1e-6)
+        frames = (duration or 0) * (fps or 0)
+        RENDER_FRAMES.inc(frames, encode=encode)
+        RENDER_SECONDS.inc(elapsed, encode=encode)
+        RENDER_FPS.set(round(frames / elapsed, 2), encode=encode)
+        encode_span.set_attribute("frames", int(frames))
+        encode_span.set_attribute("fps", round(frames / elapsed, 2))
+        try:
+            size = os.path.getsize(output_path)
+        except OSError:
+            return
+        ENCODED_BYTES.inc(size, encode=encode)
+        encode_span.set_attribute("bytes", size)
+
+
+def record_download(source: str, path_or_bytes) -> None:
+    """Adds a finished download to DOWNLOADED_BYTES; takes the byte count or the downloaded file's path."""
+    try:
+        size = path_or_bytes if isinstance(path_or_bytes, int) else os.path.getsize(path_or_bytes)
+    except OSError:
+        return
+    DOWNLOADED_BYTES.inc(size, source=source)
+    current_span().add("downloaded_bytes", size)
+
+
+def _cache_samples():
+    # Imported here: these modules report into this one
+    from backend.text_to_video.search_cache import get_search_cache
+    from backend.text_to_video.media_store import get_media_store
+    from backend.text_to_video.llm_clients.response_cache import get_llm_response_cache
+
+    requests, ratios = [], []
+    for cache_name, get_cache in (("search", get_search_cache), ("media_store", get_media_store), ("llm_response", get_llm_response_cache)):
+        cache = get_cache()
+        if cache is None:
+            continue
+        stats = dict(cache.stats)
+        hits = stats.get("hits", 0) + stats.get("stale_hits", 0)
+        total = hits + stats.get("misses", 0)
+        requests.extend([({"cache": cache_name, "result": "hit"}, stats.get("hits", 0)), ({"cache": cache_name, "result": "miss"}, stats.get("misses", 0))])
+        if "stale_hits" in stats:
+            requests.append(({"cache": cache_name, "result": "stale_hit"}, stats["stale_hits"]))
+        ratios.append(({"cache": cache_name}, round(hits / total, 4) if total else 0))
+    return [
+        ("cache_requests_total", "counter", "Cache lookups by result.", requests),
+        ("cache_hit_ratio", "gauge", "Share of cache lookups served from the cache since start.", ratios),
+    ]
+
+
+def _rate_limit_samples():
+    from backend.text_to_video.rate_limiter import rate_limit_metrics
+
+    services = rate_limit_metrics()
+    def _samples(key):
+        return [({"service": service}, figures.get(key, 0)) for service, figures in services.items()]
+    return [
+        ("rate_limit_requests_total", "counter", "Requests that acquired a rate limiter token.", _samples("requests")),
+        ("rate_limit_throttled_total", "counter", "Requests that had to wait for a token.", _samples("throttled")),
+        ("rate_limit_rejections_total", "counter", "429 responses received.", _samples("rate_limited_responses")),
+        ("rate_limit_queued", "gauge", "Requests waiting for a token now.", _samples("queued_now")),
+        ("rate_limit_tokens", "gauge", "Tokens available now.", _samples("tokens")),
+        ("rate_limit_blocked_seconds", "gauge", "Seconds until a service blocked by a 429 may be called again.", _samples("blocked_for_seconds")),
+        ("rate_limit_queue_seconds", "gauge", "Recent token wait time by quantile.",
+         [({"service": service, "quantile": quantile}, figures.get(key, 0)) for service, figures in services.items()
+          for quantile, key in (("0.5", "queue_seconds_p50"), ("0.95", "queue_seconds_p95"))]),
+    ]
+
+
+def register_process_collectors(registry: MetricsRegistry = REGISTRY) -> None:
+    """Adds the collectors every process exposes: cache hit ratios and rate limiter state."""
+    registry.add_collector(_cache_samples)
+    registry.add_collector(_rate_limit_samples)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Scrapes every few seconds would drown the worker's log
+
+
+def serve_metrics(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """
+    Serves /metrics from a daemon thread, for processes without the API server (queue workers), whose
+    stage, provider and render metrics would otherwise never be scraped.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics_server", daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{server.server_port}/metrics")
+    return server
@@ -0,0 +1,34 @@
+from typing import List, Optional, Dict, Any, Literal
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+# Scene plan items as produced by the visual scene planner prompt
+# (backend/prompts/visual_scene_planner_prompt_template.md).
+
+class FxSuggestion(BaseModel):
+    type: str
+    text_content: Optional[str] = None
+    params: Dict[str, Any] = Field(default_factory=dict)
+
+class ScenePlan(BaseModel):
+    # Orchestration adds asset paths and render status to the same dicts, so unknown keys are kept.
+    model_config = ConfigDict(extra="allow")
+
+    scene_id: str
+    start_time: float
+    end_time: float
+    text_for_scene: str
+    original_script_part_ref: Optional[str] = None
+    visual_type: Literal["AVATAR", "STOCK_VIDEO", "STOCK_IMAGE"]
+    visual_keywords: List[str] = Field(default_factory=list)
+    fx_suggestion: Optional[FxSuggestion] = None
+
+    @field_validator("scene_id", mode="before")
+    @classmethod
+    def _scene_id_as_string(cls, value):
+        # The planner occasionally emits numeric ids (1 instead of "001").
+        return str(value) if isinstance(value, int) else value
+
+    @field_validator("visual_type", mode="before")
+    @classmethod
+    def _visual_type_upper(cls, value):
+        return value.strip().upper() if isinstance(value, str) else value
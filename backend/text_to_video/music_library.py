@@ -0,0 +1,435 @@
+import os
+import re
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import numpy as np
+from pydantic import BaseModel, Field
+from pydub import AudioSegment
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- Library Configuration ---
+DEFAULT_LIBRARY_DIR = Path(__file__).resolve().parent.parent / "assets" / "music_library"
+DEFAULT_BUNDLED_DIR = Path(__file__).resolve().parent.parent / "assets" / "music" # Committed tracks, indexed on startup
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".ogg", ".flac", ".m4a")
+MUSIC_MIN_TAG_MATCH = float(os.getenv("MUSIC_MIN_TAG_MATCH", "0.5"))  # Share of the requested mood tags a track must carry
+MUSIC_BED_TARGET_LUFS = float(os.getenv("MUSIC_BED_TARGET_LUFS", "-36")) # Loudness of the music bed under the voiceover
+MUSIC_GAIN_RANGE_DB = (-40.0, 0.0)   # Never boost a track; never bury it completely
+DEFAULT_MUSIC_GAIN_DB = -22.0        # Matches the fixed 0.08 bed volume used when loudness is unknown
+ANALYSIS_SAMPLE_RATE = 22050
+LOUDNESS_BLOCK_SECONDS = 0.4         # ITU-R BS.1770 gating block, 75% overlap
+LOUDNESS_ABSOLUTE_GATE_LUFS = -70.0
+LOUDNESS_RELATIVE_GATE_LU = -10.0
+ENERGY_WINDOW_SECONDS = 1.0
+TEMPO_HOP = 512
+TEMPO_RANGE_BPM = (60.0, 180.0)
+TEMPO_OCTAVE_RATIO = 0.7
+STOPWORDS = {"and", "with", "the", "a", "an", "of", "for", "music", "background", "track", "song"}
+
+
+class MusicTrack(BaseModel):
+    """One indexed music track with the features computed when it was added."""
+    track_id: str
+    path: str
+    title: Optional[str] = None
+    source: str = "bundled"          # "bundled" or the provider it was downloaded from, e.g. "freesound"
+    source_id: Optional[str] = None
+    license: Optional[str] = None
+    attribution: Optional[str] = None
+    tags: List[str] = Field(default_factory=list)
+    duration: float
+    loudness_lufs: Optional[float] = None # Integrated loudness (BS.1770 K-weighted, gated); None for silence
+    tempo_bpm: Optional[float] = None
+    energy_curve: List[float] = Field(default_factory=list) # RMS dBFS per ENERGY_WINDOW_SECONDS
+    use_count: int = 0
+
+
+def normalize_tags(text_or_tags: str | Iterable[str]) -> List[str]:
+    """Lower-cased single-word tags from a mood description (e.g. a script's music_vibe) or a tag list."""
+    text = text_or_tags if isinstance(text_or_tags, str) else " ".join(text_or_tags)
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    return list(dict.fromkeys(w for w in words if w not in STOPWORDS and len(w) > 1))
+
+
+def _biquad_power_response(b: tuple, a: tuple, freqs: np.ndarray, sample_rate: int) -> np.ndarray:
+    z_inv = np.exp(-2j * np.pi * freqs / sample_rate)
+    numerator = b[0] + b[1] * z_inv + b[2] * z_inv ** 2
+    denominator = a[0] + a[1] * z_inv + a[2] * z_inv ** 2
+    return np.abs(numerator / denominator) ** 2
+
+
+def _k_weighting_power(freqs: np.ndarray, sample_rate: int) -> np.ndarray:
+    """|H(f)|^2 of the BS.1770 K-weighting filter (high-shelf pre-filter followed by the RLB high-pass)."""
+    # High shelf: +4 dB above ~1.5 kHz
+    w0 = 2 * np.pi * 1681.97 / sample_rate
+    big_a = 10 ** (3.99984 / 40)
+    alpha = np.sin(w0) / (2 * 0.7071752)
+    shelf_b = (big_a * ((big_a + 1) + (big_a - 1) * np.cos(w0) + 2 * np.sqrt(big_a) * alpha),
+               -2 * big_a * ((big_a - 1) + (big_a + 1) * np.cos(w0)),
+               big_a * ((big_a + 1) + (big_a - 1) * np.cos(w0) - 2 * np.sqrt(big_a) * alpha))
+    shelf_a = ((big_a + 1) - (big_a - 1) * np.cos(w0) + 2 * np.sqrt(big_a) * alpha,
+               2 * ((big_a - 1) - (big_a + 1) * np.cos(w0)),
+               (big_a + 1) - (big_a - 1) * np.cos(w0) - 2 * np.sqrt(big_a) * alpha)
+    # RLB high-pass at ~38 Hz
+    w0 = 2 * np.pi * 38.13547 / sample_rate
+    alpha = np.sin(w0) / (2 * 0.5003270)
+    highpass_b = ((1 + np.cos(w0)) / 2, -(1 + np.cos(w0)), (1 + np.cos(w0)) / 2)
+    highpass_a = (1 + alpha, -2 * np.cos(w0), 1 - alpha)
+    return _biquad_power_response(shelf_b, shelf_a, freqs, sample_rate) * _biquad_power_response(highpass_b, highpass_a, freqs, sample_rate)
+
+
+def _integrated_loudness(samples: np.ndarray, sample_rate: int) -> Optional[float]:
+    """
+    Gated integrated loudness in LUFS of float samples shaped (frames, channels).
+
+    The K-weighting is applied per 400 ms block in the frequency domain (Parseval), which matches the
+    time-domain filter apart from block-edge transients and keeps the analysis vectorized.
+    """
+    block = int(LOUDNESS_BLOCK_SECONDS * sample_rate)
+    hop = block // 4
+    if len(samples) < block:
+        return None
+    starts = np.arange(0, len(samples) - block + 1, hop)
+    weights = _k_weighting_power(np.fft.rfftfreq(block, 1 / sample_rate), sample_rate)
+    bin_scale = np.full(len(weights), 2.0)
+    bin_scale[0] = 1.0
+    if block % 2 == 0:
+        bin_scale[-1] = 1.0
+
+    block_power = np.zeros(len(starts))
+    for channel in range(samples.shape[1]): # Channel weights are 1.0 for mono/stereo
+        frames = samples[starts[:, None] + np.arange(block)[None, :], channel]
+        spectrum = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+        block_power += (spectrum * weights * bin_scale).sum(axis=1) / block ** 2
+
+    with np.errstate(divide="ignore"):
+        block_loudness = -0.691 + 10 * np.log10(block_power)
+    gated = block_power[block_loudness > LOUDNESS_ABSOLUTE_GATE_LUFS]
+    if len(gated) == 0:
+        return None
+    relative_gate = -0.691 + 10 * np.log10(gated.mean()) + LOUDNESS_RELATIVE_GATE_LU
+    gated = block_power[block_loudness > max(LOUDNESS_ABSOLUTE_GATE_LUFS, relative_gate)]
+    return round(float(-0.691 + 10 * np.log10(gated.mean())), 2)
+
+
+def _estimate_tempo(mono: np.ndarray, sample_rate: int) -> Optional[float]:
+    """Tempo in BPM from the autocorrelation of a spectral-flux onset envelope; None if no clear pulse."""
+    n_frames = (len(mono) - 2 * TEMPO_HOP) // TEMPO_HOP
+    if n_frames < 8:
+        return None
+    frames = mono[np.arange(n_frames)[:, None] * TEMPO_HOP + np.arange(2 * TEMPO_HOP)[None, :]] * np.hanning(2 * TEMPO_HOP)
+    magnitude = np.log1p(np.abs(np.fft.rfft(frames, axis=1)))
+    onset = np.maximum(0.0, np.diff(magnitude, axis=0)).sum(axis=1)
+    onset = np.convolve(onset, np.hanning(5), mode="same") # Widen peaks so off-grid beat periods still correlate
+    onset -= onset.mean()
+    if not onset.any():
+        return None
+
+    frame_rate = sample_rate / TEMPO_HOP
+    autocorr = np.correlate(onset, onset, mode="full")[len(onset) - 1:]
+    min_lag = max(1, int(round(frame_rate * 60 / TEMPO_RANGE_BPM[1])))
+    max_lag = min(len(autocorr) - 1, int(round(frame_rate * 60 / TEMPO_RANGE_BPM[0])))
+    if max_lag <= min_lag:
+        return None
+    lag = min_lag + int(np.argmax(autocorr[min_lag:max_lag + 1]))
+    if autocorr[lag] <= 0.1 * autocorr[0]:
+        return None
+    # A beat period also correlates at twice its lag; prefer the faster tempo when its peak is comparable.
+    half = lag // 2
+    if half >= min_lag:
+        half_lag = half - 1 + int(np.argmax(autocorr[half - 1:half + 2]))
+        if autocorr[half_lag] >= TEMPO_OCTAVE_RATIO * autocorr[lag]:
+            lag = half_lag
+    # Parabolic interpolation around the peak for sub-frame precision
+    if 0 < lag < len(autocorr) - 1:
+        left, center, right = autocorr[lag - 1], autocorr[lag], autocorr[lag + 1]
+        denominator = left - 2 * center + right
+        lag = lag + (0.5 * (left - right) / denominator if denominator else 0.0)
+    return round(60.0 * frame_rate / lag, 1)
+
+
+def analyze_track(path: str | Path) -> dict:
+    """
+    Computes the features stored for a track: duration, integrated loudness, tempo and energy curve.
+
+    Args:
+        path: Audio file readable by pydub.
+
+    Returns:
+        dict with duration, loudness_lufs, tempo_bpm and energy_curve.
+    """
+    audio = AudioSegment.from_file(str(path))
+    duration = len(audio) / 1000.0
+    audio = audio.set_frame_rate(ANALYSIS_SAMPLE_RATE)
+    full_scale = float(1 << (8 * audio.sample_width - 1))
+    samples = np.array(audio.get_array_of_samples(), dtype=np.float64).reshape(-1, audio.channels) / full_scale
+    mono = samples.mean(axis=1)
+
+    window = int(ENERGY_WINDOW_SECONDS * ANALYSIS_SAMPLE_RATE)
+    energy_curve = []
+    for start in range(0, len(mono), window):
+        rms = float(np.sqrt(np.mean(mono[start:start + window] ** 2)))
+        energy_curve.append(round(float(20 * np.log10(rms)), 1) if rms > 0 else -100.0)
+
+    return {
+        "duration": round(duration, 3),
+        "loudness_lufs": _integrated_loudness(samples, ANALYSIS_SAMPLE_RATE),
+        "tempo_bpm": _estimate_tempo(mono, ANALYSIS_SAMPLE_RATE),
+        "energy_curve": energy_curve,
+    }
+
+
+def mixer_gain_db(track: Optional[MusicTrack], target_lufs: float = MUSIC_BED_TARGET_LUFS) -> float:
+    """Gain in dB that brings a track to the music-bed loudness; DEFAULT_MUSIC_GAIN_DB if it was never measured."""
+    if track is None or track.loudness_lufs is None:
+        return DEFAULT_MUSIC_GAIN_DB
+    return round(min(MUSIC_GAIN_RANGE_DB[1], max(MUSIC_GAIN_RANGE_DB[0], target_lufs - track.loudness_lufs)), 2)
+
+
+class MusicLibrary:
+    """
+    Local index of music tracks with precomputed features, queried without any network round trip.
+
+    Each track is analyzed once when it is added (bundled files on scan, provider downloads after the
+    first fetch) and stored in SQLite together with its license metadata and mood tags. Downloaded
+    tracks are copied into the library's tracks/ directory so later jobs can reuse them.
+    """
+
+    def __init__(self, library_dir: str | Path = DEFAULT_LIBRARY_DIR):
+        self.library_dir = Path(library_dir)
+        self.tracks_dir = self.library_dir / "tracks"
+        self.tracks_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.library_dir / "index.sqlite3"
+        self._lock = threading.Lock()
+        self._init_index()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_index(self) -> None:
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tracks (
+                    track_id TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    source TEXT NOT NULL,
+                    source_id TEXT,
+                    data TEXT NOT NULL,
+                    use_count INTEGER NOT NULL DEFAULT 0,
+                    last_used REAL NOT NULL DEFAULT 0
+                )""")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS track_tags (
+                    track_id TEXT NOT NULL,
+                    tag TEXT NOT NULL,
+                    PRIMARY KEY (track_id, tag)
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_track_tags_tag ON track_tags(tag)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tracks_source ON tracks(source, source_id)")
+
+    @staticmethod
+    def _row_to_track(data: str, use_count: int) -> MusicTrack:
+        return MusicTrack(**json.loads(data), use_count=use_count)
+
+    def get(self, track_id: str) -> Optional[MusicTrack]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT data, use_count FROM tracks WHERE track_id = ?", (track_id,)).fetchone()
+        return self._row_to_track(*row) if row else None
+
+    def find_by_source(self, source: str, source_id: str | int) -> Optional[MusicTrack]:
+        """Returns the indexed track downloaded from source with the given id, if its file still exists."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT data, use_count FROM tracks WHERE source = ? AND source_id = ?", (source, str(source_id))).fetchone()
+        track = self._row_to_track(*row) if row else None
+        return track if track and Path(track.path).exists() else None
+
+    def tracks(self) -> List[MusicTrack]:
+        with self._connect() as conn:
+            return [self._row_to_track(*row) for row in conn.execute("SELECT data, use_count FROM tracks ORDER BY track_id")]
+
+    def add_track(
+        self,
+        path: str | Path,
+        tags: Iterable[str] = (),
+        title: str = None,
+        source: str = "bundled",
+        source_id: str | int = None,
+        license: str = None,
+        attribution: str = None,
+        copy_into_library: bool = False,
+    ) -> MusicTrack:
+        """
+        Analyzes a track and indexes it. A file already indexed with the same modification time is not
+        analyzed again; only its metadata is refreshed.
+
+        Args:
+            path: Audio file to add.
+            tags: Mood/genre tags (free text is split into words).
+            title, source, source_id, license, attribution: Metadata stored with the track.
+            copy_into_library: Copy the file into tracks/ first (for downloads living in a job directory).
+
+        Returns:
+            The indexed track.
+        """
+        path = Path(path)
+        if copy_into_library:
+            stored_name = f"{source}_{source_id}{path.suffix}" if source_id is not None else f"{source}_{path.name}"
+            stored_path = self.tracks_dir / stored_name
+            if not stored_path.exists() or stored_path.stat().st_size != path.stat().st_size:
+                shutil.copy2(path, stored_path)
+            path = stored_path
+        path = path.resolve()
+        mtime_ns = path.stat().st_mtime_ns
+        track_id = hashlib.sha1(str(path).encode("utf-8")).hexdigest()[:16]
+
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT data, mtime_ns FROM tracks WHERE track_id = ?", (track_id,)).fetchone()
+            features = None
+            if row and row[1] == mtime_ns:
+                previous = json.loads(row[0])
+                features = {key: previous[key] for key in ("duration", "loudness_lufs", "tempo_bpm", "energy_curve")}
+            if features is None:
+                start = time.monotonic()
+                features = analyze_track(path)
+                logger.info(f"Analyzed music track {path.name} in {time.monotonic() - start:.2f}s: {features['duration']:.1f}s, "
+                            f"{features['loudness_lufs']} LUFS, {features['tempo_bpm']} BPM.")
+
+            track = MusicTrack(
+                track_id=track_id, path=str(path), title=title or path.stem, source=source,
+                source_id=str(source_id) if source_id is not None else None, license=license,
+                attribution=attribution, tags=normalize_tags(tags), **features,
+            )
+            conn.execute(
+                "INSERT INTO tracks (track_id, path, mtime_ns, source, source_id, data) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(track_id) DO UPDATE SET path = excluded.path, mtime_ns = excluded.mtime_ns, "
+                "source = excluded.source, source_id = excluded.source_id, data = excluded.data",
+                (track_id, str(path), mtime_ns, source, track.source_id, track.model_dump_json(exclude={"use_count"})),
+            )
+            conn.execute("DELETE FROM track_tags WHERE track_id = ?", (track_id,))
+            conn.executemany("INSERT INTO track_tags (track_id, tag) VALUES (?, ?)", [(track_id, tag) for tag in track.tags])
+        return track
+
+    def index_directory(self, directory: str | Path) -> int:
+        """
+        Indexes every audio file in directory. An optional <name>.json sidecar next to a track supplies
+        its tags, title, license and attribution. Returns the number of tracks indexed.
+        """
+        directory = Path(directory)
+        if not directory.is_dir():
+            return 0
+        count = 0
+        for path in sorted(directory.iterdir()):
+            if path.suffix.lower() not in AUDIO_EXTENSIONS:
+                continue
+            sidecar = path.with_suffix(".json")
+            metadata = {}
+            if sidecar.exists():
+                try:
+                    metadata = json.loads(sidecar.read_text(encoding="utf-8"))
+                except (OSError, json.JSONDecodeError) as e:
+                    logger.warning(f"Ignoring unreadable music metadata {sidecar}: {e}")
+            try:
+                self.add_track(path, tags=metadata.get("tags", []), title=metadata.get("title"), license=metadata.get("license"),
+                               attribution=metadata.get("attribution"))
+                count += 1
+            except Exception as e:
+                logger.warning(f"Could not index music track {path}: {e}")
+        return count
+
+    def select(self, mood: str | Iterable[str], target_duration: Optional[float] = None, min_tag_match: float = MUSIC_MIN_TAG_MATCH) -> Optional[MusicTrack]:
+        """
+        Picks the indexed track that best fits a mood and a duration.
+
+        Tracks must carry at least min_tag_match of the requested tags. Among those, more matching tags win,
+        then the duration fit (tracks at least target_duration long avoid audible loops; much longer ones
+        are slightly penalized), then the least used track so jobs do not all share one bed.
+
+        Args:
+            mood: Mood description or tags, e.g. a script's music_vibe.
+            target_duration: Seconds of music needed (usually the voiceover length).
+            min_tag_match: Minimum share of requested tags a track must match.
+
+        Returns:
+            The chosen track (its use count is bumped), or None if nothing matches.
+        """
+        wanted = normalize_tags(mood)
+        if not wanted:
+            return None
+        placeholders = ",".join("?" * len(wanted))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT t.data, t.use_count, COUNT(*) AS matched FROM track_tags g JOIN tracks t ON t.track_id = g.track_id "
+                f"WHERE g.tag IN ({placeholders}) GROUP BY t.track_id", wanted,
+            ).fetchall()
+
+        def _duration_fit(track: MusicTrack) -> float:
+            if not target_duration:
+                return 1.0
+            if track.duration < target_duration:
+                return 0.5 * track.duration / target_duration
+            return 1.0 - 0.2 * min(1.0, (track.duration - target_duration) / target_duration)
+
+        candidates = []
+        for data, use_count, matched in rows:
+            track = self._row_to_track(data, use_count)
+            if matched / len(wanted) >= min_tag_match and Path(track.path).exists():
+                candidates.append((matched, _duration_fit(track), -use_count, track))
+        if not candidates:
+            logger.info(f"No indexed music matches mood tags {wanted}.")
+            return None
+
+        _, fit, _, chosen = max(candidates, key=lambda c: c[:3])
+        with self._connect() as conn:
+            conn.execute("UPDATE tracks SET use_count = use_count + 1, last_used = ? WHERE track_id = ?", (time.time(), chosen.track_id))
+        logger.info(f"Selected indexed music '{chosen.title}' ({chosen.duration:.1f}s, fit {fit:.2f}) for mood tags {wanted}.")
+        return chosen
+
+
+_default_library: Optional[MusicLibrary] = None
+_default_library_lock = threading.Lock()
+
+
+def get_music_library() -> Optional[MusicLibrary]:
+    """
+    Returns the process-wide music library configured from the environment, or None if disabled.
+    Bundled tracks are (re-)indexed when the library is first opened; unchanged files are not re-analyzed.
+
+    Environment:
+        MUSIC_LIBRARY_DISABLED: Set to "1"/"true" to always search Freesound.
+        MUSIC_LIBRARY_DIR: Directory holding the index and downloaded tracks.
+        MUSIC_LIBRARY_BUNDLED_DIR: Directory of committed tracks to index.
+    """
+    global _default_library
+    if os.getenv("MUSIC_LIBRARY_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    with _default_library_lock:
+        if _default_library is None:
+            _default_library = MusicLibrary(os.getenv("MUSIC_LIBRARY_DIR", str(DEFAULT_LIBRARY_DIR)))
+            indexed = _default_library.index_directory(os.getenv("MUSIC_LIBRARY_BUNDLED_DIR", str(DEFAULT_BUNDLED_DIR)))
+            if indexed:
+                logger.info(f"Indexed {indexed} bundled music tracks.")
+        return _default_library
+
+
+# Example Usage: python -m backend.text_to_video.music_library <directory>
+if __name__ == "__main__":
+    import sys
+    library = get_music_library() or MusicLibrary()
+    for directory in sys.argv[1:]:
+        print(f"Indexed {library.index_directory(directory)} tracks from {directory}")
+    for indexed_track in library.tracks():
+        print(f"{indexed_track.title}: {indexed_track.duration:.1f}s, {indexed_track.loudness_lufs} LUFS, "
+              f"{indexed_track.tempo_bpm} BPM, tags={indexed_track.tags}, license={indexed_track.license}")
@@ -4,15 +4,139 @@ import logging
 from dotenv import load_dotenv
 import random
 import json
+import threading
+
+from backend.text_to_video.search_cache import get_search_cache
+from backend.text_to_video.provider_selector import report_search_response
+from backend.text_to_video.rate_limiter import call_with_rate_limit
+from backend.text_to_video.media_store import get_media_store
+from backend.text_to_video.metrics import record_download
+from backend.text_to_video.rendition_selector import DEFAULT_TARGET_DIMS, DEFAULT_TARGET_FPS, Rendition, pexels_renditions, select_rendition
+from backend.text_to_video.stock_candidates import STOCK_CANDIDATE_TOP_N, StockCandidate, rank_candidates, fetch_best_candidates
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def find_and_download_videos(api_key: str, query: str, count: int, output_dir: str, orientation: str = "portrait", size: str = "medium") -> list[str]:
+def _search_pexels(search_url: str, api_key: str, params: dict, endpoint: str) -> dict:
+    """
+    Runs a Pexels search request, going through the persistent search cache when it is enabled.
+    Raises requests exceptions on failure, like a direct request would.
+    """
+    def _fetch():
+        response = call_with_rate_limit("pexels", lambda: requests.get(search_url, headers={"Authorization": api_key}, params=params, timeout=15))
+        response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
+        report_search_response("pexels", headers=response.headers)
+        return response.json()
+
+    search_cache = get_search_cache()
+    data = _fetch() if search_cache is None else search_cache.get_or_fetch("pexels", endpoint, params, _fetch)
+    report_search_response("pexels", hit_count=len(data.get(endpoint) or []))
+    return data
+
+def _download_pexels_file(download_link: str, output_path: str, asset_id, rendition: str) -> bool:
+    """
+    Downloads a Pexels file to output_path, reusing the shared media store when it is enabled.
+    Raises requests exceptions on failure, like a direct download would.
+    """
+    def _stream_to(path: str) -> bool:
+        response = requests.get(download_link, stream=True, timeout=60) # Increased timeout for download
+        response.raise_for_status()
+        with open(path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=8192):
+                f.write(chunk)
+        record_download("pexels", path)
+        return True
+
+    media_store = get_media_store()
+    if media_store is None:
+        return _stream_to(output_path)
+    return media_store.fetch("pexels", asset_id, rendition, output_path, _stream_to) is not None
+
+def _video_candidate(video_info: dict, query: str, output_dir: str, target_dims: tuple[int, int], target_fps: int) -> StockCandidate | None:
+    """
+    Builds the download candidate for one Pexels search result, picking the file to download.
+    Returns None if the video has no usable MP4 link.
+    """
+    video_id = video_info.get("id")
+    video_files = video_info.get("video_files", [])
+
+    # Pick the smallest file that still covers the target frame; 'hd' is frequently 4K.
+    download_link = None
+    chosen_rendition = select_rendition(pexels_renditions(video_files), target_dims, target_fps)
+    if chosen_rendition:
+        download_link = chosen_rendition.url
+
+    # Without width/height metadata, fall back to quality tags (prefer HD or Full HD)
+    preferred_qualities = ["hd", "sd"] if not download_link else [] # Pexels API uses 'hd', 'sd', etc. not 'medium'/'small' directly in files
+
+    # First pass: try preferred qualities
+    for quality in preferred_qualities:
+        for vf in video_files:
+            if vf.get("quality") == quality and vf.get("file_type") == "video/mp4":
+                download_link = vf.get("link")
+                logger.info(f"Selected quality '{quality}' for video ID {video_id}")
+                break
+        if download_link:
+            break
+
+    # Second pass (if no preferred quality found): try any mp4 link, prioritizing those with null quality (often good quality)
+    if not download_link:
+        logger.info(f"No preferred quality (hd/sd) found for video ID {video_id}. Checking for any MP4 with null or other quality.")
+        # Prioritize files where quality is null, as they are often the best available if not explicitly tagged hd/sd
+        null_quality_files = [vf for vf in video_files if vf.get("file_type") == "video/mp4" and vf.get("quality") is None and vf.get("link")]
+        if null_quality_files:
+            download_link = null_quality_files[0].get("link") # Take the first one
+            logger.info(f"Selected MP4 with 'null' quality for video ID {video_id} (often good quality). Link: {download_link}")
+        else:
+            # If no null quality, take the first available MP4 link regardless of listed quality tag
+            any_mp4_files = [vf for vf in video_files if vf.get("file_type") == "video/mp4" and vf.get("link")]
+            if any_mp4_files:
+                download_link = any_mp4_files[0].get("link")
+                actual_quality_tag = any_mp4_files[0].get("quality", "unknown")
+                logger.info(f"Selected first available MP4 for video ID {video_id} (quality tag: '{actual_quality_tag}'). Link: {download_link}")
+
+    if not download_link:
+        logger.warning(f"Could not find any suitable MP4 download link for video ID {video_id}. Skipping.")
+        # Log more details about the video object from Pexels API response
+        video_details_for_log = {
+            "id": video_info.get("id"),
+            "url": video_info.get("url"),
+            "width": video_info.get("width"),
+            "height": video_info.get("height"),
+            "duration": video_info.get("duration"),
+            "video_files_summary": [{ "quality": vf.get("quality"), "file_type": vf.get("file_type"), "link_present": bool(vf.get("link"))} for vf in video_files]
+        }
+        logger.info(f"Details of skipped Pexels video ID {video_id}: {json.dumps(video_details_for_log)}")
+        return None
+
+    chosen_file = next((vf for vf in video_files if vf.get("link") == download_link), {})
+    if chosen_rendition is None:
+        chosen_rendition = next((r for r in pexels_renditions([chosen_file]) if r.url == download_link), None) \
+            or Rendition(provider="pexels", name=str(chosen_file.get("quality")), url=download_link)
+    rendition_key = f"{chosen_file.get('width')}x{chosen_file.get('height')}" if chosen_file.get("width") else str(chosen_file.get("quality"))
+
+    # Construct a safe filename
+    safe_query = "".join(c if c.isalnum() else "_" for c in query[:20])
+    output_filename = f"pexels_{safe_query}_{video_id}.mp4"
+    return StockCandidate(
+        provider="pexels",
+        asset_id=str(video_id),
+        rendition=chosen_rendition,
+        rendition_key=rendition_key,
+        output_path=os.path.join(output_dir, output_filename),
+        duration=video_info.get("duration"),
+        width=video_info.get("width"),
+        height=video_info.get("height"),
+    )
+
+def find_and_download_videos(api_key: str, query: str, count: int, output_dir: str, orientation: str = "portrait", size: str = "medium", target_dims: tuple[int, int] = DEFAULT_TARGET_DIMS, target_fps: int = DEFAULT_TARGET_FPS, min_duration: float | None = None, cancel_event: threading.Event | None = None) -> list[str]:
     """
     Search Pexels for videos matching the query and download a specified number.
 
+    Results are ranked by duration fit, orientation and rendition size; the best one is downloaded
+    while the runner-up is probed, so an unusable result falls through to the next without a new search.
+
     Args:
         api_key (str): Your Pexels API key.
         query (str): The search query (e.g., "nature", "city skyline").
@@ -20,6 +144,10 @@ def find_and_download_videos(api_key: str, query: str, count: int, output_dir: s
         output_dir (str): Directory to save the downloaded videos.
         orientation (str): Desired video orientation ('landscape', 'portrait', 'square'). Default: 'portrait'.
         size (str): Minimum video size ('large', 'medium', 'small'). Default: 'medium'.
+        target_dims (tuple[int, int]): Final frame size; the smallest file covering it is downloaded.
+        target_fps (int): Final frame rate, used to break ties between renditions.
+        min_duration (float | None): Seconds of footage needed; shorter clips are only used as a last resort.
+        cancel_event (threading.Event | None): Aborts outstanding downloads once set.
 
     Returns:
         list[str]: A list of file paths for the downloaded videos. Returns empty list on failure.
@@ -29,10 +157,9 @@ def find_and_download_videos(api_key: str, query: str, count: int, output_dir: s
         return []
 
     search_url = "https://api.pexels.com/videos/search"
-    headers = {"Authorization": api_key}
     params = {
         "query": query,
-        "per_page": min(count * 2, 80), # Fetch a bit more to allow for filtering/randomness
+        "per_page": min(max(count * 2, STOCK_CANDIDATE_TOP_N), 80), # Enough candidates to rank, within the API maximum
         "orientation": orientation,
         "size": size
     }
@@ -40,10 +167,7 @@ def find_and_download_videos(api_key: str, query: str, count: int, output_dir: s
     downloaded_files = []
     try:
         logger.info(f"Searching Pexels for '{query}' (orientation: {orientation}, size: {size})")
-        response = requests.get(search_url, headers=headers, params=params, timeout=15)
-        response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
-
-        data = response.json()
+        data = _search_pexels(search_url, api_key, params, "videos")
         videos = data.get("videos", [])
 
         if not videos:
@@ -55,86 +179,9 @@ def find_and_download_videos(api_key: str, query: str, count: int, output_dir: s
         # Ensure the output directory exists
         os.makedirs(output_dir, exist_ok=True)
 
-        # Select random videos from the results if more were found than needed
-        selected_videos = random.sample(videos, min(count, len(videos)))
-
-        for video_info in selected_videos:
-            video_id = video_info.get("id")
-            video_files = video_info.get("video_files", [])
-
-            # Try to find a suitable video quality link (prefer HD or Full HD)
-            download_link = None
-            preferred_qualities = ["hd", "sd"] # Pexels API uses 'hd', 'sd', etc. not 'medium'/'small' directly in files
-
-            # First pass: try preferred qualities
-            for quality in preferred_qualities:
-                for vf in video_files:
-                    if vf.get("quality") == quality and vf.get("file_type") == "video/mp4":
-                        download_link = vf.get("link")
-                        logger.info(f"Selected quality '{quality}' for video ID {video_id}")
-                        break
-                if download_link:
-                    break
-
-            # Second pass (if no preferred quality found): try any mp4 link, prioritizing those with null quality (often good quality)
-            if not download_link:
-                logger.info(f"No preferred quality (hd/sd) found for video ID {video_id}. Checking for any MP4 with null or other quality.")
-                # Prioritize files where quality is null, as they are often the best available if not explicitly tagged hd/sd
-                null_quality_files = [vf for vf in video_files if vf.get("file_type") == "video/mp4" and vf.get("quality") is None and vf.get("link")]
-                if null_quality_files:
-                    download_link = null_quality_files[0].get("link") # Take the first one
-                    logger.info(f"Selected MP4 with 'null' quality for video ID {video_id} (often good quality). Link: {download_link}")
-                else:
-                    # If no null quality, take the first available MP4 link regardless of listed quality tag
-                    any_mp4_files = [vf for vf in video_files if vf.get("file_type") == "video/mp4" and vf.get("link")]
-                    if any_mp4_files:
-                        download_link = any_mp4_files[0].get("link")
-                        actual_quality_tag = any_mp4_files[0].get("quality", "unknown")
-                        logger.info(f"Selected first available MP4 for video ID {video_id} (quality tag: '{actual_quality_tag}'). Link: {download_link}")
-
-            if not download_link:
-                logger.warning(f"Could not find any suitable MP4 download link for video ID {video_id}. Skipping.")
-                # Log more details about the video object from Pexels API response
-                video_details_for_log = {
-                    "id": video_info.get("id"),
-                    "url": video_info.get("url"),
-                    "width": video_info.get("width"),
-                    "height": video_info.get("height"),
-                    "duration": video_info.get("duration"),
-                    "video_files_summary": [{ "quality": vf.get("quality"), "file_type": vf.get("file_type"), "link_present": bool(vf.get("link"))} for vf in video_files]
-                }
-                logger.info(f"Details of skipped Pexels video ID {video_id}: {json.dumps(video_details_for_log)}")
-                continue
-
-            # Construct a safe filename
-            safe_query = "".join(c if c.isalnum() else "_" for c in query[:20])
-            output_filename = f"pexels_{safe_query}_{video_id}.mp4"
-            output_path = os.path.join(output_dir, output_filename)
-
-            # Download the video
-            logger.info(f"Downloading video ID {video_id} to {output_path}")
-            try:
-                video_response = requests.get(download_link, stream=True, timeout=60) # Increased timeout for download
-                video_response.raise_for_status()
-
-                with open(output_path, 'wb') as f:
-                    for chunk in video_response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-
-                if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
-                    logger.info(f"Successfully downloaded {output_path}")
-                    downloaded_files.append(output_path)
-                else:
-                     logger.error(f"Failed to download video ID {video_id} correctly (file empty or not created).")
-
-            except requests.exceptions.RequestException as download_err:
-                logger.error(f"Error downloading video ID {video_id} from {download_link}: {download_err}")
-            except Exception as e:
-                 logger.error(f"An unexpected error occurred during download for video ID {video_id}: {e}")
-
-            # Stop if we have enough videos
-            if len(downloaded_files) >= count:
-                break
+        candidates = [c for c in (_video_candidate(v, query, output_dir, target_dims, target_fps) for v in videos) if c]
+        ranked = rank_candidates(candidates, min_duration, target_dims, top_n=max(count, STOCK_CANDIDATE_TOP_N))
+        downloaded_files = [c.output_path for c in fetch_best_candidates(ranked, count, cancel_event)]
 
     except requests.exceptions.Timeout:
         logger.error(f"Pexels API request timed out for query: '{query}'.")
@@ -170,10 +217,9 @@ def find_and_download_photos(api_key: str, query: str, count: int, output_dir: s
         return []
 
     search_url = "https://api.pexels.com/v1/search" # Photo search endpoint
-    headers = {"Authorization": api_key}
     params = {
         "query": query,
-        "per_page": min(count * 2, 80), # Fetch a bit more to allow for filtering/randomness
+        "per_page": min(max(count * 2, STOCK_CANDIDATE_TOP_N), 80), # Enough candidates to choose from, within the API maximum
         "orientation": orientation,
         "size": size
     }
@@ -185,10 +231,7 @@ def find_and_download_photos(api_key: str, query: str, count: int, output_dir: s
     downloaded_files = []
     try:
         logger.info(f"Searching Pexels for photos: '{query}' (orientation: {orientation}, size: {size})")
-        response = requests.get(search_url, headers=headers, params=params, timeout=15)
-        response.raise_for_status()
-
-        data = response.json()
+        data = _search_pexels(search_url, api_key, params, "photos")
         photos = data.get("photos", [])
 
         if not photos:
@@ -235,12 +278,8 @@ def find_and_download_photos(api_key: str, query: str, count: int, output_dir: s
 
             logger.info(f"Downloading photo ID {photo_id} to {output_path}")
             try:
-                photo_response = requests.get(download_link, stream=True, timeout=60)
-                photo_response.raise_for_status()
-
-                with open(output_path, 'wb') as f:
-                    for chunk in photo_response.iter_content(chunk_size=8192):
-                        f.write(chunk)
+                rendition = next((k for k in ("large", "original", "medium") if photo_src.get(k) == download_link), "unknown")
+                _download_pexels_file(download_link, output_path, photo_id, rendition)
 
                 if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
                     logger.info(f"Successfully downloaded {output_path}")
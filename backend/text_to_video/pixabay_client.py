@@ -4,6 +4,7 @@ import logging
 from dotenv import load_dotenv
 import random
 import re
+import threading
 from typing import List, Optional, Dict, Any
 from pathlib import Path
 
@@ -11,6 +12,13 @@ from backend.text_to_video.models.pixabay_models import (
     PixabayImageSearchParams, PixabayImageSearchResponse, PixabayImageHit,
     PixabayVideoSearchParams, PixabayVideoSearchResponse, PixabayVideoHit
 )
+from backend.text_to_video.search_cache import get_search_cache
+from backend.text_to_video.provider_selector import report_search_response
+from backend.text_to_video.rate_limiter import call_with_rate_limit
+from backend.text_to_video.media_store import get_media_store
+from backend.text_to_video.metrics import record_download
+from backend.text_to_video.rendition_selector import DEFAULT_TARGET_DIMS, DEFAULT_TARGET_FPS, pixabay_renditions, select_rendition
+from backend.text_to_video.stock_candidates import STOCK_CANDIDATE_TOP_N, StockCandidate, rank_candidates, fetch_best_candidates
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -18,6 +26,8 @@ logger = logging.getLogger(__name__)
 
 BASE_URL = "https://pixabay.com/api/"
 VIDEO_URL = "https://pixabay.com/api/videos/"
+PIXABAY_MIN_PER_PAGE = 3 # API minimum
+PIXABAY_MAX_PER_PAGE = int(os.getenv("PIXABAY_MAX_PER_PAGE", "200")) # API maximum; lower it to shrink responses
 
 def _sanitize_filename(filename: str) -> str:
     """Sanitizes a string to be a valid filename by removing or replacing invalid characters."""
@@ -33,12 +43,13 @@ def _sanitize_filename(filename: str) -> str:
 def _make_api_request(url: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """Makes a request to the Pixabay API and returns the JSON response."""
     try:
-        response = requests.get(url, params=params, timeout=15)
+        response = call_with_rate_limit("pixabay", lambda: requests.get(url, params=params, timeout=15))
         response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
         # Log rate limit headers
         logger.debug(f"X-RateLimit-Limit: {response.headers.get('X-RateLimit-Limit')}")
         logger.debug(f"X-RateLimit-Remaining: {response.headers.get('X-RateLimit-Remaining')}")
         logger.debug(f"X-RateLimit-Reset: {response.headers.get('X-RateLimit-Reset')}")
+        report_search_response("pixabay", headers=response.headers)
         return response.json()
     except requests.exceptions.Timeout:
         logger.error(f"Pixabay API request timed out for URL: {url} with params: {params}")
@@ -50,6 +61,29 @@ def _make_api_request(url: str, params: Dict[str, Any]) -> Optional[Dict[str, An
         logger.error(f"An unexpected error occurred during Pixabay API request: {e}")
     return None
 
+def _cached_search(endpoint: str, url: str, params_dict: Dict[str, Any], response_model):
+    """
+    Runs a Pixabay search through the persistent search cache (when enabled).
+    Only responses that validate against response_model are cached, and they are stored in
+    their validated form, so a cache hit only needs to rebuild the model.
+    """
+    def _fetch() -> Optional[Dict[str, Any]]:
+        json_response = _make_api_request(url, params_dict)
+        if not json_response:
+            return None
+        try:
+            return response_model(**json_response).model_dump(mode="json")
+        except Exception as e: # Catches Pydantic validation errors too
+            logger.error(f"Error parsing Pixabay {endpoint} search response: {e}. Response: {json_response}")
+            return None
+
+    search_cache = get_search_cache()
+    validated_response = _fetch() if search_cache is None else search_cache.get_or_fetch("pixabay", endpoint, params_dict, _fetch)
+    if validated_response is None:
+        return None
+    report_search_response("pixabay", hit_count=len(validated_response.get("hits") or []))
+    return response_model.model_validate(validated_response)
+
 def search_pixabay_images(api_key: str, search_params: PixabayImageSearchParams) -> Optional[PixabayImageSearchResponse]:
     """
     Search Pixabay for images.
@@ -69,13 +103,7 @@ def search_pixabay_images(api_key: str, search_params: PixabayImageSearchParams)
     params_dict['key'] = api_key
 
     logger.info(f"Searching Pixabay images with params: {params_dict}")
-    json_response = _make_api_request(BASE_URL, params_dict)
-    if json_response:
-        try:
-            return PixabayImageSearchResponse(**json_response)
-        except Exception as e: # Catches Pydantic validation errors too
-            logger.error(f"Error parsing Pixabay image search response: {e}. Response: {json_response}")
-    return None
+    return _cached_search("images", BASE_URL, params_dict, PixabayImageSearchResponse)
 
 def search_pixabay_videos(api_key: str, search_params: PixabayVideoSearchParams) -> Optional[PixabayVideoSearchResponse]:
     """
@@ -96,15 +124,9 @@ def search_pixabay_videos(api_key: str, search_params: PixabayVideoSearchParams)
     params_dict['key'] = api_key
 
     logger.info(f"Searching Pixabay videos with params: {params_dict}")
-    json_response = _make_api_request(VIDEO_URL, params_dict)
-    if json_response:
-        try:
-            return PixabayVideoSearchResponse(**json_response)
-        except Exception as e:
-            logger.error(f"Error parsing Pixabay video search response: {e}. Response: {json_response}")
-    return None
+    return _cached_search("videos", VIDEO_URL, params_dict, PixabayVideoSearchResponse)
 
-def download_pixabay_media(media_url: str, output_dir: str, desired_filename: str) -> Optional[str]:
+def download_pixabay_media(media_url: str, output_dir: str, desired_filename: str, asset_id: Optional[int] = None, rendition: Optional[str] = None) -> Optional[str]:
     """
     Downloads a media file (image or video) from a given URL.
 
@@ -112,6 +134,9 @@ def download_pixabay_media(media_url: str, output_dir: str, desired_filename: st
         media_url (str): The direct URL to the media file.
         output_dir (str): Directory to save the downloaded media.
         desired_filename (str): The base name for the downloaded file (extension will be derived).
+        asset_id (Optional[int]): Pixabay id of the asset. When given with rendition, the shared
+                                  media store is used so repeat assets are linked instead of re-downloaded.
+        rendition (Optional[str]): The file variant being downloaded (e.g. "medium", "largeImage").
 
     Returns:
         Optional[str]: The file path of the downloaded media, or None on failure.
@@ -139,12 +164,20 @@ def download_pixabay_media(media_url: str, output_dir: str, desired_filename: st
         output_path = str(Path(output_dir) / output_filename)
 
         logger.info(f"Downloading media from {media_url} to {output_path}")
-        media_response = requests.get(media_url, stream=True, timeout=60) # Increased timeout for download
-        media_response.raise_for_status()
-
-        with open(output_path, 'wb') as f:
-            for chunk in media_response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        def _stream_to(path: str) -> bool:
+            media_response = requests.get(media_url, stream=True, timeout=60) # Increased timeout for download
+            media_response.raise_for_status()
+            with open(path, 'wb') as f:
+                for chunk in media_response.iter_content(chunk_size=8192):
+                    f.write(chunk)
+            record_download("pixabay", path)
+            return True
+
+        media_store = get_media_store() if asset_id is not None and rendition else None
+        if media_store is not None:
+            media_store.fetch("pixabay", asset_id, rendition, output_path, _stream_to)
+        else:
+            _stream_to(output_path)
 
         if Path(output_path).exists() and Path(output_path).stat().st_size > 0:
             logger.info(f"Successfully downloaded {output_path}")
@@ -179,8 +212,8 @@ def find_and_download_pixabay_images(api_key: str, query: str, count: int, outpu
         list[str]: A list of file paths for the downloaded images. Returns empty list on failure.
     """
     # Ensure per_page is at least 3, as per API requirements, even if count is small
-    # Fetch more for randomness, up to API max (200)
-    per_page_val = max(3, min(count * 2, 200))
+    # Fetch enough candidates to rank (STOCK_CANDIDATE_TOP_N even for one clip), up to API max (200)
+    per_page_val = max(PIXABAY_MIN_PER_PAGE, min(max(count * 2, STOCK_CANDIDATE_TOP_N), PIXABAY_MAX_PER_PAGE))
     search_params = PixabayImageSearchParams(key=api_key, q=query, per_page=per_page_val, **kwargs)
     image_response = search_pixabay_images(api_key, search_params)
     downloaded_files = []
@@ -192,13 +225,14 @@ def find_and_download_pixabay_images(api_key: str, query: str, count: int, outpu
         for hit in selected_hits:
             # Prefer largeImageURL, then webformatURL
             download_url = hit.largeImageURL or hit.webformatURL
+            rendition = "largeImage" if hit.largeImageURL else "webformat"
             if download_url:
                 # Construct a filename: pixabay_query_id.ext
                 # Extract extension from the download_url itself
                 file_ext = Path(str(download_url).split('?')[0]).suffix
                 filename_base = f"pixabay_{_sanitize_filename(query)}_{hit.id}"
 
-                file_path = download_pixabay_media(str(download_url), output_dir, filename_base)
+                file_path = download_pixabay_media(str(download_url), output_dir, filename_base, asset_id=hit.id, rendition=rendition)
                 if file_path:
                     downloaded_files.append(file_path)
                 if len(downloaded_files) >= count:
@@ -212,23 +246,66 @@ def find_and_download_pixabay_images(api_key: str, query: str, count: int, outpu
         logger.warning(f"Could only download {len(downloaded_files)} out of {count} requested images for query '{query}'.")
     return downloaded_files
 
-def find_and_download_pixabay_videos(api_key: str, query: str, count: int, output_dir: str, **kwargs) -> List[str]:
+def _video_candidate(hit: PixabayVideoHit, query: str, output_dir: str, target_dims: tuple[int, int], target_fps: int) -> Optional[StockCandidate]:
+    """
+    Builds the download candidate for one Pixabay video hit, picking the version to download.
+    Returns None if the hit has no version with a URL.
+    """
+    logger.debug(f"Video hit details: {hit.model_dump_json(indent=2)}")
+    renditions = pixabay_renditions(hit.videos)
+    logger.info(f"Video ID {hit.id} - Available versions: {', '.join(r.name for r in renditions) if renditions else 'None'}")
+
+    # Pick the smallest version that still covers the target frame.
+    chosen = select_rendition(renditions, target_dims, target_fps)
+    if chosen is None:
+        # Without usable dimensions, prefer medium, then small, then tiny. Large might be too big or not always available.
+        chosen = next((r for name in ("medium", "small", "tiny", "large") for r in renditions if r.name == name), None)
+        if chosen is None:
+            logger.warning(f"Video ID {hit.id}: No suitable video stream found in any quality (large, medium, small, tiny) with a valid URL. Skipping this video.")
+            logger.debug(f"Full video details for ID {hit.id} with missing URLs: {hit.videos.model_dump_json(indent=2)}")
+            return None
+        logger.info(f"Video ID {hit.id}: Selected '{chosen.name}' quality for download.")
+
+    # Sanitize query for filename, taking first few words if query is long
+    safe_query_part = "_" .join(_sanitize_filename(query).split('_')[:3]) # Max 3 words from query
+    file_ext = Path(chosen.url.split('?')[0]).suffix
+    output_filename = f"{_sanitize_filename(f'pixabay_{safe_query_part}_{hit.id}_vid')}{file_ext}"
+    largest = max((r for r in renditions if r.has_dimensions), key=lambda r: r.width * r.height, default=chosen)
+    return StockCandidate(
+        provider="pixabay",
+        asset_id=str(hit.id),
+        rendition=chosen,
+        rendition_key=chosen.name,
+        output_path=str(Path(output_dir) / output_filename),
+        duration=hit.duration,
+        width=largest.width,
+        height=largest.height,
+    )
+
+def find_and_download_pixabay_videos(api_key: str, query: str, count: int, output_dir: str, target_dims: tuple[int, int] = DEFAULT_TARGET_DIMS, target_fps: int = DEFAULT_TARGET_FPS, min_duration: Optional[float] = None, cancel_event: Optional[threading.Event] = None, **kwargs) -> List[str]:
     """
     Search Pixabay for videos matching the query and download a specified number.
 
+    Hits are ranked by duration fit, orientation and version size; the best one is downloaded
+    while the runner-up is probed, so an unusable hit falls through to the next without a new search.
+
     Args:
         api_key (str): Your Pixabay API key.
         query (str): The search query.
         count (int): The number of videos to download.
         output_dir (str): Directory to save the downloaded videos.
+        target_dims (tuple[int, int]): Final frame size; the smallest version covering it is downloaded.
+        target_fps (int): Final frame rate, used to break ties between versions.
+        min_duration (Optional[float]): Seconds of footage needed; shorter clips are only used as a last resort.
+        cancel_event (Optional[threading.Event]): Aborts outstanding downloads once set.
         **kwargs: Additional parameters for PixabayVideoSearchParams.
 
     Returns:
         list[str]: A list of file paths for the downloaded videos. Returns empty list on failure.
     """
     # Ensure per_page is at least 3, as per API requirements, even if count is small
-    # Fetch more for randomness, up to API max (200)
-    per_page_val = max(3, min(count * 2, 200))
+    # Fetch enough candidates to rank (STOCK_CANDIDATE_TOP_N even for one clip), up to API max (200)
+    per_page_val = max(PIXABAY_MIN_PER_PAGE, min(max(count * 2, STOCK_CANDIDATE_TOP_N), PIXABAY_MAX_PER_PAGE))
     search_params = PixabayVideoSearchParams(key=api_key, q=query, per_page=per_page_val, **kwargs)
     logger.info(f"Finding and downloading Pixabay videos. Query: '{query}', Count: {count}, Output Dir: '{output_dir}'")
     logger.info(f"Using search_params: {search_params.model_dump(exclude_none=True)}")
@@ -240,59 +317,9 @@ def find_and_download_pixabay_videos(api_key: str, query: str, count: int, outpu
         logger.info(f"Pixabay API response for query '{query}': Total: {video_response.total}, TotalHits: {video_response.totalHits}, Received Hits: {len(video_response.hits) if video_response.hits else 0}")
         if video_response.hits:
             logger.info(f"Found {len(video_response.hits)} potential videos for '{query}'. Attempting to download {count}.")
-            selected_hits = random.sample(video_response.hits, min(count, len(video_response.hits)))
-
-            for i, hit in enumerate(selected_hits):
-                logger.info(f"Processing selected hit {i+1}/{len(selected_hits)}: ID {hit.id}, Tags: '{hit.tags}'")
-                logger.debug(f"Video hit details: {hit.model_dump_json(indent=2)}")
-
-                chosen_video_detail = None
-                choice_log = f"Video ID {hit.id} - Available versions: "
-                versions_available = []
-                if hit.videos.large and hit.videos.large.url: versions_available.append("large")
-                if hit.videos.medium and hit.videos.medium.url: versions_available.append("medium")
-                if hit.videos.small and hit.videos.small.url: versions_available.append("small")
-                if hit.videos.tiny and hit.videos.tiny.url: versions_available.append("tiny")
-                choice_log += ", ".join(versions_available) if versions_available else "None"
-                logger.info(choice_log)
-
-                # Prefer medium, then small, then tiny. Large might be too big or not always available.
-                if hit.videos.medium and hit.videos.medium.url:
-                    chosen_video_detail = hit.videos.medium
-                    logger.info(f"Video ID {hit.id}: Selected 'medium' quality for download.")
-                elif hit.videos.small and hit.videos.small.url:
-                    chosen_video_detail = hit.videos.small
-                    logger.info(f"Video ID {hit.id}: Selected 'small' quality for download (medium not available/no URL).")
-                elif hit.videos.tiny and hit.videos.tiny.url:
-                    chosen_video_detail = hit.videos.tiny
-                    logger.info(f"Video ID {hit.id}: Selected 'tiny' quality for download (medium/small not available/no URL).")
-                elif hit.videos.large and hit.videos.large.url: # Fallback to large if others not present
-                    chosen_video_detail = hit.videos.large
-                    logger.info(f"Video ID {hit.id}: Selected 'large' quality for download (medium/small/tiny not available/no URL).")
-                else:
-                    logger.warning(f"Video ID {hit.id}: No suitable video stream found in any quality (large, medium, small, tiny) with a valid URL. Skipping this video.")
-                    logger.debug(f"Full video details for ID {hit.id} with missing URLs: {hit.videos.model_dump_json(indent=2)}")
-                    continue # Skip to the next video hit
-
-                if chosen_video_detail and chosen_video_detail.url:
-                    download_url = chosen_video_detail.url
-                    # Sanitize query for filename, taking first few words if query is long
-                    safe_query_part = "_" .join(_sanitize_filename(query).split('_')[:3]) # Max 3 words from query
-                    filename_base = f"pixabay_{safe_query_part}_{hit.id}_vid"
-
-                    logger.info(f"Attempting download for video ID {hit.id} from URL: {download_url}")
-                    file_path = download_pixabay_media(str(download_url), output_dir, filename_base)
-                    if file_path:
-                        downloaded_files.append(file_path)
-                    else:
-                        logger.warning(f"Download failed for video ID {hit.id} from {download_url}.")
-
-                    if len(downloaded_files) >= count:
-                        logger.info(f"Reached desired download count ({count}). Stopping further downloads for query '{query}'.")
-                        break
-                # This else should ideally not be reached if the logic above correctly assigns chosen_video_detail or continues
-                # else:
-                # logger.warning(f"No suitable download URL found for video ID {hit.id} after selection. Video details: {hit.videos.model_dump_json(indent=2)}")
+            candidates = [c for c in (_video_candidate(hit, query, output_dir, target_dims, target_fps) for hit in video_response.hits) if c]
+            ranked = rank_candidates(candidates, min_duration, target_dims, top_n=max(count, STOCK_CANDIDATE_TOP_N))
+            downloaded_files = [c.output_path for c in fetch_best_candidates(ranked, count, cancel_event)]
         else:
             logger.warning(f"No video hits returned by API for query: '{query}' with params {search_params.model_dump(exclude_none=True)}")
     else:
@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import random
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional
+
+from pydantic import BaseModel, Field
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- Provider Selection Configuration ---
+DEFAULT_STATS_PATH = Path(__file__).resolve().parent.parent / "assets" / "cache" / "provider_stats.json"
+EWMA_ALPHA = 0.3                          # Weight of the newest observation
+PRIOR_LATENCY_SECONDS = 5.0               # Assumed time-to-asset for a provider with no history
+PRIOR_SUCCESS_RATE = 0.8
+PRIOR_RELEVANCE_RATE = 0.8
+MIN_USABLE_PROBABILITY = 0.05             # Floor so a bad streak cannot make a provider infinitely expensive
+STATS_HALF_LIFE_SECONDS = 6 * 60 * 60     # Persisted stats drift back toward the priors with this half-life
+LATENCY_SAMPLE_WINDOW = 50
+HEDGE_PERCENTILE = 90
+HEDGE_MIN_SAMPLES = 5
+HEDGE_MIN_DELAY_SECONDS = 1.0
+QUOTA_RESERVE = 5                         # Requests left before a provider is treated as exhausted
+DEFAULT_EXPLORE_RATIO = float(os.getenv("PROVIDER_EXPLORE_RATIO", "0.05"))
+
+
+class ProviderStats(BaseModel):
+    """Rolling health and usefulness figures for one stock provider."""
+    latency_ewma: Optional[float] = None   # Seconds from search start to a downloaded asset
+    success_ewma: float = PRIOR_SUCCESS_RATE   # Share of attempts that produced a usable asset
+    relevance_ewma: float = PRIOR_RELEVANCE_RATE # Share of searches that returned at least one hit
+    latency_samples: List[float] = Field(default_factory=list)
+    attempts: int = 0
+    quota_remaining: Optional[int] = None
+    quota_reset_at: Optional[float] = None # Unix time the quota window resets
+    updated_at: float = 0.0
+
+
+def _ewma(previous: Optional[float], value: float) -> float:
+    return value if previous is None else EWMA_ALPHA * value + (1 - EWMA_ALPHA) * previous
+
+
+def _parse_header_number(value) -> Optional[float]:
+    if not isinstance(value, (str, int, float)):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class ProviderSelector:
+    """
+    Routes stock searches to the provider with the best expected time-to-usable-asset.
+
+    Expected time is latency / P(usable), where P(usable) = success rate * relevance hit rate, all
+    tracked as EWMAs. Providers at or below their quota reserve are ranked last until the quota window
+    resets. Stats are persisted as JSON between runs and decay toward the priors while idle, so a past
+    brownout does not exile a provider forever; a small exploration ratio also keeps the runner-up sampled.
+    """
+
+    def __init__(self, stats_path: Optional[str | Path] = DEFAULT_STATS_PATH, explore_ratio: float = DEFAULT_EXPLORE_RATIO, hedging_enabled: bool = True):
+        self.stats_path = Path(stats_path) if stats_path else None
+        self.explore_ratio = explore_ratio
+        self.hedging_enabled = hedging_enabled
+        self._lock = threading.Lock()
+        self._stats: Dict[str, ProviderStats] = self._load()
+
+    def _load(self) -> Dict[str, ProviderStats]:
+        if not self.stats_path or not self.stats_path.exists():
+            return {}
+        try:
+            with open(self.stats_path, 'r', encoding='utf-8') as f:
+                return {provider: ProviderStats(**data) for provider, data in json.load(f).items()}
+        except Exception as e:
+            logger.warning(f"Could not read provider stats {self.stats_path}: {e}. Starting from priors.")
+            return {}
+
+    def save(self) -> None:
+        """Writes the current stats to stats_path (atomically). No-op when persistence is off."""
+        if not self.stats_path:
+            return
+        with self._lock:
+            payload = {provider: stats.model_dump() for provider, stats in self._stats.items()}
+        try:
+            self.stats_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.stats_path.with_name(f"{self.stats_path.name}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, indent=2)
+            os.replace(tmp_path, self.stats_path)
+        except OSError as e:
+            logger.warning(f"Could not save provider stats to {self.stats_path}: {e}")
+
+    def stats(self, provider: str) -> ProviderStats:
+        """Returns a copy of a provider's stats (priors if it has never been used)."""
+        with self._lock:
+            return self._stats.get(provider, ProviderStats()).model_copy(deep=True)
+
+    def _get(self, provider: str) -> ProviderStats:
+        return self._stats.setdefault(provider, ProviderStats())
+
+    def record_attempt(self, provider: str, latency_seconds: float, success: bool) -> None:
+        """Records one search+download attempt and whether it produced a usable asset."""
+        with self._lock:
+            stats = self._get(provider)
+            stats.latency_ewma = _ewma(stats.latency_ewma, latency_seconds)
+            stats.success_ewma = _ewma(stats.success_ewma, 1.0 if success else 0.0)
+            stats.latency_samples = (stats.latency_samples + [latency_seconds])[-LATENCY_SAMPLE_WINDOW:]
+            stats.attempts += 1
+            stats.updated_at = time.time()
+
+    def record_search(self, provider: str, hit_count: int) -> None:
+        """Records whether a search returned anything usable."""
+        with self._lock:
+            stats = self._get(provider)
+            stats.relevance_ewma = _ewma(stats.relevance_ewma, 1.0 if hit_count > 0 else 0.0)
+            stats.updated_at = time.time()
+
+    def record_quota(self, provider: str, headers: Mapping) -> None:
+        """
+        Updates remaining quota from rate-limit response headers.
+
+        Pexels sends X-Ratelimit-Reset as a Unix timestamp, Pixabay as seconds until reset; both forms are accepted.
+        """
+        remaining = _parse_header_number(headers.get("X-RateLimit-Remaining"))
+        if remaining is None:
+            return
+        reset = _parse_header_number(headers.get("X-RateLimit-Reset"))
+        with self._lock:
+            stats = self._get(provider)
+            stats.quota_remaining = int(remaining)
+            if reset is not None:
+                stats.quota_reset_at = reset if reset > 1_000_000_000 else time.time() + reset
+
+    def expected_time_to_asset(self, provider: str) -> float:
+        """Seconds until this provider is expected to deliver a usable asset; inf if its quota is exhausted."""
+        with self._lock:
+            stats = self._stats.get(provider, ProviderStats())
+        now = time.time()
+        if stats.quota_remaining is not None and stats.quota_remaining <= QUOTA_RESERVE:
+            if stats.quota_reset_at is None or stats.quota_reset_at > now:
+                return float("inf")
+
+        weight = 0.5 ** (max(0.0, now - stats.updated_at) / STATS_HALF_LIFE_SECONDS) if stats.updated_at else 0.0
+        latency = PRIOR_LATENCY_SECONDS if stats.latency_ewma is None else stats.latency_ewma
+        latency = weight * latency + (1 - weight) * PRIOR_LATENCY_SECONDS
+        success = weight * stats.success_ewma + (1 - weight) * PRIOR_SUCCESS_RATE
+        relevance = weight * stats.relevance_ewma + (1 - weight) * PRIOR_RELEVANCE_RATE
+        return latency / max(success * relevance, MIN_USABLE_PROBABILITY)
+
+    def rank(self, providers: List[str]) -> List[str]:
+        """
+        Orders providers by expected time-to-usable-asset (best first). Ties keep the input order.
+        With probability explore_ratio the runner-up is tried first so its stats stay current.
+        """
+        ranked = sorted(providers, key=self.expected_time_to_asset)
+        if len(ranked) > 1 and self.explore_ratio > 0 and random.random() < self.explore_ratio \
+                and self.expected_time_to_asset(ranked[1]) != float("inf"):
+            ranked[0], ranked[1] = ranked[1], ranked[0]
+            logger.info(f"Exploring provider '{ranked[0]}' ahead of '{ranked[1]}'.")
+        return ranked
+
+    def hedge_delay(self, provider: str) -> Optional[float]:
+        """
+        Seconds after which a second provider should be started if this one has not delivered,
+        i.e. its HEDGE_PERCENTILE latency. None if hedging is off or there is too little history.
+        """
+        if not self.hedging_enabled:
+            return None
+        with self._lock:
+            samples = sorted(self._stats.get(provider, ProviderStats()).latency_samples)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        index = min(len(samples) - 1, int(round(HEDGE_PERCENTILE / 100 * (len(samples) - 1))))
+        return max(HEDGE_MIN_DELAY_SECONDS, samples[index])
+
+
+_default_selector: Optional[ProviderSelector] = None
+_default_selector_lock = threading.Lock()
+
+
+def get_provider_selector() -> Optional[ProviderSelector]:
+    """
+    Returns the process-wide provider selector configured from the environment, or None if disabled.
+
+    Environment:
+        PROVIDER_SELECTOR_DISABLED: Set to "1"/"true" to fall back to a fixed provider order.
+        PROVIDER_STATS_PATH: JSON file the stats are persisted to.
+        PROVIDER_HEDGING_ENABLED: Set to "0"/"false" to never start a second provider speculatively.
+    """
+    global _default_selector
+    if os.getenv("PROVIDER_SELECTOR_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    with _default_selector_lock:
+        if _default_selector is None:
+            _default_selector = ProviderSelector(
+                stats_path=os.getenv("PROVIDER_STATS_PATH", str(DEFAULT_STATS_PATH)),
+                hedging_enabled=os.getenv("PROVIDER_HEDGING_ENABLED", "true").lower() not in ("0", "false", "no"),
+            )
+        return _default_selector
+
+
+def report_search_response(provider: str, hit_count: Optional[int] = None, headers: Optional[Mapping] = None) -> None:
+    """Hook for provider clients: feeds search hit counts and rate-limit headers into the default selector."""
+    selector = get_provider_selector()
+    if selector is None:
+        return
+    if headers is not None:
+        selector.record_quota(provider, headers)
+    if hit_count is not None:
+        selector.record_search(provider, hit_count)
@@ -0,0 +1,501 @@
+import os
+import time
+import uuid
+import heapq
+import sqlite3
+import logging
+import itertools
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, astuple, replace
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Mapping, Optional
+
+from backend.text_to_video.metrics import record_provider_request, outcome_for_status
+from backend.text_to_video.tracing import span
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- Request Priorities ---
+INTERACTIVE = 0 # API-triggered jobs a user is waiting on
+BATCH = 1       # Pipeline/CLI runs; only served when no interactive request is queued
+
+# --- Rate Limit Configuration ---
+# requests per per_seconds window; burst is the bucket capacity (how many may go out back to back).
+DEFAULT_SERVICE_LIMITS = {
+    "pexels": {"requests": 200, "per_seconds": 3600, "burst": 50},
+    "pixabay": {"requests": 100, "per_seconds": 60, "burst": 20},
+    "freesound": {"requests": 60, "per_seconds": 60, "burst": 10},
+    "elevenlabs": {"requests": 5, "per_seconds": 1, "burst": 5},
+    "argil": {"requests": 60, "per_seconds": 60, "burst": 10},
+    "heygen": {"requests": 60, "per_seconds": 60, "burst": 10},
+}
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "3")) # Retries of a request answered with 429
+RATE_LIMIT_DEFAULT_BACKOFF_SECONDS = 5.0 # Block after a 429 without Retry-After/reset headers
+RATE_LIMIT_PACING_WINDOW_SECONDS = float(os.getenv("RATE_LIMIT_PACING_WINDOW_SECONDS", "3600")) # Longer server windows (Pexels' monthly quota) are not paced
+RATE_LIMIT_CONFIG_PATH = Path(os.getenv("RATE_LIMIT_CONFIG_PATH", str(Path(__file__).resolve().parent.parent / "tests" / "test_config.yaml"))) # Its rate_limits section
+DELAY_SAMPLE_WINDOW = 500
+
+# --- Shared Bucket Configuration ---
+# Buckets live in SQLite so API workers, queue workers and pipeline runs on a host share one quota.
+RATE_LIMIT_SHARED = os.getenv("RATE_LIMIT_SHARED", "true").lower() in ("1", "true", "yes")
+RATE_LIMIT_DB_PATH = Path(os.getenv("RATE_LIMIT_DB_PATH", str(Path(__file__).resolve().parent.parent / "data" / "rate_limits.sqlite3")))
+RATE_LIMIT_POLL_SECONDS = 0.5 # Longest a shared-bucket waiter sleeps before checking again (other processes draw tokens too)
+RATE_LIMIT_WAITER_STALE_SECONDS = 5.0 # A waiter not seen for this long (its process died) no longer holds back lower priorities
+
+_request_priority: contextvars.ContextVar[int] = contextvars.ContextVar("request_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def request_priority(priority: int):
+    """Runs the enclosed block (and anything submitted via tracing.submit_in_context) at the given priority."""
+    token = _request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+
+def _parse_header_number(value) -> Optional[float]:
+    if not isinstance(value, (str, int, float)):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None # e.g. an HTTP-date Retry-After; fall back to the default backoff
+
+
+def _percentile(sorted_values: list, percentile: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(percentile / 100 * (len(sorted_values) - 1))))]
+
+
+@dataclass
+class _BucketState:
+    """Token bucket of one service. Times are wall-clock (time.time()), so processes can share them."""
+    tokens: float
+    updated: float
+    blocked_until: float = 0.0
+    paced_rate: Optional[float] = None
+    window_reset_at: Optional[float] = None # When the server-side window resets
+    consecutive_429: int = 0
+
+
+class SharedBucketStore:
+    """
+    Token buckets in SQLite (WAL), shared by every process on the host that calls the same services.
+
+    Each take or header update is one write transaction on the service's row. Waiting requests are
+    registered with their priority, so a batch request in one process holds back while an interactive
+    request in another process is waiting for the same service.
+    """
+
+    def __init__(self, db_path: str | Path = RATE_LIMIT_DB_PATH):
+        self.db_path = Path(db_path)
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_db(self) -> None:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._open()
+        try:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                    service TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    blocked_until REAL NOT NULL DEFAULT 0,
+                    paced_rate REAL,
+                    window_reset_at REAL,
+                    consecutive_429 INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS rate_limit_waiters (
+                    service TEXT NOT NULL,
+                    waiter_id TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    seen_at REAL NOT NULL,
+                    PRIMARY KEY (service, waiter_id)
+                );
+            """)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self._init_db()
+                    self._initialized = True
+        return self._open()
+
+    @staticmethod
+    def _load(conn: sqlite3.Connection, service: str) -> Optional[_BucketState]:
+        row = conn.execute(
+            "SELECT tokens, updated, blocked_until, paced_rate, window_reset_at, consecutive_429 FROM rate_limit_buckets WHERE service = ?",
+            (service,),
+        ).fetchone()
+        return _BucketState(*row) if row else None
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    @contextmanager
+    def locked(self, service: str, capacity: float) -> Iterator[tuple[_BucketState, sqlite3.Connection]]:
+        """The service's bucket (full if new) under the database write lock; changes are saved on exit."""
+        with self._transaction() as conn:
+            state = self._load(conn, service) or _BucketState(tokens=capacity, updated=time.time())
+            yield state, conn
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limit_buckets (service, tokens, updated, blocked_until, paced_rate, window_reset_at, consecutive_429) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (service, *astuple(state)),
+            )
+
+    def peek(self, service: str) -> Optional[_BucketState]:
+        """The service's bucket as last saved, read without taking the write lock."""
+        conn = self._connect()
+        try:
+            return self._load(conn, service)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def set_waiting(conn: sqlite3.Connection, service: str, waiter_id: str, priority: Optional[int]) -> None:
+        """Registers (or with priority None, removes) a waiting request, within a locked() transaction."""
+        if priority is None:
+            conn.execute("DELETE FROM rate_limit_waiters WHERE service = ? AND waiter_id = ?", (service, waiter_id))
+        else:
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limit_waiters (service, waiter_id, priority, seen_at) VALUES (?, ?, ?, ?)",
+                (service, waiter_id, priority, time.time()),
+            )
+
+    @staticmethod
+    def higher_priority_waiting(conn: sqlite3.Connection, service: str, waiter_id: str, priority: int) -> bool:
+        """Whether another process has a request of higher priority waiting for the service."""
+        return conn.execute(
+            "SELECT 1 FROM rate_limit_waiters WHERE service = ? AND waiter_id != ? AND priority < ? AND seen_at > ? LIMIT 1",
+            (service, waiter_id, priority, time.time() - RATE_LIMIT_WAITER_STALE_SECONDS),
+        ).fetchone() is not None
+
+    def clear_waiting(self, service: str, waiter_id: str) -> None:
+        with self._transaction() as conn:
+            self.set_waiting(conn, service, waiter_id, None)
+
+
+class RateLimiter:
+    """
+    Token bucket for one external service, shared by every thread in the process and, with a
+    SharedBucketStore, by every process on the host.
+
+    Callers acquire a token before each API request. Waiters are served strictly by priority and
+    then arrival order, so interactive requests overtake queued batch work (in other processes too,
+    when shared). Response headers keep the bucket in sync with the server: X-RateLimit-Remaining caps
+    the tokens, the remaining quota is paced evenly until X-RateLimit-Reset (for windows up to
+    RATE_LIMIT_PACING_WINDOW_SECONDS), and a 429 (or Retry-After) blocks the service until it may
+    resume. That keeps batch load running at the quota ceiling instead of bursting into lockouts.
+    """
+
+    def __init__(self, service: str, requests: float, per_seconds: float, burst: Optional[float] = None,
+                 shared: Optional[SharedBucketStore] = None):
+        self.service = service
+        self.shared = shared
+        self._waiter_id = uuid.uuid4().hex # This limiter's head waiter in the shared waiter table
+        self._cond = threading.Condition()
+        self._waiters: list = []
+        self._seq = itertools.count()
+        self._delays: deque = deque(maxlen=DELAY_SAMPLE_WINDOW)
+        self._metrics = {"requests": 0, "throttled": 0, "rate_limited_responses": 0, "total_queue_seconds": 0.0, "max_queue_seconds": 0.0}
+        self.configure(requests, per_seconds, burst)
+        self._state = _BucketState(tokens=self.capacity, updated=time.time()) # Used when not shared
+
+    def configure(self, requests: float, per_seconds: float, burst: Optional[float] = None) -> None:
+        """Sets the steady-state rate (requests / per_seconds) and bucket capacity."""
+        with self._cond:
+            self.rate = requests / per_seconds
+            self.per_seconds = per_seconds
+            self.capacity = max(1.0, float(burst if burst is not None else requests))
+            self._cond.notify_all()
+
+    @contextmanager
+    def _bucket(self) -> Iterator[tuple[_BucketState, Optional[sqlite3.Connection]]]:
+        """The bucket to update: this process's own, or the shared one under the database lock."""
+        if self.shared is None:
+            yield self._state, None
+            return
+        with self.shared.locked(self.service, self.capacity) as (state, conn):
+            yield state, conn
+
+    def _effective_rate(self, state: _BucketState, now: float) -> float:
+        if state.paced_rate is not None and state.window_reset_at is not None and now < state.window_reset_at:
+            return state.paced_rate
+        state.paced_rate = None
+        return self.rate
+
+    def _refill(self, state: _BucketState, now: float) -> None:
+        elapsed = max(0.0, now - state.updated)
+        state.updated = max(state.updated, now)
+        state.tokens = min(self.capacity, state.tokens + elapsed * self._effective_rate(state, now))
+
+    def _try_take(self, priority: int) -> Optional[float]:
+        """Takes a token if one is free; otherwise returns how long to wait before trying again."""
+        with self._bucket() as (state, conn):
+            now = time.time()
+            self._refill(state, now)
+            if now < state.blocked_until:
+                wait_seconds = state.blocked_until - now
+            elif state.tokens < 1:
+                wait_seconds = (1 - state.tokens) / max(self._effective_rate(state, now), 1e-9)
+            elif conn is not None and self.shared.higher_priority_waiting(conn, self.service, self._waiter_id, priority):
+                wait_seconds = RATE_LIMIT_POLL_SECONDS
+            else:
+                state.tokens -= 1
+                if conn is not None:
+                    self.shared.set_waiting(conn, self.service, self._waiter_id, None)
+                return None
+            if conn is not None:
+                self.shared.set_waiting(conn, self.service, self._waiter_id, priority)
+                wait_seconds = min(wait_seconds, RATE_LIMIT_POLL_SECONDS) # Other processes change the bucket too
+            return wait_seconds
+
+    def acquire(self, priority: Optional[int] = None, timeout: Optional[float] = None) -> Optional[float]:
+        """
+        Blocks until a request may be sent.
+
+        Args:
+            priority: INTERACTIVE or BATCH. Defaults to the priority of the current context.
+            timeout: Give up after this many seconds.
+
+        Returns:
+            Seconds spent queued, or None if the timeout expired first.
+        """
+        priority = _request_priority.get() if priority is None else priority
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        with self._cond:
+            entry = (priority, next(self._seq))
+            heapq.heappush(self._waiters, entry)
+            while True:
+                is_head = self._waiters[0] == entry
+                try:
+                    wait_seconds = self._try_take(priority) if is_head else None
+                except BaseException: # e.g. the shared database is unavailable; do not leave the queue stuck
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    self._cond.notify_all()
+                    raise
+                if is_head and wait_seconds is None:
+                    heapq.heappop(self._waiters)
+                    self._cond.notify_all() # Let the next waiter become head
+                    break
+
+                now = time.monotonic()
+                if deadline is not None:
+                    if now >= deadline:
+                        self._waiters.remove(entry)
+                        heapq.heapify(self._waiters)
+                        if is_head and self.shared is not None:
+                            self.shared.clear_waiting(self.service, self._waiter_id)
+                        self._cond.notify_all()
+                        return None
+                    wait_seconds = deadline - now if wait_seconds is None else min(wait_seconds, deadline - now)
+                self._cond.wait(wait_seconds)
+
+            queued = time.monotonic() - start
+            self._metrics["requests"] += 1
+            self._metrics["total_queue_seconds"] += queued
+            self._metrics["max_queue_seconds"] = max(self._metrics["max_queue_seconds"], queued)
+            if queued > 0.001:
+                self._metrics["throttled"] += 1
+            self._delays.append(queued)
+        if queued > 1.0:
+            logger.info(f"{self.service}: request waited {queued:.2f}s for rate limit ({'interactive' if priority == INTERACTIVE else 'batch'}).")
+        return queued
+
+    def update_from_response(self, status_code, headers: Optional[Mapping]) -> None:
+        """Synchronizes the bucket with the server's rate-limit headers and reacts to 429 responses."""
+        headers = headers if headers is not None else {}
+        remaining = _parse_header_number(headers.get("X-RateLimit-Remaining"))
+        reset = _parse_header_number(headers.get("X-RateLimit-Reset"))
+        retry_after = _parse_header_number(headers.get("Retry-After"))
+        with self._cond, self._bucket() as (state, _):
+            now = time.time()
+            self._refill(state, now)
+            reset_in = None
+            if reset is not None:
+                # Pexels sends a Unix timestamp, Pixabay seconds until the window resets.
+                reset_in = max(0.0, reset - now) if reset > 1_000_000_000 else max(0.0, reset)
+                state.window_reset_at = now + reset_in
+            if remaining is not None:
+                state.tokens = min(state.tokens, remaining)
+                # Pacing a monthly quota (Pexels) over the rest of the month would run far below the
+                # hourly limit; such windows only block once they are used up.
+                if reset_in and reset_in <= max(self.per_seconds, RATE_LIMIT_PACING_WINDOW_SECONDS):
+                    state.paced_rate = min(self.rate, remaining / reset_in) if remaining > 0 else None
+                if remaining <= 0:
+                    state.blocked_until = max(state.blocked_until, now + (reset_in or RATE_LIMIT_DEFAULT_BACKOFF_SECONDS))
+
+            if status_code == 429:
+                self._metrics["rate_limited_responses"] += 1
+                state.consecutive_429 += 1
+                block_for = retry_after if retry_after is not None else (reset_in or RATE_LIMIT_DEFAULT_BACKOFF_SECONDS * 2 ** (state.consecutive_429 - 1))
+                state.blocked_until = max(state.blocked_until, now + block_for)
+                state.tokens = 0.0
+                logger.warning(f"{self.service}: 429 Too Many Requests. Pausing requests for {block_for:.1f}s.")
+            elif isinstance(status_code, int):
+                state.consecutive_429 = 0
+                if retry_after is not None and status_code == 503:
+                    state.blocked_until = max(state.blocked_until, now + retry_after)
+            self._cond.notify_all()
+
+    def metrics(self) -> dict:
+        """Queueing-delay and throttling figures for this service."""
+        with self._cond:
+            delays = sorted(self._delays)
+            if self.shared is None:
+                state = replace(self._state)
+            else:
+                state = self.shared.peek(self.service) or _BucketState(tokens=self.capacity, updated=time.time())
+            now = time.time()
+            self._refill(state, now)
+            return {
+                **self._metrics,
+                "queued_now": len(self._waiters),
+                "tokens": round(state.tokens, 2),
+                "rate_per_second": round(self._effective_rate(state, now), 4),
+                "blocked_for_seconds": round(max(0.0, state.blocked_until - now), 2),
+                "queue_seconds_p50": round(_percentile(delays, 50), 4),
+                "queue_seconds_p95": round(_percentile(delays, 95), 4),
+            }
+
+
+_service_limits: Dict[str, dict] = {service: dict(limits) for service, limits in DEFAULT_SERVICE_LIMITS.items()}
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+_shared_store: Optional[SharedBucketStore] = None
+
+
+def get_shared_bucket_store() -> SharedBucketStore:
+    """Returns the process-wide handle on the shared bucket database."""
+    global _shared_store
+    with _limiters_lock:
+        if _shared_store is None:
+            _shared_store = SharedBucketStore()
+        return _shared_store
+
+
+def _env_limits(service: str) -> Optional[dict]:
+    """Reads RATE_LIMIT_<SERVICE>="<requests>/<seconds>[/<burst>]", e.g. RATE_LIMIT_PEXELS="200/3600/50"."""
+    value = os.getenv(f"RATE_LIMIT_{service.upper()}")
+    if not value:
+        return None
+    try:
+        parts = [float(part) for part in value.split("/")]
+        return {"requests": parts[0], "per_seconds": parts[1], "burst": parts[2] if len(parts) > 2 else None}
+    except (ValueError, IndexError):
+        logger.warning(f"Ignoring malformed RATE_LIMIT_{service.upper()}={value!r}; expected '<requests>/<seconds>[/<burst>]'.")
+        return None
+
+
+def configure_rate_limits(limits: Optional[Mapping[str, Mapping]]) -> None:
+    """
+    Applies per-service limits, e.g. the `rate_limits` section of the pipeline config.
+    Environment variables (RATE_LIMIT_<SERVICE>) still take precedence.
+
+    Args:
+        limits: {service: {"requests": int, "per_seconds": float, "burst": int (optional)}}
+    """
+    for service, service_limits in (limits or {}).items():
+        merged = {**_service_limits.get(service, {}), **service_limits}
+        if "requests" not in merged or "per_seconds" not in merged:
+            logger.warning(f"Rate limit for '{service}' needs 'requests' and 'per_seconds'; got {dict(service_limits)}.")
+            continue
+        _service_limits[service] = merged
+        with _limiters_lock:
+            limiter = _limiters.get(service)
+        if limiter and not _env_limits(service):
+            limiter.configure(merged["requests"], merged["per_seconds"], merged.get("burst"))
+        logger.info(f"Rate limit for {service}: {merged['requests']} requests / {merged['per_seconds']}s (burst {merged.get('burst', merged['requests'])}).")
+
+
+def load_rate_limit_config(path: str | Path = RATE_LIMIT_CONFIG_PATH) -> dict:
+    """Reads the `rate_limits` section of a YAML config (the pipeline config by default); {} if absent."""
+    import yaml # Only needed when a config file is read
+
+    try:
+        with open(path, 'r') as f:
+            return (yaml.safe_load(f) or {}).get("rate_limits") or {}
+    except (OSError, yaml.YAMLError) as e:
+        logger.warning(f"Could not read rate limits from {path}: {e}. Using defaults.")
+        return {}
+
+
+def get_rate_limiter(service: str) -> RateLimiter:
+    """Returns the process-wide limiter for a service, creating it from env/config/defaults on first use."""
+    shared = get_shared_bucket_store() if RATE_LIMIT_SHARED else None
+    with _limiters_lock:
+        limiter = _limiters.get(service)
+        if limiter is None:
+            limits = _env_limits(service) or _service_limits.get(service) or {"requests": 10, "per_seconds": 1}
+            limiter = RateLimiter(service, limits["requests"], limits["per_seconds"], limits.get("burst"), shared=shared)
+            _limiters[service] = limiter
+        return limiter
+
+
+def call_with_rate_limit(service: str, send: Callable[[], object], max_retries: int = RATE_LIMIT_MAX_RETRIES):
+    """
+    Sends an API request through the service's limiter.
+
+    Waits for a token, calls send() (which performs the actual HTTP request and returns the response),
+    feeds the response headers back into the limiter, and retries 429 responses once the limiter allows.
+
+    Returns:
+        The last response. A final 429 is returned as-is for the caller's usual error handling.
+    """
+    limiter = get_rate_limiter(service)
+    for attempt in range(max_retries + 1):
+        queued_seconds = limiter.acquire()
+        with span(service, "provider", attempt=attempt + 1, queued_seconds=round(queued_seconds or 0, 3)) as request_span:
+            start = time.monotonic()
+            try:
+                response = send()
+            except Exception:
+                record_provider_request(service, time.monotonic() - start, "exception")
+                raise
+            status_code = getattr(response, "status_code", None)
+            request_span.set_attribute("status_code", status_code)
+            record_provider_request(service, time.monotonic() - start, outcome_for_status(status_code))
+        limiter.update_from_response(status_code, getattr(response, "headers", None))
+        if status_code != 429 or attempt == max_retries:
+            return response
+        logger.warning(f"{service}: retrying rate-limited request (attempt {attempt + 2}/{max_retries + 1}).")
+    return response
+
+
+def rate_limit_metrics() -> Dict[str, dict]:
+    """Queueing-delay metrics for every service used so far in this process."""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {service: limiter.metrics() for service, limiter in limiters.items()}
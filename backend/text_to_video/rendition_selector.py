@@ -0,0 +1,110 @@
+import logging
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Output format of the video pipeline (see video_general in the pipeline config)
+DEFAULT_TARGET_DIMS = (1080, 1920)
+DEFAULT_TARGET_FPS = 30
+
+
+class Rendition(BaseModel):
+    """One downloadable file variant of a stock asset, normalized across providers."""
+    provider: str
+    name: str                   # Provider label for the variant, e.g. "hd", "medium"
+    url: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    size: Optional[int] = None  # Bytes, when the provider reports it (Pixabay)
+    fps: Optional[float] = None # Frame rate, when the provider reports it (Pexels)
+
+    @property
+    def has_dimensions(self) -> bool:
+        return bool(self.width and self.height)
+
+    def cover_scale(self, target_dims: Tuple[int, int]) -> float:
+        """Scale factor applied by scale-to-cover; <= 1 means the crop is covered without upscaling."""
+        target_w, target_h = target_dims
+        return max(target_w / self.width, target_h / self.height)
+
+
+def pexels_renditions(video_files: List[dict]) -> List[Rendition]:
+    """Converts the video_files list of a Pexels video into renditions (MP4 files with a link only)."""
+    return [
+        Rendition(
+            provider="pexels",
+            name=str(vf.get("quality")),
+            url=vf["link"],
+            width=vf.get("width"),
+            height=vf.get("height"),
+            fps=vf.get("fps"),
+        )
+        for vf in video_files
+        if vf.get("file_type") == "video/mp4" and vf.get("link")
+    ]
+
+
+def pixabay_renditions(videos) -> List[Rendition]:
+    """Converts a PixabayVideoVersions model into renditions."""
+    renditions = []
+    for name in ("large", "medium", "small", "tiny"):
+        detail = getattr(videos, name, None)
+        if detail and detail.url:
+            renditions.append(Rendition(
+                provider="pixabay", name=name, url=str(detail.url),
+                width=detail.width or None, height=detail.height or None, size=detail.size or None,
+            ))
+    return renditions
+
+
+def select_rendition(
+    renditions: List[Rendition],
+    target_dims: Tuple[int, int] = DEFAULT_TARGET_DIMS,
+    target_fps: Optional[float] = DEFAULT_TARGET_FPS,
+) -> Optional[Rendition]:
+    """
+    Picks the smallest rendition that still covers target_dims after scale-to-cover and center-crop.
+
+    Among covering renditions the one with the fewest pixels wins; ties prefer a frame rate at or above
+    target_fps (closest first) and then the smaller file. If nothing covers the target, the rendition
+    needing the least upscaling is returned.
+
+    Args:
+        renditions: Candidate renditions of a single asset.
+        target_dims: (width, height) of the final frame.
+        target_fps: Output frame rate, used only to break ties.
+
+    Returns:
+        The chosen rendition, or None if no candidate reports its dimensions (callers should then
+        fall back to their provider-specific preference order).
+    """
+    candidates = [r for r in renditions if r.has_dimensions]
+    if not candidates:
+        return None
+
+    def _fps_penalty(r: Rendition) -> float:
+        if not target_fps or not r.fps:
+            return 0.0
+        if r.fps < target_fps:
+            return 1000.0 + (target_fps - r.fps)
+        return r.fps - target_fps
+
+    covering = [r for r in candidates if r.cover_scale(target_dims) <= 1.0]
+    if covering:
+        chosen = min(covering, key=lambda r: (r.width * r.height, _fps_penalty(r), r.size or 0))
+        reason = "smallest covering"
+    else:
+        chosen = min(candidates, key=lambda r: (r.cover_scale(target_dims), _fps_penalty(r), r.size or 0))
+        reason = "none cover target, least upscaling"
+
+    size_info = f", {chosen.size / (1024 * 1024):.1f} MB" if chosen.size else ""
+    fps_info = f" @ {chosen.fps:g}fps" if chosen.fps else ""
+    logger.info(
+        f"Selected {chosen.provider} rendition '{chosen.name}' {chosen.width}x{chosen.height}{fps_info}{size_info} "
+        f"for target {target_dims[0]}x{target_dims[1]} ({reason}; {len(candidates)} candidates)."
+    )
+    return chosen
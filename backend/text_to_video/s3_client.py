@@ -1,11 +1,28 @@
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError, NoCredentialsError
+import io
+import time
+import hashlib
 import logging
 import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dotenv import load_dotenv
+
+from backend.text_to_video.tracing import span, current_span, submit_in_context
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Upload Manager Configuration
+S3_UPLOAD_MAX_WORKERS = int(os.getenv("S3_UPLOAD_MAX_WORKERS", "8"))
+S3_MULTIPART_THRESHOLD_BYTES = int(os.getenv("S3_MULTIPART_THRESHOLD_BYTES", str(8 * 1024 * 1024)))
+S3_MULTIPART_CHUNKSIZE_BYTES = int(os.getenv("S3_MULTIPART_CHUNKSIZE_BYTES", str(8 * 1024 * 1024)))
+S3_PRESIGNED_URL_EXPIRES_SECONDS = int(os.getenv("S3_PRESIGNED_URL_EXPIRES_SECONDS", "3600"))
+S3_PRESIGNED_URL_MIN_REMAINING_SECONDS = 300 # Don't hand out cached URLs that expire sooner than this
+CONTENT_HASH_METADATA_KEY = "sha256"
+
 def get_s3_client():
     """Creates and returns an S3 client using environment credentials."""
     try:
@@ -75,6 +92,13 @@ def ensure_s3_bucket(s3_client, bucket_name: str, region: str = None):
             logger.error(f"Error checking S3 bucket '{bucket_name}': {e}")
             return False
 
+def _public_object_url(s3_client, bucket_name: str, s3_key: str) -> str:
+    """Constructs the public URL of an object (common format, may vary slightly by region/settings)."""
+    region = s3_client.meta.region_name
+    if region == 'us-east-1':
+        return f"https://{bucket_name}.s3.amazonaws.com/{s3_key}"
+    return f"https://{bucket_name}.s3.{region}.amazonaws.com/{s3_key}"
+
 def upload_to_s3(s3_client, local_file_path: str, bucket_name: str, s3_key: str) -> str | None:
     """
     Uploads a local file to an S3 bucket and returns its public URL.
@@ -109,12 +133,7 @@ def upload_to_s3(s3_client, local_file_path: str, bucket_name: str, s3_key: str)
             ExtraArgs={'ContentType': 'audio/mpeg'} # Set only ContentType
         )
 
-        # Construct the public URL (common format, may vary slightly by region/settings)
-        region = s3_client.meta.region_name
-        if region == 'us-east-1':
-            object_url = f"https://{bucket_name}.s3.amazonaws.com/{s3_key}"
-        else:
-            object_url = f"https://{bucket_name}.s3.{region}.amazonaws.com/{s3_key}"
+        object_url = _public_object_url(s3_client, bucket_name, s3_key)
 
         logger.info(f"Successfully uploaded to {object_url}")
         return object_url
@@ -129,6 +148,145 @@ def upload_to_s3(s3_client, local_file_path: str, bucket_name: str, s3_key: str)
         logger.error(f"An unexpected error occurred during S3 upload: {e}")
         return None
 
+class S3UploadManager:
+    """
+    Uploads files and in-memory buffers to one bucket with bounded parallelism.
+
+    Every object is tagged with the sha256 of its content in its metadata; an upload whose key already
+    holds the same content is skipped after a single HEAD request. Large bodies use multipart
+    transfers (TransferConfig), and presigned GET URLs are cached until they near expiry.
+
+    Usage:
+        with S3UploadManager(s3_client, bucket) as uploads:
+            future = uploads.submit_bytes(buffer.getvalue(), "job/scene_001.mp3")
+            url = future.result()
+    """
+
+    def __init__(
+        self,
+        s3_client,
+        bucket_name: str,
+        max_workers: int = S3_UPLOAD_MAX_WORKERS,
+        multipart_threshold: int = S3_MULTIPART_THRESHOLD_BYTES,
+        multipart_chunksize: int = S3_MULTIPART_CHUNKSIZE_BYTES,
+    ):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=4,
+            use_threads=True,
+        )
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="s3_upload")
+        self._presigned_urls: dict[tuple[str, int], tuple[str, float]] = {}
+        self._presigned_lock = threading.Lock()
+        self.stats = {"uploaded": 0, "skipped": 0, "failed": 0, "bytes_uploaded": 0}
+        self._stats_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self) -> None:
+        """Waits for queued uploads and releases the worker threads."""
+        self._executor.shutdown(wait=True)
+
+    def object_url(self, s3_key: str) -> str:
+        return _public_object_url(self.s3_client, self.bucket_name, s3_key)
+
+    def _existing_content_hash(self, s3_key: str) -> str | None:
+        try:
+            head = self.s3_client.head_object(Bucket=self.bucket_name, Key=s3_key)
+        except ClientError:
+            return None # Missing (404) or not readable; upload normally
+        return head.get("Metadata", {}).get(CONTENT_HASH_METADATA_KEY)
+
+    def _upload(self, body, size: int, content_hash: str, s3_key: str, content_type: str) -> str | None:
+        with span("s3 upload", "provider", key=s3_key, bytes=size):
+            return self._upload_unless_present(body, size, content_hash, s3_key, content_type)
+
+    def _upload_unless_present(self, body, size: int, content_hash: str, s3_key: str, content_type: str) -> str | None:
+        if self._existing_content_hash(s3_key) == content_hash:
+            with self._stats_lock:
+                self.stats["skipped"] += 1
+            current_span().set_attribute("cache_hit", True)
+            logger.info(f"s3://{self.bucket_name}/{s3_key} already holds this content ({content_hash[:12]}). Skipping upload.")
+            return self.object_url(s3_key)
+
+        extra_args = {"ContentType": content_type, "Metadata": {CONTENT_HASH_METADATA_KEY: content_hash}}
+        start = time.monotonic()
+        try:
+            if isinstance(body, str):
+                self.s3_client.upload_file(body, self.bucket_name, s3_key, ExtraArgs=extra_args, Config=self.transfer_config)
+            else:
+                self.s3_client.upload_fileobj(body, self.bucket_name, s3_key, ExtraArgs=extra_args, Config=self.transfer_config)
+        except (ClientError, NoCredentialsError) as e:
+            with self._stats_lock:
+                self.stats["failed"] += 1
+            logger.error(f"Failed to upload to s3://{self.bucket_name}/{s3_key}: {e}")
+            return None
+
+        with self._stats_lock:
+            self.stats["uploaded"] += 1
+            self.stats["bytes_uploaded"] += size
+        with self._presigned_lock: # Content changed; previously signed URLs still work but drop them anyway
+            for cache_key in [k for k in self._presigned_urls if k[0] == s3_key]:
+                del self._presigned_urls[cache_key]
+        logger.info(f"Uploaded {size} bytes to s3://{self.bucket_name}/{s3_key} in {time.monotonic() - start:.2f}s")
+        return self.object_url(s3_key)
+
+    def upload_bytes(self, data: bytes | io.BytesIO, s3_key: str, content_type: str = "audio/mpeg") -> str | None:
+        """
+        Uploads an in-memory body, skipping it if the key already holds identical content.
+
+        Returns:
+            The public URL of the object, or None if the upload failed.
+        """
+        payload = data.getvalue() if isinstance(data, io.BytesIO) else data
+        content_hash = hashlib.sha256(payload).hexdigest()
+        return self._upload(io.BytesIO(payload), len(payload), content_hash, s3_key, content_type)
+
+    def upload_file(self, local_file_path: str, s3_key: str, content_type: str = "audio/mpeg") -> str | None:
+        """Uploads a local file, skipping it if the key already holds identical content. Returns the public URL or None."""
+        if not os.path.exists(local_file_path):
+            logger.error(f"Local file not found for upload: {local_file_path}")
+            return None
+        digest = hashlib.sha256()
+        with open(local_file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return self._upload(local_file_path, os.path.getsize(local_file_path), digest.hexdigest(), s3_key, content_type)
+
+    def submit_bytes(self, data: bytes | io.BytesIO, s3_key: str, content_type: str = "audio/mpeg") -> Future:
+        """Queues upload_bytes on the manager's bounded pool. The future resolves to the URL or None."""
+        return submit_in_context(self._executor, self.upload_bytes, data, s3_key, content_type) # Keeps the job's trace
+
+    def submit_file(self, local_file_path: str, s3_key: str, content_type: str = "audio/mpeg") -> Future:
+        """Queues upload_file on the manager's bounded pool. The future resolves to the URL or None."""
+        return submit_in_context(self._executor, self.upload_file, local_file_path, s3_key, content_type)
+
+    def presigned_url(self, s3_key: str, expires_in: int = S3_PRESIGNED_URL_EXPIRES_SECONDS) -> str | None:
+        """Returns a presigned GET URL for s3_key, reusing a cached one while it has enough lifetime left."""
+        cache_key = (s3_key, expires_in)
+        now = time.time()
+        with self._presigned_lock:
+            cached = self._presigned_urls.get(cache_key)
+            if cached and cached[1] - now > min(S3_PRESIGNED_URL_MIN_REMAINING_SECONDS, expires_in / 2):
+                return cached[0]
+        try:
+            url = self.s3_client.generate_presigned_url(
+                "get_object", Params={"Bucket": self.bucket_name, "Key": s3_key}, ExpiresIn=expires_in
+            )
+        except (ClientError, NoCredentialsError) as e:
+            logger.error(f"Failed to presign s3://{self.bucket_name}/{s3_key}: {e}")
+            return None
+        with self._presigned_lock:
+            self._presigned_urls[cache_key] = (url, now + expires_in)
+        return url
+
 # Example Usage
 if __name__ == "__main__":
     load_dotenv()
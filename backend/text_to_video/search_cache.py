@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from backend.text_to_video.tracing import event
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- Cache Configuration ---
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / "assets" / "cache" / "stock_search"
+DEFAULT_TTL_SECONDS = 24 * 60 * 60           # Entries younger than this are served without touching the API
+DEFAULT_STALE_TTL_SECONDS = 7 * 24 * 60 * 60 # Older entries within this extra window are served stale and refreshed in the background
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_RESCAN_SECONDS = 10 * 60 # The size index is rebuilt from disk this often, picking up entries other processes wrote
+
+# Params that identify the caller rather than the query; never part of the cache key.
+_EXCLUDED_KEY_PARAMS = {"key", "api_key", "token"}
+
+
+def _normalize_param_value(value: Any) -> Any:
+    """Normalizes a search param so that trivially different queries share a cache entry."""
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    return value
+
+
+class SearchCache:
+    """
+    Disk-backed cache for stock provider search responses.
+
+    Entries are keyed by (provider, endpoint, normalized params) and stored one JSON file per key.
+    Fresh entries are returned directly, stale entries are returned immediately while a background
+    thread refreshes them (stale-while-revalidate), and expired entries are refetched synchronously.
+    The cache is bounded by entry count and total bytes; the least recently written entries are evicted first.
+    Sizes are tracked in an in-memory index, so a write costs O(1) plus its evictions; the directory is only
+    scanned on the first write and then every rescan_seconds.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path = DEFAULT_CACHE_DIR,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        stale_ttl_seconds: float = DEFAULT_STALE_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        rescan_seconds: float = DEFAULT_RESCAN_SECONDS,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.stale_ttl_seconds = stale_ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.rescan_seconds = rescan_seconds
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, int]" = OrderedDict() # Entry key -> bytes, least recently written first
+        self._index_bytes = 0
+        self._indexed_at: Optional[float] = None
+        self._refreshing: set[str] = set()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0}
+
+    @staticmethod
+    def make_key(provider: str, endpoint: str, params: Dict[str, Any]) -> str:
+        """Builds a stable cache key from the provider, endpoint and normalized search params."""
+        normalized_params = {
+            k: _normalize_param_value(v) for k, v in sorted(params.items())
+            if k not in _EXCLUDED_KEY_PARAMS and v is not None
+        }
+        key_material = json.dumps([provider, endpoint, normalized_params], sort_keys=True, default=str)
+        return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Tuple[Optional[Any], Optional[float]]:
+        """
+        Reads a cache entry.
+
+        Returns:
+            A (value, age_seconds) tuple, or (None, None) if the entry is missing, expired or unreadable.
+        """
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'r') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None, None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Discarding unreadable search cache entry {entry_path}: {e}")
+            try: entry_path.unlink()
+            except OSError: pass
+            with self._lock:
+                self._index_bytes -= self._index.pop(key, 0)
+            return None, None
+
+        age_seconds = time.time() - entry.get("stored_at", 0)
+        if age_seconds > self.ttl_seconds + self.stale_ttl_seconds:
+            return None, None
+        return entry.get("value"), age_seconds
+
+    def set(self, key: str, value: Any, provider: str = None, endpoint: str = None) -> None:
+        """Writes a cache entry atomically and enforces the size limits."""
+        entry = {"provider": provider, "endpoint": endpoint, "stored_at": time.time(), "value": value}
+        entry_path = self._entry_path(key)
+        temp_path = entry_path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(entry, f)
+            os.replace(temp_path, entry_path)
+            size = entry_path.stat().st_size
+        except OSError as e:
+            logger.warning(f"Failed to write search cache entry {entry_path}: {e}")
+            try: temp_path.unlink()
+            except OSError: pass
+            return
+        self._record_write(key, size)
+
+    def _record_write(self, key: str, size: int) -> None:
+        with self._lock:
+            if self._indexed_at is None or time.monotonic() - self._indexed_at >= self.rescan_seconds:
+                self._scan() # Picks up the entry just written
+            else:
+                self._index_bytes += size - self._index.pop(key, 0)
+                self._index[key] = size
+            self._evict_if_needed()
+
+    def _scan(self) -> None:
+        entries = []
+        for entry_path in self.cache_dir.glob("*.json"):
+            try:
+                stat = entry_path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, entry_path.stem, stat.st_size))
+        entries.sort() # Oldest first
+        self._index = OrderedDict((key, size) for _, key, size in entries)
+        self._index_bytes = sum(size for _, _, size in entries)
+        self._indexed_at = time.monotonic()
+
+    def _evict_if_needed(self) -> None:
+        evicted = 0
+        while self._index and (len(self._index) > self.max_entries or self._index_bytes > self.max_bytes):
+            key, size = self._index.popitem(last=False)
+            try:
+                self._entry_path(key).unlink()
+                evicted += 1
+            except OSError:
+                pass
+            self._index_bytes -= size
+        if evicted:
+            logger.info(f"Evicted {evicted} search cache entries to stay within limits.")
+
+    def _count(self, name: str) -> None:
+        with self._lock: # get_or_fetch runs on the scene and hedge thread pools
+            self.stats[name] += 1
+
+    def _refresh_in_background(self, key: str, provider: str, endpoint: str, fetch_fn: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def _refresh():
+            try:
+                value = fetch_fn()
+                if value is not None:
+                    self.set(key, value, provider, endpoint)
+                    logger.debug(f"Refreshed stale search cache entry for {provider} {endpoint}.")
+            except Exception as e:
+                logger.warning(f"Background refresh of search cache entry for {provider} {endpoint} failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=_refresh, name=f"search_cache_refresh_{key[:8]}", daemon=True).start()
+
+    def get_or_fetch(self, provider: str, endpoint: str, params: Dict[str, Any], fetch_fn: Callable[[], Any]) -> Any:
+        """
+        Returns the cached response for a search, calling fetch_fn on a miss.
+
+        Args:
+            provider: Provider name, e.g. "pexels" or "pixabay".
+            endpoint: Logical endpoint name, e.g. "videos" or "images".
+            params: The search params sent to the provider (API keys are ignored for keying).
+            fetch_fn: Zero-argument callable performing the real request. Returning None means
+                      "do not cache" (e.g. the request failed).
+
+        Returns:
+            The cached or freshly fetched value (may be None if the fetch failed).
+        """
+        key = self.make_key(provider, endpoint, params)
+        value, age_seconds = self.get(key)
+
+        if value is not None and age_seconds <= self.ttl_seconds:
+            self._count("hits")
+            event("search_cache hit", "cache", provider=provider, endpoint=endpoint, cache_hit=True)
+            logger.info(f"Search cache hit for {provider} {endpoint} (age {age_seconds:.0f}s).")
+            return value
+
+        if value is not None:
+            self._count("stale_hits")
+            event("search_cache stale hit", "cache", provider=provider, endpoint=endpoint, cache_hit=True)
+            logger.info(f"Serving stale search cache entry for {provider} {endpoint} (age {age_seconds:.0f}s) while revalidating.")
+            self._refresh_in_background(key, provider, endpoint, fetch_fn)
+            return value
+
+        self._count("misses")
+        event("search_cache miss", "cache", provider=provider, endpoint=endpoint, cache_hit=False)
+        value = fetch_fn()
+        if value is not None:
+            self.set(key, value, provider, endpoint)
+        return value
+
+
+_default_cache: Optional[SearchCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> Optional[SearchCache]:
+    """
+    Returns the process-wide search cache configured from the environment, or None if caching is disabled.
+
+    Environment:
+        STOCK_SEARCH_CACHE_DISABLED: Set to "1"/"true" to bypass the cache entirely.
+        STOCK_SEARCH_CACHE_DIR: Directory for cache entries.
+        STOCK_SEARCH_CACHE_TTL_SECONDS / STOCK_SEARCH_CACHE_STALE_TTL_SECONDS: Freshness windows.
+        STOCK_SEARCH_CACHE_MAX_ENTRIES / STOCK_SEARCH_CACHE_MAX_BYTES: Size limits.
+        STOCK_SEARCH_CACHE_RESCAN_SECONDS: How often the size index is rebuilt from the directory.
+    """
+    global _default_cache
+    if os.getenv("STOCK_SEARCH_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = SearchCache(
+                cache_dir=os.getenv("STOCK_SEARCH_CACHE_DIR", str(DEFAULT_CACHE_DIR)),
+                ttl_seconds=float(os.getenv("STOCK_SEARCH_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+                stale_ttl_seconds=float(os.getenv("STOCK_SEARCH_CACHE_STALE_TTL_SECONDS", DEFAULT_STALE_TTL_SECONDS)),
+                max_entries=int(os.getenv("STOCK_SEARCH_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                max_bytes=int(os.getenv("STOCK_SEARCH_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+                rescan_seconds=float(os.getenv("STOCK_SEARCH_CACHE_RESCAN_SECONDS", DEFAULT_RESCAN_SECONDS)),
+            )
+        return _default_cache
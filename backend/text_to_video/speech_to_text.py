@@ -1,6 +1,9 @@
 import os
 from groq import Groq
 
+from backend.text_to_video.metrics import observe_stage, observe_provider
+
+@observe_stage("transcription")
 def transcribe_audio(audio_file_path, response_format="verbose_json"):
     """
     Transcribe audio file to text using Groq's Whisper model.
@@ -15,7 +18,7 @@ def transcribe_audio(audio_file_path, response_format="verbose_json"):
     client = Groq()
     
     try:
-        with open(audio_file_path, "rb") as file:
+        with open(audio_file_path, "rb") as file, observe_provider("groq"):
             transcription = client.audio.transcriptions.create(
                 file=(audio_file_path, file.read()),
                 model="whisper-large-v3-turbo",
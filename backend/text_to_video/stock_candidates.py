@@ -0,0 +1,244 @@
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import requests
+from pydantic import BaseModel
+
+from backend.text_to_video.media_store import get_media_store
+from backend.text_to_video.metrics import record_download
+from backend.text_to_video.rendition_selector import DEFAULT_TARGET_DIMS, Rendition
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- Candidate Pipeline Configuration ---
+STOCK_CANDIDATE_TOP_N = int(os.getenv("STOCK_CANDIDATE_TOP_N", "5"))           # Candidates considered per scene
+STOCK_PROBE_AHEAD = int(os.getenv("STOCK_PROBE_AHEAD", "1"))                   # Runner-ups probed while the leader downloads
+STOCK_PROBE_TIMEOUT_SECONDS = float(os.getenv("STOCK_PROBE_TIMEOUT_SECONDS", "5"))
+STOCK_PROBE_MAX_WORKERS = int(os.getenv("STOCK_PROBE_MAX_WORKERS", "8"))
+DOWNLOAD_TIMEOUT_SECONDS = 60
+DOWNLOAD_CHUNK_BYTES = 8192
+SHORT_CLIP_PENALTY = 100.0      # Clips shorter than the scene are only used when nothing else fits
+ORIENTATION_PENALTY = 10.0      # Landscape footage in a portrait frame loses most of the picture to the crop
+UPSCALE_PENALTY = 5.0           # Per unit of scale-to-cover factor above 1
+EXCESS_DURATION_PENALTY = 0.5   # Max penalty for a clip much longer than needed (more bytes, same footage)
+SIZE_PENALTY = 1.0              # Max penalty for the heaviest candidate in the pool
+ESTIMATED_BYTES_PER_PIXEL_SECOND = 0.1 # Rough H.264 rate, for sizing renditions the provider does not report
+DEFAULT_CLIP_SECONDS = 10.0
+PROBE_CONTENT_TYPES = ("video/", "image/", "application/octet-stream", "binary/octet-stream")
+
+
+class StockCandidate(BaseModel):
+    """One search result of a stock provider, with the rendition that would be downloaded for it."""
+    provider: str
+    asset_id: str
+    rendition: Rendition
+    rendition_key: str               # Media store key of the rendition, e.g. "1080x1920" or "medium"
+    output_path: str                 # Where the job expects the downloaded file
+    duration: Optional[float] = None # Seconds, as reported by the provider
+    width: Optional[int] = None      # Dimensions of the source asset (orientation)
+    height: Optional[int] = None
+    score: float = 0.0               # Lower is better; set by rank_candidates
+
+
+_probe_executor: Optional[ThreadPoolExecutor] = None
+_probe_executor_lock = threading.Lock()
+
+
+def _get_probe_executor() -> ThreadPoolExecutor:
+    global _probe_executor
+    with _probe_executor_lock:
+        if _probe_executor is None:
+            _probe_executor = ThreadPoolExecutor(max_workers=STOCK_PROBE_MAX_WORKERS, thread_name_prefix="stock-probe")
+        return _probe_executor
+
+
+def _estimated_bytes(candidate: StockCandidate) -> float:
+    if candidate.rendition.size:
+        return float(candidate.rendition.size)
+    if not candidate.rendition.has_dimensions:
+        return 0.0
+    duration = candidate.duration or DEFAULT_CLIP_SECONDS
+    return candidate.rendition.width * candidate.rendition.height * duration * ESTIMATED_BYTES_PER_PIXEL_SECOND
+
+
+def rank_candidates(
+    candidates: List[StockCandidate],
+    min_duration: Optional[float] = None,
+    target_dims: Tuple[int, int] = DEFAULT_TARGET_DIMS,
+    top_n: int = STOCK_CANDIDATE_TOP_N,
+) -> List[StockCandidate]:
+    """
+    Orders search results by how likely they are to be usable, best first, and keeps the top_n.
+
+    The score adds penalties for a clip shorter than min_duration (kept only as a last resort), an
+    orientation that does not match target_dims, a rendition that must be upscaled to cover the frame,
+    and, as a tie-breaker, surplus duration and download size. Equal scores keep the provider's order.
+
+    Args:
+        candidates: Results of one search.
+        min_duration: Seconds of footage the scene needs, if known.
+        target_dims: (width, height) of the final frame.
+        top_n: Maximum number of candidates returned.
+
+    Returns:
+        The best top_n candidates with their score set.
+    """
+    if not candidates:
+        return []
+    want_portrait = target_dims[1] > target_dims[0]
+    max_bytes = max(_estimated_bytes(c) for c in candidates) or 1.0
+
+    for candidate in candidates:
+        score = 0.0
+        if min_duration and candidate.duration:
+            if candidate.duration < min_duration:
+                score += SHORT_CLIP_PENALTY + (min_duration - candidate.duration)
+            else:
+                score += EXCESS_DURATION_PENALTY * min(1.0, (candidate.duration - min_duration) / min_duration)
+        width = candidate.width or candidate.rendition.width
+        height = candidate.height or candidate.rendition.height
+        if width and height and width != height and (height > width) != want_portrait:
+            score += ORIENTATION_PENALTY
+        if candidate.rendition.has_dimensions:
+            score += UPSCALE_PENALTY * max(0.0, candidate.rendition.cover_scale(target_dims) - 1.0)
+        score += SIZE_PENALTY * _estimated_bytes(candidate) / max_bytes
+        candidate.score = score
+
+    ranked = sorted(candidates, key=lambda c: c.score)[:top_n]
+    logger.info(f"Ranked {len(candidates)} stock candidates; trying {[(c.provider, c.asset_id, round(c.score, 2)) for c in ranked]}.")
+    return ranked
+
+
+def probe_candidate(candidate: StockCandidate, timeout: float = STOCK_PROBE_TIMEOUT_SECONDS) -> bool:
+    """
+    Checks that a candidate's file is downloadable without fetching it: a HEAD request, or a one-byte
+    ranged GET for hosts that reject HEAD. Fails on error statuses, empty files and non-media responses.
+    """
+    url = candidate.rendition.url
+    try:
+        response = requests.head(url, allow_redirects=True, timeout=timeout)
+        if response.status_code in (403, 405, 501): # Some CDNs only sign GETs
+            response = requests.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=timeout)
+            response.close()
+    except requests.exceptions.RequestException as e:
+        logger.info(f"Probe of {candidate.provider} asset {candidate.asset_id} failed: {e}")
+        return False
+
+    if response.status_code not in (200, 206):
+        logger.info(f"Probe of {candidate.provider} asset {candidate.asset_id} returned HTTP {response.status_code}.")
+        return False
+    content_type = response.headers.get("Content-Type")
+    if isinstance(content_type, str) and content_type and not content_type.lower().startswith(PROBE_CONTENT_TYPES):
+        logger.info(f"Probe of {candidate.provider} asset {candidate.asset_id} returned non-media content type '{content_type}'.")
+        return False
+    if response.headers.get("Content-Length") == "0":
+        logger.info(f"Probe of {candidate.provider} asset {candidate.asset_id} reports an empty file.")
+        return False
+    return True
+
+
+def download_candidate(candidate: StockCandidate, cancel_event: Optional[threading.Event] = None) -> Optional[str]:
+    """
+    Downloads a candidate to its output_path, through the shared media store when it is enabled.
+
+    The download is abandoned as soon as cancel_event is set (another candidate or provider won), and
+    is rejected if the body is empty or shorter than the announced Content-Length.
+
+    Returns:
+        The output path on success, otherwise None (no partial file is left behind).
+    """
+    url = candidate.rendition.url
+
+    def _stream_to(path: str) -> bool:
+        response = requests.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT_SECONDS)
+        try:
+            response.raise_for_status()
+            written = 0
+            with open(path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                    if cancel_event is not None and cancel_event.is_set():
+                        logger.info(f"Cancelled download of {candidate.provider} asset {candidate.asset_id}; another candidate won.")
+                        return False
+                    f.write(chunk)
+                    written += len(chunk)
+        finally:
+            response.close()
+        expected = response.headers.get("Content-Length")
+        if isinstance(expected, str) and expected.isdigit() and not response.headers.get("Content-Encoding") and written != int(expected):
+            logger.warning(f"Truncated download of {candidate.provider} asset {candidate.asset_id}: {written} of {expected} bytes.")
+            return False
+        record_download(candidate.provider, written)
+        return True
+
+    output_path = Path(candidate.output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    logger.info(f"Downloading {candidate.provider} asset {candidate.asset_id} ({candidate.rendition_key}) to {output_path}")
+    try:
+        media_store = get_media_store()
+        if media_store is not None:
+            ok = media_store.fetch(candidate.provider, candidate.asset_id, candidate.rendition_key, str(output_path), _stream_to) is not None
+        else:
+            ok = _stream_to(str(output_path))
+    except (requests.exceptions.RequestException, OSError) as e:
+        logger.error(f"Error downloading {candidate.provider} asset {candidate.asset_id} from {url}: {e}")
+        ok = False
+
+    if ok and output_path.exists() and output_path.stat().st_size > 0:
+        return str(output_path)
+    if output_path.exists():
+        try: output_path.unlink()
+        except OSError: pass
+    return None
+
+
+def fetch_best_candidates(
+    candidates: List[StockCandidate],
+    count: int = 1,
+    cancel_event: Optional[threading.Event] = None,
+    probe_ahead: int = STOCK_PROBE_AHEAD,
+) -> List[StockCandidate]:
+    """
+    Downloads the first `count` usable candidates of a ranked list.
+
+    The leading candidate starts downloading immediately while the next probe_ahead candidates are
+    probed in parallel, so when the leader turns out to be unusable the fallback is already known to be
+    reachable (candidates whose probe failed are skipped without a download). Outstanding probes are
+    cancelled as soon as enough candidates validate, and everything stops once cancel_event is set.
+
+    Args:
+        candidates: Candidates in preference order (see rank_candidates).
+        count: Number of assets wanted.
+        cancel_event: Set by the caller when the result is no longer needed (e.g. a hedged provider won).
+        probe_ahead: How many runner-ups to probe while a download is in flight.
+
+    Returns:
+        The candidates that were downloaded, in preference order.
+    """
+    winners: List[StockCandidate] = []
+    probes = {}
+    try:
+        for index, candidate in enumerate(candidates):
+            if len(winners) >= count or (cancel_event is not None and cancel_event.is_set()):
+                break
+            for ahead in range(index + 1, min(index + 1 + probe_ahead, len(candidates))):
+                if ahead not in probes:
+                    probes[ahead] = _get_probe_executor().submit(probe_candidate, candidates[ahead])
+            if index in probes and not probes[index].result():
+                logger.info(f"Skipping {candidate.provider} asset {candidate.asset_id}: probe failed.")
+                continue
+            if download_candidate(candidate, cancel_event):
+                winners.append(candidate)
+                if index > 0:
+                    logger.info(f"Fallback candidate #{index + 1} ({candidate.provider} asset {candidate.asset_id}) validated.")
+            else:
+                logger.warning(f"Candidate {candidate.provider} asset {candidate.asset_id} was unusable; moving to the runner-up.")
+    finally:
+        for future in probes.values():
+            future.cancel()
+    return winners
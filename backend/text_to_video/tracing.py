@@ -0,0 +1,295 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- Tracing Configuration ---
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() in ("1", "true", "yes")
+TRACE_DIR = Path(os.getenv("TRACE_DIR", str(Path(__file__).resolve().parent.parent / "data" / "traces"))) # One <job_id>.trace.json per job
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "20000")) # Per job and process; later spans are dropped
+TRACE_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "wanx")
+_otlp_base = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+OTLP_TRACES_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT") or (f"{_otlp_base.rstrip('/')}/v1/traces" if _otlp_base else None) # OTLP/HTTP JSON; unset disables
+OTLP_HEADERS = dict(pair.split("=", 1) for pair in os.getenv("OTEL_EXPORTER_OTLP_HEADERS", "").split(",") if "=" in pair)
+OTLP_TIMEOUT_SECONDS = 5
+
+_current_trace: contextvars.ContextVar[Optional["_JobTrace"]] = contextvars.ContextVar("trace", default=None)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("span", default=None)
+_parent_from_context: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_parent", default=None) # Set when a trace continues in another process
+_file_lock = threading.Lock()
+
+
+def _trace_id(job_id: str) -> str:
+    # Derived from the job, so the parts of a job traced in other processes join the same trace
+    return hashlib.sha256(job_id.encode()).hexdigest()[:32]
+
+
+def _new_span_id() -> str:
+    return os.urandom(8).hex()
+
+
+class Span:
+    """A timed operation of a job. Attributes are shown in the trace viewer and exported to OTLP."""
+
+    def __init__(self, name: str, category: str, job_id: str, parent_id: Optional[str], attributes: dict):
+        self.name = name
+        self.category = category
+        self.job_id = job_id
+        self.span_id = _new_span_id()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = time.time_ns() # Wall clock, so spans from several processes line up
+        self.duration_ns = 0
+        self.thread_id = threading.get_native_id()
+        self.error: Optional[str] = None
+        self._start = time.perf_counter_ns()
+
+    def set_attribute(self, name: str, value) -> None:
+        self.attributes[name] = value
+
+    def add(self, name: str, amount: float) -> None:
+        """Adds amount to a numeric attribute (e.g. bytes downloaded within the span)."""
+        self.attributes[name] = self.attributes.get(name, 0) + amount
+
+    def _finish(self) -> None:
+        self.duration_ns = time.perf_counter_ns() - self._start
+
+
+class _NullSpan:
+    """Stands in for a span when no job is being traced, so instrumented code never checks."""
+
+    def set_attribute(self, name: str, value) -> None:
+        pass
+
+    def add(self, name: str, amount: float) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _JobTrace:
+    """Finished spans (and instant events) of one job in this process, written out when the job's work ends."""
+
+    def __init__(self, job_id: str, trace_dir: Optional[Path] = None):
+        self.job_id = job_id
+        self.trace_dir = Path(trace_dir) if trace_dir else None
+        self.spans: list[Span] = []
+        self.events: list[tuple[str, str, int, int, dict]] = [] # (name, category, time_ns, thread_id, attributes)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def record(self, span: Span) -> None:
+        with self._lock:
+            if len(self.spans) + len(self.events) < TRACE_MAX_SPANS:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+    def record_event(self, name: str, category: str, attributes: dict) -> None:
+        with self._lock:
+            if len(self.spans) + len(self.events) < TRACE_MAX_SPANS:
+                self.events.append((name, category, time.time_ns(), threading.get_native_id(), attributes))
+            else:
+                self.dropped += 1
+
+
+def _chrome_events(trace: _JobTrace) -> list[dict]:
+    pid = os.getpid()
+    events = [{
+        "name": span.name, "cat": span.category, "ph": "X", "pid": pid, "tid": span.thread_id,
+        "ts": span.start_ns / 1000, "dur": span.duration_ns / 1000,
+        "args": {"job_id": span.job_id, "span_id": span.span_id, "parent_id": span.parent_id, **span.attributes,
+                 **({"error": span.error} if span.error else {})},
+    } for span in trace.spans]
+    events.extend({
+        "name": name, "cat": category, "ph": "i", "s": "t", "pid": pid, "tid": thread_id, "ts": time_ns / 1000,
+        "args": {"job_id": trace.job_id, **attributes},
+    } for name, category, time_ns, thread_id, attributes in trace.events)
+    return events
+
+
+def write_chrome_trace(trace: _JobTrace, trace_dir: Path = TRACE_DIR) -> Optional[Path]:
+    """
+    Appends the trace's spans to <trace_dir>/<job_id>.trace.json in the Chrome trace event format (JSON
+    array form, which viewers accept unterminated), so every process and task of a job adds to one file.
+    Open it in https://ui.perfetto.dev or chrome://tracing.
+    """
+    events = _chrome_events(trace)
+    if not events:
+        return None
+    path = Path(trace_dir) / f"{trace.job_id}.trace.json"
+    text = "".join(json.dumps(event, default=str) + ",\n" for event in events)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with _file_lock, open(path, "a", encoding="utf-8") as f:
+            if f.tell() == 0:
+                text = "[\n" + text
+            f.write(text) # One append per task, so concurrent processes do not interleave events
+    except OSError as e:
+        logger.warning(f"[{trace.job_id}] Could not write trace file {path}: {e}")
+        return None
+    return path
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_payload(trace: _JobTrace) -> dict:
+    """The trace's spans as an OTLP/HTTP JSON ExportTraceServiceRequest."""
+    trace_id = _trace_id(trace.job_id)
+    spans = []
+    for span in trace.spans:
+        attributes = {"job.id": span.job_id, "span.category": span.category, **span.attributes}
+        spans.append({
+            "traceId": trace_id,
+            "spanId": span.span_id,
+            **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+            "name": span.name,
+            "kind": 1, # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.start_ns + span.duration_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        })
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": TRACE_SERVICE_NAME}},
+                                    {"key": "process.pid", "value": {"intValue": str(os.getpid())}}]},
+        "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+    }]}
+
+
+def _export_otlp(trace: _JobTrace, endpoint: str) -> None:
+    import requests # Only needed when an OTLP endpoint is configured
+
+    try:
+        response = requests.post(endpoint, json=otlp_payload(trace), headers=OTLP_HEADERS, timeout=OTLP_TIMEOUT_SECONDS)
+        if response.status_code >= 400:
+            logger.warning(f"[{trace.job_id}] OTLP export rejected ({response.status_code}): {response.text[:200]}")
+    except Exception as e:
+        logger.warning(f"[{trace.job_id}] OTLP export to {endpoint} failed: {e}")
+
+
+def _export(trace: _JobTrace) -> None:
+    if trace.dropped:
+        logger.warning(f"[{trace.job_id}] Trace exceeded {TRACE_MAX_SPANS} spans; {trace.dropped} were dropped.")
+    write_chrome_trace(trace, trace.trace_dir or TRACE_DIR)
+    if OTLP_TRACES_ENDPOINT and trace.spans:
+        threading.Thread(target=_export_otlp, args=(trace, OTLP_TRACES_ENDPOINT), name="otlp_export", daemon=True).start()
+
+
+@contextmanager
+def span(name: str, category: str = "internal", **attributes) -> Iterator[Span | _NullSpan]:
+    """
+    Times a block as a span nested under the current one (e.g. a provider call inside a stage).
+
+    Outside a traced job this yields a no-op span, so instrumented code costs nothing when not traced.
+    An exception is recorded on the span and re-raised.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield _NULL_SPAN
+        return
+    parent = _current_span.get()
+    current = Span(name, category, trace.job_id, parent.span_id if parent else _parent_from_context.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current._finish()
+        _current_span.reset(token)
+        trace.record(current)
+
+
+@contextmanager
+def job_trace(job_id: Optional[str], name: str, parent_id: Optional[str] = None, trace_dir: Optional[Path] = None,
+              **attributes) -> Iterator[Span | _NullSpan]:
+    """
+    Traces a unit of a job's work (a task run by the job executor or a queue worker) as a root span.
+
+    Spans opened below it in the same context (also in threads started with submit_in_context) belong
+    to the job. When the outermost job_trace of this context ends, its spans are appended to the job's
+    trace file and, if configured, exported to OTLP. Nested calls for the same job just open a span.
+
+    Args:
+        parent_id: Span id this work continues, when started from another process (see trace_context).
+        trace_dir: Where to write the trace file instead of TRACE_DIR (e.g. next to a pipeline run's outputs).
+    """
+    current = _current_trace.get()
+    if not TRACING_ENABLED or not job_id or (current is not None and current.job_id == job_id):
+        with span(name, "job", **attributes) as root:
+            yield root
+        return
+
+    trace = _JobTrace(job_id, trace_dir)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    parent_token = _parent_from_context.set(parent_id)
+    try:
+        with span(name, "job", **attributes) as root:
+            yield root
+    finally:
+        _parent_from_context.reset(parent_token)
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        _export(trace)
+
+
+def record_span(name: str, category: str, start_ns: int, duration_ns: int, error: Optional[str] = None, **attributes) -> None:
+    """
+    Records an already finished span under the current one, for work that cannot hold a span open in
+    its context (e.g. a generator suspended at each yield while its consumer opens spans of its own).
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    parent = _current_span.get()
+    finished = Span(name, category, trace.job_id, parent.span_id if parent else _parent_from_context.get(), attributes)
+    finished.start_ns, finished.duration_ns, finished.error = start_ns, duration_ns, error
+    trace.record(finished)
+
+
+def trace_context() -> Optional[tuple[str, Optional[str]]]:
+    """(job_id, current span id) to hand to another process, which continues the trace with job_trace."""
+    trace = _current_trace.get()
+    if trace is None:
+        return None
+    parent = _current_span.get()
+    return trace.job_id, parent.span_id if parent else None
+
+
+def submit_in_context(executor, fn, *args, **kwargs):
+    """executor.submit that carries the caller's context (its job trace, current span and request priority) into the worker thread."""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def current_span() -> Span | _NullSpan:
+    """The innermost open span, for adding attributes (e.g. cache_hit) from deeper code."""
+    return _current_span.get() or _NULL_SPAN
+
+
+def event(name: str, category: str = "event", **attributes) -> None:
+    """Records an instant event (e.g. a cache hit) in the current job's trace."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record_event(name, category, attributes)
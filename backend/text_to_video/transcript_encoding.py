@@ -0,0 +1,146 @@
+import os
+import sys
+import json
+import math
+import time
+import bisect
+import logging
+import argparse
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- Encoding Configuration ---
+PHRASE_PAUSE_SECONDS = float(os.getenv("TRANSCRIPT_PHRASE_PAUSE_SECONDS", "0.25")) # A silence this long ends a phrase
+PHRASE_BREAK_PUNCTUATION = (".", "!", "?", ",", ";", ":")
+CHARS_PER_TOKEN_ESTIMATE = 4 # Rough English average, for offline comparisons only
+
+
+def _to_cs(seconds: float) -> int:
+    return int(round(seconds * 100))
+
+
+class CompactTranscript:
+    """
+    Phrase-level, centisecond encoding of a word-level transcript for LLM prompts.
+
+    The word-level Whisper JSON repeats three keys per word and carries long float timestamps; most of the
+    prompt is syntax. Here consecutive words are grouped into phrases (broken at pauses, punctuation and
+    max_phrase_seconds) and each phrase becomes one line "start_cs end_cs text" with integer centiseconds.
+    Phrases are kept no longer than the shortest allowed scene, so any valid scene can be built from whole
+    phrases. The original words are kept, so times in the returned plan can be snapped back to exact word
+    boundaries (snap_scene).
+    """
+
+    HEADER = "# one phrase per line: start_cs end_cs text (times in centiseconds; 1234 = 12.34s)"
+
+    def __init__(self, words: list[dict], max_phrase_seconds: float = 1.0, pause_seconds: float = PHRASE_PAUSE_SECONDS):
+        self.words = [w for w in words if str(w.get("word", "")).strip() and w.get("start") is not None and w.get("end") is not None]
+        self._word_starts = [float(w["start"]) for w in self.words]
+        self._word_ends = [float(w["end"]) for w in self.words]
+        self.phrases = self._group(max_phrase_seconds, pause_seconds)
+
+    def _group(self, max_phrase_seconds: float, pause_seconds: float) -> list[dict]:
+        phrases = []
+        first = 0
+        for i, word in enumerate(self.words):
+            is_last = i == len(self.words) - 1
+            text = str(word["word"]).strip()
+            if not is_last:
+                pause = self._word_starts[i + 1] - self._word_ends[i]
+                next_overruns = self._word_ends[i + 1] - self._word_starts[first] > max_phrase_seconds
+            if is_last or pause >= pause_seconds or text.endswith(PHRASE_BREAK_PUNCTUATION) or next_overruns:
+                phrases.append({
+                    "first_word": first,
+                    "last_word": i,
+                    "start_cs": _to_cs(self._word_starts[first]),
+                    "end_cs": _to_cs(self._word_ends[i]),
+                    "text": " ".join(str(w["word"]).strip() for w in self.words[first:i + 1]),
+                })
+                first = i + 1
+        return phrases
+
+    def to_prompt_text(self) -> str:
+        """The encoded transcript as it is inserted into the prompt."""
+        return "\n".join([self.HEADER, *(f"{p['start_cs']} {p['end_cs']} {p['text']}" for p in self.phrases)])
+
+    def word_times(self, phrase_index: int) -> list[tuple[str, float, float]]:
+        """Maps a phrase back to its words with their exact (unrounded) times."""
+        phrase = self.phrases[phrase_index]
+        return [(str(w["word"]).strip(), float(w["start"]), float(w["end"])) for w in self.words[phrase["first_word"]:phrase["last_word"] + 1]]
+
+    @staticmethod
+    def _nearest(boundaries: list[float], seconds: float) -> int:
+        i = bisect.bisect_left(boundaries, seconds)
+        if i == 0:
+            return 0
+        if i == len(boundaries):
+            return len(boundaries) - 1
+        return i if boundaries[i] - seconds < seconds - boundaries[i - 1] else i - 1
+
+    def snap_scene(self, scene: dict) -> dict:
+        """
+        Replaces a scene's (rounded) start/end times with the exact start of its first word and end of its
+        last word, and rebuilds text_for_scene from those words. Scenes without usable times are returned as is.
+        """
+        start_time, end_time = scene.get("start_time"), scene.get("end_time")
+        if not self.words or start_time is None or end_time is None:
+            return scene
+        first = self._nearest(self._word_starts, float(start_time))
+        last = self._nearest(self._word_ends, float(end_time))
+        if last < first:
+            return scene
+        scene["start_time"] = self._word_starts[first]
+        scene["end_time"] = self._word_ends[last]
+        scene["text_for_scene"] = " ".join(str(w["word"]).strip() for w in self.words[first:last + 1])
+        return scene
+
+
+def estimate_tokens(text: str) -> int:
+    """Offline token estimate; use the count_tokens API for exact numbers."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN_ESTIMATE)
+
+
+def benchmark_encodings(words: list[dict], max_phrase_seconds: float = 1.0, claude_client=None) -> dict:
+    """
+    Compares the raw word JSON with the compact encoding: characters and tokens, plus (with a ClaudeClient)
+    exact token counts and time-to-first-token of a one-token request carrying each encoding.
+    """
+    encodings = {
+        "word_json": json.dumps(words),
+        "compact": CompactTranscript(words, max_phrase_seconds).to_prompt_text(),
+    }
+    report = {}
+    for name, text in encodings.items():
+        result = {"chars": len(text), "estimated_tokens": estimate_tokens(text)}
+        if claude_client is not None:
+            messages = [{"role": "user", "content": f"Transcript:\n{text}\n\nReply with OK."}]
+            result["input_tokens"] = claude_client.client.messages.count_tokens(model=claude_client.model, messages=messages).input_tokens
+            start = time.monotonic()
+            with claude_client.client.messages.stream(model=claude_client.model, max_tokens=1, messages=messages) as stream:
+                next(iter(stream.text_stream), None)
+                result["time_to_first_token_seconds"] = round(time.monotonic() - start, 3)
+        report[name] = result
+    report["size_ratio"] = round(report["compact"]["chars"] / max(report["word_json"]["chars"], 1), 3)
+    return report
+
+
+if __name__ == "__main__":
+    PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
+
+    parser = argparse.ArgumentParser(description="Benchmark the compact transcript encoding against the word-level JSON.")
+    parser.add_argument("transcript_path", help="Word-level transcript JSON (e.g. 03_transcription.json).")
+    parser.add_argument("--max_phrase_seconds", type=float, default=1.0)
+    parser.add_argument("--live", action="store_true", help="Also measure exact tokens and time-to-first-token with the Claude API.")
+    args = parser.parse_args()
+
+    with open(args.transcript_path, 'r') as f:
+        transcript_words = json.load(f)
+    client = None
+    if args.live:
+        from backend.text_to_video.llm_clients.claude_client import ClaudeClient
+        client = ClaudeClient()
+    print(json.dumps(benchmark_encodings(transcript_words, args.max_phrase_seconds, client), indent=2))
@@ -5,6 +5,9 @@ from dotenv import load_dotenv
 from elevenlabs.client import ElevenLabs
 from elevenlabs import play, Voice, VoiceSettings
 
+from backend.text_to_video.rate_limiter import get_rate_limiter
+from backend.text_to_video.metrics import observe_stage, observe_provider
+
 # Load environment variables
 load_dotenv()
 
@@ -34,6 +37,7 @@ def sanitize_filename(filename):
     sanitized = re.sub(r'[^\w\-_.]', '_', filename.replace(' ', '_'))
     return sanitized
 
+@observe_stage("tts")
 def text_to_speech(
     text: str,
     output_filename: str = "output.mp3",
@@ -114,17 +118,19 @@ def text_to_speech(
 
         logger.info(f"Requesting TTS with settings: voice_id={voice_id}, model_id={model_id}, speed={speed}, stability={stability}, similarity_boost={similarity_boost}, style={style}, use_speaker_boost={use_speaker_boost}")
 
-        # Convert text to speech
-        audio_generator = client.text_to_speech.convert(
-            text=text,
-            voice_id=voice_id,
-            model_id=model_id,
-            output_format=output_format,
-            voice_settings=custom_voice_settings
-        )
-
-        # Collect audio data from the generator
-        audio_data = b''.join(audio_generator)
+        # Convert text to speech (the SDK does not expose rate-limit headers, so only pace the calls)
+        get_rate_limiter("elevenlabs").acquire()
+        with observe_provider("elevenlabs"):
+            audio_generator = client.text_to_speech.convert(
+                text=text,
+                voice_id=voice_id,
+                model_id=model_id,
+                output_format=output_format,
+                voice_settings=custom_voice_settings
+            )
+
+            # Collect audio data from the generator (the audio streams in as it is read)
+            audio_data = b''.join(audio_generator)
 
         # Play the audio (optional, can be removed if not needed for CLI usage)
         # play(audio_data)
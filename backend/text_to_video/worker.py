@@ -0,0 +1,172 @@
+import os
+import sys
+import signal
+import socket
+import logging
+import argparse
+import threading
+import traceback
+import multiprocessing
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+# Workers are already separate processes; a nested render process pool per worker would only add overhead.
+# Set before the job executor module reads its configuration.
+os.environ.setdefault("JOB_RENDER_WORKERS", "0")
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.text_to_video.job_queue import SQLiteJobQueue, QueuedTask, get_job_queue, JOB_QUEUE_VISIBILITY_TIMEOUT
+from backend.text_to_video.job_store import SQLiteJobStore, get_job_store, JOB_HEARTBEAT_SECONDS
+from backend.text_to_video.metrics import register_process_collectors, serve_metrics
+from backend.text_to_video.rate_limiter import configure_rate_limits, load_rate_limit_config
+from backend.text_to_video.tracing import job_trace
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- Worker Configuration ---
+JOB_WORKER_POLL_SECONDS = float(os.getenv("JOB_WORKER_POLL_SECONDS", "1")) # Idle wait between claims
+JOB_WORKER_RESTART_DELAY = 5 # Seconds before the supervisor replaces a crashed worker process
+JOB_WORKER_METRICS_PORT = int(os.getenv("JOB_WORKER_METRICS_PORT", "0")) # Worker i serves /metrics on this port + i; 0 disables
+
+
+class QueueWorker:
+    """
+    Claims tasks from the durable job queue and runs them, one at a time.
+
+    The task runs in a thread while this loop renews its lease every third of the visibility timeout, so
+    a worker that dies or hangs loses the lease and the task is redelivered to another worker. A lost
+    lease (reclaimed, or the job was cancelled) is logged and the result is not reported. Progress is
+    reported by the tasks themselves through the job store; failures are added to the job's log.
+    """
+
+    def __init__(self, tasks: Dict[str, Callable], queue: Optional[SQLiteJobQueue] = None, store: Optional[SQLiteJobStore] = None,
+                 worker_id: Optional[str] = None, visibility_timeout: float = JOB_QUEUE_VISIBILITY_TIMEOUT,
+                 poll_seconds: float = JOB_WORKER_POLL_SECONDS):
+        self.tasks = tasks
+        self.queue = queue or get_job_queue()
+        self.store = store or get_job_store()
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.visibility_timeout = visibility_timeout
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """Stops claiming new tasks; the current task finishes first."""
+        self._stop.set()
+
+    def run_once(self) -> bool:
+        """Claims and runs one task. Returns False if the queue had nothing available."""
+        task = self.queue.claim(self.worker_id, self.visibility_timeout)
+        if task is None:
+            return False
+        self._run(task)
+        return True
+
+    def _run(self, task: QueuedTask) -> None:
+        fn = self.tasks.get(task.task_name)
+        if fn is None:
+            logger.error(f"[{task.job_id}] Unknown task '{task.task_name}' (task {task.task_id}).")
+            self.queue.fail(task.task_id, self.worker_id, f"unknown task {task.task_name}", retry_delay=0)
+            return
+
+        logger.info(f"[{task.job_id}] {self.worker_id} running {task.task_name} (task {task.task_id}, attempt {task.attempts}/{task.max_attempts}).")
+        outcome = {}
+
+        def _target():
+            try:
+                with job_trace(task.job_id, task.task_name, task_id=task.task_id, attempt=task.attempts, worker=self.worker_id):
+                    fn(task.job_id, *task.args)
+            except BaseException as e:
+                outcome["error"] = e
+                outcome["traceback"] = traceback.format_exc()
+
+        thread = threading.Thread(target=_target, name=f"task_{task.task_id}", daemon=True)
+        thread.start()
+        lease_held = True
+        self.store.heartbeat([task.job_id], self.worker_id)
+        while True:
+            thread.join(min(self.visibility_timeout / 3, JOB_HEARTBEAT_SECONDS))
+            if not thread.is_alive():
+                break
+            self.store.heartbeat([task.job_id], self.worker_id) # API processes resuming jobs leave this one alone
+            if lease_held and not self.queue.heartbeat(task.task_id, self.worker_id, self.visibility_timeout):
+                lease_held = False
+                reason = "the job was cancelled" if self.queue.is_cancelled(task.task_id) else "its lease expired"
+                logger.warning(f"[{task.job_id}] Task {task.task_id} no longer held by {self.worker_id} ({reason}); its result will be discarded.")
+
+        if not lease_held:
+            return
+        if "error" in outcome:
+            error = outcome["error"]
+            logger.error(f"[{task.job_id}] Task {task.task_id} ({task.task_name}) failed: {outcome['traceback']}")
+            will_retry = self.queue.fail(task.task_id, self.worker_id, f"{type(error).__name__}: {error}")
+            self.store.append_log(task.job_id, f"[{datetime.now().isoformat()}] Error in {task.task_name}: {error}" + (" Retrying." if will_retry else ""))
+        else:
+            self.queue.complete(task.task_id, self.worker_id)
+            logger.info(f"[{task.job_id}] Task {task.task_id} ({task.task_name}) done.")
+
+    def run(self) -> None:
+        """Processes tasks until stop() (or SIGTERM/SIGINT in the main thread)."""
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, lambda *_: self.stop())
+        logger.info(f"Worker {self.worker_id} started ({len(self.tasks)} task types).")
+        while not self._stop.is_set():
+            if not self.run_once():
+                self._stop.wait(self.poll_seconds)
+        logger.info(f"Worker {self.worker_id} stopped.")
+
+
+def _worker_process_main(metrics_port: int = 0) -> None:
+    """Entry point of one worker process."""
+    from backend.text_to_video.main import JOB_TASKS # Imports the API module for its task functions; no server is started
+    configure_rate_limits(load_rate_limit_config())
+    if metrics_port:
+        register_process_collectors()
+        serve_metrics(metrics_port)
+    QueueWorker(JOB_TASKS).run()
+
+
+def run_workers(count: int, metrics_port: int = JOB_WORKER_METRICS_PORT) -> None:
+    """
+    Runs count worker processes, replacing any that crash, until SIGTERM/SIGINT. With a metrics_port,
+    worker i serves its own /metrics on metrics_port + i (a replacement reuses its port).
+    """
+    context = multiprocessing.get_context("spawn")
+    stopping = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stopping.set())
+
+    processes = {}
+    while not stopping.is_set():
+        for index in range(count):
+            process = processes.get(index)
+            if process is not None and process.is_alive():
+                continue
+            if process is not None:
+                logger.error(f"Worker process {process.pid} exited with code {process.exitcode}. Replacing it in {JOB_WORKER_RESTART_DELAY}s.")
+                if stopping.wait(JOB_WORKER_RESTART_DELAY):
+                    break
+            processes[index] = context.Process(target=_worker_process_main, args=(metrics_port + index if metrics_port else 0,), name=f"job_worker_{index}")
+            processes[index].start()
+        stopping.wait(1)
+
+    logger.info("Stopping worker processes; running tasks finish first.")
+    for process in processes.values():
+        if process.is_alive():
+            process.terminate() # Delivers SIGTERM: the worker stops claiming and finishes its task
+    for process in processes.values():
+        process.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run job worker processes consuming the durable job queue (JOB_EXECUTION_MODE=queue).")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("JOB_QUEUE_WORKERS", "2")), help="Number of worker processes.")
+    parser.add_argument("--metrics-port", type=int, default=JOB_WORKER_METRICS_PORT, help="Serve /metrics on this port + worker index (0: off).")
+    args = parser.parse_args()
+    run_workers(args.workers, args.metrics_port)
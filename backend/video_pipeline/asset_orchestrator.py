@@ -6,17 +6,22 @@ import uuid
 import random
 import time
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from typing import Iterable
 from dotenv import load_dotenv
 import requests
 
 # Project-level imports
 from backend.text_to_video.freesound_client import find_and_download_music
-from backend.video_pipeline.audio_utils import slice_audio
-from backend.text_to_video.s3_client import get_s3_client, ensure_s3_bucket, upload_to_s3
+from backend.text_to_video.music_library import get_music_library, mixer_gain_db
+from backend.video_pipeline.audio_utils import slice_audio_to_buffer
+from backend.text_to_video.s3_client import get_s3_client, ensure_s3_bucket, S3UploadManager
 from backend.text_to_video.argil_client import (
     create_argil_video_job,
     render_argil_video,
     get_argil_video_details,
+    wait_for_argil_video_events,
     DEFAULT_AVATAR_ID as DEFAULT_ARGIL_AVATAR_ID,
     DEFAULT_VOICE_ID as DEFAULT_ARGIL_VOICE_ID,
     DEFAULT_GESTURE_SLUGS
@@ -26,6 +31,17 @@ from backend.text_to_video.pixabay_client import (
     find_and_download_pixabay_videos,
     find_and_download_pixabay_images,
 )
+from backend.text_to_video.rendition_selector import DEFAULT_TARGET_DIMS, DEFAULT_TARGET_FPS
+from backend.text_to_video.provider_selector import ProviderSelector, get_provider_selector
+from backend.text_to_video.rate_limiter import rate_limit_metrics
+from backend.text_to_video.tracing import submit_in_context
+from backend.text_to_video.metrics import observe_stage, record_download
+from backend.video_pipeline.ingest import (
+    INGEST_NORMALIZE_ENABLED,
+    INGEST_DURATION_PADDING_SECONDS,
+    normalize_media,
+    download_and_normalize,
+)
 
 # Configure basic logging
 logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -35,11 +51,23 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 # Argil Polling Configuration
-ARGIL_POLLING_INTERVAL_SECONDS = 30
-ARGIL_MAX_POLLING_ATTEMPTS = 20
+ARGIL_POLL_INITIAL_INTERVAL_SECONDS = float(os.getenv("ARGIL_POLL_INITIAL_INTERVAL_SECONDS", "5"))
+ARGIL_POLL_MAX_INTERVAL_SECONDS = float(os.getenv("ARGIL_POLL_MAX_INTERVAL_SECONDS", "30"))
+ARGIL_POLL_BACKOFF_FACTOR = 1.5
+ARGIL_POLL_JITTER_RATIO = 0.2
+ARGIL_POLLING_DEADLINE_SECONDS = float(os.getenv("ARGIL_POLLING_DEADLINE_SECONDS", "600")) # Global, for all avatar renders together
+ARGIL_MAX_DETAILS_FAILURES = 5 # Consecutive failed status requests before giving up on a render
+ARGIL_POLL_MAX_WORKERS = int(os.getenv("ARGIL_POLL_MAX_WORKERS", "4"))
 ARGIL_SUCCESS_STATUS = "DONE"
 ARGIL_FAILURE_STATUSES = ["VIDEO_GENERATION_FAILED", "ERROR", "FAILED"]
 
+# Stock Media Concurrency Configuration
+ORCHESTRATION_MAX_WORKERS = int(os.getenv("ORCHESTRATION_MAX_WORKERS", "8")) # Global cap on concurrent stock scene fetches
+PROVIDER_MAX_CONCURRENCY = {
+    "pexels": int(os.getenv("PEXELS_MAX_CONCURRENCY", "4")),
+    "pixabay": int(os.getenv("PIXABAY_MAX_CONCURRENCY", "4")),
+}
+
 def _download_file_from_url(url: str, output_path: pathlib.Path) -> bool:
     """Downloads a file from a URL to the given output_path."""
     try:
@@ -49,6 +77,7 @@ def _download_file_from_url(url: str, output_path: pathlib.Path) -> bool:
             with open(output_path, 'wb') as f:
                 for chunk in r.iter_content(chunk_size=8192):
                     f.write(chunk)
+        record_download("argil", output_path)
         logger.info(f"Successfully downloaded file from {url} to {output_path}")
         return True
     except requests.exceptions.RequestException as e:
@@ -57,9 +86,259 @@ def _download_file_from_url(url: str, output_path: pathlib.Path) -> bool:
         logger.error(f"IOError saving file to {output_path}: {e}")
     return False
 
-def poll_and_download_argil_videos(scene_plans: list, api_key: str, project_id: str, rendered_avatars_dir: pathlib.Path) -> list:
+def _scene_render_duration(scene_plans: list, index: int) -> float | None:
+    """
+    Seconds of footage the assembler will take for scene_plans[index]: its own span plus any gap
+    before the next scene, with a small safety tail. None if the scene has no usable timing.
+    """
+    scene = scene_plans[index]
+    start_time, end_time = scene.get("start_time"), scene.get("end_time")
+    if start_time is None or end_time is None or end_time <= start_time:
+        return None
+    covered_until = end_time
+    if index < len(scene_plans) - 1:
+        next_start_time = scene_plans[index + 1].get("start_time")
+        if next_start_time is not None and next_start_time > end_time:
+            covered_until = next_start_time
+    return covered_until - start_time + INGEST_DURATION_PADDING_SECONDS
+
+def _normalize_scene_video(scene_plan_item: dict, asset_path_key: str, normalized_path: pathlib.Path, target_dims: tuple, target_fps: int, render_duration: float | None) -> None:
+    """
+    Replaces a downloaded scene video with its normalized intermediate, keeping the original path
+    under source_<asset_path_key>. Leaves the scene untouched if normalization fails.
+    """
+    source_path = scene_plan_item[asset_path_key]
+    normalized = normalize_media(source_path, str(normalized_path), target_dims, target_fps, duration=render_duration)
+    if normalized:
+        scene_plan_item[f"source_{asset_path_key}"] = source_path
+        scene_plan_item[asset_path_key] = normalized
+    else:
+        logger.warning(f"Keeping un-normalized asset {source_path}; assembly will transform it.")
+
+def _search_provider(
+    provider: str,
+    visual_type: str,
+    query: str,
+    api_key: str,
+    output_dir: pathlib.Path,
+    provider_semaphores: dict,
+    target_dims: tuple,
+    target_fps: int,
+    selector: ProviderSelector | None,
+    cancelled: threading.Event | None = None,
+    render_duration: float | None = None,
+) -> list:
+    """
+    Runs one provider's search+download under its semaphore and records the outcome with the selector.
+    Skipped if cancelled is set by the time the semaphore is acquired (another provider already won);
+    video downloads already in flight are abandoned when it is set. render_duration ranks out clips too
+    short for the scene.
+    """
+    downloaded_paths = []
+    with provider_semaphores[provider]:
+        if cancelled is not None and cancelled.is_set():
+            return []
+        start = time.monotonic()
+        try:
+            if visual_type == "STOCK_VIDEO":
+                if provider == "pexels":
+                    downloaded_paths = find_pexels_videos(api_key, query, 1, str(output_dir), orientation="portrait", target_dims=target_dims, target_fps=target_fps,
+                                                          min_duration=render_duration, cancel_event=cancelled)
+                elif provider == "pixabay":
+                    downloaded_paths = find_and_download_pixabay_videos(api_key, query, 1, str(output_dir), target_dims=target_dims, target_fps=target_fps, orientation="vertical",
+                                                                        min_duration=render_duration, cancel_event=cancelled)
+            else:
+                if provider == "pexels":
+                    downloaded_paths = find_pexels_photos(api_key, query, 1, str(output_dir), orientation="portrait")
+                elif provider == "pixabay":
+                    downloaded_paths = find_and_download_pixabay_images(api_key, query, 1, str(output_dir), orientation="vertical")
+        finally:
+            if selector:
+                selector.record_attempt(provider, time.monotonic() - start, bool(downloaded_paths))
+    return downloaded_paths
+
+def _fetch_stock_asset(
+    scene_plan_item: dict,
+    scene_id: str,
+    visual_type: str,
+    query: str,
+    providers_to_try: list,
+    provider_api_keys: dict,
+    output_dir: pathlib.Path,
+    provider_semaphores: dict,
+    target_dims: tuple = DEFAULT_TARGET_DIMS,
+    target_fps: int = DEFAULT_TARGET_FPS,
+    render_duration: float | None = None,
+    normalized_dir: pathlib.Path | None = None,
+    selector: ProviderSelector | None = None,
+    hedge_executor: ThreadPoolExecutor | None = None,
+) -> bool:
+    """
+    Searches and downloads one STOCK_VIDEO or STOCK_IMAGE asset, trying providers in order.
+    Runs in a worker thread; each provider call is gated by that provider's semaphore.
+    With a selector and hedge_executor, the next provider is also started (hedged) once the current
+    one runs past its tail latency; the first usable result wins and the slower call is ignored.
+    If normalized_dir is given, downloaded videos are normalized to target_dims/target_fps and
+    trimmed to render_duration in the same worker, overlapping with the other scenes' downloads.
+    Updates scene_plan_item in place on success.
+    """
+    cancelled = threading.Event()
+
+    def _attempt(provider: str) -> list:
+        return _search_provider(provider, visual_type, query, provider_api_keys.get(provider), output_dir,
+                                provider_semaphores, target_dims, target_fps, selector, cancelled, render_duration)
+
+    winner, downloaded_paths = None, []
+    if hedge_executor is None:
+        for provider_index, current_provider in enumerate(providers_to_try):
+            logger.info(f"Attempting {visual_type} for {scene_id} from provider: {current_provider} (Attempt {provider_index + 1}/{len(providers_to_try)}) with query: '{query}'")
+            downloaded_paths = _attempt(current_provider)
+            if downloaded_paths:
+                winner = current_provider
+                break
+            logger.warning(f"Failed to download {visual_type} from {current_provider} for {scene_id} with query '{query}'.")
+    else:
+        remaining = list(providers_to_try)
+        pending = {}
+        hedge_due, hedge_delay = False, None
+        while winner is None and (pending or remaining):
+            if remaining and (not pending or hedge_due):
+                current_provider = remaining.pop(0)
+                logger.info(f"{'Hedging' if pending else 'Attempting'} {visual_type} for {scene_id} from provider: {current_provider} with query: '{query}'")
+                pending[submit_in_context(hedge_executor, _attempt, current_provider)] = current_provider
+                hedge_delay = selector.hedge_delay(current_provider) if selector and remaining else None
+            done, _ = wait(pending, timeout=hedge_delay if remaining else None, return_when=FIRST_COMPLETED)
+            hedge_due = not done
+            for future in done:
+                current_provider = pending.pop(future)
+                try:
+                    downloaded_paths = future.result()
+                except Exception as e:
+                    logger.error(f"Error fetching {visual_type} from {current_provider} for {scene_id}: {e}")
+                    downloaded_paths = []
+                if downloaded_paths:
+                    winner = current_provider
+                    break
+                logger.warning(f"Failed to download {visual_type} from {current_provider} for {scene_id} with query '{query}'.")
+        if winner and pending:
+            cancelled.set() # Losers still waiting for their provider's semaphore never start
+            for future in pending:
+                future.cancel()
+            logger.info(f"{winner} won the hedged fetch for {scene_id}; ignoring the result of {list(pending.values())}.")
+
+    if winner:
+        asset_path_key = "video_asset_path" if visual_type == "STOCK_VIDEO" else "image_asset_path"
+        scene_plan_item[asset_path_key] = str(pathlib.Path(downloaded_paths[0]))
+        scene_plan_item["stock_media_provider"] = winner
+        logger.info(f"Successfully downloaded {visual_type} for {scene_id} from {winner}: {downloaded_paths[0]}")
+        if visual_type == "STOCK_VIDEO" and normalized_dir is not None:
+            _normalize_scene_video(scene_plan_item, asset_path_key, normalized_dir / f"{scene_id}_normalized.mp4", target_dims, target_fps, render_duration)
+        return True
+
+    logger.error(f"Exhausted all providers but failed to download {visual_type} for {scene_id} with query '{query}'.")
+    return False
+
+def _start_argil_avatar_scene(
+    scene_plan_item: dict,
+    scene_id: str,
+    video_project_id: str,
+    master_vo_file: pathlib.Path,
+    argil_api_key: str,
+    upload_manager: S3UploadManager,
+) -> bool:
+    """
+    Slices the scene's voiceover in memory, uploads it to S3 and requests the Argil render.
+    Runs in a worker thread; the upload goes through the shared manager's bounded pool.
+    Updates scene_plan_item in place.
+    """
+    audio_buffer = slice_audio_to_buffer(str(master_vo_file), scene_plan_item["start_time"], scene_plan_item["end_time"])
+    if audio_buffer is None:
+        logger.error(f"Failed to slice audio for scene {scene_id}. Skipping Argil."); return False
+
+    s3_audio_key = f"{video_project_id}/audio/{video_project_id}_{scene_id}_audio.mp3"
+    audio_s3_url = upload_manager.submit_bytes(audio_buffer, s3_audio_key).result()
+    if not audio_s3_url:
+        logger.error(f"Failed to upload S3 audio for {scene_id}. Skipping Argil."); return False
+    scene_plan_item["audio_s3_url"] = audio_s3_url
+    logger.info(f"Uploaded scene audio to S3: {audio_s3_url}")
+
+    argil_job_title = f"{video_project_id}_{scene_id}_Avatar"
+    argil_callback_id = f"{video_project_id}__{scene_id}"
+    selected_gesture = DEFAULT_GESTURE_SLUGS[0] if DEFAULT_GESTURE_SLUGS else "gesture-1"
+    moment_details = {"avatarId": DEFAULT_ARGIL_AVATAR_ID, "gestureSlug": selected_gesture, "audioUrl": audio_s3_url}
+
+    creation_response = create_argil_video_job(
+        api_key=argil_api_key, video_title=argil_job_title, full_transcript=scene_plan_item["text_for_scene"],
+        moments_payload=[moment_details], avatar_id=DEFAULT_ARGIL_AVATAR_ID,
+        voice_id=DEFAULT_ARGIL_VOICE_ID, aspect_ratio="9:16", callback_id=argil_callback_id
+    )
+    if not (creation_response and creation_response.get("success")):
+        scene_plan_item["argil_creation_status"] = "creation_failed"; logger.error(f"Failed to create Argil job for {scene_id}."); return False
+
+    argil_video_id = creation_response.get("video_id")
+    scene_plan_item["argil_video_id"] = argil_video_id
+    render_response = render_argil_video(argil_api_key, argil_video_id)
+    if render_response and render_response.get("success"):
+        scene_plan_item["argil_render_status"] = render_response.get('data',{}).get('status')
+        logger.info(f"Argil video render requested for {scene_id}. Status: {scene_plan_item['argil_render_status']}")
+        return True
+    scene_plan_item["argil_render_status"] = "render_failed"; logger.error(f"Failed to render Argil video {scene_id}.")
+    return False
+
+def _download_argil_avatar(
+    scene_plan_item: dict,
+    scene_index: int,
+    scene_plans: list,
+    download_url: str,
+    project_id: str,
+    rendered_avatars_dir: pathlib.Path,
+    target_dims: tuple,
+    target_fps: int,
+) -> None:
+    """Downloads (and, when enabled, stream-normalizes) one finished Argil render. Updates scene_plan_item in place."""
+    scene_id = scene_plan_item.get("scene_id", "unknown_scene")
+    avatar_output_path = rendered_avatars_dir / f"{project_id}_{scene_id}_avatar.mp4"
+    normalized_avatar_path = None
+    if INGEST_NORMALIZE_ENABLED:
+        normalized_avatar_path = download_and_normalize(
+            download_url, str(rendered_avatars_dir / f"{project_id}_{scene_id}_avatar_normalized.mp4"),
+            target_dims, target_fps, duration=_scene_render_duration(scene_plans, scene_index),
+            raw_output_path=str(avatar_output_path),
+        )
+    if normalized_avatar_path:
+        scene_plan_item["source_avatar_video_path"] = str(avatar_output_path)
+        scene_plan_item["avatar_video_path"] = normalized_avatar_path
+        logger.info(f"Successfully downloaded and normalized rendered avatar for Scene {scene_id} to {normalized_avatar_path}")
+    elif (avatar_output_path.exists() and avatar_output_path.stat().st_size > 0) or _download_file_from_url(download_url, avatar_output_path):
+        scene_plan_item["avatar_video_path"] = str(avatar_output_path)
+        logger.info(f"Successfully downloaded rendered avatar for Scene {scene_id} to {avatar_output_path}")
+    else:
+        scene_plan_item["argil_render_status"] = "download_failed"
+        logger.error(f"Failed to download rendered avatar for Scene {scene_id} from {download_url}")
+
+def _next_poll_interval(current_interval: float) -> float:
+    """Exponential backoff capped at ARGIL_POLL_MAX_INTERVAL_SECONDS, with +/- ARGIL_POLL_JITTER_RATIO jitter."""
+    next_interval = min(current_interval * ARGIL_POLL_BACKOFF_FACTOR, ARGIL_POLL_MAX_INTERVAL_SECONDS)
+    return next_interval * random.uniform(1 - ARGIL_POLL_JITTER_RATIO, 1 + ARGIL_POLL_JITTER_RATIO)
+
+def poll_and_download_argil_videos(
+    scene_plans: list,
+    api_key: str,
+    project_id: str,
+    rendered_avatars_dir: pathlib.Path,
+    target_dims: tuple = DEFAULT_TARGET_DIMS,
+    target_fps: int = DEFAULT_TARGET_FPS,
+) -> list:
     """
     Polls Argil for video job completion and downloads successful videos.
+
+    All outstanding renders are tracked together: each video id is polled on its own exponential
+    backoff schedule (with jitter) under a single global deadline, and each video is downloaded in
+    a worker thread the moment it reaches DONE. Webhook results the server's /webhooks/argil handler
+    records in the shared job store (argil_client.notify_argil_video_event) end a wait within
+    ARGIL_WEBHOOK_EVENT_CHECK_SECONDS, whichever process received them.
+    When ingest normalization is enabled, each download is streamed through ffmpeg so the avatar
+    arrives already scaled, cropped, retimed and trimmed for assembly.
     Updates scene_plans in place with status and download paths.
     """
     if not api_key:
@@ -69,91 +348,197 @@ def poll_and_download_argil_videos(scene_plans: list, api_key: str, project_id:
     os.makedirs(rendered_avatars_dir, exist_ok=True)
     logger.info(f"Starting Argil polling for {len(scene_plans)} scenes. Output dir: {rendered_avatars_dir}")
 
-    all_jobs_finalized = True
-
-    for scene_plan_item in scene_plans:
-        if scene_plan_item.get("visual_type") == "AVATAR" and "argil_video_id" in scene_plan_item:
-            video_id = scene_plan_item["argil_video_id"]
-            scene_id = scene_plan_item.get("scene_id", "unknown_scene")
-            current_status = scene_plan_item.get("argil_render_status", "UNKNOWN")
-
-            if current_status == ARGIL_SUCCESS_STATUS and "avatar_video_path" in scene_plan_item:
-                logger.info(f"Scene {scene_id} (Argil ID: {video_id}) already processed and downloaded. Skipping poll.")
-                continue
-            if current_status in ARGIL_FAILURE_STATUSES or current_status == "polling_timed_out":
-                logger.info(f"Scene {scene_id} (Argil ID: {video_id}) already in a final failure state: {current_status}. Skipping poll.")
-                all_jobs_finalized = all_jobs_finalized and True
-                continue
-
-            logger.info(f"Polling for AVATAR scene {scene_id}, Argil Video ID: {video_id}, Current Status: {current_status}")
-            all_jobs_finalized = False
+    # video_id -> polling state for every render still outstanding
+    pending = {}
+    for scene_index, scene_plan_item in enumerate(scene_plans):
+        if scene_plan_item.get("visual_type") != "AVATAR":
+            continue
+        scene_id = scene_plan_item.get("scene_id", "unknown_scene")
+        if "argil_video_id" not in scene_plan_item:
+            logger.warning(f"AVATAR Scene {scene_id} has no argil_video_id. Skipping polling.")
+            continue
+        video_id = scene_plan_item["argil_video_id"]
+        current_status = scene_plan_item.get("argil_render_status", "UNKNOWN")
+        if current_status == ARGIL_SUCCESS_STATUS and "avatar_video_path" in scene_plan_item:
+            logger.info(f"Scene {scene_id} (Argil ID: {video_id}) already processed and downloaded. Skipping poll.")
+            continue
+        if current_status in ARGIL_FAILURE_STATUSES or current_status == "polling_timed_out":
+            logger.info(f"Scene {scene_id} (Argil ID: {video_id}) already in a final failure state: {current_status}. Skipping poll.")
+            continue
+        pending[video_id] = {
+            "scene_plan_item": scene_plan_item, "scene_index": scene_index, "scene_id": scene_id,
+            "next_poll_at": 0.0, "interval": ARGIL_POLL_INITIAL_INTERVAL_SECONDS, "failures": 0,
+        }
+
+    if not pending:
+        logger.info("No outstanding Argil renders to poll.")
+        return scene_plans
 
-            for attempt in range(ARGIL_MAX_POLLING_ATTEMPTS):
-                logger.debug(f"Polling attempt {attempt + 1}/{ARGIL_MAX_POLLING_ATTEMPTS} for Argil Video ID: {video_id}")
-                details_response = get_argil_video_details(api_key, video_id)
+    start = time.monotonic()
+    deadline = start + ARGIL_POLLING_DEADLINE_SECONDS
+    download_futures = {}
+
+    def _settle(video_id: str, job_data: dict) -> bool:
+        """Applies a status update for video_id. Returns True if the render reached a final state."""
+        state = pending[video_id]
+        scene_plan_item, scene_id = state["scene_plan_item"], state["scene_id"]
+        status = job_data.get("status")
+        scene_plan_item["argil_render_status"] = status
+        logger.info(f"Argil Video ID: {video_id} (Scene: {scene_id}) - Status: {status}{' (webhook)' if job_data.get('source') == 'webhook' else ''}")
+
+        if status == ARGIL_SUCCESS_STATUS:
+            download_url = job_data.get("videoUrl")
+            if not download_url and job_data.get("source") == "webhook":
+                return False # Webhook carried no URL; the next poll fetches it
+            if download_url:
+                logger.info(f"Argil Video ID: {video_id} (Scene: {scene_id}) - Succeeded after {time.monotonic() - start:.1f}s. Downloading from {download_url}")
+                download_futures[submit_in_context(download_executor,
+                    _download_argil_avatar, scene_plan_item, state["scene_index"], scene_plans,
+                    download_url, project_id, pathlib.Path(rendered_avatars_dir), target_dims, target_fps
+                )] = scene_id
+            else:
+                scene_plan_item["argil_render_status"] = "success_no_url"
+                logger.error(f"Argil Video ID: {video_id} (Scene: {scene_id}) - Succeeded but no download URL found in response: {job_data}")
+            return True
+        if status in ARGIL_FAILURE_STATUSES:
+            logger.error(f"Argil Video ID: {video_id} (Scene: {scene_id}) - Failed with status: {status}. Details: {job_data.get('error')}")
+            return True
+        return False
+
+    with ThreadPoolExecutor(max_workers=ARGIL_POLL_MAX_WORKERS, thread_name_prefix="argil_poll") as poll_executor, \
+         ThreadPoolExecutor(max_workers=ARGIL_POLL_MAX_WORKERS, thread_name_prefix="argil_download") as download_executor:
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+
+            # Poll every render whose backoff has elapsed, concurrently.
+            due_ids = [video_id for video_id, state in pending.items() if state["next_poll_at"] <= now]
+            poll_futures = {submit_in_context(poll_executor, get_argil_video_details, api_key, video_id): video_id for video_id in due_ids}
+            for future in as_completed(poll_futures):
+                video_id = poll_futures[future]
+                state = pending[video_id]
+                try:
+                    details_response = future.result()
+                except Exception as e:
+                    details_response = {"success": False, "error": str(e)}
 
                 if details_response and details_response.get("success"):
-                    job_data = details_response.get("data", {})
-                    status = job_data.get("status")
-                    scene_plan_item["argil_render_status"] = status
-                    logger.info(f"Argil Video ID: {video_id} (Scene: {scene_id}) - Status: {status}")
-
-                    if status == ARGIL_SUCCESS_STATUS:
-                        download_url = job_data.get("videoUrl")
-
-                        if download_url:
-                            logger.info(f"Argil Video ID: {video_id} (Scene: {scene_id}) - Succeeded. Download URL: {download_url}")
-                            avatar_filename = f"{project_id}_{scene_id}_avatar.mp4"
-                            avatar_output_path = rendered_avatars_dir / avatar_filename
-                            if _download_file_from_url(download_url, avatar_output_path):
-                                scene_plan_item["avatar_video_path"] = str(avatar_output_path)
-                                logger.info(f"Successfully downloaded rendered avatar for Scene {scene_id} to {avatar_output_path}")
-                            else:
-                                scene_plan_item["argil_render_status"] = "download_failed"
-                                logger.error(f"Failed to download rendered avatar for Scene {scene_id} from {download_url}")
-                        else:
-                            scene_plan_item["argil_render_status"] = "success_no_url"
-                            logger.error(f"Argil Video ID: {video_id} (Scene: {scene_id}) - Succeeded but no download URL found in response: {job_data}")
-                        all_jobs_finalized = True
-                        break
-
-                    elif status in ARGIL_FAILURE_STATUSES:
-                        logger.error(f"Argil Video ID: {video_id} (Scene: {scene_id}) - Failed with status: {status}. Details: {job_data.get('error')}")
-                        all_jobs_finalized = True
-                        break
-                    else:
-                        logger.info(f"Argil Video ID: {video_id} (Scene: {scene_id}) - Status {status} is pending. Waiting {ARGIL_POLLING_INTERVAL_SECONDS}s...")
-                        time.sleep(ARGIL_POLLING_INTERVAL_SECONDS)
+                    state["failures"] = 0
+                    if _settle(video_id, details_response.get("data", {})):
+                        del pending[video_id]
+                        continue
                 else:
-                    logger.warning(f"Failed to get details for Argil Video ID: {video_id} (Scene: {scene_id}) on attempt {attempt + 1}. Response: {details_response}")
-                    if attempt == ARGIL_MAX_POLLING_ATTEMPTS - 1:
-                        scene_plan_item["argil_render_status"] = "polling_details_failed"
-                        all_jobs_finalized = True
-                    else:
-                        time.sleep(ARGIL_POLLING_INTERVAL_SECONDS)
+                    state["failures"] += 1
+                    logger.warning(f"Failed to get details for Argil Video ID: {video_id} (Scene: {state['scene_id']}) (failure {state['failures']}/{ARGIL_MAX_DETAILS_FAILURES}). Response: {details_response}")
+                    if state["failures"] >= ARGIL_MAX_DETAILS_FAILURES:
+                        state["scene_plan_item"]["argil_render_status"] = "polling_details_failed"
+                        del pending[video_id]
+                        continue
+                state["interval"] = _next_poll_interval(state["interval"])
+                state["next_poll_at"] = time.monotonic() + state["interval"]
+
+            if not pending:
+                break
+
+            # Sleep until the next scheduled poll or the deadline, waking early on webhook results.
+            wait_seconds = min(min(state["next_poll_at"] for state in pending.values()), deadline) - time.monotonic()
+            for video_id, event in wait_for_argil_video_events(list(pending), wait_seconds).items():
+                if _settle(video_id, event):
+                    del pending[video_id]
+                else:
+                    pending[video_id]["next_poll_at"] = 0.0 # Poll now to fetch what the webhook lacked
 
-            else:
-                if scene_plan_item["argil_render_status"] not in [ARGIL_SUCCESS_STATUS] + ARGIL_FAILURE_STATUSES and \
-                   scene_plan_item["argil_render_status"] not in ["download_failed", "success_no_url", "polling_details_failed"]:
-                    logger.warning(f"Argil Video ID: {video_id} (Scene: {scene_id}) - Polling timed out after {ARGIL_MAX_POLLING_ATTEMPTS} attempts. Last status: {scene_plan_item.get('argil_render_status')}")
-                    scene_plan_item["argil_render_status"] = "polling_timed_out"
-                    all_jobs_finalized = True
-        elif scene_plan_item.get("visual_type") == "AVATAR" and "argil_video_id" not in scene_plan_item:
-            logger.warning(f"AVATAR Scene {scene_plan_item.get('scene_id', 'unknown_scene')} has no argil_video_id. Skipping polling.")
-
-    if all_jobs_finalized:
-        logger.info("Argil polling and download process complete. All pollable jobs have reached a final state or timed out.")
-    else:
-        logger.info("Argil polling and download process iteration complete. Some jobs may still be pending if max global timeout not reached (not implemented here).")
+        for video_id, state in pending.items():
+            logger.warning(f"Argil Video ID: {video_id} (Scene: {state['scene_id']}) - Polling deadline of {ARGIL_POLLING_DEADLINE_SECONDS}s reached. Last status: {state['scene_plan_item'].get('argil_render_status')}")
+            state["scene_plan_item"]["argil_render_status"] = "polling_timed_out"
+
+        for future in as_completed(download_futures):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"Unexpected error downloading Argil avatar for {download_futures[future]}: {e}", exc_info=True)
 
+    logger.info(f"Argil polling and download process complete in {time.monotonic() - start:.1f}s. All pollable jobs have reached a final state or timed out.")
     return scene_plans
 
+def _fetch_background_music(music_vibe: str, freesound_api_key: str | None, music_output_path: pathlib.Path, target_duration: float | None) -> tuple:
+    """
+    Places a background track matching music_vibe at music_output_path.
+
+    The local music library is queried first (no network); on a miss the track is downloaded from
+    Freesound and indexed so later jobs with a similar mood reuse it.
+
+    Returns:
+        (path or None, MusicTrack or None) - the track carries the loudness the mixer gain is derived from.
+    """
+    music_library = get_music_library()
+    if music_library:
+        track = music_library.select(music_vibe, target_duration)
+        if track:
+            if music_output_path.exists():
+                music_output_path.unlink()
+            try:
+                os.link(track.path, music_output_path)
+            except OSError:
+                shutil.copy2(track.path, music_output_path)
+            logger.info(f"Background music '{track.title}' taken from the music library ({track.license or 'unknown license'}).")
+            return music_output_path, track
+
+    if not freesound_api_key:
+        logger.warning("FREESOUND_API_KEY not set and no indexed track matches. Skipping background music.")
+        return None, None
+
+    actual_music_query = music_vibe.split(',')[0].strip()
+    logger.info(f"Attempting to download background music. Query: '{actual_music_query}'")
+    sound_info, indexed = {}, {}
+
+    def _indexed_copy(sound_id):
+        # The search picked a sound an earlier job already downloaded (but whose tags did not match this mood)
+        indexed["track"] = music_library.find_by_source("freesound", sound_id) if music_library else None
+        return indexed["track"].path if indexed["track"] else None
+
+    downloaded_music_path = find_and_download_music(freesound_api_key, actual_music_query, str(music_output_path), sound_info_out=sound_info, local_copy=_indexed_copy)
+    if not downloaded_music_path:
+        logger.warning(f"Failed to download background music for query: {actual_music_query}")
+        return None, None
+    logger.info(f"Background music downloaded to: {downloaded_music_path}")
+
+    track = indexed.get("track")
+    if track is None and music_library and sound_info.get("id") is not None:
+        try:
+            track = music_library.add_track(
+                downloaded_music_path, tags=[music_vibe, *(sound_info.get("tags") or [])], title=sound_info.get("name"),
+                source="freesound", source_id=sound_info["id"], license=sound_info.get("license"),
+                attribution=sound_info.get("username"), copy_into_library=True,
+            )
+        except Exception as e:
+            logger.warning(f"Could not index downloaded music {downloaded_music_path}: {e}")
+    return downloaded_music_path, track
+
+@observe_stage("orchestration")
 def run_asset_orchestration(
     scene_plan_path_str: str,
     master_vo_path_str: str,
     original_script_path_str: str,
     output_dir: pathlib.Path,
+    target_dims: tuple = DEFAULT_TARGET_DIMS,
+    target_fps: int = DEFAULT_TARGET_FPS,
+    scene_stream: Iterable[dict] | None = None,
 ) -> pathlib.Path:
+    """
+    Fetches every asset a scene plan needs and writes the orchestration summary.
+
+    Args:
+        scene_plan_path_str: Scene plan JSON. With scene_stream it is only recorded in the summary
+            (the producer writes it once the plan is complete).
+        scene_stream: Optional iterable of scene plan items consumed as they arrive (e.g. while the LLM is
+            still generating the plan). Avatar jobs start on arrival; stock fetches start once the next
+            scene is known, because the footage length depends on where the next scene starts.
+
+    Returns:
+        Path of the orchestration summary JSON.
+    """
     logger.info("Starting video asset orchestration...")
 
     # Resolve input paths
@@ -167,14 +552,13 @@ def run_asset_orchestration(
     stock_media_base_dir = output_dir / "stock_media"
     stock_video_output_dir = stock_media_base_dir / "videos"
     stock_image_output_dir = stock_media_base_dir / "images"
-    temp_sliced_audio_dir = output_dir / "temp_scene_audio"
+    normalized_video_dir = stock_media_base_dir / "normalized" if INGEST_NORMALIZE_ENABLED else None
 
     # Create necessary output directories
     output_dir.mkdir(parents=True, exist_ok=True)
     rendered_avatars_dir.mkdir(parents=True, exist_ok=True)
     stock_video_output_dir.mkdir(parents=True, exist_ok=True)
     stock_image_output_dir.mkdir(parents=True, exist_ok=True)
-    temp_sliced_audio_dir.mkdir(parents=True, exist_ok=True)
 
     # --- Get API Keys from environment (as done previously) ---
     freesound_api_key = os.getenv("FREESOUND_API_KEY")
@@ -185,12 +569,15 @@ def run_asset_orchestration(
     pixabay_api_key = os.getenv("PIXABAY_API_KEY")
 
     # --- 1. Load Inputs ---
-    logger.info(f"Loading scene plan from: {scene_plan_file}")
-    if not scene_plan_file.exists():
-        logger.error(f"Scene plan file not found: {scene_plan_file}")
-        raise FileNotFoundError(f"Scene plan file not found: {scene_plan_file}")
-    with open(scene_plan_file, 'r') as f:
-        scene_plans = json.load(f)
+    if scene_stream is None:
+        logger.info(f"Loading scene plan from: {scene_plan_file}")
+        if not scene_plan_file.exists():
+            logger.error(f"Scene plan file not found: {scene_plan_file}")
+            raise FileNotFoundError(f"Scene plan file not found: {scene_plan_file}")
+        with open(scene_plan_file, 'r') as f:
+            scene_stream = json.load(f)
+    else:
+        logger.info("Consuming streamed scene plan; scenes are dispatched as they arrive.")
 
     logger.info(f"Loading original script (JSON output from script gen) from: {original_script_file}")
     if not original_script_file.exists():
@@ -204,23 +591,6 @@ def run_asset_orchestration(
         raise FileNotFoundError(f"Master voiceover file not found: {master_vo_file}")
     logger.info(f"Master voiceover file located: {master_vo_file}")
 
-    # --- 2. Fetch Background Music ---
-    music_vibe = original_script_data.get("production_notes", {}).get("music_vibe")
-    downloaded_music_path = None
-    if music_vibe and freesound_api_key:
-        actual_music_query = music_vibe.split(',')[0].strip()
-        logger.info(f"Attempting to download background music. Query: '{actual_music_query}'")
-        music_output_filename = "background_music.mp3"
-        # Save music directly into the main output_dir for this run
-        music_output_path = output_dir / music_output_filename
-        downloaded_music_path = find_and_download_music(freesound_api_key, actual_music_query, str(music_output_path))
-        if downloaded_music_path:
-            logger.info(f"Background music downloaded to: {downloaded_music_path}")
-        else:
-            logger.warning(f"Failed to download background music for query: {actual_music_query}")
-    elif not music_vibe: logger.info("No music_vibe in script. Skipping background music.")
-    elif not freesound_api_key: logger.warning("FREESOUND_API_KEY not set. Skipping background music.")
-
     # --- Initialize S3 Client (if needed for Argil) ---
     s3_client = None
     if s3_bucket_name and aws_default_region and argil_api_key:
@@ -237,8 +607,19 @@ def run_asset_orchestration(
     video_project_id = f"video_project_{uuid.uuid4().hex[:8]}"
     logger.info(f"Generated Video Project ID: {video_project_id}")
 
-    # --- 3. Process Scenes (Avatar, Stock Video, Stock Image) ---
-    for scene_index, scene_plan_item in enumerate(scene_plans):
+    # --- 2. Process Scenes (Avatar, Stock Video, Stock Image) ---
+    # Stock fetches and avatar render kick-offs are fanned out to a thread pool so their network latency overlaps.
+    provider_api_keys = {"pexels": pexels_api_key, "pixabay": pixabay_api_key}
+    provider_semaphores = {provider: threading.BoundedSemaphore(limit) for provider, limit in PROVIDER_MAX_CONCURRENCY.items()}
+    upload_manager = S3UploadManager(s3_client, s3_bucket_name) if s3_client else None
+    provider_selector = get_provider_selector()
+    # Provider calls run here so a scene worker can wait on a primary and a hedged request at once.
+    hedge_executor = ThreadPoolExecutor(max_workers=ORCHESTRATION_MAX_WORKERS * 2, thread_name_prefix="provider_fetch") if provider_selector else None
+    scene_plans = []
+    scene_futures = {}
+
+    def _dispatch_scene(scene_index: int) -> None:
+        scene_plan_item = scene_plans[scene_index]
         scene_id = scene_plan_item.get("scene_id", f"scene_{scene_index:03d}")
         visual_type = scene_plan_item.get("visual_type")
         text_for_scene = scene_plan_item.get("text_for_scene")
@@ -249,127 +630,96 @@ def run_asset_orchestration(
         logger.info(f"Processing {scene_id} ({visual_type}) - Text: '{text_for_scene[:50] if text_for_scene else 'N/A'}...'")
 
         if visual_type == "AVATAR":
-            if not argil_api_key: logger.warning(f"ARGIL_API_KEY not set. Skipping AVATAR scene {scene_id}."); continue
-            if s3_client is None: logger.warning(f"S3 client N/A. Skipping AVATAR scene {scene_id}."); continue
-            if text_for_scene is None or start_time is None or end_time is None: logger.warning(f"Missing data for AVATAR scene {scene_id}. Skipping."); continue
-
-            sliced_audio_filename = f"{video_project_id}_{scene_id}_audio.mp3"
-            sliced_audio_local_path = temp_sliced_audio_dir / sliced_audio_filename
-            if not slice_audio(str(master_vo_file), str(sliced_audio_local_path), start_time, end_time):
-                logger.error(f"Failed to slice audio for scene {scene_id}. Skipping Argil."); continue
-
-            s3_audio_key = f"{video_project_id}/audio/{sliced_audio_filename}"
-            audio_s3_url = upload_to_s3(s3_client, str(sliced_audio_local_path), s3_bucket_name, s3_audio_key)
-            if not audio_s3_url: logger.error(f"Failed to upload S3 audio for {scene_id}. Skipping Argil."); continue
-            scene_plan_item["audio_s3_url"] = audio_s3_url
-            logger.info(f"Uploaded scene audio to S3: {audio_s3_url}")
-
-            argil_job_title = f"{video_project_id}_{scene_id}_Avatar"
-            argil_callback_id = f"{video_project_id}__{scene_id}"
-            selected_gesture = DEFAULT_GESTURE_SLUGS[0] if DEFAULT_GESTURE_SLUGS else "gesture-1"
-            moment_details = {"avatarId": DEFAULT_ARGIL_AVATAR_ID, "gestureSlug": selected_gesture, "audioUrl": audio_s3_url}
-
-            creation_response = create_argil_video_job(
-                api_key=argil_api_key, video_title=argil_job_title, full_transcript=text_for_scene,
-                moments_payload=[moment_details], avatar_id=DEFAULT_ARGIL_AVATAR_ID,
-                voice_id=DEFAULT_ARGIL_VOICE_ID, aspect_ratio="9:16", callback_id=argil_callback_id
-            )
-            if creation_response and creation_response.get("success"):
-                argil_video_id = creation_response.get("video_id")
-                scene_plan_item["argil_video_id"] = argil_video_id
-                render_response = render_argil_video(argil_api_key, argil_video_id)
-                if render_response and render_response.get("success"):
-                    scene_plan_item["argil_render_status"] = render_response.get('data',{}).get('status')
-                    logger.info(f"Argil video render requested for {scene_id}. Status: {scene_plan_item['argil_render_status']}")
-                else: scene_plan_item["argil_render_status"] = "render_failed"; logger.error(f"Failed to render Argil video {scene_id}.")
-            else: scene_plan_item["argil_creation_status"] = "creation_failed"; logger.error(f"Failed to create Argil job for {scene_id}.")
-
-        elif visual_type == "STOCK_VIDEO":
-            if not visual_keywords: logger.warning(f"No keywords for STOCK_VIDEO {scene_id}. Skipping."); continue
-            query = visual_keywords[0]
-
-            all_configured_providers = []
-            if pexels_api_key: all_configured_providers.append("pexels")
-            if pixabay_api_key: all_configured_providers.append("pixabay")
-
-            if not all_configured_providers:
-                logger.warning(f"No API keys for any stock video providers. Skipping STOCK_VIDEO for {scene_id}.")
-                continue
-
-            downloaded_paths = []
-            primary_provider_choice = random.choice(all_configured_providers)
-            providers_to_try = [primary_provider_choice]
-
-            # If more than one provider is configured, add the others as fallbacks
-            if len(all_configured_providers) > 1:
-                fallback_providers = [p for p in all_configured_providers if p != primary_provider_choice]
-                providers_to_try.extend(fallback_providers)
-
-            for provider_index, current_provider in enumerate(providers_to_try):
-                logger.info(f"Attempting STOCK_VIDEO for {scene_id} from provider: {current_provider} (Attempt {provider_index + 1}/{len(providers_to_try)}) with query: '{query}'")
-
-                if current_provider == "pexels":
-                    downloaded_paths = find_pexels_videos(pexels_api_key, query, 1, str(stock_video_output_dir), orientation="portrait")
-                elif current_provider == "pixabay":
-                    downloaded_paths = find_and_download_pixabay_videos(pixabay_api_key, query, 1, str(stock_video_output_dir), orientation="vertical")
-
-                if downloaded_paths:
-                    scene_plan_item["video_asset_path"] = str(pathlib.Path(downloaded_paths[0]))
-                    scene_plan_item["stock_media_provider"] = current_provider
-                    logger.info(f"Successfully downloaded STOCK_VIDEO for {scene_id} from {current_provider}: {downloaded_paths[0]}")
-                    break # Success, no need to try other providers
-                else:
-                    logger.warning(f"Failed to download STOCK_VIDEO from {current_provider} for {scene_id} with query '{query}'.")
-
-            if not downloaded_paths: # If still no paths after trying all configured providers
-                 logger.error(f"Exhausted all providers but failed to download STOCK_VIDEO for {scene_id} with query '{query}'.")
-
-        elif visual_type == "STOCK_IMAGE":
-            if not visual_keywords: logger.warning(f"No keywords for STOCK_IMAGE {scene_id}. Skipping."); continue
+            if not argil_api_key: logger.warning(f"ARGIL_API_KEY not set. Skipping AVATAR scene {scene_id}."); return
+            if upload_manager is None: logger.warning(f"S3 client N/A. Skipping AVATAR scene {scene_id}."); return
+            if text_for_scene is None or start_time is None or end_time is None: logger.warning(f"Missing data for AVATAR scene {scene_id}. Skipping."); return
+
+            # Slicing, upload and job creation run in the pool so avatar renders start concurrently.
+            scene_futures[submit_in_context(scene_executor,
+                _start_argil_avatar_scene, scene_plan_item, scene_id, video_project_id,
+                master_vo_file, argil_api_key, upload_manager
+            )] = scene_id
+
+        elif visual_type in ("STOCK_VIDEO", "STOCK_IMAGE"):
+            if not visual_keywords: logger.warning(f"No keywords for {visual_type} {scene_id}. Skipping."); return
             query = visual_keywords[0]
 
-            all_configured_providers = []
-            if pexels_api_key: all_configured_providers.append("pexels")
-            if pixabay_api_key: all_configured_providers.append("pixabay")
-
+            all_configured_providers = [p for p in ("pexels", "pixabay") if provider_api_keys.get(p)]
             if not all_configured_providers:
-                logger.warning(f"No API keys for any stock image providers. Skipping STOCK_IMAGE for {scene_id}.")
-                continue
-
-            downloaded_paths = []
-            primary_provider_choice = random.choice(all_configured_providers)
-            providers_to_try = [primary_provider_choice]
-
-            if len(all_configured_providers) > 1:
-                fallback_providers = [p for p in all_configured_providers if p != primary_provider_choice]
-                providers_to_try.extend(fallback_providers)
-
-            for provider_index, current_provider in enumerate(providers_to_try):
-                logger.info(f"Attempting STOCK_IMAGE for {scene_id} from provider: {current_provider} (Attempt {provider_index + 1}/{len(providers_to_try)}) with query: '{query}'")
-
-                if current_provider == "pexels":
-                    downloaded_paths = find_pexels_photos(pexels_api_key, query, 1, str(stock_image_output_dir), orientation="portrait")
-                elif current_provider == "pixabay":
-                    downloaded_paths = find_and_download_pixabay_images(pixabay_api_key, query, 1, str(stock_image_output_dir), orientation="vertical")
-
-                if downloaded_paths:
-                    scene_plan_item["image_asset_path"] = str(pathlib.Path(downloaded_paths[0]))
-                    scene_plan_item["stock_media_provider"] = current_provider
-                    logger.info(f"Successfully downloaded STOCK_IMAGE for {scene_id} from {current_provider}: {downloaded_paths[0]}")
-                    break # Success
-                else:
-                    logger.warning(f"Failed to download STOCK_IMAGE from {current_provider} for {scene_id} with query '{query}'.")
-
-            if not downloaded_paths: # If still no paths after trying all
-                logger.error(f"Exhausted all providers but failed to download STOCK_IMAGE for {scene_id} with query '{query}'.")
+                logger.warning(f"No API keys for any stock providers. Skipping {visual_type} for {scene_id}.")
+                return
+
+            # Best expected time-to-usable-asset first; the others are fallbacks (or hedges).
+            providers_to_try = provider_selector.rank(all_configured_providers) if provider_selector else all_configured_providers
+
+            output_dir_for_type = stock_video_output_dir if visual_type == "STOCK_VIDEO" else stock_image_output_dir
+            scene_futures[submit_in_context(scene_executor,
+                _fetch_stock_asset, scene_plan_item, scene_id, visual_type, query,
+                providers_to_try, provider_api_keys, output_dir_for_type, provider_semaphores,
+                target_dims, target_fps, _scene_render_duration(scene_plans, scene_index), normalized_video_dir,
+                provider_selector, hedge_executor
+            )] = scene_id
         else:
             logger.warning(f"Unknown visual_type '{visual_type}' for scene {scene_id}.")
 
+    with ThreadPoolExecutor(max_workers=ORCHESTRATION_MAX_WORKERS, thread_name_prefix="scene_fetch") as scene_executor:
+        # A stock scene's render duration needs the next scene's start, so it is dispatched one scene late;
+        # avatar scenes (the slowest assets) start the moment they arrive.
+        undispatched_index = None
+        for scene_plan_item in scene_stream:
+            scene_plans.append(scene_plan_item)
+            scene_index = len(scene_plans) - 1
+            if undispatched_index is not None:
+                _dispatch_scene(undispatched_index)
+                undispatched_index = None
+            if scene_plan_item.get("visual_type") == "AVATAR":
+                _dispatch_scene(scene_index)
+            else:
+                undispatched_index = scene_index
+        if undispatched_index is not None:
+            _dispatch_scene(undispatched_index)
+
+        # --- 3. Fetch Background Music ---
+        # Runs alongside the remaining scene fetches once the plan (and so the video length) is complete.
+        music_vibe = original_script_data.get("production_notes", {}).get("music_vibe")
+        music_future = None
+        if music_vibe:
+            scene_end_times = [sp.get("end_time") for sp in scene_plans if sp.get("end_time") is not None]
+            # Save music directly into the main output_dir for this run
+            music_future = submit_in_context(scene_executor,
+                _fetch_background_music, music_vibe, freesound_api_key, output_dir / "background_music.mp3",
+                max(scene_end_times) if scene_end_times else None
+            )
+        else: logger.info("No music_vibe in script. Skipping background music.")
+
+        logger.info(f"Submitted {len(scene_futures)} scenes for concurrent processing. Waiting for completion...")
+        for future in as_completed(scene_futures):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"Unexpected error processing {scene_futures[future]}: {e}", exc_info=True)
+
+        downloaded_music_path, music_track = None, None
+        if music_future:
+            try:
+                downloaded_music_path, music_track = music_future.result()
+            except Exception as e:
+                logger.error(f"Unexpected error fetching background music: {e}", exc_info=True)
+    if upload_manager:
+        upload_manager.close()
+        logger.info(f"Scene audio uploads: {upload_manager.stats}")
+    if hedge_executor:
+        hedge_executor.shutdown(wait=False) # Losing hedged calls finish in the background
+    if provider_selector:
+        provider_selector.save()
+    for service, service_metrics in rate_limit_metrics().items():
+        logger.info(f"Rate limiter [{service}]: {service_metrics}")
+
     logger.info("Initial asset orchestration pass completed.")
 
     # --- 4. Poll for Argil Video Completion and Download ---
     if argil_api_key:
-        scene_plans = poll_and_download_argil_videos(scene_plans, argil_api_key, video_project_id, rendered_avatars_dir)
+        scene_plans = poll_and_download_argil_videos(scene_plans, argil_api_key, video_project_id, rendered_avatars_dir, target_dims, target_fps)
     else:
         logger.warning("ARGIL_API_KEY not set. Skipping Argil polling.")
         for sp in scene_plans:
@@ -380,6 +730,10 @@ def run_asset_orchestration(
         "video_project_id": video_project_id,
         "master_vo_path": str(master_vo_file),
         "background_music_path": str(downloaded_music_path) if downloaded_music_path else None,
+        "background_music": {
+            **music_track.model_dump(include={"track_id", "title", "source", "source_id", "license", "attribution", "duration", "loudness_lufs", "tempo_bpm"}),
+            "gain_db": mixer_gain_db(music_track),
+        } if downloaded_music_path and music_track else None,
         "scene_plans": scene_plans,
         "original_script_file_used": str(original_script_file),
         "scene_plan_file_used": str(scene_plan_file)
@@ -388,13 +742,5 @@ def run_asset_orchestration(
         json.dump(orchestration_summary, f, indent=2)
     logger.info(f"Orchestration summary saved to: {orchestration_summary_file}")
 
-    # Clean up temporary sliced audio directory
-    if temp_sliced_audio_dir.exists():
-        try:
-            shutil.rmtree(temp_sliced_audio_dir)
-            logger.info(f"Cleaned up temp sliced audio dir: {temp_sliced_audio_dir}")
-        except Exception as e:
-            logger.warning(f"Error cleaning up temp sliced audio dir {temp_sliced_audio_dir}: {e}")
-
     logger.info("Video asset orchestration finished.")
     return orchestration_summary_file
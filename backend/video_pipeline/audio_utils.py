@@ -1,10 +1,78 @@
 from pydub import AudioSegment
+import io
 import logging
 import os
+from functools import lru_cache
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=4)
+def _load_audio_cached(input_path: str, mtime_ns: int) -> AudioSegment:
+    # Keyed on mtime so a rewritten file is decoded again; AudioSegment is immutable and safe to share.
+    return AudioSegment.from_file(input_path)
+
+def _load_audio(input_path: str) -> AudioSegment:
+    """Decodes an audio file once per process (per modification time) instead of once per slice."""
+    return _load_audio_cached(input_path, os.stat(input_path).st_mtime_ns)
+
+def _slice_segment(input_path: str, start_seconds: float, end_seconds: float) -> AudioSegment | None:
+    """Returns the [start, end) slice of an audio file, or None if the range is invalid."""
+    if not os.path.exists(input_path):
+        logger.error(f"Input audio file not found: {input_path}")
+        return None
+
+    # Convert seconds to milliseconds for pydub
+    start_ms = int(start_seconds * 1000)
+    end_ms = int(end_seconds * 1000)
+
+    if start_ms < 0:
+        logger.warning(f"Start time {start_seconds}s is negative, clamping to 0.")
+        start_ms = 0
+
+    if start_ms >= end_ms:
+        logger.error(f"Start time {start_seconds}s is after or equal to end time {end_seconds}s. Cannot slice.")
+        return None
+
+    audio = _load_audio(input_path)
+
+    if start_ms >= len(audio):
+        logger.error(f"Start time {start_seconds}s is beyond the audio duration of {len(audio)/1000.0:.2f}s.")
+        return None
+
+    # Ensure end_ms does not exceed audio length
+    if end_ms > len(audio):
+        logger.warning(f"End time {end_seconds}s is beyond audio duration. Slicing till end of audio: {len(audio)/1000.0:.2f}s.")
+        end_ms = len(audio)
+
+    return audio[start_ms:end_ms]
+
+def slice_audio_to_buffer(input_path: str, start_seconds: float, end_seconds: float, format: str = "mp3") -> io.BytesIO | None:
+    """
+    Slices a segment from an audio file into an in-memory buffer, e.g. for a direct S3 upload.
+
+    Args:
+        input_path (str): Path to the input audio file.
+        start_seconds (float): Start time of the slice in seconds.
+        end_seconds (float): End time of the slice in seconds.
+        format (str): Export format. Default: 'mp3'.
+
+    Returns:
+        io.BytesIO | None: The encoded slice (positioned at 0), or None on failure.
+    """
+    try:
+        sliced_audio = _slice_segment(input_path, start_seconds, end_seconds)
+        if sliced_audio is None:
+            return None
+        buffer = io.BytesIO()
+        sliced_audio.export(buffer, format=format)
+        buffer.seek(0)
+        logger.info(f"Sliced audio from {input_path} ({start_seconds}s-{end_seconds}s) into memory ({buffer.getbuffer().nbytes} bytes)")
+        return buffer
+    except Exception as e:
+        logger.error(f"Error slicing audio file {input_path} into memory: {e}")
+        return None
+
 def slice_audio(input_path: str, output_path: str, start_seconds: float, end_seconds: float) -> bool:
     """
     Slices a segment from an audio file and saves it.
@@ -19,41 +87,11 @@ def slice_audio(input_path: str, output_path: str, start_seconds: float, end_sec
         bool: True if slicing was successful, False otherwise.
     """
     try:
-        if not os.path.exists(input_path):
-            logger.error(f"Input audio file not found: {input_path}")
-            return False
-
-        # Convert seconds to milliseconds for pydub
-        start_ms = int(start_seconds * 1000)
-        end_ms = int(end_seconds * 1000)
-
-        if start_ms < 0:
-            logger.warning(f"Start time {start_seconds}s is negative, clamping to 0.")
-            start_ms = 0
-
-        if start_ms >= end_ms:
-            logger.error(f"Start time {start_seconds}s is after or equal to end time {end_seconds}s. Cannot slice.")
-            return False
-
         logger.info(f"Slicing audio from {input_path} (start: {start_seconds}s, end: {end_seconds}s) to {output_path}")
-
-        # Load the audio file
-        # pydub will attempt to determine the format from the extension,
-        # or you can specify it with format="mp3" etc.
-        audio = AudioSegment.from_file(input_path)
-
-        if start_ms >= len(audio):
-            logger.error(f"Start time {start_seconds}s is beyond the audio duration of {len(audio)/1000.0:.2f}s.")
+        sliced_audio = _slice_segment(input_path, start_seconds, end_seconds)
+        if sliced_audio is None:
             return False
 
-        # Ensure end_ms does not exceed audio length
-        if end_ms > len(audio):
-            logger.warning(f"End time {end_seconds}s is beyond audio duration. Slicing till end of audio: {len(audio)/1000.0:.2f}s.")
-            end_ms = len(audio)
-
-        # Slice the audio
-        sliced_audio = audio[start_ms:end_ms]
-
         try:
             # Ensure output directory exists
             output_path_obj = Path(output_path)
@@ -0,0 +1,196 @@
+import os
+import time
+import logging
+import pathlib
+import subprocess
+from typing import Optional
+
+import requests
+from moviepy.config import get_setting
+
+from backend.text_to_video.rendition_selector import DEFAULT_TARGET_DIMS, DEFAULT_TARGET_FPS
+from backend.text_to_video.metrics import record_download
+from backend.text_to_video.tracing import span, record_span
+
+# Configure logging
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Ingest Configuration
+INGEST_NORMALIZE_ENABLED = os.getenv("INGEST_NORMALIZE_ENABLED", "true").lower() not in ("0", "false", "no")
+INGEST_X264_PRESET = os.getenv("INGEST_X264_PRESET", "veryfast")
+INGEST_X264_CRF = os.getenv("INGEST_X264_CRF", "20")
+INGEST_FFMPEG_TIMEOUT_SECONDS = int(os.getenv("INGEST_FFMPEG_TIMEOUT_SECONDS", "600"))
+INGEST_DURATION_PADDING_SECONDS = 0.5 # Extra tail so assembly never has to freeze-extend a normalized clip
+INGEST_CHUNK_SIZE = 64 * 1024
+
+
+def get_ffmpeg_binary() -> str:
+    """Returns the ffmpeg binary MoviePy is configured with (FFMPEG_BINARY env or the imageio-ffmpeg download)."""
+    return get_setting("FFMPEG_BINARY")
+
+
+def _normalize_command(
+    input_spec: str,
+    output_path: pathlib.Path,
+    target_dims: tuple[int, int],
+    target_fps: int,
+    duration: Optional[float],
+    keep_audio: bool,
+) -> list[str]:
+    """Builds the ffmpeg command that scale-to-covers, center-crops, retimes and optionally trims a clip."""
+    target_w, target_h = target_dims
+    video_filter = (
+        f"scale={target_w}:{target_h}:force_original_aspect_ratio=increase,"
+        f"crop={target_w}:{target_h},setsar=1,fps={target_fps}"
+    )
+    command = [get_ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-y", "-i", input_spec]
+    if duration:
+        # Hold the last frame if the source is shorter than the scene, then cut to the exact length.
+        video_filter += ",tpad=stop_mode=clone:stop=-1"
+        command += ["-t", f"{duration:.3f}"]
+    command += ["-vf", video_filter]
+    command += ["-c:a", "aac"] if keep_audio else ["-an"]
+    command += [
+        "-c:v", "libx264", "-preset", INGEST_X264_PRESET, "-crf", str(INGEST_X264_CRF),
+        "-pix_fmt", "yuv420p", "-movflags", "+faststart", str(output_path),
+    ]
+    return command
+
+
+def _output_ok(output_path: pathlib.Path) -> bool:
+    return output_path.exists() and output_path.stat().st_size > 0
+
+
+def normalize_media(
+    input_path: str,
+    output_path: str,
+    target_dims: tuple[int, int] = DEFAULT_TARGET_DIMS,
+    target_fps: int = DEFAULT_TARGET_FPS,
+    duration: Optional[float] = None,
+    keep_audio: bool = False,
+) -> Optional[str]:
+    """
+    Normalizes a local video into a ready-to-concat intermediate at target_dims/target_fps.
+
+    Args:
+        input_path: Source video file.
+        output_path: Where to write the normalized MP4.
+        target_dims: (width, height) of the output; the source is scaled to cover and center-cropped.
+        target_fps: Output frame rate.
+        duration: If set, the output is trimmed (or last-frame extended) to exactly this many seconds.
+        keep_audio: Keep the audio track (AAC); stripped by default since assembly uses the master VO.
+
+    Returns:
+        The output path on success, otherwise None.
+    """
+    if not pathlib.Path(input_path).exists():
+        logger.error(f"Cannot normalize missing file: {input_path}")
+        return None
+    output = pathlib.Path(output_path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    command = _normalize_command(str(input_path), output, target_dims, target_fps, duration, keep_audio)
+    try:
+        with span("ffmpeg normalize", "ffmpeg", input=pathlib.Path(input_path).name) as ffmpeg_span:
+            result = subprocess.run(command, capture_output=True, timeout=INGEST_FFMPEG_TIMEOUT_SECONDS)
+            ffmpeg_span.set_attribute("exit_code", result.returncode)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.error(f"ffmpeg normalize failed for {input_path}: {e}")
+        return None
+    if result.returncode != 0 or not _output_ok(output):
+        logger.error(f"ffmpeg normalize failed for {input_path} (exit {result.returncode}): {result.stderr.decode(errors='ignore').strip()[-500:]}")
+        return None
+
+    logger.info(f"Normalized {pathlib.Path(input_path).name} -> {output} ({target_dims[0]}x{target_dims[1]} @ {target_fps}fps{f', {duration:.2f}s' if duration else ''})")
+    return str(output)
+
+
+def download_and_normalize(
+    url: str,
+    output_path: str,
+    target_dims: tuple[int, int] = DEFAULT_TARGET_DIMS,
+    target_fps: int = DEFAULT_TARGET_FPS,
+    duration: Optional[float] = None,
+    keep_audio: bool = False,
+    raw_output_path: Optional[str] = None,
+) -> Optional[str]:
+    """
+    Streams an HTTP download straight into an ffmpeg normalize process so transfer and transcode overlap.
+
+    The raw bytes are also teed to disk. Sources that cannot be decoded from a pipe (e.g. MP4s whose
+    moov atom sits at the end of the file) are normalized from that copy once the download completes.
+
+    Args:
+        url: Source media URL.
+        output_path: Where to write the normalized MP4.
+        target_dims, target_fps, duration, keep_audio: See normalize_media.
+        raw_output_path: Keep the original download here. If None it is written to a temp file and removed.
+
+    Returns:
+        The normalized output path on success, otherwise None.
+    """
+    output = pathlib.Path(output_path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    raw_path = pathlib.Path(raw_output_path) if raw_output_path else output.with_name(f"{output.stem}.download.tmp")
+    raw_path.parent.mkdir(parents=True, exist_ok=True)
+
+    command = _normalize_command("pipe:0", output, target_dims, target_fps, duration, keep_audio)
+    started_ns, started = time.time_ns(), time.monotonic()
+    try:
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    except OSError as e:
+        logger.error(f"Could not start ffmpeg for streaming normalize: {e}")
+        return None
+
+    pipe_open = True
+    download_ok = False
+    try:
+        with requests.get(url, stream=True, timeout=60) as response:
+            response.raise_for_status()
+            with open(raw_path, 'wb') as raw_file:
+                for chunk in response.iter_content(chunk_size=INGEST_CHUNK_SIZE):
+                    raw_file.write(chunk)
+                    if pipe_open:
+                        try:
+                            process.stdin.write(chunk)
+                        except (BrokenPipeError, OSError):
+                            pipe_open = False # ffmpeg gave up on the stream; keep downloading for the file fallback
+        download_ok = True
+        record_download("ingest", raw_path)
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error downloading {url} for normalization: {e}")
+    except IOError as e:
+        logger.error(f"IOError writing download of {url} to {raw_path}: {e}")
+    finally:
+        try:
+            process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+    stderr_output = b""
+    try:
+        stderr_output = process.stderr.read()
+        returncode = process.wait(timeout=INGEST_FFMPEG_TIMEOUT_SECONDS)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        returncode = process.wait()
+    record_span("ffmpeg stream-normalize", "ffmpeg", started_ns, int((time.monotonic() - started) * 1e9),
+                exit_code=returncode, downloaded=download_ok, bytes=raw_path.stat().st_size if raw_path.exists() else 0)
+
+    try:
+        if not download_ok:
+            if output.exists():
+                try: output.unlink()
+                except OSError: pass
+            return None
+        if returncode == 0 and _output_ok(output):
+            logger.info(f"Stream-normalized {url} -> {output}")
+            return str(output)
+
+        logger.warning(f"Streaming normalize of {url} failed (exit {returncode}): {stderr_output.decode(errors='ignore').strip()[-300:]}. Retrying from the downloaded file.")
+        return normalize_media(str(raw_path), str(output), target_dims, target_fps, duration, keep_audio)
+    finally:
+        if (not raw_output_path or not download_ok) and raw_path.exists(): # Never leave a partial download behind
+            try: raw_path.unlink()
+            except OSError: pass
@@ -9,6 +9,8 @@ import re
 import datetime
 import sys
 import time
+from contextlib import contextmanager
+from typing import Iterator
 
 # Ensure project root is in sys.path
 PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent.parent
@@ -20,10 +22,21 @@ from dotenv import load_dotenv
 from backend.text_to_video.tts import text_to_speech, sanitize_filename
 from backend.text_to_video.fx.transcriber import transcribe_locally
 from backend.text_to_video.llm_clients.claude_client import ClaudeClient
+from backend.text_to_video.models.scene_models import ScenePlan
+from backend.text_to_video.transcript_encoding import CompactTranscript
 
 # Import refactored orchestrator and assembler
 from backend.video_pipeline.asset_orchestrator import run_asset_orchestration
 from backend.video_pipeline.video_assembler import assemble_final_video
+from backend.video_pipeline.scene_planner import (
+    SCENE_PLAN_WINDOW_SECONDS,
+    SCENE_PLAN_WINDOW_OVERLAP_SECONDS,
+    split_transcript_windows,
+    plan_scenes_windowed,
+)
+from backend.text_to_video.rate_limiter import configure_rate_limits, request_priority, BATCH
+from backend.text_to_video.metrics import observe_stage
+from backend.text_to_video.tracing import job_trace
 
 # --- Configuration ---
 logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -34,6 +47,37 @@ CONFIG_FILE_PATH = PROJECT_ROOT / "backend" / "tests" / "test_config.yaml" # Usi
 TECH_IN_ASIA_SCRIPT_PROMPT_PATH = PROJECT_ROOT / "config" / "tech_in_asia_script_prompt.md"
 VISUAL_SCENE_PLANNER_PROMPT_PATH = PROJECT_ROOT / "backend" / "prompts" / "visual_scene_planner_prompt_template.md"
 DEFAULT_OUTPUT_BASE_DIR = PROJECT_ROOT / "video_outputs"
+STAGE_TIMINGS_FILENAME = "00_stage_timings.json"
+SCENE_PLAN_FILENAME = "04_scene_plan.json"
+TRANSCRIPT_FORMAT_DESCRIPTIONS = {
+    "word_json": "A JSON list of words, each with 'word', 'start' (seconds), 'end' (seconds).",
+    "compact": "One phrase per line as 'start_cs end_cs text', with times as integer centiseconds (1234 = 12.34 seconds). "
+               "Scene boundaries should fall on phrase boundaries; give scene times in seconds (start_cs / 100).",
+}
+
+# Wall time per pipeline stage, filled by timed_stage and written next to the run's outputs
+stage_timings: dict[str, float] = {}
+
+@contextmanager
+def timed_stage(name: str):
+    """Records the wall time of a pipeline stage in stage_timings (also when the stage fails)."""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        stage_timings[name] = round(time.monotonic() - start, 2)
+        logger.info(f"Stage '{name}' took {stage_timings[name]:.2f}s")
+
+def write_stage_timings(output_dir: pathlib.Path, claude_client: ClaudeClient | None) -> None:
+    """Writes stage timings and LLM response cache counters (hits, misses, tokens saved) to the output dir."""
+    llm_cache_stats = dict(claude_client.response_cache.stats) if claude_client and claude_client.response_cache else None
+    report = {"stages": stage_timings, "total_seconds": round(sum(stage_timings.values()), 2), "llm_cache": llm_cache_stats}
+    logger.info(f"Stage timings: {json.dumps(stage_timings)}; LLM cache: {json.dumps(llm_cache_stats)}")
+    try:
+        with open(output_dir / STAGE_TIMINGS_FILENAME, 'w') as f:
+            json.dump(report, f, indent=2)
+    except OSError as e:
+        logger.warning(f"Could not write stage timings: {e}")
 
 def load_pipeline_config():
     if not CONFIG_FILE_PATH.exists():
@@ -49,6 +93,7 @@ def get_prompt_template(template_path: pathlib.Path) -> str:
     with open(template_path, 'r') as f:
         return f.read()
 
+@observe_stage("script")
 def generate_video_script(story_content: str, claude_client: ClaudeClient, config: dict, output_dir: pathlib.Path) -> pathlib.Path:
     logger.info("--- Step 1: Generating Video Script ---")
     script_prompt_template = get_prompt_template(TECH_IN_ASIA_SCRIPT_PROMPT_PATH)
@@ -165,11 +210,17 @@ def generate_transcription(audio_path: pathlib.Path, output_dir: pathlib.Path) -
     logger.info(f"Transcription saved to: {transcription_output_path}")
     return transcription_output_path
 
-def generate_scene_plan(script_data_path: pathlib.Path, transcript_path: pathlib.Path, claude_client: ClaudeClient, config: dict, output_dir: pathlib.Path) -> pathlib.Path:
-    logger.info("--- Step 4: Generating Scene Plan ---")
-    with open(script_data_path, 'r') as f: script_data = json.load(f)
-    with open(transcript_path, 'r') as f: word_transcript = json.load(f)
+def build_scene_plan_request(script_data: dict, word_transcript: list, config: dict, excerpt_note: str = None) -> tuple[dict, CompactTranscript | None]:
+    """
+    Builds the scene planner's Claude request (prompts and call parameters) from the script and transcript.
 
+    Args:
+        excerpt_note: Appended to the user prompt when word_transcript is only one window of the voiceover.
+
+    Returns:
+        (request kwargs, CompactTranscript used for the prompt or None if the raw word JSON was sent).
+        Scenes planned from a compact transcript should be passed through its snap_scene.
+    """
     scene_planner_prompt_template = get_prompt_template(VISUAL_SCENE_PLANNER_PROMPT_PATH)
     llm_config = config['llm_scene_planner'].copy() # Use a copy to safely modify
     system_prompt = "You are an expert video production planner. Follow instructions precisely and return only the JSON list."
@@ -180,9 +231,24 @@ def generate_scene_plan(script_data_path: pathlib.Path, transcript_path: pathlib
     config_for_prompt.pop("MAX_TOKENS", None)
     config_for_prompt.pop("TEMPERATURE", None)
     config_for_prompt.pop("MODEL_NAME", None) # Also remove MODEL_NAME as it's not for the prompt content
+    config_for_prompt.pop("STREAMING", None)
+    config_for_prompt.pop("COMPACT_TRANSCRIPT", None)
+    config_for_prompt.pop("WINDOW_SECONDS", None)
+    config_for_prompt.pop("WINDOW_OVERLAP_SECONDS", None)
+
+    # Phrase lines with centisecond offsets instead of the word JSON: far fewer prompt tokens, and the
+    # exact word times are restored from the encoding when the plan comes back.
+    compact_transcript = None
+    transcript_for_prompt = json.dumps(word_transcript)
+    if llm_config.get("COMPACT_TRANSCRIPT", True):
+        compact_transcript = CompactTranscript(word_transcript, max_phrase_seconds=float(llm_config["MIN_SEGMENT_DURATION"]))
+        transcript_for_prompt = compact_transcript.to_prompt_text()
+        logger.info(f"Compact transcript: {len(compact_transcript.words)} words in {len(compact_transcript.phrases)} phrases, "
+                    f"{len(transcript_for_prompt)} chars (word JSON: {len(json.dumps(word_transcript))} chars).")
 
     replacements = {
-        "{{word_transcript_json_string}}": json.dumps(word_transcript),
+        "{{transcript_format_description}}": TRANSCRIPT_FORMAT_DESCRIPTIONS["compact" if compact_transcript else "word_json"],
+        "{{word_transcript_json_string}}": transcript_for_prompt,
         "{{script_json_string}}": json.dumps(script_data),
         "{{min_segment_duration}}": str(llm_config["MIN_SEGMENT_DURATION"]),
         "{{max_segment_duration}}": str(llm_config["MAX_SEGMENT_DURATION"]),
@@ -194,29 +260,95 @@ def generate_scene_plan(script_data_path: pathlib.Path, transcript_path: pathlib
     user_prompt = scene_planner_prompt_template
     for placeholder, value in replacements.items():
         user_prompt = user_prompt.replace(placeholder, value)
+    if excerpt_note:
+        user_prompt += f"\n\n{excerpt_note}"
 
-    call_params = {}
+    request = {"system_prompt": system_prompt, "user_prompt": user_prompt}
     max_tokens_config = llm_config.get("MAX_TOKENS") # Get from original llm_config
     if max_tokens_config is not None:
-        call_params['max_tokens'] = int(max_tokens_config)
+        request['max_tokens'] = int(max_tokens_config)
 
     temperature_config = llm_config.get("TEMPERATURE") # Get from original llm_config
     if temperature_config is not None:
-        call_params['temperature'] = float(temperature_config)
+        request['temperature'] = float(temperature_config)
+    return request, compact_transcript
+
+def write_scene_plan(scene_plans: list, output_dir: pathlib.Path) -> pathlib.Path:
+    scene_plan_output_path = output_dir / SCENE_PLAN_FILENAME
+    with open(scene_plan_output_path, 'w') as f:
+        json.dump(scene_plans, f, indent=2)
+    logger.info(f"Scene plan saved to: {scene_plan_output_path}")
+    return scene_plan_output_path
+
+def _windowed_scene_plan(script_data: dict, word_transcript: list, claude_client: ClaudeClient, config: dict) -> Iterator[dict] | None:
+    """
+    Returns an iterator over a concurrently planned, window-by-window scene plan, or None if the transcript
+    fits in a single window (then one request plans everything).
+    """
+    llm_config = config['llm_scene_planner']
+    window_seconds = float(llm_config.get("WINDOW_SECONDS", SCENE_PLAN_WINDOW_SECONDS))
+    overlap_seconds = float(llm_config.get("WINDOW_OVERLAP_SECONDS", SCENE_PLAN_WINDOW_OVERLAP_SECONDS))
+    if len(split_transcript_windows(word_transcript, window_seconds, overlap_seconds)) < 2:
+        return None
+    return plan_scenes_windowed(
+        claude_client, word_transcript,
+        lambda window_words, note: build_scene_plan_request(script_data, window_words, config, excerpt_note=note),
+        min_segment_duration=float(llm_config["MIN_SEGMENT_DURATION"]),
+        window_seconds=window_seconds, overlap_seconds=overlap_seconds,
+    )
+
+@observe_stage("planning")
+def generate_scene_plan(script_data_path: pathlib.Path, transcript_path: pathlib.Path, claude_client: ClaudeClient, config: dict, output_dir: pathlib.Path) -> pathlib.Path:
+    logger.info("--- Step 4: Generating Scene Plan ---")
+    with open(script_data_path, 'r') as f: script_data = json.load(f)
+    with open(transcript_path, 'r') as f: word_transcript = json.load(f)
+
+    windowed_plan = _windowed_scene_plan(script_data, word_transcript, claude_client, config)
+    if windowed_plan is not None:
+        return write_scene_plan(list(windowed_plan), output_dir)
 
+    request, compact_transcript = build_scene_plan_request(script_data, word_transcript, config)
     scene_plans_raw = claude_client.generate_structured_output( # Expects JSON list
-        system_prompt=system_prompt,
-        user_prompt=user_prompt,
-        **call_params
+        **request,
+        response_model=ScenePlan,
     )
     if not scene_plans_raw:
         raise ValueError("LLM response for scene plan generation was None or empty.")
+    if compact_transcript:
+        scene_plans_raw = [compact_transcript.snap_scene(scene) for scene in scene_plans_raw]
+    return write_scene_plan(scene_plans_raw, output_dir)
+
+def stream_scene_plan(script_data_path: pathlib.Path, transcript_path: pathlib.Path, claude_client: ClaudeClient, config: dict, output_dir: pathlib.Path) -> Iterator[dict]:
+    """
+    Streams the scene plan, yielding each validated scene as soon as it is planned.
+
+    Short transcripts are planned by one streamed request (scenes arrive as Claude closes them); long ones
+    window by window (scenes arrive as each window, planned concurrently, completes in order). Meant to be
+    consumed by run_asset_orchestration(scene_stream=...) so asset fetching overlaps plan generation. The
+    complete plan is written to the usual scene plan file when the stream ends.
+    """
+    logger.info("--- Step 4: Streaming Scene Plan ---")
+    with open(script_data_path, 'r') as f: script_data = json.load(f)
+    with open(transcript_path, 'r') as f: word_transcript = json.load(f)
 
-    scene_plan_output_path = output_dir / "04_scene_plan.json"
-    with open(scene_plan_output_path, 'w') as f:
-        json.dump(scene_plans_raw, f, indent=2)
-    logger.info(f"Scene plan saved to: {scene_plan_output_path}")
-    return scene_plan_output_path
+    with observe_stage("planning", detached=True): # Overlaps orchestration, which consumes the scenes as they arrive
+        start = time.monotonic()
+        scene_plans = []
+        scene_source = _windowed_scene_plan(script_data, word_transcript, claude_client, config)
+        compact_transcript = None
+        if scene_source is None:
+            request, compact_transcript = build_scene_plan_request(script_data, word_transcript, config)
+            scene_source = claude_client.stream_structured_list(**request, item_model=ScenePlan)
+        for scene in scene_source:
+            if compact_transcript:
+                scene = compact_transcript.snap_scene(scene)
+            scene_plans.append(scene)
+            logger.info(f"Scene {scene.get('scene_id')} planned after {time.monotonic() - start:.1f}s; handing to orchestration.")
+            yield scene
+        if not scene_plans:
+            raise ValueError("LLM response for scene plan generation was empty.")
+        write_scene_plan(scene_plans, output_dir)
+        logger.info(f"Scene plan stream complete: {len(scene_plans)} scenes in {time.monotonic() - start:.1f}s.")
 
 def main():
     parser = argparse.ArgumentParser(description="Run the full video generation pipeline.")
@@ -225,6 +357,7 @@ def main():
     parser.add_argument("--rerun_from_orchestration_summary", type=str, help="Optional: Path to an existing orchestration_summary.json to restart from the assembly step.")
     parser.add_argument("--rerun_transcription_path", type=str, help="Required if --rerun_from_orchestration_summary is used. Path to the corresponding transcription.json.")
     parser.add_argument("--rerun_script_path", type=str, help="Optional if --rerun_from_orchestration_summary is used, but needed by some earlier steps if not skipping them all. Path to the corresponding 01_generated_video_script.json.") # Added for completeness, though assembly might not need it directly.
+    parser.add_argument("--refresh_llm_cache", action="store_true", help="Ignore cached LLM responses and regenerate (and re-cache) the script and scene plan.")
     parser.add_argument("--rerun_audio_path", type=str, help="Optional if --rerun_from_orchestration_summary is used. Path to the master audio file. Orchestration summary should contain this, but can be overridden.")
 
     args = parser.parse_args()
@@ -233,6 +366,7 @@ def main():
         parser.error("--rerun_transcription_path is required when using --rerun_from_orchestration_summary")
 
     config = load_pipeline_config()
+    configure_rate_limits(config.get("rate_limits"))
 
     # Determine input type and content
     story_content = ""
@@ -276,7 +410,7 @@ def main():
 
     llm_planner_config = config.get('llm_scene_planner', {})
     claude_model = llm_planner_config.get("MODEL_NAME", "claude-3-5-sonnet-20240620")
-    claude_client = ClaudeClient(model=claude_model)
+    claude_client = ClaudeClient(model=claude_model, refresh_cache=args.refresh_llm_cache)
 
     # Initialize paths for pipeline products
     script_path = None
@@ -285,92 +419,120 @@ def main():
     scene_plan_path = None
     orchestration_summary_path = None
 
-    try:
-        if args.rerun_from_orchestration_summary:
-            logger.info(f"--- RE-RUNNING FROM EXISTING ORCHESTRATION SUMMARY --- ")
-            orchestration_summary_path = pathlib.Path(args.rerun_from_orchestration_summary)
-            transcript_path = pathlib.Path(args.rerun_transcription_path)
-
-            if not orchestration_summary_path.exists():
-                logger.error(f"Provided orchestration summary not found: {orchestration_summary_path}")
-                sys.exit(1)
-            if not transcript_path.exists():
-                logger.error(f"Provided transcription path not found: {transcript_path}")
+    # Spans of every stage (Claude, stock and avatar providers, ingest and encode passes) are written to
+    # <output_dir>/<run_id>.trace.json when the run ends, also when it fails; open it in https://ui.perfetto.dev
+    run_id = f"video_pipeline_{input_name_stem}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    with job_trace(run_id, "video_pipeline", trace_dir=output_dir, input=input_name_stem,
+                   rerun=bool(args.rerun_from_orchestration_summary)):
+        try:
+            if args.rerun_from_orchestration_summary:
+                logger.info(f"--- RE-RUNNING FROM EXISTING ORCHESTRATION SUMMARY --- ")
+                orchestration_summary_path = pathlib.Path(args.rerun_from_orchestration_summary)
+                transcript_path = pathlib.Path(args.rerun_transcription_path)
+
+                if not orchestration_summary_path.exists():
+                    logger.error(f"Provided orchestration summary not found: {orchestration_summary_path}")
+                    sys.exit(1)
+                if not transcript_path.exists():
+                    logger.error(f"Provided transcription path not found: {transcript_path}")
+                    sys.exit(1)
+
+                # If script_path and audio_path are needed by later stages (e.g. if we didn't skip orchestration)
+                # For now, assembly only needs orchestration summary and transcript directly.
+                # However, the orchestration summary itself should contain the master_vo_path.
+                logger.info(f"Using Orchestration Summary: {orchestration_summary_path}")
+                logger.info(f"Using Transcription: {transcript_path}")
+                # Skip steps 1-5
+                logger.info("Skipping Script Generation, TTS, Transcription Generation, Scene Planning, and Asset Orchestration.")
+
+            else:
+                logger.info("--- Starting Full Pipeline Execution --- ")
+                # --- Run Pipeline Steps --- (Original order)
+                with timed_stage("script_generation"):
+                    script_path = generate_video_script(story_content, claude_client, config, output_dir)
+
+                with open(script_path, 'r') as f:
+                    script_data_for_tts = json.load(f)
+                with timed_stage("tts"):
+                    audio_path = generate_tts_audio(script_data_for_tts, config, output_dir)
+
+                with timed_stage("transcription"):
+                    transcript_path = generate_transcription(audio_path, output_dir)
+
+                # Streaming hands each scene to orchestration as soon as Claude closes it, so stock searches,
+                # downloads and avatar jobs overlap plan generation; the two stages are then timed together.
+                scene_stream = None
+                orchestration_stage = "asset_orchestration"
+                if config.get("llm_scene_planner", {}).get("STREAMING", True):
+                    scene_plan_path = output_dir / SCENE_PLAN_FILENAME
+                    scene_stream = stream_scene_plan(script_path, transcript_path, claude_client, config, output_dir)
+                    orchestration_stage = "scene_planning_and_asset_orchestration"
+                else:
+                    with timed_stage("scene_planning"):
+                        scene_plan_path = generate_scene_plan(script_path, transcript_path, claude_client, config, output_dir)
+
+                logger.info(f"--- Step 5: Asset Orchestration ---")
+                # If rerun_audio_path is provided, it could potentially be used here for orchestration if that step wasn't skipped.
+                # For now, if we are in this else block, audio_path is from generate_tts_audio.
+                # Similarly for script_path.
+                orchestration_video_config = config.get("video_general", {})
+                with timed_stage(orchestration_stage):
+                    orchestration_summary_path = run_asset_orchestration(
+                        scene_plan_path_str=str(scene_plan_path),
+                        master_vo_path_str=str(audio_path), # audio_path from TTS step
+                        original_script_path_str=str(script_path), # script_path from script gen step
+                        output_dir=output_dir,
+                        # Stock and avatar clips are normalized at ingest to the same format assembly renders
+                        target_dims=tuple(orchestration_video_config.get("TARGET_DIMENSIONS", [1080, 1920])),
+                        target_fps=orchestration_video_config.get("TARGET_FPS", 30),
+                        scene_stream=scene_stream,
+                    )
+                logger.info(f"Asset orchestration summary saved to: {orchestration_summary_path}")
+
+            # --- Step 6: Video Assembly --- (Common to both full run and re-run)
+            # orchestration_summary_path and transcript_path will be set either by full run or re-run args
+            if not orchestration_summary_path or not transcript_path:
+                logger.error("Critical path information for assembly (orchestration summary or transcript) is missing.")
                 sys.exit(1)
 
-            # If script_path and audio_path are needed by later stages (e.g. if we didn't skip orchestration)
-            # For now, assembly only needs orchestration summary and transcript directly.
-            # However, the orchestration summary itself should contain the master_vo_path.
-            logger.info(f"Using Orchestration Summary: {orchestration_summary_path}")
-            logger.info(f"Using Transcription: {transcript_path}")
-            # Skip steps 1-5
-            logger.info("Skipping Script Generation, TTS, Transcription Generation, Scene Planning, and Asset Orchestration.")
-
-        else:
-            logger.info("--- Starting Full Pipeline Execution --- ")
-            # --- Run Pipeline Steps --- (Original order)
-            script_path = generate_video_script(story_content, claude_client, config, output_dir)
-
-            with open(script_path, 'r') as f:
-                script_data_for_tts = json.load(f)
-            audio_path = generate_tts_audio(script_data_for_tts, config, output_dir)
-
-            transcript_path = generate_transcription(audio_path, output_dir)
-
-            scene_plan_path = generate_scene_plan(script_path, transcript_path, claude_client, config, output_dir)
-
-            logger.info(f"--- Step 5: Asset Orchestration ---")
-            # If rerun_audio_path is provided, it could potentially be used here for orchestration if that step wasn't skipped.
-            # For now, if we are in this else block, audio_path is from generate_tts_audio.
-            # Similarly for script_path.
-            orchestration_summary_path = run_asset_orchestration(
-                scene_plan_path_str=str(scene_plan_path),
-                master_vo_path_str=str(audio_path), # audio_path from TTS step
-                original_script_path_str=str(script_path), # script_path from script gen step
-                output_dir=output_dir,
-            )
-            logger.info(f"Asset orchestration summary saved to: {orchestration_summary_path}")
-
-        # --- Step 6: Video Assembly --- (Common to both full run and re-run)
-        # orchestration_summary_path and transcript_path will be set either by full run or re-run args
-        if not orchestration_summary_path or not transcript_path:
-            logger.error("Critical path information for assembly (orchestration summary or transcript) is missing.")
+            logger.info(f"--- Step 6: Video Assembly ---")
+            logger.info(f"Using orchestration summary for assembly: {orchestration_summary_path}")
+            logger.info(f"Using transcription for assembly: {transcript_path}")
+
+            video_general_config = config.get("video_general", {})
+            target_fps = video_general_config.get("TARGET_FPS", 30)
+            target_dims = tuple(video_general_config.get("TARGET_DIMENSIONS", [1080, 1920]))
+            if len(target_dims) != 2: target_dims = (1080, 1920) # Fallback
+
+            final_video_filename = f"{input_name_stem}_final_video.mp4"
+            with timed_stage("video_assembly"):
+                final_video_path = assemble_final_video(
+                    orchestration_summary_path_str=str(orchestration_summary_path),
+                    transcription_path_str=str(transcript_path),
+                    final_output_dir=output_dir,
+                    final_video_filename=final_video_filename,
+                    target_fps=target_fps,
+                    target_dims=target_dims
+                )
+            if final_video_path:
+                logger.info(f"Final video generated: {final_video_path}")
+            else:
+                raise RuntimeError("Video assembly failed to produce a final video path.")
+
+            logger.info("--- Pipeline Execution Completed Successfully! ---")
+            logger.info(f"Outputs are in: {output_dir}")
+
+        except Exception as e:
+            logger.error(f"Pipeline failed: {e}", exc_info=True)
             sys.exit(1)
-
-        logger.info(f"--- Step 6: Video Assembly ---")
-        logger.info(f"Using orchestration summary for assembly: {orchestration_summary_path}")
-        logger.info(f"Using transcription for assembly: {transcript_path}")
-
-        video_general_config = config.get("video_general", {})
-        target_fps = video_general_config.get("TARGET_FPS", 30)
-        target_dims = tuple(video_general_config.get("TARGET_DIMENSIONS", [1080, 1920]))
-        if len(target_dims) != 2: target_dims = (1080, 1920) # Fallback
-
-        final_video_filename = f"{input_name_stem}_final_video.mp4"
-        final_video_path = assemble_final_video(
-            orchestration_summary_path_str=str(orchestration_summary_path),
-            transcription_path_str=str(transcript_path),
-            final_output_dir=output_dir,
-            final_video_filename=final_video_filename,
-            target_fps=target_fps,
-            target_dims=target_dims
-        )
-        if final_video_path:
-            logger.info(f"Final video generated: {final_video_path}")
-        else:
-            raise RuntimeError("Video assembly failed to produce a final video path.")
-
-        logger.info("--- Pipeline Execution Completed Successfully! ---")
-        logger.info(f"Outputs are in: {output_dir}")
-
-    except Exception as e:
-        logger.error(f"Pipeline failed: {e}", exc_info=True)
-        sys.exit(1)
+        finally:
+            write_stage_timings(output_dir, claude_client)
 
 if __name__ == "__main__":
     start_time = time.time()
     try:
-        main()
+        with request_priority(BATCH): # CLI runs yield external API quota to interactive API jobs
+            main()
     finally:
         end_time = time.time()
         total_time = end_time - start_time
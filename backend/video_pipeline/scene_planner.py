@@ -0,0 +1,192 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+from backend.text_to_video.llm_clients.claude_client import ClaudeClient
+from backend.text_to_video.models.scene_models import ScenePlan
+from backend.text_to_video.transcript_encoding import CompactTranscript
+from backend.text_to_video.tracing import submit_in_context
+
+# Configure logging
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- Windowed Planning Configuration ---
+SCENE_PLAN_WINDOW_SECONDS = float(os.getenv("SCENE_PLAN_WINDOW_SECONDS", "45"))
+SCENE_PLAN_WINDOW_OVERLAP_SECONDS = float(os.getenv("SCENE_PLAN_WINDOW_OVERLAP_SECONDS", "5"))
+SCENE_PLAN_MAX_WORKERS = int(os.getenv("SCENE_PLAN_MAX_WORKERS", "4"))
+SCENE_PLAN_WINDOW_MAX_ATTEMPTS = int(os.getenv("SCENE_PLAN_WINDOW_MAX_ATTEMPTS", "3"))
+COVERAGE_TOLERANCE_SECONDS = 0.5 # Slack at window edges, on top of the natural pause between words
+SENTENCE_END_PUNCTUATION = (".", "!", "?")
+
+
+@dataclass
+class TranscriptWindow:
+    """
+    A slice of the transcript planned by one request.
+
+    The window sends words [first_word, last_word] (its owned span plus the overlap on both sides, widened
+    to whole sentences, for context) and keeps only the scenes inside its owned span
+    [own_first_word, own_last_word]. Owned spans of consecutive windows meet exactly at a sentence boundary.
+    """
+    index: int
+    first_word: int
+    last_word: int
+    own_first_word: int
+    own_last_word: int
+
+
+def _sentence_starts(words: list[dict]) -> list[int]:
+    """Indices of words that begin a sentence (always including 0)."""
+    starts = [0]
+    for i in range(1, len(words)):
+        if str(words[i - 1]["word"]).strip().endswith(SENTENCE_END_PUNCTUATION):
+            starts.append(i)
+    return starts
+
+
+def split_transcript_windows(words: list[dict], window_seconds: float = SCENE_PLAN_WINDOW_SECONDS,
+                             overlap_seconds: float = SCENE_PLAN_WINDOW_OVERLAP_SECONDS) -> list[TranscriptWindow]:
+    """
+    Splits a word-level transcript into windows of about window_seconds, cut at sentence boundaries.
+
+    A transcript shorter than 1.5 windows (or without sentence boundaries) is a single window.
+    """
+    if not words:
+        return []
+    sentence_starts = _sentence_starts(words)
+
+    # Owned spans: cut at the first sentence start at least window_seconds after the current span began,
+    # unless that would leave a tail shorter than half a window.
+    cuts = [0]
+    total_end = float(words[-1]["end"])
+    for start_index in sentence_starts[1:]:
+        span_start = float(words[cuts[-1]]["start"])
+        cut_time = float(words[start_index]["start"])
+        if cut_time - span_start >= window_seconds and total_end - cut_time >= window_seconds / 2:
+            cuts.append(start_index)
+    cuts.append(len(words))
+
+    windows = []
+    for index in range(len(cuts) - 1):
+        own_first, own_last = cuts[index], cuts[index + 1] - 1
+        # Context: overlap_seconds on either side, widened to whole sentences.
+        first, last = own_first, own_last
+        if own_first > 0:
+            context_start = float(words[own_first]["start"]) - overlap_seconds
+            first = max([i for i in sentence_starts if i < own_first and float(words[i]["start"]) <= context_start], default=0)
+        if own_last < len(words) - 1:
+            context_end = float(words[own_last]["end"]) + overlap_seconds
+            last = min([i - 1 for i in sentence_starts if i > own_last + 1 and float(words[i - 1]["end"]) >= context_end], default=len(words) - 1)
+        windows.append(TranscriptWindow(index, first, last, own_first, own_last))
+    return windows
+
+
+def reconcile_window_scenes(scenes: list[dict], window: TranscriptWindow, words: list[dict], min_segment_duration: float) -> list[dict]:
+    """
+    Keeps the scenes of a window that overlap its owned span, clipped to it.
+
+    Scenes planned for the context on either side are dropped. A scene straddling a span edge is clipped
+    to it, so consecutive windows meet exactly at the edge; a clipped remnant shorter than
+    min_segment_duration is merged into its neighbour.
+    """
+    own_start, own_end = float(words[window.own_first_word]["start"]), float(words[window.own_last_word]["end"])
+    kept = []
+    for scene in sorted(scenes, key=lambda s: s["start_time"]):
+        start_time, end_time = max(scene["start_time"], own_start), min(scene["end_time"], own_end)
+        if end_time > start_time:
+            kept.append({**scene, "start_time": start_time, "end_time": end_time})
+
+    for edge in (0, -1):
+        if len(kept) > 1 and kept[edge]["end_time"] - kept[edge]["start_time"] < min_segment_duration:
+            remnant = kept.pop(edge)
+            neighbour = kept[edge]
+            neighbour["start_time"] = min(neighbour["start_time"], remnant["start_time"])
+            neighbour["end_time"] = max(neighbour["end_time"], remnant["end_time"])
+    return kept
+
+
+def coverage_errors(scenes: list[dict], words: list[dict], first_word: int, last_word: int,
+                    tolerance: float = COVERAGE_TOLERANCE_SECONDS) -> list[str]:
+    """
+    Checks that scenes cover words[first_word..last_word] without holes.
+
+    Returns a list of problems (empty if the coverage is valid). Gaps are allowed where the transcript
+    itself is silent.
+    """
+    if not scenes:
+        return ["no scenes"]
+    errors = []
+    span_start, span_end = float(words[first_word]["start"]), float(words[last_word]["end"])
+    if scenes[0]["start_time"] - span_start > tolerance:
+        errors.append(f"first scene starts at {scenes[0]['start_time']:.2f}s, transcript span at {span_start:.2f}s")
+    if span_end - scenes[-1]["end_time"] > tolerance:
+        errors.append(f"last scene ends at {scenes[-1]['end_time']:.2f}s, transcript span at {span_end:.2f}s")
+    for previous, scene in zip(scenes, scenes[1:]):
+        gap = scene["start_time"] - previous["end_time"]
+        if gap > tolerance:
+            spoken = [w for w in words[first_word:last_word + 1] if float(w["start"]) < scene["start_time"] and float(w["end"]) > previous["end_time"]]
+            if spoken:
+                errors.append(f"{len(spoken)} words between {previous['end_time']:.2f}s and {scene['start_time']:.2f}s are not in any scene")
+        elif gap < -tolerance:
+            errors.append(f"scenes overlap by {-gap:.2f}s at {scene['start_time']:.2f}s")
+    return errors
+
+
+def plan_scenes_windowed(claude_client: ClaudeClient, words: list[dict], build_request: Callable[[list[dict], str], tuple[dict, CompactTranscript | None]],
+                         min_segment_duration: float, window_seconds: float = SCENE_PLAN_WINDOW_SECONDS,
+                         overlap_seconds: float = SCENE_PLAN_WINDOW_OVERLAP_SECONDS, max_workers: int = SCENE_PLAN_MAX_WORKERS) -> Iterator[dict]:
+    """
+    Plans scenes for a long transcript with one concurrent request per window, yielding scenes in order.
+
+    Each window's response is validated (ScenePlan per scene, then coverage of its owned span); only
+    windows that fail are re-requested, bypassing the response cache, up to SCENE_PLAN_WINDOW_MAX_ATTEMPTS.
+    Owned spans partition the transcript, so valid windows together cover its whole duration.
+    Scenes of a window are yielded as soon as it and every earlier window are done, so the stream can feed
+    asset orchestration like a single streamed plan.
+
+    Args:
+        claude_client: Client used for every window request.
+        words: The full word-level transcript.
+        build_request: Builds (request kwargs, compact transcript or None) for a list of words and a note
+            placed in the prompt about where the excerpt sits in the video.
+        min_segment_duration: Scene length below which a clipped boundary scene is merged into its neighbour.
+
+    Raises:
+        ValueError: If a window still fails validation after all attempts.
+    """
+    windows = split_transcript_windows(words, window_seconds, overlap_seconds)
+    full_transcript = CompactTranscript(words) # Re-aligns clipped scenes to exact word times and text
+    logger.info(f"Planning {len(words)} words in {len(windows)} windows (~{window_seconds:.0f}s, {overlap_seconds:.0f}s overlap).")
+
+    def _plan_window(window: TranscriptWindow) -> list[dict]:
+        window_words = words[window.first_word:window.last_word + 1]
+        note = (f"This transcript is excerpt {window.index + 1} of {len(windows)} of a longer voiceover "
+                f"({float(window_words[0]['start']):.2f}s to {float(window_words[-1]['end']):.2f}s). "
+                "Plan scenes for this excerpt only, with times on the full video's timeline as given.")
+        request, compact_transcript = build_request(window_words, note)
+        errors = []
+        for attempt in range(1, SCENE_PLAN_WINDOW_MAX_ATTEMPTS + 1):
+            scenes = claude_client.generate_structured_output(**request, response_model=ScenePlan, refresh_cache=True if attempt > 1 else None)
+            if not isinstance(scenes, list):
+                errors = ["response was not a valid scene list"]
+            else:
+                if compact_transcript:
+                    scenes = [compact_transcript.snap_scene(scene) for scene in scenes]
+                scenes = [full_transcript.snap_scene(scene) for scene in reconcile_window_scenes(scenes, window, words, min_segment_duration)]
+                errors = coverage_errors(scenes, words, window.own_first_word, window.own_last_word)
+                if not errors:
+                    return scenes
+            logger.warning(f"Scene plan window {window.index + 1}/{len(windows)} failed validation (attempt {attempt}/{SCENE_PLAN_WINDOW_MAX_ATTEMPTS}): {'; '.join(errors)}")
+        raise ValueError(f"Scene plan window {window.index + 1}/{len(windows)} failed validation: {'; '.join(errors)}")
+
+    scene_number = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(windows))), thread_name_prefix="scene_plan_window") as executor:
+        futures = [submit_in_context(executor, _plan_window, window) for window in windows]
+        for future in futures:
+            for scene in future.result():
+                scene_number += 1
+                scene["scene_id"] = f"{scene_number:03d}" # Window-local ids would collide
+                yield scene
@@ -25,6 +25,7 @@ from backend.video_pipeline.video_utils import (
 )
 from backend.text_to_video.fx.text_animations import animate_text_fade, animate_text_scale # Added animate_text_scale
 from backend.text_to_video.fx import add_captions as add_captions_fx # For captions step
+from backend.text_to_video.metrics import observe_stage, encode_pass
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -194,6 +195,9 @@ def assemble_video_step1_base_visuals_and_audio(
 
     master_vo_path_str = summary_data.get("master_vo_path") if isinstance(summary_data, dict) else None
     background_music_path_str = summary_data.get("background_music_path") if isinstance(summary_data, dict) else None
+    # Gain precomputed from the track's indexed loudness; without it the bed keeps the fixed 0.08 volume.
+    background_music_info = (summary_data.get("background_music") or {}) if isinstance(summary_data, dict) else {}
+    background_music_volume = 10 ** (background_music_info["gain_db"] / 20) if background_music_info.get("gain_db") is not None else 0.08
 
     if isinstance(summary_data, list): # Fallback for older list-based summary for master_vo_path
         logger.warning("Orchestration summary is a list (older format). Attempting to find fallback Master VO.")
@@ -218,6 +222,7 @@ def assemble_video_step1_base_visuals_and_audio(
         if fallback_bg_music_path.exists():
             logger.warning(f"BG music not in summary or invalid. Using fallback: {fallback_bg_music_path}")
             background_music_path_str = str(fallback_bg_music_path)
+            background_music_volume = 0.08 # Unknown loudness
         # else: logger info/warning about no BG music will be handled in audio prep section
 
     # --- Process scene assets into MoviePy clips (NO FX HERE) ---
@@ -317,7 +322,7 @@ def assemble_video_step1_base_visuals_and_audio(
             else: bg_music_adjusted_duration_clip = bg_music_clip_original.set_duration(target_audio_duration)
 
             if bg_music_adjusted_duration_clip:
-                bg_music_final_processed_clip = (bg_music_adjusted_duration_clip.volumex(0.08).audio_fadein(1.5).audio_fadeout(1.5))
+                bg_music_final_processed_clip = (bg_music_adjusted_duration_clip.volumex(background_music_volume).audio_fadein(1.5).audio_fadeout(1.5))
                 final_audio_for_file_write = CompositeAudioClip([master_audio_clip, bg_music_final_processed_clip])
 
         if not final_audio_for_file_write: logger.error("Final audio track is None before write."); return None
@@ -348,7 +353,8 @@ def assemble_video_step1_base_visuals_and_audio(
         final_visual_track_silent = final_visual_track.without_audio()
         output_fps = final_visual_track_silent.fps or target_fps
         logger.info(f"Writing base silent visual to {temp_final_visual_path} (Dur: {final_visual_track_silent.duration:.2f}s, FPS: {output_fps})")
-        final_visual_track_silent.write_videofile(str(temp_final_visual_path), codec="libx264", audio=False, fps=output_fps, logger=None)
+        with encode_pass("base_visuals", str(temp_final_visual_path), final_visual_track_silent.duration, output_fps):
+            final_visual_track_silent.write_videofile(str(temp_final_visual_path), codec="libx264", audio=False, fps=output_fps, logger=None)
     except Exception as e: logger.error(f"Error writing base silent visual: {e}"); return None
     finally:
         if final_visual_track and hasattr(final_visual_track, 'close'): final_visual_track.close()
@@ -375,7 +381,8 @@ def assemble_video_step1_base_visuals_and_audio(
 
         if not video_ready_for_render: logger.error("Failed to prep base video for render."); return None
         logger.info(f"Writing Step 1 (Base) video to: {final_output_path} (Dur: {video_ready_for_render.duration:.2f}s)")
-        video_ready_for_render.write_videofile(str(final_output_path), codec="libx264", audio_codec="aac", fps=output_fps_final, logger=None)
+        with encode_pass("base", str(final_output_path), video_ready_for_render.duration, output_fps_final):
+            video_ready_for_render.write_videofile(str(final_output_path), codec="libx264", audio_codec="aac", fps=output_fps_final, logger=None)
         logger.info(f"Successfully assembled Step 1 (Base) video: {final_output_path}")
         return str(final_output_path)
     except Exception as e:
@@ -567,7 +574,8 @@ def apply_fx_to_video(input_video_path: str, output_dir_path: pathlib.Path, outp
             video_with_fx = video_with_fx.set_fps(output_fps)
 
         logger.info(f"Writing Step 2 (FX) video to: {final_output_path} (Dur: {video_with_fx.duration:.2f}s, FPS: {output_fps})")
-        video_with_fx.write_videofile(str(final_output_path), codec="libx264", audio_codec="aac", fps=output_fps, logger=None)
+        with encode_pass("fx", str(final_output_path), video_with_fx.duration, output_fps):
+            video_with_fx.write_videofile(str(final_output_path), codec="libx264", audio_codec="aac", fps=output_fps, logger=None)
         logger.info(f"Successfully assembled Step 2 (FX) video: {final_output_path}")
         return str(final_output_path)
 
@@ -587,6 +595,7 @@ def apply_fx_to_video(input_video_path: str, output_dir_path: pathlib.Path, outp
             try: locals()['video_with_fx'].close()
             except Exception as e_final_fx_close: logger.warning(f"Minor error closing final video_with_fx: {e_final_fx_close}")
 
+@observe_stage("captions")
 def add_captions_to_video(input_video_path: str, output_dir_path: pathlib.Path, output_filename: str, transcription_data: list) -> str | None:
     logger.info(f"--- STEP 3: Adding Captions --- ")
     logger.info(f"Input video for Captions: {input_video_path}")
@@ -650,6 +659,7 @@ def add_captions_to_video(input_video_path: str, output_dir_path: pathlib.Path,
         return None
 
 
+@observe_stage("render")
 def assemble_final_video(
     orchestration_summary_path_str: str,
     transcription_path_str: str,
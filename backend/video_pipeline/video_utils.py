@@ -135,6 +135,14 @@ def process_video_clip(
             # original_clip_loaded is not closed here; caller of process_video_clip handles returned clip
             return None
 
+        if (original_w, original_h) == (target_w, target_h) and original_clip_loaded.fps and abs(original_clip_loaded.fps - target_fps) < 0.01:
+            # Already normalized at ingest (see ingest.normalize_media): no resize, crop or retime needed.
+            final_transformed_clip = current_clip_state.set_duration(scene_duration)
+            if clip_was_extended:
+                final_transformed_clip = final_transformed_clip.set_audio(None)
+            logger.info(f"Clip {pathlib.Path(video_path).name} already matches {target_w}x{target_h} @ {target_fps}fps. Skipped resize/crop.")
+            return final_transformed_clip
+
         ar_original = original_w / original_h
         ar_target = target_w / target_h
 